@@ -14,7 +14,9 @@ import hashlib
 import base64
 import uuid
 import time
-from datetime import datetime, timezone
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Any, Union
 from dataclasses import dataclass, asdict
 from enum import Enum
@@ -101,6 +103,231 @@ class ShareLink:
     access_count: int = 0
     max_access: Optional[int] = None
     
+class AnalyticsPipeline:
+    """
+    📊 Buffered analytics events with incrementally maintained rollups
+
+    record() only appends to an in-memory buffer. A background task writes
+    the buffer in one transaction per batch (every flush_interval seconds,
+    or sooner once batch_size events are waiting): the raw events, plus
+    upserts into analytics_totals (per content and event type) and
+    analytics_daily (per content, day and event type). Reads combine the
+    rollup rows with the events not yet written, so their cost does not
+    grow with the number of events stored. If the buffer reaches
+    max_buffer events the next record() writes it out immediately.
+    
+    The writer commits a batch and marks it written under `lock`; readers
+    that combine rollups with pending events hold the same lock, so each
+    event is counted exactly once.
+    """
+    
+    def __init__(self, database_path: str, batch_size: int = 500, flush_interval: float = 2.0,
+                 max_buffer: int = 10000):
+        self.database_path = database_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        
+        self.buffer: List[tuple] = []
+        self.in_flight: List[tuple] = []  # batch being written
+        self._counts: Dict[str, Counter] = defaultdict(Counter)  # content_id -> buffered events by type
+        self._in_flight_counts: Dict[str, Counter] = {}  # the same for in_flight
+        self._in_flight_written = False  # in_flight is committed and already in the rollups
+        self.lock = threading.Lock()
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        
+        self.stats = {"recorded": 0, "written": 0, "batches": 0, "write_errors": 0}
+    
+    def init_tables(self, conn: sqlite3.Connection):
+        """Create rollup tables; fill them from existing raw events the first time"""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analytics_totals'"
+        ).fetchone()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS analytics_totals (
+                content_id TEXT NOT NULL,
+                event_type TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                last_at TEXT NOT NULL,
+                PRIMARY KEY (content_id, event_type)
+            );
+            CREATE TABLE IF NOT EXISTS analytics_daily (
+                content_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                event_type TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (content_id, day, event_type)
+            );
+            CREATE INDEX IF NOT EXISTS idx_analytics_content_time ON content_analytics(content_id, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_analytics_daily_day ON analytics_daily(day, event_type);
+        """)
+        if not exists:
+            conn.execute("""
+                INSERT INTO analytics_totals (content_id, event_type, count, last_at)
+                SELECT content_id, event_type, COUNT(*), MAX(timestamp)
+                FROM content_analytics GROUP BY content_id, event_type
+            """)
+            conn.execute("""
+                INSERT INTO analytics_daily (content_id, day, event_type, count)
+                SELECT content_id, substr(timestamp, 1, 10), event_type, COUNT(*)
+                FROM content_analytics GROUP BY content_id, substr(timestamp, 1, 10), event_type
+            """)
+    
+    def record(self, content_id: str, event_type: str, user_id: str = None, metadata: Dict[str, Any] = None):
+        """Buffer one event (call from the event loop)"""
+        self.buffer.append((
+            str(uuid.uuid4()),
+            content_id,
+            event_type,
+            user_id,
+            datetime.now(timezone.utc).isoformat(),
+            json.dumps(metadata) if metadata else None
+        ))
+        self._counts[content_id][event_type] += 1
+        self.stats["recorded"] += 1
+        
+        if len(self.buffer) >= self.max_buffer:
+            # Writer is behind: write synchronously rather than grow without bound
+            batch, self.buffer = self.buffer, []
+            self._write_batch(batch)
+            self._uncount(batch)
+            self._written(batch)
+        elif len(self.buffer) >= self.batch_size and self._wake is not None:
+            self._wake.set()
+    
+    def start(self):
+        """Start the background writer on the running loop (no-op if it is already running there)"""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = loop.create_task(self._run())
+    
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Analytics flush failed: {e}")
+    
+    async def flush(self) -> int:
+        """Write buffered events now; returns how many were written"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self.buffer:
+                return 0
+            batch, self.buffer = self.buffer, []
+            self.in_flight = batch
+            self._in_flight_counts = self._uncount(batch)
+            self._in_flight_written = False
+            try:
+                await asyncio.to_thread(self._write_batch, batch, self._mark_in_flight_written)
+            except Exception:
+                # Keep the events for the next attempt
+                self.buffer = batch + self.buffer
+                for content_id, counts in self._in_flight_counts.items():
+                    self._counts[content_id].update(counts)
+                self.stats["write_errors"] += 1
+                raise
+            finally:
+                self.in_flight = []
+                self._in_flight_counts = {}
+                self._in_flight_written = False
+            self._written(batch)
+            return len(batch)
+    
+    def _uncount(self, batch: List[tuple]) -> Dict[str, Counter]:
+        """Take batch's events out of the buffered counts; returns them by content"""
+        taken: Dict[str, Counter] = defaultdict(Counter)
+        for _, content_id, event_type, _, _, _ in batch:
+            counts = self._counts[content_id]
+            counts[event_type] -= 1
+            if counts[event_type] <= 0:
+                del counts[event_type]
+            if not counts:
+                del self._counts[content_id]
+            taken[content_id][event_type] += 1
+        return taken
+    
+    def _mark_in_flight_written(self):
+        self._in_flight_written = True
+    
+    def _written(self, batch: List[tuple]):
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+    
+    def _write_batch(self, batch: List[tuple], on_commit=None):
+        totals: Dict[tuple, list] = {}
+        daily = Counter()
+        for _, content_id, event_type, _, timestamp, _ in batch:
+            entry = totals.setdefault((content_id, event_type), [0, timestamp])
+            entry[0] += 1
+            entry[1] = max(entry[1], timestamp)
+            daily[(content_id, timestamp[:10], event_type)] += 1
+        
+        conn = sqlite3.connect(self.database_path, timeout=30)
+        try:
+            with conn:
+                conn.executemany("""
+                    INSERT INTO content_analytics (id, content_id, event_type, user_id, timestamp, metadata)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, batch)
+                conn.executemany("""
+                    INSERT INTO analytics_totals (content_id, event_type, count, last_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (content_id, event_type) DO UPDATE SET
+                        count = count + excluded.count, last_at = MAX(last_at, excluded.last_at)
+                """, [(content_id, event_type, count, last_at)
+                      for (content_id, event_type), (count, last_at) in totals.items()])
+                conn.executemany("""
+                    INSERT INTO analytics_daily (content_id, day, event_type, count) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (content_id, day, event_type) DO UPDATE SET count = count + excluded.count
+                """, [(content_id, day, event_type, count) for (content_id, day, event_type), count in daily.items()])
+                # The rollups and the pending counts change in one step for readers holding the lock
+                with self.lock:
+                    conn.commit()
+                    if on_commit:
+                        on_commit()
+        finally:
+            conn.close()
+    
+    def pending_counts(self, content_id: str) -> Counter:
+        """Events for content_id recorded but not yet written, by type (hold lock to match the rollups)"""
+        counts = Counter(self._counts.get(content_id, {}))
+        if not self._in_flight_written:
+            counts.update(self._in_flight_counts.get(content_id, {}))
+        return counts
+    
+    def pending_events(self, content_id: str, limit: int) -> List[tuple]:
+        """Newest unwritten events for content_id (hold lock to match the rollups)"""
+        found = []
+        unwritten = self.buffer if self._in_flight_written else self.in_flight + self.buffer
+        for event in reversed(unwritten):
+            if event[1] == content_id:
+                found.append(event)
+                if len(found) == limit:
+                    break
+        return found
+    
+    async def close(self):
+        """Stop the background writer and write what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
 class EnhancedEcosystemManager:
     """
     🌐 Enhanced Ecosystem Manager - Complete Content & Collaboration Platform
@@ -115,6 +342,9 @@ class EnhancedEcosystemManager:
         self.encryption_key = self._get_or_create_encryption_key()
         self.cipher_suite = Fernet(self.encryption_key) if (Fernet is not None and self.encryption_key) else None
         
+        # Analytics events are buffered and written in batches with rollups
+        self.analytics = AnalyticsPipeline(database_path)
+        
         # Initialize database
         self._init_database()
         
@@ -225,6 +455,9 @@ class EnhancedEcosystemManager:
             )
         """)
         
+        # Analytics rollups
+        self.analytics.init_tables(conn)
+        
         conn.commit()
         conn.close()
         
@@ -796,60 +1029,60 @@ class EnhancedEcosystemManager:
         user_id: str = None,
         metadata: Dict[str, Any] = None
     ):
-        """Log analytics event"""
-        
-        analytics_id = str(uuid.uuid4())
-        
-        conn = sqlite3.connect(self.database_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO content_analytics 
-            (id, content_id, event_type, user_id, timestamp, metadata)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
-            analytics_id,
-            content_id,
-            event_type,
-            user_id,
-            datetime.now(timezone.utc).isoformat(),
-            json.dumps(metadata) if metadata else None
-        ))
+        """Log analytics event (buffered; written in batches by a background task)"""
         
-        conn.commit()
-        conn.close()
+        self.analytics.start()
+        self.analytics.record(content_id, event_type, user_id, metadata)
     
-    async def get_analytics(self, content_id: str) -> Dict[str, Any]:
+    async def get_analytics(self, content_id: str, days: int = 30) -> Dict[str, Any]:
         """Get analytics for content"""
         
         conn = sqlite3.connect(self.database_path)
         cursor = conn.cursor()
         
-        # Get basic analytics
-        cursor.execute("""
-            SELECT event_type, COUNT(*) as count
-            FROM content_analytics 
-            WHERE content_id = ?
-            GROUP BY event_type
-        """, (content_id,))
-        
-        analytics = {}
-        for row in cursor.fetchall():
-            analytics[row[0]] = row[1]
-        
-        # Get recent activity
-        cursor.execute("""
-            SELECT event_type, user_id, timestamp, metadata
-            FROM content_analytics 
-            WHERE content_id = ?
-            ORDER BY timestamp DESC
-            LIMIT 20
-        """, (content_id,))
+        # Rollups and pending events are read under the pipeline lock, so a
+        # batch committing meanwhile is counted once, on one side or the other
+        with self.analytics.lock:
+            # Get basic analytics from the rollups, plus events not written yet
+            cursor.execute("""
+                SELECT event_type, count
+                FROM analytics_totals 
+                WHERE content_id = ?
+            """, (content_id,))
+        
+            analytics = Counter(dict(cursor.fetchall()))
+            analytics.update(self.analytics.pending_counts(content_id))
+        
+            # Daily counts for the last `days` days
+            since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).date().isoformat()
+            cursor.execute("""
+                SELECT day, event_type, count
+                FROM analytics_daily 
+                WHERE content_id = ? AND day >= ?
+            """, (content_id, since))
+        
+            daily = defaultdict(Counter)
+            for day, event_type, count in cursor.fetchall():
+                daily[day][event_type] += count
+            for _, _, event_type, _, timestamp, _ in self.analytics.pending_events(content_id, self.analytics.max_buffer):
+                daily[timestamp[:10]][event_type] += 1
+        
+            # Get recent activity
+            cursor.execute("""
+                SELECT event_type, user_id, timestamp, metadata
+                FROM content_analytics 
+                WHERE content_id = ?
+                ORDER BY timestamp DESC
+                LIMIT 20
+            """, (content_id,))
+        
+            columns = [desc[0] for desc in cursor.description]
+            rows = [(event_type, user_id, timestamp, metadata)
+                    for _, _, event_type, user_id, timestamp, metadata in self.analytics.pending_events(content_id, 20)]
+            rows += cursor.fetchall()
         
         recent_activity = []
-        columns = [desc[0] for desc in cursor.description]
-        
-        for row in cursor.fetchall():
+        for row in rows[:20]:
             activity = dict(zip(columns, row))
             if activity['metadata']:
                 activity['metadata'] = json.loads(activity['metadata'])
@@ -858,7 +1091,8 @@ class EnhancedEcosystemManager:
         conn.close()
         
         return {
-            "summary": analytics,
+            "summary": dict(analytics),
+            "daily": {day: dict(daily[day]) for day in sorted(daily, reverse=True)},
             "recent_activity": recent_activity
         }
     
@@ -948,8 +1182,9 @@ class EnhancedEcosystemManager:
         backup_dir = Path(backup_path)
         backup_dir.mkdir(exist_ok=True)
         
-        # Backup database
+        # Backup database (with buffered analytics written first)
         import shutil
+        await self.analytics.flush()
         shutil.copy2(self.database_path, backup_dir / "ecosystem.db")
         
         # Backup content storage
@@ -969,6 +1204,10 @@ class EnhancedEcosystemManager:
         
         logger.info(f"💾 Ecosystem backup created: {backup_path}")
         return str(backup_dir)
+    
+    async def close(self):
+        """Write buffered analytics and stop the background writer"""
+        await self.analytics.close()
 
 
 # Integration with existing Ultimate Agentic AI System
@@ -1114,6 +1353,8 @@ class AutonomousAgent:
     backup_path = await ecosystem.backup_ecosystem()
     print(f"💾 Backup created: {backup_path}")
     
+    await ecosystem.close()
+    
     print("\n🎉 Enhanced Ecosystem Integration completed successfully!")
 
 
@@ -8,167 +8,73 @@ __version__ = "2.0.0"
 __author__ = "Mulky Malikul Dhaher"
 __description__ = "Autonomous Multi-Agent Intelligence System"
 
-# Import all agents
-try:
-    from .cybershell import cybershell_agent
-except ImportError:
-    cybershell_agent = None
+import sys
+from types import ModuleType
 
-try:
-    from .agent_maker import agent_maker
-except ImportError:
-    agent_maker = None
+from core.lazy_registry import LazyRegistry
 
-try:
-    from .ui_designer import ui_designer_agent
-except ImportError:
-    ui_designer_agent = None
-
-try:
-    from .dev_engine import dev_engine_agent
-except ImportError:
-    dev_engine_agent = None
-
-try:
-    from .data_sync import data_sync_agent
-except ImportError:
-    data_sync_agent = None
-
-try:
-    from .fullstack_dev import fullstack_dev_agent
-except ImportError:
-    fullstack_dev_agent = None
-
-try:
-    from .meta_agent_creator import meta_agent_creator
-except ImportError:
-    meta_agent_creator = None
-
-try:
-    from .system_optimizer import system_optimizer
-except ImportError:
-    system_optimizer = None
-
-try:
-    from .code_executor import code_executor
-except ImportError:
-    code_executor = None
-
-try:
-    from .ai_research_agent import ai_research_agent
-except ImportError:
-    ai_research_agent = None
-
-try:
-    from .credential_manager import credential_manager
-except ImportError:
-    credential_manager = None
-
-try:
-    from .authentication_agent import authentication_agent
-except ImportError:
-    authentication_agent = None
-
-try:
-    from .llm_provider_manager import llm_provider_manager
-except ImportError:
-    llm_provider_manager = None
-
-# New agents from cursor/fix branch integration
-try:
-    from .agi_colony_connector import agi_colony_connector
-except ImportError:
-    agi_colony_connector = None
-
-try:
-    from .backup_colony_system import backup_colony_system
-except ImportError:
-    backup_colony_system = None
-
-try:
-    from .bug_hunter_bot import bug_hunter_bot
-except ImportError:
-    bug_hunter_bot = None
-
-try:
-    from .commander_agi import commander_agi
-except ImportError:
-    commander_agi = None
-
-try:
-    from .deployment_specialist import deployment_specialist
-except ImportError:
-    deployment_specialist = None
+# Agents are imported on first use: attribute name -> (submodule, attribute, registry id).
+# Importing every agent module eagerly pulled in psutil, selenium, sklearn,
+# cryptography and database connections just to list the registry.
+_LAZY_AGENTS = {
+    'cybershell_agent': ('cybershell', 'cybershell_agent', 'cybershell'),
+    'agent_maker': ('agent_maker', 'agent_maker', 'agent_maker'),
+    'ui_designer_agent': ('ui_designer', 'ui_designer_agent', 'ui_designer'),
+    'dev_engine_agent': ('dev_engine', 'dev_engine_agent', 'dev_engine'),
+    'data_sync_agent': ('data_sync', 'data_sync_agent', 'data_sync'),
+    'fullstack_dev_agent': ('fullstack_dev', 'fullstack_dev_agent', 'fullstack_dev'),
+    'meta_agent_creator': ('meta_agent_creator', 'meta_agent_creator', 'meta_agent_creator'),
+    'system_optimizer': ('system_optimizer', 'system_optimizer', 'system_optimizer'),
+    'code_executor': ('code_executor', 'code_executor', 'code_executor'),
+    'ai_research_agent': ('ai_research_agent', 'ai_research_agent', 'ai_research_agent'),
+    'credential_manager': ('credential_manager', 'credential_manager', 'credential_manager'),
+    'authentication_agent': ('authentication_agent', 'authentication_agent', 'authentication_agent'),
+    'llm_provider_manager': ('llm_provider_manager', 'llm_provider_manager', 'llm_provider_manager'),
+    # New agents from cursor/fix branch integration
+    'agi_colony_connector': ('agi_colony_connector', 'agi_colony_connector', 'agi_colony_connector'),
+    'backup_colony_system': ('backup_colony_system', 'backup_colony_system', 'backup_colony_system'),
+    'bug_hunter_bot': ('bug_hunter_bot', 'bug_hunter_bot', 'bug_hunter_bot'),
+    'commander_agi': ('commander_agi', 'commander_agi', 'commander_agi'),
+    'deployment_specialist': ('deployment_specialist', 'deployment_specialist', 'deployment_specialist'),
+    'knowledge_management_agent': ('knowledge_management_agent', 'knowledge_management_agent', 'knowledge_management_agent'),
+    'marketing_agent': ('marketing_agent', 'marketing_agent', 'marketing_agent'),
+    'money_making_agent': ('money_making_agent', 'money_making_agent', 'money_making_agent'),
+    'quality_control_specialist': ('quality_control_specialist', 'quality_control_specialist', 'quality_control_specialist'),
+}
 
-try:
-    from .knowledge_management_agent import knowledge_management_agent
-except ImportError:
-    knowledge_management_agent = None
+_AGENT_ATTRS = {agent_id: attr for attr, (_, _, agent_id) in _LAZY_AGENTS.items()}
 
-try:
-    from .marketing_agent import marketing_agent
-except ImportError:
-    marketing_agent = None
+def _bind_agent(agent_id: str, instance):
+    # Cache the loaded instance so later lookups skip __getattr__
+    if agent_id in _AGENT_ATTRS:
+        globals()[_AGENT_ATTRS[agent_id]] = instance
 
-try:
-    from .money_making_agent import money_making_agent
-except ImportError:
-    money_making_agent = None
+class _AgentsPackage(ModuleType):
+    def __setattr__(self, name: str, value):
+        # Importing a submodule binds it on its package, so after
+        # `import agents.code_executor` (e.g. from agent_pool) agents.code_executor
+        # would be the module; keep such names resolving to the instance
+        if name in _LAZY_AGENTS and isinstance(value, ModuleType):
+            return
+        super().__setattr__(name, value)
 
-try:
-    from .quality_control_specialist import quality_control_specialist
-except ImportError:
-    quality_control_specialist = None
+sys.modules[__name__].__class__ = _AgentsPackage
 
 # Global agents registry
-AGENTS_REGISTRY = {}
+AGENTS_REGISTRY = LazyRegistry(
+    {agent_id: (f'.{module}', instance) for module, instance, agent_id in _LAZY_AGENTS.values()},
+    package=__name__,
+    on_load=_bind_agent
+)
+
+def __getattr__(name: str):
+    # PEP 562: only called for names not already in the module namespace
+    if name in _LAZY_AGENTS:
+        return AGENTS_REGISTRY.load(_LAZY_AGENTS[name][2])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Add agents that were successfully imported
-if cybershell_agent:
-    AGENTS_REGISTRY['cybershell'] = cybershell_agent
-if agent_maker:
-    AGENTS_REGISTRY['agent_maker'] = agent_maker
-if ui_designer_agent:
-    AGENTS_REGISTRY['ui_designer'] = ui_designer_agent
-if dev_engine_agent:
-    AGENTS_REGISTRY['dev_engine'] = dev_engine_agent
-if data_sync_agent:
-    AGENTS_REGISTRY['data_sync'] = data_sync_agent
-if fullstack_dev_agent:
-    AGENTS_REGISTRY['fullstack_dev'] = fullstack_dev_agent
-if meta_agent_creator:
-    AGENTS_REGISTRY['meta_agent_creator'] = meta_agent_creator
-if system_optimizer:
-    AGENTS_REGISTRY['system_optimizer'] = system_optimizer
-if code_executor:
-    AGENTS_REGISTRY['code_executor'] = code_executor
-if ai_research_agent:
-    AGENTS_REGISTRY['ai_research_agent'] = ai_research_agent
-if credential_manager:
-    AGENTS_REGISTRY['credential_manager'] = credential_manager
-if authentication_agent:
-    AGENTS_REGISTRY['authentication_agent'] = authentication_agent
-if llm_provider_manager:
-    AGENTS_REGISTRY['llm_provider_manager'] = llm_provider_manager
-# New agents from cursor/fix integration
-if agi_colony_connector:
-    AGENTS_REGISTRY['agi_colony_connector'] = agi_colony_connector
-if backup_colony_system:
-    AGENTS_REGISTRY['backup_colony_system'] = backup_colony_system
-if bug_hunter_bot:
-    AGENTS_REGISTRY['bug_hunter_bot'] = bug_hunter_bot
-if commander_agi:
-    AGENTS_REGISTRY['commander_agi'] = commander_agi
-if deployment_specialist:
-    AGENTS_REGISTRY['deployment_specialist'] = deployment_specialist
-if knowledge_management_agent:
-    AGENTS_REGISTRY['knowledge_management_agent'] = knowledge_management_agent
-if marketing_agent:
-    AGENTS_REGISTRY['marketing_agent'] = marketing_agent
-if money_making_agent:
-    AGENTS_REGISTRY['money_making_agent'] = money_making_agent
-if quality_control_specialist:
-    AGENTS_REGISTRY['quality_control_specialist'] = quality_control_specialist
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_AGENTS))
 
 # Agent metadata for UI
 AGENTS_METADATA = {
@@ -344,7 +250,7 @@ def get_agents_list():
     
     return agents_list
 
-print(f"✅ Agents module loaded - {len(AGENTS_REGISTRY)} agents available")
+print(f"✅ Agents module loaded - {len(_LAZY_AGENTS)} agents registered (imported on first use)")
 
 # Legacy imports for compatibility
 __all__ = [
@@ -10,11 +10,6 @@ import os
 import requests
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 import time
 
 class AuthenticationAgent:
@@ -70,8 +65,8 @@ class AuthenticationAgent:
         self.active_sessions = {}
         self.session_cookies = {}
         
-        # Browser setup for web automation
-        self.browser_options = self._setup_browser_options()
+        # Browser setup for web automation; selenium is imported on the first web login
+        self.browser_options = None
         
         # Performance metrics
         self.successful_logins = 0
@@ -81,8 +76,10 @@ class AuthenticationAgent:
         
         print(f"✅ {self.name} initialized with {len(self.auth_handlers)} platform handlers")
     
-    def _setup_browser_options(self) -> Options:
+    def _setup_browser_options(self):
         """Setup Chrome browser options for automation"""
+        from selenium.webdriver.chrome.options import Options
+        
         options = Options()
         options.add_argument('--headless')  # Run in background
         options.add_argument('--no-sandbox')
@@ -357,6 +354,13 @@ class AuthenticationAgent:
         """Perform web-based login using browser automation"""
         driver = None
         try:
+            from selenium import webdriver
+            from selenium.webdriver.common.by import By
+            from selenium.webdriver.support.ui import WebDriverWait
+            from selenium.webdriver.support import expected_conditions as EC
+            
+            if self.browser_options is None:
+                self.browser_options = self._setup_browser_options()
             driver = webdriver.Chrome(options=self.browser_options)
             driver.get(login_url)
             
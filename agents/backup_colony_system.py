@@ -10,7 +10,6 @@ import json
 import logging
 import hashlib
 import shutil
-import gzip
 import time
 import os
 import sqlite3
@@ -22,9 +21,7 @@ from dataclasses import dataclass
 from pathlib import Path
 import requests
 import subprocess
-import tempfile
 import zipfile
-import tarfile
 import base64
 
 # Heavy dependency - made optional for graceful degradation
@@ -35,6 +32,9 @@ except ImportError:
     Fernet = None
     _CRYPTOGRAPHY_AVAILABLE = False
 
+from core.chunk_store import BACKUP_TYPES, ChunkStore
+from core.replication_queue import DirectoryNode, ReplicationQueue
+
 @dataclass
 class BackupNode:
     """Backup node information"""
@@ -105,7 +105,6 @@ class BackupColonySystem:
         # Backup infrastructure
         self.backup_nodes = {}
         self.backup_records = {}
-        self.sync_queue = []
         self.replication_factor = 3  # Minimum copies per backup
         
         # Backup configuration
@@ -118,6 +117,11 @@ class BackupColonySystem:
                 "yearly": 5     # Keep 5 yearly backups
             },
             "compression_level": 6,
+            "backup_workers": min(8, os.cpu_count() or 1),  # threads compressing and writing chunks
+            "restore_workers": 4,  # threads decoding chunks during a restore
+            "replication_transfers": 4,  # concurrent node transfers overall
+            "replication_bandwidth_mb_s": 0,  # overall replication bandwidth, 0 = unlimited
+            "critical_paths": ["data/", "config/"],  # backups of these replicate first
             "encryption_enabled": True,
             "max_backup_size": 10 * 1024 * 1024 * 1024,  # 10GB
             "priority_paths": [
@@ -193,6 +197,22 @@ class BackupColonySystem:
         
         # Generate encryption keys
         self.initialize_encryption()
+        
+        # Deduplicating chunk store that backups are written to
+        self.chunk_store = ChunkStore(
+            "data/backups/store",
+            cipher=Fernet(self.master_key) if self.master_key else None,
+            compression_level=self.backup_config["compression_level"],
+            workers=self.backup_config["backup_workers"]
+        )
+        
+        # Durable replication queue: copies snapshots' chunks and manifests to other nodes
+        self.replication = ReplicationQueue(
+            "data/backups/replication.db", str(self.chunk_store.root), self.chunk_store.snapshot_files,
+            max_concurrent=self.backup_config["replication_transfers"],
+            bandwidth=self.backup_config["replication_bandwidth_mb_s"] * 1024 * 1024 or None,
+            on_complete=self._on_replicated
+        )
     
     def initialize_local_node(self):
         """Initialize local backup node"""
@@ -314,12 +334,33 @@ class BackupColonySystem:
                     config = json.load(f)
                     self.backup_config.update(config.get("backup_config", {}))
                     self.colony_network.update(config.get("colony_network", {}))
+                    self.chunk_store.workers = self.backup_config["backup_workers"]
                     
                 self.logger.info("Backup configuration loaded")
                 
             except Exception as e:
                 self.logger.error(f"Failed to load backup configuration: {e}")
     
+    def add_backup_node(self, node_id: str, path: str, bandwidth_mb_s: float = 0,
+                        max_transfers: int = 2) -> BackupNode:
+        """Add a directory-backed node (e.g. a mounted disk or share) that backups replicate to"""
+        Path(path).mkdir(parents=True, exist_ok=True)
+        disk_usage = shutil.disk_usage(path)
+        node = BackupNode(
+            node_id=node_id,
+            node_type="remote",
+            location=path,
+            capacity_gb=disk_usage.total / (1024**3),
+            used_gb=(disk_usage.total - disk_usage.free) / (1024**3),
+            status="active",
+            connection_info={"path": path, "transport": "directory"}
+        )
+        self.backup_nodes[node_id] = node
+        self.replication.register_node(node_id, DirectoryNode(path), max_concurrent=max_transfers,
+                                       bandwidth=bandwidth_mb_s * 1024 * 1024 or None)
+        self.logger.info(f"Backup node added: {node_id} at {path}")
+        return node
+    
     async def start_colony_network(self) -> Dict[str, Any]:
         """Start backup colony network"""
         self.logger.info("Starting backup colony network")
@@ -355,39 +396,30 @@ class BackupColonySystem:
         self.logger.info(f"Creating {backup_type} backup of {source_path}")
         
         try:
-            backup_id = hashlib.md5(f"{source_path}_{backup_type}_{datetime.now()}".encode()).hexdigest()[:8]
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"backup_{backup_id}_{timestamp}.tar.gz"
+            if backup_type not in BACKUP_TYPES:
+                return {"success": False, "error": f"Unknown backup type: {backup_type}"}
             
-            # Determine backup path
-            backup_dir = Path("data/backups/local")
-            backup_path = backup_dir / backup_filename
+            backup_id = hashlib.md5(f"{source_path}_{backup_type}_{datetime.now()}".encode()).hexdigest()[:8]
             
-            # Create compressed backup
-            compression_start = time.time()
-            original_size, compressed_size, file_count = await self._create_compressed_backup(
-                source_path, backup_path, encrypt
+            # Chunk, deduplicate, compress and encrypt off the event loop;
+            # only chunks the store has not seen before are written
+            report = await asyncio.to_thread(
+                self.chunk_store.snapshot, source_path, backup_id, backup_type,
+                encrypt, self.backup_config["compression_level"]
             )
-            compression_time = time.time() - compression_start
-            
-            # Calculate compression ratio
-            compression_ratio = compressed_size / original_size if original_size > 0 else 0
             
-            # Generate checksum
-            checksum = await self._calculate_checksum(backup_path)
-            
-            # Create backup record
+            # Create backup record (the manifest is what gets checksummed and replicated)
             backup_record = BackupRecord(
                 backup_id=backup_id,
                 backup_type=backup_type,
                 source_path=source_path,
-                backup_path=str(backup_path),
-                file_count=file_count,
-                size_bytes=compressed_size,
+                backup_path=report["manifest_path"],
+                file_count=report["file_count"],
+                size_bytes=report["stored_bytes"],
                 created_at=datetime.now(),
-                compression_ratio=compression_ratio,
-                encryption_enabled=encrypt,
-                checksum=checksum,
+                compression_ratio=report["compression_ratio"],
+                encryption_enabled=report["encrypted"],
+                checksum=report["manifest_sha256"],
                 nodes_stored=[list(self.backup_nodes.keys())[0]]  # Initially on local node
             )
             
@@ -399,71 +431,36 @@ class BackupColonySystem:
             # Queue for replication to other nodes
             await self._queue_for_replication(backup_id)
             
-            self.logger.info(f"Backup created: {backup_id} ({compressed_size/1024/1024:.2f}MB, "
-                           f"{compression_ratio:.2f} compression ratio)")
+            self.logger.info(f"Backup created: {backup_id} ({report['files_changed']}/{report['file_count']} files changed, "
+                           f"{report['stored_bytes']/1024/1024:.2f}MB written, dedup ratio {report['dedup_ratio']}, "
+                           f"{report['throughput_mb_s']}MB/s)")
             
             return {
                 "success": True,
                 "backup_id": backup_id,
-                "size_mb": compressed_size / 1024 / 1024,
-                "compression_ratio": compression_ratio,
-                "file_count": file_count,
-                "creation_time": compression_time,
-                "encrypted": encrypt
+                "backup_type": backup_type,
+                "base_id": report["base_id"],
+                "size_mb": report["stored_bytes"] / 1024 / 1024,
+                "compression_ratio": report["compression_ratio"],
+                "dedup_ratio": report["dedup_ratio"],
+                "file_count": report["file_count"],
+                "files_changed": report["files_changed"],
+                "new_chunks": report["new_chunks"],
+                "reused_chunks": report["reused_chunks"],
+                "throughput_mb_s": report["throughput_mb_s"],
+                "stages": report["stages"],
+                "codec": report["codec"],
+                "creation_time": report["duration"],
+                "encrypted": report["encrypted"]
             }
             
         except Exception as e:
             self.logger.error(f"Failed to create backup: {e}")
             return {"success": False, "error": str(e)}
     
-    async def _create_compressed_backup(self, source_path: str, backup_path: Path, 
-                                      encrypt: bool) -> tuple:
-        """Create compressed and optionally encrypted backup"""
-        original_size = 0
-        file_count = 0
-        
-        # Create temporary tar file
-        with tempfile.NamedTemporaryFile(suffix='.tar', delete=False) as temp_tar:
-            temp_tar_path = temp_tar.name
-        
-        try:
-            # Create tar archive
-            with tarfile.open(temp_tar_path, 'w') as tar:
-                source = Path(source_path)
-                if source.is_file():
-                    tar.add(source, arcname=source.name)
-                    original_size = source.stat().st_size
-                    file_count = 1
-                else:
-                    for item in source.rglob('*'):
-                        if item.is_file():
-                            tar.add(item, arcname=item.relative_to(source.parent))
-                            original_size += item.stat().st_size
-                            file_count += 1
-            
-            # Compress and optionally encrypt
-            with open(temp_tar_path, 'rb') as tar_file:
-                tar_data = tar_file.read()
-            
-            if encrypt and self.master_key:
-                fernet = Fernet(self.master_key)
-                tar_data = fernet.encrypt(tar_data)
-            
-            # Compress
-            with gzip.open(backup_path, 'wb', compresslevel=self.backup_config["compression_level"]) as gz_file:
-                gz_file.write(tar_data)
-            
-            compressed_size = backup_path.stat().st_size
-            
-            return original_size, compressed_size, file_count
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_tar_path):
-                os.unlink(temp_tar_path)
-    
-    async def restore_backup(self, backup_id: str, restore_path: str) -> Dict[str, Any]:
-        """Restore a backup to specified location"""
+    async def restore_backup(self, backup_id: str, restore_path: str,
+                             paths: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Restore a backup (or only the files matching paths) to specified location"""
         self.logger.info(f"Restoring backup {backup_id} to {restore_path}")
         
         if backup_id not in self.backup_records:
@@ -491,47 +488,47 @@ class BackupColonySystem:
             if current_checksum != backup_record.checksum:
                 return {"success": False, "error": "Backup integrity check failed"}
             
-            # Restore backup
-            restore_start = time.time()
-            
-            # Decompress
-            with gzip.open(backup_file, 'rb') as gz_file:
-                compressed_data = gz_file.read()
-            
-            # Decrypt if encrypted
-            if backup_record.encryption_enabled and self.master_key:
-                fernet = Fernet(self.master_key)
-                compressed_data = fernet.decrypt(compressed_data)
+            # Restore backup: chunks are decoded and verified in parallel and
+            # streamed into place, so memory use does not grow with backup size
+            report = await asyncio.to_thread(
+                self.chunk_store.restore, backup_id, restore_path, paths,
+                self.backup_config["restore_workers"]
+            )
             
-            # Extract tar archive
-            with tempfile.NamedTemporaryFile(suffix='.tar', delete=False) as temp_tar:
-                temp_tar.write(compressed_data)
-                temp_tar_path = temp_tar.name
+            self.logger.info(f"Backup {backup_id} restored successfully in {report['duration']:.2f}s")
             
-            try:
-                with tarfile.open(temp_tar_path, 'r') as tar:
-                    tar.extractall(path=restore_path)
-                
-                restore_time = time.time() - restore_start
-                
-                self.logger.info(f"Backup {backup_id} restored successfully in {restore_time:.2f}s")
-                
-                return {
-                    "success": True,
-                    "backup_id": backup_id,
-                    "restore_path": restore_path,
-                    "file_count": backup_record.file_count,
-                    "restore_time": restore_time
-                }
-                
-            finally:
-                if os.path.exists(temp_tar_path):
-                    os.unlink(temp_tar_path)
+            return {
+                "success": True,
+                "backup_id": backup_id,
+                "restore_path": restore_path,
+                "file_count": report["file_count"],
+                "files_in_backup": report["files_in_backup"],
+                "bytes_restored": report["bytes_restored"],
+                "restore_time": report["duration"],
+                "throughput_mb_s": report["throughput_mb_s"]
+            }
             
         except Exception as e:
             self.logger.error(f"Failed to restore backup {backup_id}: {e}")
             return {"success": False, "error": str(e)}
     
+    async def list_backup_files(self, backup_id: str, paths: Optional[List[str]] = None) -> Dict[str, Any]:
+        """List the files in a backup, e.g. to pick paths for a selective restore"""
+        if backup_id not in self.backup_records:
+            return {"success": False, "error": "Backup not found"}
+        
+        try:
+            manifest = await asyncio.to_thread(self.chunk_store.load_manifest, backup_id)
+            files = self.chunk_store.select(manifest, paths)
+            return {
+                "success": True,
+                "backup_id": backup_id,
+                "files": [{"path": name, "size": entry["size"], "sha256": entry["sha256"]} for name, entry in files]
+            }
+        except Exception as e:
+            self.logger.error(f"Failed to list backup {backup_id}: {e}")
+            return {"success": False, "error": str(e)}
+    
     async def discover_colony_nodes(self) -> Dict[str, Any]:
         """Discover other backup colony nodes on the network"""
         self.logger.info("Discovering backup colony nodes")
@@ -593,6 +590,7 @@ class BackupColonySystem:
         ])
         
         # Calculate redundancy statistics
+        replication = self.replication.get_stats()
         replicated_backups = len([
             b for b in self.backup_records.values()
             if len(b.nodes_stored) >= self.replication_factor
@@ -613,7 +611,9 @@ class BackupColonySystem:
                 "replicated_backups": replicated_backups,
                 "replication_factor": self.replication_factor
             },
-            "sync_queue": len(self.sync_queue),
+            "chunk_store": self.chunk_store.get_stats(),
+            "replication": replication,
+            "sync_queue": replication["pending"],
             "last_backup": max([b.created_at for b in self.backup_records.values()]).isoformat() if self.backup_records else None,
             "uptime_hours": (datetime.now() - self.start_time).total_seconds() / 3600
         }
@@ -632,11 +632,8 @@ class BackupColonySystem:
         """Background service for data synchronization"""
         while True:
             try:
-                if self.sync_queue:
-                    backup_id = self.sync_queue.pop(0)
-                    await self._replicate_backup(backup_id)
-                
-                await asyncio.sleep(30)  # Check sync queue every 30 seconds
+                # Runs queued transfers, waking on new backups or every 30 seconds for retries
+                await self.replication.run_forever(30)
             except Exception as e:
                 self.logger.error(f"Synchronization service error: {e}")
                 await asyncio.sleep(60)
@@ -691,15 +688,15 @@ class BackupColonySystem:
                 await asyncio.sleep(600)
     
     async def _calculate_checksum(self, file_path: Path) -> str:
-        """Calculate SHA-256 checksum of file"""
-        import hashlib
-        sha256_hash = hashlib.sha256()
-        
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(chunk)
-        
-        return sha256_hash.hexdigest()
+        """Calculate SHA-256 checksum of file (in a worker thread)"""
+        def digest() -> str:
+            sha256_hash = hashlib.sha256()
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha256_hash.update(chunk)
+            return sha256_hash.hexdigest()
+        
+        return await asyncio.to_thread(digest)
     
     async def _save_backup_record(self, backup_record: BackupRecord):
         """Save backup record to database"""
@@ -734,15 +731,29 @@ class BackupColonySystem:
             self.logger.error(f"Failed to save backup record: {e}")
     
     async def _queue_for_replication(self, backup_id: str):
-        """Queue backup for replication to other nodes"""
-        if backup_id not in self.sync_queue:
-            self.sync_queue.append(backup_id)
+        """Queue backup for replication to other nodes (backups of critical paths first)"""
+        record = self.backup_records[backup_id]
+        source = Path(record.source_path).as_posix()
+        critical = any(source.startswith(path.rstrip("/")) for path in self.backup_config["critical_paths"])
+        for node_id in self.replication.nodes:
+            if node_id not in record.nodes_stored:
+                self.replication.enqueue(backup_id, node_id, priority=1 if critical else 0,
+                                         created_at=record.created_at.timestamp())
     
     async def _replicate_backup(self, backup_id: str):
-        """Replicate backup to other available nodes"""
-        # Implementation would depend on available remote nodes
-        # For now, just log the replication attempt
-        self.logger.info(f"Replication queued for backup {backup_id}")
+        """Replicate backup to other available nodes now instead of waiting for the background service"""
+        await self._queue_for_replication(backup_id)
+        await self.replication.drain()
+    
+    async def _on_replicated(self, backup_id: str, node_id: str):
+        """Record a finished transfer on the backup and the node"""
+        record = self.backup_records.get(backup_id)
+        if record is not None and node_id not in record.nodes_stored:
+            record.nodes_stored.append(node_id)
+            await self._save_backup_record(record)
+        if node_id in self.backup_nodes:
+            self.backup_nodes[node_id].last_sync = datetime.now()
+        self.logger.info(f"Backup {backup_id} replicated to {node_id}")
 
 # Global instance
 backup_colony_system = BackupColonySystem()
@@ -7,15 +7,22 @@ Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
 import asyncio
 import json
 import os
-import subprocess
-import tempfile
-import docker
 import uuid
+try:
+    import docker
+except ImportError:
+    docker = None
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 import sys
 
+from core.process_runner import ProcessRunner
+from core.interpreter_pool import InterpreterPool
+from core.compile_cache import CompileCache
+from core.container_pool import ContainerPool
+from core.session_manager import SessionManager
+
 class CodeExecutorAgent:
     """
     Advanced Code Execution Agent that:
@@ -97,10 +104,47 @@ class CodeExecutorAgent:
             }
         }
         
-        # Execution sessions
-        self.active_sessions = {}
+        # Execution sessions: directories are removed after 30 idle minutes
+        # (sessions execute_code makes on its own after ephemeral_session_ttl),
+        # least recently used first beyond 200 sessions or 1 GB. Set
+        # AGENTIC_SESSIONS_TMPFS=1 to keep them in /dev/shm
+        self.ephemeral_session_ttl = 60
+        self.sessions = SessionManager(
+            "temp_sessions", idle_ttl=1800, max_sessions=200, max_bytes=1024 * 1024 * 1024,
+            use_tmpfs=os.getenv("AGENTIC_SESSIONS_TMPFS") == "1", reap_interval=60
+        )
+        self.active_sessions = self.sessions.sessions
         self.execution_history = []
         
+        # Local runs and package installs go through asyncio subprocesses so
+        # they never block the event loop; at most max_concurrent at a time
+        self.execution_timeout = 30  # seconds per compile or run step
+        self.install_timeout = 60
+        self.process_runner = ProcessRunner(self.agent_id, max_concurrent=4,
+                                            default_timeout=self.execution_timeout,
+                                            max_output=1024 * 1024)
+        
+        # Compiled languages: builds are cached by a hash of source, flags
+        # and toolchain version, so repeated programs skip the compiler
+        self.compile_specs = {
+            'cpp': {'version': ['g++', '--version'], 'flags': []},
+            'java': {'version': ['javac', '-version'], 'flags': []},
+            'go': {'version': ['go', 'version'], 'flags': []}
+        }
+        self.compile_cache = CompileCache("data/compile_cache", max_bytes=512 * 1024 * 1024,
+                                          runner=self.process_runner)
+        
+        # Python runs go to warm pre-started interpreters (POSIX only: the
+        # workers rely on rlimits and interval timers); a caller-supplied
+        # session_id keeps its namespace between runs, REPL style, in a
+        # worker that serves no other session
+        self.interpreter_pool = InterpreterPool(
+            size=2, max_runs=100, cpu_seconds=self.execution_timeout,
+            memory_mb=512, file_size_mb=16, default_timeout=self.execution_timeout
+        ) if os.name == 'posix' else None
+        if self.interpreter_pool is not None:
+            self.sessions.on_close.append(self.interpreter_pool.reset_session)
+        
         # Docker client
         try:
             self.docker_client = docker.from_env()
@@ -111,6 +155,12 @@ class CodeExecutorAgent:
             self.docker_available = False
             print("⚠️ Docker not available, using local execution")
         
+        # Docker runs exec into pre-warmed, network-disabled containers that
+        # are reset between runs and replaced after 50 runs or 10 minutes
+        self.container_pool = ContainerPool(
+            self.docker_client, size=2, max_uses=50, max_age=600, mem_limit='256m', cpu_quota=50000
+        ) if self.docker_available else None
+        
         # Performance metrics
         self.executions_count = 0
         self.success_rate = 100.0
@@ -127,6 +177,8 @@ class CodeExecutorAgent:
                 return await self.execute_code(task)
             elif task_type == 'create_session':
                 return await self.create_execution_session(task)
+            elif task_type == 'close_session':
+                return await self.close_execution_session(task)
             elif task_type == 'install_package':
                 return await self.install_package(task)
             elif task_type == 'list_files':
@@ -167,22 +219,26 @@ class CodeExecutorAgent:
                     'error': f'Language {language} not supported. Supported: {list(self.supported_languages.keys())}'
                 }
             
-            # Create execution session if needed
+            # Create execution session if needed (a short-lived one: nothing refers to it again)
             if not session_id:
                 session_id = str(uuid.uuid4())
                 await self.create_execution_session({
                     'session_id': session_id,
                     'language': language,
-                    'environment': environment
+                    'environment': environment,
+                    'ttl': self.ephemeral_session_ttl
                 })
+            self.sessions.ensure_reaper()
             
             start_time = datetime.now()
             
             # Execute based on environment preference
-            if environment == 'docker' and self.docker_available:
-                result = await self._execute_in_docker(code, language, session_id)
-            else:
-                result = await self._execute_locally(code, language, session_id)
+            async with self.sessions.using(session_id):
+                if environment == 'docker' and self.docker_available:
+                    result = await self._execute_in_docker(code, language, session_id)
+                else:
+                    result = await self._execute_locally(code, language, session_id,
+                                                         keep_namespace=bool(task.get('session_id')))
             
             end_time = datetime.now()
             execution_time = (end_time - start_time).total_seconds()
@@ -224,95 +280,44 @@ class CodeExecutorAgent:
                 'error': f'Code execution failed: {str(e)}'
             }
     
-    async def _execute_locally(self, code: str, language: str, session_id: str) -> Dict[str, Any]:
+    async def _execute_locally(self, code: str, language: str, session_id: str,
+                               keep_namespace: bool = False) -> Dict[str, Any]:
         """Execute code locally"""
         try:
             lang_config = self.supported_languages[language]
             
-            # Create temporary directory for this execution
-            session_dir = Path(f"temp_sessions/{session_id}")
-            session_dir.mkdir(parents=True, exist_ok=True)
+            # Session directory (absolute: the child runs with cwd=session_dir)
+            session_dir = self.sessions.ensure(session_id)
+            
+            if language == 'python' and self.interpreter_pool is not None:
+                return await self._execute_in_pool(code, session_id if keep_namespace else None, session_dir)
             
             # Write code to file
             code_file = session_dir / f"main{lang_config['extension']}"
             with open(code_file, 'w', encoding='utf-8') as f:
                 f.write(code)
             
+            if language in self.compile_specs:
+                return await self._execute_compiled(code, language, session_dir)
+            
             # Prepare command
             command = lang_config['command'].copy()
-            if language == 'java':
-                # Special handling for Java
-                class_name = self._extract_java_class_name(code) or 'Main'
-                compile_cmd = ['javac', str(code_file)]
-                run_cmd = ['java', '-cp', str(session_dir), class_name]
-                
-                # Compile first
-                compile_result = subprocess.run(
-                    compile_cmd, 
-                    cwd=session_dir,
-                    capture_output=True, 
-                    text=True,
-                    timeout=30
-                )
-                
-                if compile_result.returncode != 0:
-                    return {
-                        'success': False,
-                        'output': '',
-                        'error': compile_result.stderr,
-                        'type': 'compilation_error'
-                    }
-                
-                command = run_cmd
-            elif language == 'cpp':
-                # Special handling for C++
-                compile_cmd = ['g++', str(code_file), '-o', str(session_dir / 'output')]
-                run_cmd = [str(session_dir / 'output')]
-                
-                # Compile first
-                compile_result = subprocess.run(
-                    compile_cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-                
-                if compile_result.returncode != 0:
-                    return {
-                        'success': False,
-                        'output': '',
-                        'error': compile_result.stderr,
-                        'type': 'compilation_error'
-                    }
-                
-                command = run_cmd
-            else:
-                command.append(str(code_file))
+            command.append(str(code_file))
             
             # Execute the code
-            result = subprocess.run(
-                command,
-                cwd=session_dir,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            result = await self.process_runner.run(command, cwd=str(session_dir))
+            if result.timed_out:
+                return self._timeout_result(result.stdout)
             
             return {
-                'success': result.returncode == 0,
+                'success': result.return_code == 0,
                 'output': result.stdout,
                 'error': result.stderr,
-                'return_code': result.returncode,
+                'return_code': result.return_code,
+                'output_truncated': result.stdout_truncated or result.stderr_truncated,
                 'type': 'execution_result'
             }
             
-        except subprocess.TimeoutExpired:
-            return {
-                'success': False,
-                'output': '',
-                'error': 'Execution timed out (30 seconds limit)',
-                'type': 'timeout_error'
-            }
         except Exception as e:
             return {
                 'success': False,
@@ -321,63 +326,122 @@ class CodeExecutorAgent:
                 'type': 'execution_error'
             }
     
+    def _compile_plan(self, language: str, code: str) -> Dict[str, Any]:
+        """Source file name plus compile and run commands for a build directory"""
+        flags = self.compile_specs[language]['flags']
+        if language == 'java':
+            class_name = self._extract_java_class_name(code) or 'Main'
+            source = f"{class_name}.java"  # javac wants public classes in a file of that name
+            return {
+                'source': source,
+                'compile': lambda out: ['javac', *flags, '-d', str(out), str(out / source)],
+                'run': lambda out: ['java', '-cp', str(out), class_name]
+            }
+        if language == 'go':
+            return {
+                'source': 'main.go',
+                'compile': lambda out: ['go', 'build', *flags, '-o', str(out / 'main'), str(out / 'main.go')],
+                'run': lambda out: [str(out / 'main')]
+            }
+        return {
+            'source': 'main.cpp',
+            'compile': lambda out: ['g++', *flags, str(out / 'main.cpp'), '-o', str(out / 'output')],
+            'run': lambda out: [str(out / 'output')]
+        }
+    
+    async def _execute_compiled(self, code: str, language: str, session_dir: Path) -> Dict[str, Any]:
+        """Compile (or reuse a cached build of) code, then run it in the session directory"""
+        spec = self.compile_specs[language]
+        plan = self._compile_plan(language, code)
+        toolchain = await self.compile_cache.toolchain_version(spec['version'])
+        key = self.compile_cache.key(language, code, spec['flags'], toolchain)
+        
+        async def build(out: Path):
+            (out / plan['source']).write_text(code, encoding='utf-8')
+            return await self.process_runner.run(plan['compile'](out), cwd=str(out))
+        
+        async with self.compile_cache.artifact(key, build) as outcome:
+            if outcome.path is None:
+                if outcome.result.timed_out:
+                    return self._timeout_result()
+                return {
+                    'success': False,
+                    'output': '',
+                    'error': outcome.result.stderr,
+                    'type': 'compilation_error'
+                }
+            
+            result = await self.process_runner.run(plan['run'](outcome.path), cwd=str(session_dir))
+        
+        if result.timed_out:
+            return self._timeout_result(result.stdout)
+        
+        return {
+            'success': result.return_code == 0,
+            'output': result.stdout,
+            'error': result.stderr,
+            'return_code': result.return_code,
+            'output_truncated': result.stdout_truncated or result.stderr_truncated,
+            'compile_cache': 'hit' if outcome.hit else 'miss',
+            'type': 'execution_result'
+        }
+    
+    async def _execute_in_pool(self, code: str, session_id: Optional[str], session_dir: Path) -> Dict[str, Any]:
+        """Run Python in a warm interpreter; session_id (if given) keeps its namespace"""
+        answer = await self.interpreter_pool.execute(code, session_id=session_id, cwd=str(session_dir))
+        if answer.get('timed_out'):
+            return self._timeout_result(answer['stdout'])
+        
+        if session_id in self.active_sessions:
+            session = self.active_sessions[session_id]
+            session['variables'] = answer.get('variables', {})
+        
+        return {
+            'success': answer['success'],
+            'output': answer['stdout'],
+            'error': answer['stderr'],
+            'result': answer.get('result'),
+            'return_code': 0 if answer['success'] else 1,
+            'output_truncated': answer.get('truncated', False),
+            'session_reset': answer['session_reset'],
+            'type': 'execution_result'
+        }
+    
+    def _timeout_result(self, output: str = '') -> Dict[str, Any]:
+        return {
+            'success': False,
+            'output': output,
+            'error': f'Execution timed out ({self.execution_timeout} seconds limit)',
+            'type': 'timeout_error'
+        }
+    
     async def _execute_in_docker(self, code: str, language: str, session_id: str) -> Dict[str, Any]:
-        """Execute code in Docker container"""
+        """Execute code in a pooled Docker container"""
         try:
             lang_config = self.supported_languages[language]
+            source = f"main{lang_config['extension']}"
+            command = " ".join(lang_config['command'] + [source])
             
-            # Create temporary directory
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Write code to file
-                code_file = Path(temp_dir) / f"main{lang_config['extension']}"
-                with open(code_file, 'w', encoding='utf-8') as f:
-                    f.write(code)
-                
-                # Prepare Docker command
-                docker_command = " ".join(lang_config['command'] + [f"main{lang_config['extension']}"])
-                
-                # Run in Docker container
-                container = self.docker_client.containers.run(
-                    lang_config['docker_image'],
-                    command=f"sh -c 'cd /workspace && {docker_command}'",
-                    volumes={temp_dir: {'bind': '/workspace', 'mode': 'rw'}},
-                    working_dir='/workspace',
-                    detach=True,
-                    remove=True,
-                    mem_limit='256m',
-                    cpu_period=100000,
-                    cpu_quota=50000,  # 50% CPU
-                    network_disabled=True  # Security: disable network
-                )
-                
-                # Wait for completion with timeout
-                try:
-                    result = container.wait(timeout=30)
-                    logs = container.logs().decode('utf-8')
-                    
-                    return {
-                        'success': result['StatusCode'] == 0,
-                        'output': logs,
-                        'error': '',
-                        'return_code': result['StatusCode'],
-                        'type': 'docker_execution'
-                    }
-                    
-                except Exception as e:
-                    container.kill()
-                    return {
-                        'success': False,
-                        'output': '',
-                        'error': f'Docker execution error: {str(e)}',
-                        'type': 'docker_error'
-                    }
+            result = await self.container_pool.execute(
+                lang_config['docker_image'], command, {source: code}, timeout=self.execution_timeout
+            )
+            if result['timed_out']:
+                return self._timeout_result(result['stdout'])
+            
+            return {
+                'success': result['success'],
+                'output': result['stdout'],
+                'error': result['stderr'],
+                'return_code': result['return_code'],
+                'type': 'docker_execution'
+            }
             
         except Exception as e:
             return {
                 'success': False,
                 'output': '',
-                'error': f'Docker setup error: {str(e)}',
-                'type': 'docker_setup_error'
+                'error': f'Docker execution error: {str(e)}',
+                'type': 'docker_error'
             }
     
     def _extract_java_class_name(self, code: str) -> Optional[str]:
@@ -404,11 +468,8 @@ class CodeExecutorAgent:
                 'last_activity': datetime.now().isoformat()
             }
             
-            self.active_sessions[session_id] = session
-            
-            # Create session directory
-            session_dir = Path(f"temp_sessions/{session_id}")
-            session_dir.mkdir(parents=True, exist_ok=True)
+            # Registers the session and creates its directory
+            self.sessions.create(session_id, session, ttl=task.get('ttl'))
             
             return {
                 'success': True,
@@ -423,6 +484,22 @@ class CodeExecutorAgent:
                 'error': f'Session creation failed: {str(e)}'
             }
     
+    async def close_execution_session(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Close a session now instead of waiting for it to expire"""
+        session_id = task.get('session_id')
+        if not session_id or session_id not in self.active_sessions:
+            return {
+                'success': False,
+                'error': 'Invalid session ID'
+            }
+        
+        reclaimed = await self.sessions.close(session_id)
+        return {
+            'success': True,
+            'session_id': session_id,
+            'bytes_reclaimed': reclaimed
+        }
+    
     async def install_package(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """Install package in execution environment"""
         try:
@@ -440,20 +517,16 @@ class CodeExecutorAgent:
             
             # Install package based on language
             if language == 'python':
-                result = subprocess.run(
+                result = await self.process_runner.run(
                     ['pip', 'install', package_name],
-                    capture_output=True,
-                    text=True,
-                    timeout=60
+                    timeout=self.install_timeout
                 )
             elif language in ['javascript', 'typescript']:
-                session_dir = Path(f"temp_sessions/{session_id}")
-                result = subprocess.run(
+                session_dir = self.sessions.ensure(session_id)
+                result = await self.process_runner.run(
                     ['npm', 'install', package_name],
-                    cwd=session_dir,
-                    capture_output=True,
-                    text=True,
-                    timeout=60
+                    cwd=str(session_dir),
+                    timeout=self.install_timeout
                 )
             else:
                 return {
@@ -461,7 +534,12 @@ class CodeExecutorAgent:
                     'error': f'Package installation not supported for {language}'
                 }
             
-            if result.returncode == 0:
+            if result.timed_out:
+                return {
+                    'success': False,
+                    'error': f'Package installation timed out ({self.install_timeout} seconds limit)'
+                }
+            if result.return_code == 0:
                 session['packages'].append(package_name)
                 return {
                     'success': True,
@@ -594,8 +672,13 @@ class CodeExecutorAgent:
             'avg_execution_time': round(avg_execution_time, 3),
             'supported_languages': list(self.supported_languages.keys()),
             'active_sessions': len(self.active_sessions),
+            'sessions': self.sessions.get_stats(),
             'docker_available': self.docker_available,
-            'execution_history_size': len(self.execution_history)
+            'execution_history_size': len(self.execution_history),
+            'processes': self.process_runner.get_stats(),
+            'compile_cache': self.compile_cache.get_stats(),
+            'container_pool': self.container_pool.get_stats() if self.container_pool is not None else None,
+            'interpreter_pool': self.interpreter_pool.get_stats() if self.interpreter_pool is not None else None
         }
 
 # Global instance
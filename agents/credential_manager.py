@@ -13,7 +13,7 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 try:
-    from cryptography.fernet import Fernet
+    from cryptography.fernet import Fernet, MultiFernet
     from cryptography.hazmat.primitives import hashes
     from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
     HAS_CRYPTO = True
@@ -167,8 +167,7 @@ class CredentialManagerAgent:
             )
             key = base64.urlsafe_b64encode(kdf.derive(password))
             
-            with open(key_file, 'wb') as f:
-                f.write(key)
+            self._write_key(key_file, key)
             
             # Also save salt for key derivation
             with open("data/salt.key", 'wb') as f:
@@ -176,6 +175,50 @@ class CredentialManagerAgent:
             
             return key
     
+    @staticmethod
+    def _write_key(key_file: Path, key: bytes):
+        """Write a key file readable only by the owner"""
+        fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key)
+    
+    async def rotate_master_key(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Re-encrypt every stored credential under a fresh master key"""
+        try:
+            key_file = Path("data/master.key")
+            pending = key_file.with_suffix(".key.new")
+            new_key = Fernet.generate_key()
+            # Keep the new key on disk before any row depends on it
+            self._write_key(pending, new_key)
+            rotator = MultiFernet([Fernet(new_key), self.cipher_suite])
+            
+            conn = sqlite3.connect(self.credentials_db)
+            try:
+                with conn:
+                    rows = conn.execute('SELECT id, encrypted_data FROM credentials').fetchall()
+                    conn.executemany(
+                        'UPDATE credentials SET encrypted_data = ? WHERE id = ?',
+                        [(rotator.rotate(data.encode()).decode(), row_id) for row_id, data in rows]
+                    )
+            finally:
+                conn.close()
+            
+            os.replace(pending, key_file)
+            self.master_key = new_key
+            self.cipher_suite = self._initialize_encryption()
+            await self._log_audit_event(None, 'rotate_master_key', True, f'{len(rows)} credentials re-encrypted')
+            
+            return {
+                'success': True,
+                'credentials_rotated': len(rows)
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Key rotation failed: {str(e)}'
+            }
+    
     def _initialize_encryption(self) -> Fernet:
         """Initialize Fernet encryption suite"""
         return Fernet(self.master_key)
@@ -262,6 +305,8 @@ class CredentialManagerAgent:
                 return await self.import_credentials(task)
             elif task_type == 'audit_log':
                 return await self.get_audit_log(task)
+            elif task_type == 'rotate_master_key':
+                return await self.rotate_master_key(task)
             else:
                 return {
                     'success': False,
@@ -6,7 +6,6 @@ Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
 """
 
 import asyncio
-import subprocess
 import os
 import json
 import time
@@ -18,6 +17,8 @@ import threading
 import queue
 import psutil
 
+from core.process_runner import ProcessRunner, RunningProcess
+
 class CyberShellAgent:
     """
     Advanced shell execution agent with:
@@ -42,8 +43,16 @@ class CyberShellAgent:
             "network_commands"
         ]
         
-        # Execution tracking
-        self.active_processes: Dict[str, subprocess.Popen] = {}
+        # Execution tracking: commands run as asyncio subprocesses, at most
+        # max_concurrent_commands at once, with stdout/stderr capped at
+        # max_output_bytes each
+        self.default_timeout = 300  # 5 minutes
+        self.max_concurrent_commands = 8
+        self.max_output_bytes = 1024 * 1024
+        self.process_runner = ProcessRunner(self.agent_id, max_concurrent=self.max_concurrent_commands,
+                                            default_timeout=self.default_timeout,
+                                            max_output=self.max_output_bytes)
+        self.active_processes: Dict[str, RunningProcess] = self.process_runner.active
         self.execution_history: List[Dict] = []
         self.command_queue = queue.Queue()
         
@@ -139,41 +148,35 @@ class CyberShellAgent:
             # Set working directory
             work_dir = task.get("working_dir", self.working_dir)
             
-            # Execute command
-            process = subprocess.Popen(
+            # Execute command without blocking the event loop
+            outcome = await self.process_runner.run(
                 args,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
                 cwd=work_dir,
                 env=env,
-                timeout=task.get("timeout", 300)  # 5 minutes default
+                timeout=task.get("timeout", self.default_timeout)
             )
             
-            # Store active process
-            process_id = f"proc_{int(time.time())}_{len(self.active_processes)}"
-            self.active_processes[process_id] = process
-            
-            # Wait for completion
-            stdout, stderr = process.communicate()
-            
             execution_time = time.time() - start_time
-            return_code = process.returncode
-            
-            # Clean up
-            if process_id in self.active_processes:
-                del self.active_processes[process_id]
+            return_code = outcome.return_code
+            if outcome.timed_out:
+                return {
+                    **self._create_error_response(f"Command timed out after {task.get('timeout', self.default_timeout)}s"),
+                    "stdout": outcome.stdout,
+                    "stderr": outcome.stderr,
+                    "process_id": outcome.process_id
+                }
             
             # Create result
             result = {
                 "success": return_code == 0,
                 "command": command,
                 "return_code": return_code,
-                "stdout": stdout,
-                "stderr": stderr,
+                "stdout": outcome.stdout,
+                "stderr": outcome.stderr,
+                "output_truncated": outcome.stdout_truncated or outcome.stderr_truncated,
                 "execution_time": round(execution_time, 2),
                 "working_dir": work_dir,
-                "process_id": process_id
+                "process_id": outcome.process_id
             }
             
             # Update statistics
@@ -192,8 +195,6 @@ class CyberShellAgent:
             
             return result
             
-        except subprocess.TimeoutExpired:
-            return self._create_error_response("Command timed out")
         except FileNotFoundError:
             return self._create_error_response(f"Command not found: {base_command}")
         except Exception as e:
@@ -311,7 +312,7 @@ class CyberShellAgent:
             if action == "list":
                 return self._list_processes()
             elif action == "kill":
-                return self._kill_process(task.get("process_id"))
+                return await self._kill_process(task.get("process_id"))
             elif action == "status":
                 return self._get_process_status(task.get("process_id"))
             else:
@@ -322,24 +323,7 @@ class CyberShellAgent:
     
     def _list_processes(self) -> Dict[str, Any]:
         """List active shell processes"""
-        process_list = []
-        
-        for process_id, process in self.active_processes.items():
-            try:
-                process_info = {
-                    "process_id": process_id,
-                    "pid": process.pid,
-                    "command": " ".join(process.args) if hasattr(process, 'args') else "unknown",
-                    "status": "running" if process.poll() is None else "completed",
-                    "return_code": process.returncode
-                }
-                process_list.append(process_info)
-            except:
-                process_list.append({
-                    "process_id": process_id,
-                    "status": "error",
-                    "error": "Could not get process info"
-                })
+        process_list = self.process_runner.list_active()
         
         return {
             "success": True,
@@ -347,24 +331,13 @@ class CyberShellAgent:
             "total_processes": len(process_list)
         }
     
-    def _kill_process(self, process_id: str) -> Dict[str, Any]:
-        """Kill a specific process"""
+    async def _kill_process(self, process_id: str) -> Dict[str, Any]:
+        """Kill a specific process (SIGTERM, then SIGKILL after a grace period)"""
         if process_id not in self.active_processes:
             return self._create_error_response(f"Process {process_id} not found")
         
         try:
-            process = self.active_processes[process_id]
-            process.terminate()
-            
-            # Wait a bit for graceful termination
-            try:
-                process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                # Force kill if still running
-                process.kill()
-                process.wait()
-            
-            del self.active_processes[process_id]
+            await self.process_runner.kill(process_id)
             
             return {
                 "success": True,
@@ -504,6 +477,7 @@ class CyberShellAgent:
             "capabilities": self.capabilities,
             "execution_stats": self.execution_stats,
             "active_processes": len(self.active_processes),
+            "processes": self.process_runner.get_stats(),
             "history_size": len(self.execution_history),
             "allowed_commands": len(self.allowed_commands),
             "working_directory": self.working_dir
@@ -515,11 +489,8 @@ class CyberShellAgent:
     
     def cleanup_completed_processes(self):
         """Clean up completed processes"""
-        completed = []
-        
-        for process_id, process in self.active_processes.items():
-            if process.poll() is not None:  # Process completed
-                completed.append(process_id)
+        completed = [process_id for process_id, running in self.active_processes.items()
+                     if running.return_code is not None]
         
         for process_id in completed:
             del self.active_processes[process_id]
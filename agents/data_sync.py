@@ -10,14 +10,13 @@ import json
 import os
 import time
 import sqlite3
-import redis
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 import uuid
 import hashlib
-import aiofiles
-import asyncpg
+
+from core.error_recovery import error_recovery, RetryPolicy
 
 class DataSyncAgent:
     """
@@ -46,6 +45,13 @@ class DataSyncAgent:
         
         # Database connections
         self.connections = {}
+        self.redis_retry_interval = 60
+        self._redis_attempted_at = 0.0
+        
+        # Remote writes (Redis) go through a circuit breaker and retry budget
+        self.executor = error_recovery.executor
+        self.retry_policy = RetryPolicy(max_attempts=3, base_delay=0.2, max_delay=2.0)
+        self.remote_timeout = 10.0
         self.sync_configs = self._load_sync_configs()
         
         # Sync tracking
@@ -110,18 +116,37 @@ class DataSyncAgent:
         except Exception as e:
             print(f"⚠️ SQLite connection failed: {e}")
         
-        # Redis connection
+        # Redis is connected on first use (_ensure_redis): a ping against an
+        # absent server retries for seconds and used to block importing the agent
+    
+    def _ensure_redis(self) -> bool:
+        """Connect to Redis if not yet connected; failed attempts are retried after a cooldown"""
+        if "redis" in self.connections:
+            return True
+        if time.time() - self._redis_attempted_at < self.redis_retry_interval:
+            return False
+        self._redis_attempted_at = time.time()
+        
         try:
+            import redis
+            
             redis_config = self.sync_configs["redis_cache"]
-            self.connections["redis"] = redis.Redis(
+            connection = redis.Redis(
                 host=redis_config["host"],
                 port=redis_config["port"],
-                decode_responses=True
+                decode_responses=True,
+                # A hung server must not hold a thread (or the loop, for the
+                # calls made on it) past the remote timeout
+                socket_timeout=self.remote_timeout,
+                socket_connect_timeout=self.remote_timeout
             )
-            self.connections["redis"].ping()
+            connection.ping()
+            self.connections["redis"] = connection
             print("✅ Redis connection established")
+            return True
         except Exception as e:
             print(f"⚠️ Redis connection failed: {e}")
+            return False
     
     def _setup_sqlite_tables(self):
         """Setup SQLite tables for system data"""
@@ -323,54 +348,17 @@ class DataSyncAgent:
     
     async def _cache_to_redis(self) -> Dict[str, Any]:
         """Cache frequently accessed data to Redis"""
-        if "redis" not in self.connections:
+        if not self._ensure_redis():
             return {"success": False, "error": "Redis not available"}
         
         try:
-            redis_conn = self.connections["redis"]
-            cached_count = 0
-            
-            # Cache agent status data
-            if "sqlite" in self.connections:
-                conn = self.connections["sqlite"]
-                cursor = conn.cursor()
-                
-                # Cache recent agent data
-                cursor.execute("""
-                    SELECT agent_id, data_type, data_content, updated_at
-                    FROM agent_data
-                    WHERE updated_at > datetime('now', '-1 hour')
-                    ORDER BY updated_at DESC
-                    LIMIT 50
-                """)
-                
-                for row in cursor.fetchall():
-                    cache_key = f"agent:{row[0]}:{row[1]}"
-                    cache_data = {
-                        "content": json.loads(row[2]),
-                        "updated_at": row[3]
-                    }
-                    
-                    redis_conn.setex(
-                        cache_key,
-                        3600,  # 1 hour TTL
-                        json.dumps(cache_data)
-                    )
-                    cached_count += 1
-            
-            # Cache system status
-            system_status = {
-                "agents_active": len(self.sync_configs),
-                "last_sync": datetime.now().isoformat(),
-                "sync_agent_status": "active"
-            }
-            
-            redis_conn.setex(
-                "system:status",
-                300,  # 5 minutes TTL
-                json.dumps(system_status)
+            entries = self._redis_cache_entries()
+            # redis-py blocks, so each attempt runs in a worker thread; the
+            # executor's deadline can then bound it without stalling the loop
+            cached_count = await self.executor.call(
+                "data_sync", "redis", asyncio.to_thread, self._push_redis_cache, self.connections["redis"], entries,
+                policy=self.retry_policy, timeout=self.remote_timeout
             )
-            cached_count += 1
             
             return {
                 "success": True,
@@ -381,6 +369,47 @@ class DataSyncAgent:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    def _redis_cache_entries(self) -> List[tuple]:
+        """(key, ttl, value) for recent agent data and system status, read on the loop thread"""
+        entries = []
+        
+        # Cache agent status data
+        if "sqlite" in self.connections:
+            conn = self.connections["sqlite"]
+            cursor = conn.cursor()
+            
+            # Cache recent agent data
+            cursor.execute("""
+                SELECT agent_id, data_type, data_content, updated_at
+                FROM agent_data
+                WHERE updated_at > datetime('now', '-1 hour')
+                ORDER BY updated_at DESC
+                LIMIT 50
+            """)
+            
+            for row in cursor.fetchall():
+                cache_data = {
+                    "content": json.loads(row[2]),
+                    "updated_at": row[3]
+                }
+                entries.append((f"agent:{row[0]}:{row[1]}", 3600, json.dumps(cache_data)))  # 1 hour TTL
+        
+        # Cache system status
+        system_status = {
+            "agents_active": len(self.sync_configs),
+            "last_sync": datetime.now().isoformat(),
+            "sync_agent_status": "active"
+        }
+        entries.append(("system:status", 300, json.dumps(system_status)))  # 5 minutes TTL
+        
+        return entries
+    
+    def _push_redis_cache(self, redis_conn, entries: List[tuple]) -> int:
+        """Write cache entries to Redis (blocking; runs in a worker thread); returns the number of keys written"""
+        for key, ttl, value in entries:
+            redis_conn.setex(key, ttl, value)
+        return len(entries)
+    
     async def _create_json_backup(self) -> Dict[str, Any]:
         """Create JSON backup of critical data"""
         try:
@@ -433,6 +462,7 @@ class DataSyncAgent:
                 backup_data["data"]["system_metrics"] = metrics_data
             
             # Save backup file
+            import aiofiles
             async with aiofiles.open(backup_file, 'w') as f:
                 await f.write(json.dumps(backup_data, indent=2))
             
@@ -496,7 +526,7 @@ class DataSyncAgent:
                 conn.commit()
             
             # Clean up Redis expired keys
-            if "redis" in self.connections:
+            if self._ensure_redis():
                 # Redis handles TTL automatically, but we can clean up manually
                 redis_conn = self.connections["redis"]
                 
@@ -559,7 +589,7 @@ class DataSyncAgent:
                     validation_results["sqlite"]["issues"].append(str(e))
             
             # Validate Redis
-            if "redis" in self.connections:
+            if self._ensure_redis():
                 try:
                     redis_conn = self.connections["redis"]
                     redis_conn.ping()
@@ -664,7 +694,8 @@ class DataSyncAgent:
             "active_connections": len(self.connections),
             "configured_databases": len(self.sync_configs),
             "last_sync_times": {k: v.isoformat() for k, v in self.last_sync_times.items()},
-            "active_operations": len(self.sync_operations)
+            "active_operations": len(self.sync_operations),
+            "redis_circuit": self.executor.breaker("data_sync", "redis").state
         }
         
         # Add connection status
@@ -48,6 +48,15 @@ try:
 except ImportError:
     spacy = None
 
+try:
+    from core.vector_index import get_semantic_index
+except ImportError:
+    get_semantic_index = None
+
+from core.memory_manager import memory_manager, trim_oldest
+
+from .knowledge_patterns import PatternAnalysisPipeline, PATTERN_TYPES
+
 @dataclass
 class KnowledgeItem:
     """Knowledge item data structure"""
@@ -139,6 +148,8 @@ class KnowledgeManagementAgent:
             self.tfidf_vectorizer = None
         self.document_vectors = None
         self.search_cache = {}
+        self.semantic_index = None
+        self.pattern_pipeline = PatternAnalysisPipeline()
         
         # Configuration
         self.config = {
@@ -149,7 +160,11 @@ class KnowledgeManagementAgent:
             "learning_update_interval": 3600,  # 1 hour
             "supported_languages": ["en", "id", "es", "fr", "de", "zh"],
             "max_content_length": 100000,  # 100KB per item
-            "enable_auto_learning": True
+            "enable_auto_learning": True,
+            "ann_similarity_threshold": 0.15,
+            "ann_candidate_multiplier": 3,
+            "max_connections_per_item": 5,
+            "connection_threshold": 0.35
         }
         
         # Analytics
@@ -170,6 +185,8 @@ class KnowledgeManagementAgent:
         
         # Initialize knowledge infrastructure
         self.initialize_knowledge_infrastructure()
+        memory_manager.register(f"{self.agent_id}.search_cache.{id(self):x}", self.trim_search_cache,
+                                self.search_cache.__len__)
         
         # Load existing knowledge
         self.load_existing_knowledge()
@@ -307,6 +324,12 @@ class KnowledgeManagementAgent:
     def initialize_search_infrastructure(self):
         """Initialize search and indexing infrastructure"""
         try:
+            # Approximate nearest-neighbour index (reconciled after items load)
+            if get_semantic_index is not None:
+                self.semantic_index = get_semantic_index(
+                    "knowledge", path="data/knowledge/vectors/knowledge_index.npz"
+                )
+            
             # Load or create TF-IDF vectorizer
             # SECURITY NOTE: pickle.load is inherently unsafe for untrusted data.
             # We only load from our own data directory which should be protected.
@@ -393,6 +416,14 @@ class KnowledgeManagementAgent:
             self.analytics["total_items"] = len(self.knowledge_items)
             self.analytics["patterns_discovered"] = len(self.learning_patterns)
             
+            # Bring the vector index in line with the database
+            if self.semantic_index is not None:
+                changes = self.semantic_index.reconcile(
+                    self.knowledge_items, text_fn=self._search_text
+                )
+                if changes["added"] or changes["removed"]:
+                    self.logger.info(f"Vector index reconciled: {changes}")
+            
             self.logger.info(f"Loaded {len(self.knowledge_items)} knowledge items and {len(self.learning_patterns)} patterns")
             
         except Exception as e:
@@ -473,7 +504,7 @@ class KnowledgeManagementAgent:
             await self._save_knowledge_item_to_database(knowledge_item)
             
             # Update search vectors
-            await self._update_search_vectors()
+            await self._update_search_vectors(knowledge_item)
             
             # Create knowledge graph connections
             await self._create_knowledge_connections(item_id)
@@ -557,6 +588,8 @@ class KnowledgeManagementAgent:
                 },
                 "timestamp": datetime.now()
             }
+            if len(self.search_cache) > self.config["max_cache_size"]:
+                self.trim_search_cache(0.1)
             
             # Log search
             await self._log_search(query, len(results), execution_time, user_id)
@@ -629,51 +662,64 @@ class KnowledgeManagementAgent:
             self.logger.error(f"Failed to generate recommendations: {e}")
             return {"success": False, "error": str(e)}
     
-    async def analyze_knowledge_patterns(self) -> Dict[str, Any]:
+    async def analyze_knowledge_patterns(self, full_rebuild: bool = False) -> Dict[str, Any]:
         """Analyze and discover knowledge patterns"""
         self.logger.info("Analyzing knowledge patterns")
         
         try:
-            patterns_discovered = []
-            
-            # 1. Content clustering analysis
-            content_patterns = await self._analyze_content_clusters()
-            patterns_discovered.extend(content_patterns)
-            
-            # 2. Tag co-occurrence analysis
-            tag_patterns = await self._analyze_tag_cooccurrence()
-            patterns_discovered.extend(tag_patterns)
-            
-            # 3. Temporal patterns analysis
-            temporal_patterns = await self._analyze_temporal_patterns()
-            patterns_discovered.extend(temporal_patterns)
-            
-            # 4. Category distribution analysis
-            category_patterns = await self._analyze_category_distribution()
-            patterns_discovered.extend(category_patterns)
+            # Clustering, tag co-occurrence, temporal and category analyses run
+            # in a process pool over items added since the previous run
+            patterns_discovered = await self.pattern_pipeline.run(
+                self.knowledge_items,
+                vector_fn=self.semantic_index.get_vectors if self.semantic_index is not None else None,
+                full=full_rebuild
+            )
             
-            # Store discovered patterns
+            # Store discovered patterns; ids come from what a pattern describes
+            # (type plus cluster id or tag pair), so re-runs update in place
+            changed = []
+            current_ids = set()
             for pattern_data in patterns_discovered:
-                pattern_id = hashlib.md5(f"{pattern_data['type']}_{datetime.now()}".encode()).hexdigest()[:8]
+                pattern_id = hashlib.md5(pattern_data["key"].encode()).hexdigest()[:12]
+                current_ids.add(pattern_id)
+                confidence = pattern_data.get("confidence", 0.5)
+                applications = pattern_data.get("applications", [])
+                
+                existing = self.learning_patterns.get(pattern_id)
+                if (existing is not None and existing.pattern_data == pattern_data["data"]
+                        and existing.confidence == confidence and existing.applications == applications):
+                    continue
                 
                 pattern = LearningPattern(
                     pattern_id=pattern_id,
                     pattern_type=pattern_data["type"],
                     pattern_data=pattern_data["data"],
-                    confidence=pattern_data.get("confidence", 0.5),
-                    discovered_at=datetime.now(),
-                    applications=pattern_data.get("applications", [])
+                    confidence=confidence,
+                    discovered_at=existing.discovered_at if existing is not None else datetime.now(),
+                    applications=applications
                 )
                 
                 self.learning_patterns[pattern_id] = pattern
                 await self._save_learning_pattern(pattern)
+                changed.append(pattern_data)
             
-            self.analytics["patterns_discovered"] += len(patterns_discovered)
+            # A run that analysed anything returns the complete set, so
+            # pipeline patterns missing from it no longer hold
+            if patterns_discovered:
+                stale = [pattern_id for pattern_id, pattern in self.learning_patterns.items()
+                         if pattern.pattern_type in PATTERN_TYPES and pattern_id not in current_ids]
+                for pattern_id in stale:
+                    del self.learning_patterns[pattern_id]
+                await self._delete_learning_patterns(stale)
+            
+            self.analytics["patterns_discovered"] = len(self.learning_patterns)
             
             return {
                 "success": True,
-                "patterns_discovered": len(patterns_discovered),
-                "pattern_types": [p["type"] for p in patterns_discovered],
+                "patterns_discovered": len(changed),
+                "pattern_types": [p["type"] for p in changed],
+                "items_analyzed": self.pattern_pipeline.last_run.get("new_items", 0),
+                "analysis_time": self.pattern_pipeline.last_run.get("duration", 0.0),
                 "analysis_timestamp": datetime.now().isoformat()
             }
             
@@ -860,11 +906,15 @@ class KnowledgeManagementAgent:
     
     async def _perform_semantic_search(self, query: str, content_types: List[str], 
                                      categories: List[str], limit: int) -> List[tuple]:
-        """Perform semantic search using TF-IDF and cosine similarity"""
+        """Perform semantic search using the ANN index, or TF-IDF and cosine similarity"""
         try:
             if not self.knowledge_items:
                 return []
             
+            # Approximate nearest-neighbour search over the vector index
+            if self.semantic_index is not None:
+                return self._ann_search(query, content_types, categories, limit)
+            
             # If sklearn is not available, fall back to simple text search
             if self.tfidf_vectorizer is None or cosine_similarity is None:
                 return self._simple_text_search(query, content_types, categories, limit)
@@ -937,6 +987,160 @@ class KnowledgeManagementAgent:
         
         results.sort(key=lambda x: x[1], reverse=True)
         return results[:limit]
+    
+    def _search_text(self, item: KnowledgeItem) -> str:
+        """Text that represents an item in the vector index"""
+        return f"{item.title} {item.content}"
+    
+    def _ann_search(self, query: str, content_types: List[str],
+                    categories: List[str], limit: int) -> List[tuple]:
+        """Search the vector index, applying filters inside the candidate scan"""
+        def matches(item_id: str) -> bool:
+            item = self.knowledge_items.get(item_id)
+            if item is None:
+                return False
+            if content_types and item.content_type not in content_types:
+                return False
+            if categories and item.category not in categories:
+                return False
+            return True
+        
+        return self.semantic_index.search(
+            query,
+            k=limit * self.config["ann_candidate_multiplier"],
+            filter_fn=matches,
+            min_score=self.config["ann_similarity_threshold"]
+        )
+    
+    def trim_search_cache(self, fraction: float) -> int:
+        """Drop search results past the 5 minute validity, then the oldest fraction"""
+        return trim_oldest(self.search_cache, fraction, lambda cached: cached["timestamp"].timestamp(), max_age=300)
+    
+    async def _update_search_vectors(self, item: KnowledgeItem):
+        """Insert or refresh an item in the vector index"""
+        self.search_cache.clear()
+        if self.semantic_index is not None:
+            self.semantic_index.add(item.item_id, self._search_text(item))
+    
+    async def _create_knowledge_connections(self, item_id: str):
+        """Link an item to its nearest neighbours in the knowledge graph"""
+        if self.semantic_index is None or item_id not in self.knowledge_items:
+            return
+        
+        neighbours = self.semantic_index.search(
+            self._search_text(self.knowledge_items[item_id]),
+            k=self.config["max_connections_per_item"] + 1,
+            filter_fn=lambda other_id: other_id != item_id,
+            min_score=self.config["connection_threshold"]
+        )
+        if not neighbours:
+            return
+        
+        self.knowledge_graph[item_id] = [
+            {"target": target_id, "relationship": "similar", "weight": score}
+            for target_id, score in neighbours
+        ]
+        
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.executemany('''
+                INSERT OR REPLACE INTO knowledge_graph
+                (edge_id, source_item, target_item, relationship_type, weight)
+                VALUES (?, ?, ?, 'similar', ?)
+            ''', [(f"{item_id}_{target_id}", item_id, target_id, score) for target_id, score in neighbours])
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            self.logger.error(f"Failed to save knowledge connections: {e}")
+    
+    async def _save_knowledge_item_to_database(self, item: KnowledgeItem):
+        """Persist a knowledge item"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            INSERT OR REPLACE INTO knowledge_items
+            (item_id, title, content, content_type, category, tags, created_at, updated_at,
+             source, relevance_score, access_count, last_accessed, metadata)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            item.item_id, item.title, item.content, item.content_type, item.category,
+            json.dumps(item.tags), item.created_at.isoformat(), item.updated_at.isoformat(),
+            item.source, item.relevance_score, item.access_count,
+            item.last_accessed.isoformat() if item.last_accessed else None,
+            json.dumps(item.metadata or {}, default=str)
+        ))
+        conn.commit()
+        conn.close()
+    
+    async def _apply_search_filters(self, results: List[tuple], content_types: List[str],
+                                    categories: List[str]) -> List[tuple]:
+        """Drop results that no longer exist or don't match the filters"""
+        filtered = []
+        for item_id, score in results:
+            item = self.knowledge_items.get(item_id)
+            if item is None:
+                continue
+            if content_types and item.content_type not in content_types:
+                continue
+            if categories and item.category not in categories:
+                continue
+            filtered.append((item_id, score))
+        return filtered
+    
+    async def _rank_search_results(self, results: List[tuple], query: str,
+                                   user_id: str = None) -> List[tuple]:
+        """Order by similarity, breaking ties with item relevance"""
+        return sorted(
+            results,
+            key=lambda r: (r[1], self.knowledge_items[r[0]].relevance_score),
+            reverse=True
+        )
+    
+    async def _save_learning_pattern(self, pattern: LearningPattern):
+        """Persist a discovered learning pattern"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('''
+                INSERT OR REPLACE INTO learning_patterns
+                (pattern_id, pattern_type, pattern_data, confidence, discovered_at, applications)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (
+                pattern.pattern_id, pattern.pattern_type, json.dumps(pattern.pattern_data),
+                pattern.confidence, pattern.discovered_at.isoformat(), json.dumps(pattern.applications)
+            ))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            self.logger.error(f"Failed to save learning pattern: {e}")
+    
+    async def _delete_learning_patterns(self, pattern_ids: List[str]):
+        """Remove learning patterns that no longer hold"""
+        if not pattern_ids:
+            return
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.executemany('DELETE FROM learning_patterns WHERE pattern_id = ?',
+                             [(pattern_id,) for pattern_id in pattern_ids])
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            self.logger.error(f"Failed to delete learning patterns: {e}")
+    
+    async def _log_search(self, query: str, results_count: int, execution_time: float,
+                          user_id: str = None):
+        """Record a search in the search history table"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('''
+                INSERT INTO search_history (search_id, query, results_count, user_id, execution_time)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (
+                hashlib.md5(f"{query}_{time.time()}".encode()).hexdigest()[:12],
+                query, results_count, user_id, execution_time
+            ))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            self.logger.error(f"Failed to log search: {e}")
 
 # Global instance
 knowledge_management_agent = KnowledgeManagementAgent()
@@ -0,0 +1,503 @@
+"""
+📊 Knowledge Pattern Pipeline - Parallel, Incremental Pattern Analysis
+Runs the knowledge agent's corpus analyses in a process pool over a
+memory-mapped snapshot of item metadata
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_EPOCH = datetime(1970, 1, 1)
+_WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Pattern types the pipeline produces; each run returns the full set of them
+PATTERN_TYPES = ("content_cluster", "tag_cooccurrence", "temporal_activity", "category_distribution")
+
+
+def _pair_keys(a: "np.ndarray", b: "np.ndarray") -> "np.ndarray":
+    """Encode id pairs as a single int64 key (high word, low word)"""
+    return (a.astype(np.int64) << 32) | b.astype(np.int64)
+
+
+def _merge_counts(keys: "np.ndarray", counts: "np.ndarray",
+                  new_keys: "np.ndarray", new_counts: "np.ndarray"):
+    """Add two sparse (key -> count) vectors"""
+    if not len(new_keys):
+        return keys, counts
+    merged, inverse = np.unique(np.concatenate([keys, new_keys]), return_inverse=True)
+    totals = np.zeros(len(merged), dtype=np.int64)
+    np.add.at(totals, inverse, np.concatenate([counts, new_counts]))
+    return merged, totals
+
+
+def _add_bincount(total: "np.ndarray", delta: "np.ndarray") -> "np.ndarray":
+    size = max(len(total), len(delta))
+    result = np.zeros(size, dtype=np.int64)
+    result[:len(total)] += total
+    result[:len(delta)] += delta
+    return result
+
+
+def _load_snapshot(snapshot_dir: str, *names: str):
+    return [np.load(os.path.join(snapshot_dir, f"{name}.npy"), mmap_mode="r") for name in names]
+
+
+# Worker functions: module level so they can run in a process pool.
+# Each reads the memory-mapped snapshot and returns partial aggregates.
+
+def tag_cooccurrence_worker(snapshot_dir: str) -> Dict[str, Any]:
+    """Tag frequencies and a sparse co-occurrence matrix in one vectorized pass"""
+    indptr, tag_ids = _load_snapshot(snapshot_dir, "tag_indptr", "tag_ids")
+    indptr = np.asarray(indptr)
+    tag_ids = np.asarray(tag_ids)
+
+    lengths = np.diff(indptr)
+    entries = len(tag_ids)
+    if not entries:
+        return {"keys": np.zeros(0, np.int64), "counts": np.zeros(0, np.int64),
+                "frequency": np.zeros(0, np.int64)}
+
+    # For every tag entry, pair it with each later tag of the same item
+    item_of_entry = np.repeat(np.arange(len(lengths)), lengths)
+    position = np.arange(entries) - indptr[item_of_entry]
+    after = lengths[item_of_entry] - position - 1
+    left = np.repeat(np.arange(entries), after)
+    offset = np.arange(len(left)) - np.repeat(np.cumsum(after) - after, after)
+    right = left + 1 + offset
+
+    a, b = tag_ids[left], tag_ids[right]
+    keys = _pair_keys(np.minimum(a, b), np.maximum(a, b))
+    keys = keys[np.minimum(a, b) != np.maximum(a, b)]
+    keys, counts = np.unique(keys, return_counts=True)
+
+    return {
+        "keys": keys,
+        "counts": counts.astype(np.int64),
+        "frequency": np.bincount(tag_ids).astype(np.int64),
+    }
+
+
+def temporal_worker(snapshot_dir: str) -> Dict[str, Any]:
+    """Hour-of-day, weekday and per-day creation counts"""
+    (created,) = _load_snapshot(snapshot_dir, "created")
+    created = np.asarray(created)
+    if not len(created):
+        return {"hours": np.zeros(24, np.int64), "weekdays": np.zeros(7, np.int64),
+                "day_keys": np.zeros(0, np.int64), "day_counts": np.zeros(0, np.int64)}
+
+    seconds = created.astype(np.int64)
+    days = seconds // 86400
+    day_keys, day_counts = np.unique(days, return_counts=True)
+    return {
+        "hours": np.bincount((seconds % 86400) // 3600, minlength=24).astype(np.int64),
+        # 1970-01-01 was a Thursday (weekday 3)
+        "weekdays": np.bincount((days + 3) % 7, minlength=7).astype(np.int64),
+        "day_keys": day_keys.astype(np.int64),
+        "day_counts": day_counts.astype(np.int64),
+    }
+
+
+def category_worker(snapshot_dir: str) -> Dict[str, Any]:
+    """Category and content-type distributions"""
+    category, content_type = _load_snapshot(snapshot_dir, "category", "content_type")
+    return {
+        "categories": np.bincount(np.asarray(category)).astype(np.int64),
+        "content_types": np.bincount(np.asarray(content_type)).astype(np.int64),
+    }
+
+
+def _grow_centroids(vectors: "np.ndarray", centroids: "np.ndarray", counts: "np.ndarray",
+                    n_clusters: int, min_distance: float = 1e-3):
+    """Add up to n_clusters - len(centroids) centroids, farthest-first from the existing ones"""
+    similarity = (vectors @ centroids.T).max(axis=1)
+    added = []
+    while len(centroids) + len(added) < n_clusters:
+        farthest = int(np.argmin(similarity))
+        if similarity[farthest] > 1 - min_distance:
+            break  # every item already sits on a centroid
+        added.append(vectors[farthest])
+        similarity = np.maximum(similarity, vectors @ vectors[farthest])
+    if not added:
+        return centroids, counts
+    return (np.vstack([centroids, np.asarray(added, dtype=np.float32)]),
+            np.concatenate([counts, np.zeros(len(added), dtype=np.int64)]))
+
+
+def cluster_worker(snapshot_dir: str, centroids: Optional["np.ndarray"],
+                   counts: Optional["np.ndarray"], n_clusters: int) -> Dict[str, Any]:
+    """
+    Incremental (mini-batch) spherical k-means over item vectors.
+
+    New items are assigned to the nearest centroid and each centroid moves
+    towards the mean of its new members with rate new/total members, so a
+    centroid tracks the running mean of everything assigned to it without
+    revisiting old items. While there are fewer than n_clusters centroids
+    (the first batch was small), each run adds centroids seeded from the
+    new items farthest from the existing ones.
+    """
+    vectors, indptr, tag_ids = _load_snapshot(snapshot_dir, "vectors", "tag_indptr", "tag_ids")
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if not len(vectors):
+        return {"centroids": centroids, "counts": counts,
+                "tag_keys": np.zeros(0, np.int64), "tag_counts": np.zeros(0, np.int64)}
+
+    if centroids is None:
+        k = max(1, min(n_clusters, len(vectors)))
+        rng = np.random.default_rng(len(vectors))
+        centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+        for _ in range(10):
+            labels = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, vectors)
+            norms = np.linalg.norm(sums, axis=1)
+            keep = norms > 0
+            centroids[keep] = sums[keep] / norms[keep, None]
+        counts = np.zeros(len(centroids), dtype=np.int64)
+
+    centroids = np.array(centroids, dtype=np.float32)
+    counts = np.array(counts, dtype=np.int64)
+    if len(centroids) < n_clusters:
+        centroids, counts = _grow_centroids(vectors, centroids, counts, n_clusters)
+    labels = np.argmax(vectors @ centroids.T, axis=1)
+
+    for cluster in np.unique(labels):
+        members = vectors[labels == cluster]
+        counts[cluster] += len(members)
+        rate = len(members) / counts[cluster]
+        updated = (1 - rate) * centroids[cluster] + rate * members.mean(axis=0)
+        norm = np.linalg.norm(updated)
+        if norm > 0:
+            centroids[cluster] = updated / norm
+
+    # Per-cluster tag counts, keyed (cluster, tag)
+    lengths = np.diff(np.asarray(indptr))
+    tag_keys, tag_counts = np.unique(
+        _pair_keys(np.repeat(labels, lengths), np.asarray(tag_ids)), return_counts=True
+    )
+    return {"centroids": centroids, "counts": counts,
+            "tag_keys": tag_keys, "tag_counts": tag_counts.astype(np.int64)}
+
+
+class PatternAnalysisPipeline:
+    """
+    Incremental pattern analysis for the knowledge corpus.
+
+    Each run:
+    1. Collects items not seen by previous runs
+    2. Writes their metadata (timestamps, category/type ids, CSR tag lists,
+       vectors) to a memory-mapped snapshot
+    3. Runs the four analyses concurrently in a process pool
+    4. Merges the partial aggregates into the persisted running state and
+       derives pattern records from the totals
+    """
+
+    def __init__(self, state_dir: str = "data/knowledge/analytics", max_workers: int = None,
+                 n_clusters: int = 8):
+        self.state_dir = Path(state_dir)
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.n_clusters = n_clusters
+        self._executor = None
+        self.last_run: Dict[str, Any] = {}
+        self._reset_state()
+        self._load_state()
+
+    def _reset_state(self):
+        self.processed_ids = set()
+        self.vocab = {"tags": [], "categories": [], "content_types": []}
+        self._vocab_index = {name: {} for name in self.vocab}
+        if np is None:
+            return
+        self.cooccurrence_keys = np.zeros(0, np.int64)
+        self.cooccurrence_counts = np.zeros(0, np.int64)
+        self.tag_frequency = np.zeros(0, np.int64)
+        self.hours = np.zeros(24, np.int64)
+        self.weekdays = np.zeros(7, np.int64)
+        self.day_keys = np.zeros(0, np.int64)
+        self.day_counts = np.zeros(0, np.int64)
+        self.categories = np.zeros(0, np.int64)
+        self.content_types = np.zeros(0, np.int64)
+        self.centroids = None
+        self.cluster_counts = None
+        self.cluster_tag_keys = np.zeros(0, np.int64)
+        self.cluster_tag_counts = np.zeros(0, np.int64)
+
+    async def run(self, items: Dict[str, Any], vector_fn: Callable[[List[str]], Optional["np.ndarray"]] = None,
+                  full: bool = False) -> List[Dict[str, Any]]:
+        """
+        Analyse items added since the last run and return pattern records.
+
+        Args:
+            items: item_id -> KnowledgeItem
+            vector_fn: returns an (n, dim) matrix for a list of item ids, or
+                None to skip clustering
+            full: discard the running state and reprocess every item
+        """
+        if np is None:
+            return []
+
+        start = time.perf_counter()
+        if full:
+            self._reset_state()
+
+        new_ids = [item_id for item_id in items if item_id not in self.processed_ids]
+        self.last_run = {"new_items": len(new_ids), "total_items": len(items)}
+        if not new_ids:
+            self.last_run["duration"] = time.perf_counter() - start
+            return []
+
+        snapshot_dir = tempfile.mkdtemp(prefix="knowledge_snapshot_")
+        try:
+            has_vectors = self._write_snapshot(snapshot_dir, [items[i] for i in new_ids], new_ids, vector_fn)
+
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            jobs = [
+                loop.run_in_executor(executor, tag_cooccurrence_worker, snapshot_dir),
+                loop.run_in_executor(executor, temporal_worker, snapshot_dir),
+                loop.run_in_executor(executor, category_worker, snapshot_dir),
+            ]
+            if has_vectors:
+                jobs.append(loop.run_in_executor(
+                    executor, cluster_worker, snapshot_dir,
+                    self.centroids, self.cluster_counts, self.n_clusters
+                ))
+            results = await asyncio.gather(*jobs)
+        finally:
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+        self._merge(*results)
+        self.processed_ids.update(new_ids)
+        self._save_state()
+
+        self.last_run["duration"] = time.perf_counter() - start
+        return self._build_patterns()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            try:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            except (OSError, NotImplementedError, ValueError) as e:
+                # Sandboxes without process support fall back to the default thread pool
+                print(f"⚠️ Process pool unavailable for pattern analysis: {e}")
+                return None
+        return self._executor
+
+    def _intern(self, vocab: str, value: str) -> int:
+        index = self._vocab_index[vocab]
+        if value not in index:
+            index[value] = len(self.vocab[vocab])
+            self.vocab[vocab].append(value)
+        return index[value]
+
+    def _write_snapshot(self, snapshot_dir: str, items: List[Any], item_ids: List[str],
+                        vector_fn: Optional[Callable]) -> bool:
+        """Write item metadata as .npy files that workers memory-map"""
+        count = len(items)
+        created = np.lib.format.open_memmap(
+            os.path.join(snapshot_dir, "created.npy"), mode="w+", dtype=np.float64, shape=(count,))
+        category = np.lib.format.open_memmap(
+            os.path.join(snapshot_dir, "category.npy"), mode="w+", dtype=np.int32, shape=(count,))
+        content_type = np.lib.format.open_memmap(
+            os.path.join(snapshot_dir, "content_type.npy"), mode="w+", dtype=np.int32, shape=(count,))
+
+        indptr = np.zeros(count + 1, dtype=np.int64)
+        tag_ids: List[int] = []
+        for row, item in enumerate(items):
+            # Naive wall-clock seconds, so hour/weekday buckets match local time
+            created[row] = ((item.created_at or datetime.now()) - _EPOCH).total_seconds()
+            category[row] = self._intern("categories", item.category or "uncategorized")
+            content_type[row] = self._intern("content_types", item.content_type or "text")
+            tag_ids.extend(self._intern("tags", tag) for tag in dict.fromkeys(item.tags or []))
+            indptr[row + 1] = len(tag_ids)
+
+        np.save(os.path.join(snapshot_dir, "tag_indptr.npy"), indptr)
+        np.save(os.path.join(snapshot_dir, "tag_ids.npy"), np.asarray(tag_ids, dtype=np.int32))
+        for array in (created, category, content_type):
+            array.flush()
+
+        vectors = vector_fn(item_ids) if vector_fn else None
+        if vectors is None or len(vectors) != count:
+            return False
+        np.save(os.path.join(snapshot_dir, "vectors.npy"), np.asarray(vectors, dtype=np.float32))
+        return True
+
+    def _merge(self, tags: Dict, temporal: Dict, category: Dict, clusters: Dict = None):
+        self.cooccurrence_keys, self.cooccurrence_counts = _merge_counts(
+            self.cooccurrence_keys, self.cooccurrence_counts, tags["keys"], tags["counts"])
+        self.tag_frequency = _add_bincount(self.tag_frequency, tags["frequency"])
+
+        self.hours = _add_bincount(self.hours, temporal["hours"])
+        self.weekdays = _add_bincount(self.weekdays, temporal["weekdays"])
+        self.day_keys, self.day_counts = _merge_counts(
+            self.day_keys, self.day_counts, temporal["day_keys"], temporal["day_counts"])
+
+        self.categories = _add_bincount(self.categories, category["categories"])
+        self.content_types = _add_bincount(self.content_types, category["content_types"])
+
+        if clusters is not None:
+            self.centroids = clusters["centroids"]
+            self.cluster_counts = clusters["counts"]
+            self.cluster_tag_keys, self.cluster_tag_counts = _merge_counts(
+                self.cluster_tag_keys, self.cluster_tag_counts,
+                clusters["tag_keys"], clusters["tag_counts"])
+
+    def _build_patterns(self) -> List[Dict[str, Any]]:
+        """Derive pattern records from the running totals; "key" names what a pattern describes"""
+        patterns = []
+        tags = self.vocab["tags"]
+        total_items = len(self.processed_ids)
+
+        # Content clusters with their dominant tags
+        if self.cluster_counts is not None:
+            clusters = self.cluster_tag_keys >> 32
+            for cluster_id, size in enumerate(self.cluster_counts.tolist()):
+                if size < 3:
+                    continue
+                mask = clusters == cluster_id
+                top = np.argsort(-self.cluster_tag_counts[mask])[:5]
+                patterns.append({
+                    "type": "content_cluster",
+                    "key": f"content_cluster:{cluster_id}",
+                    "data": {
+                        "cluster_id": cluster_id,
+                        "size": size,
+                        "top_tags": [tags[int(k & 0xFFFFFFFF)] for k in self.cluster_tag_keys[mask][top]],
+                    },
+                    "confidence": round(size / total_items, 3),
+                    "applications": ["content_recommendation", "auto_categorization"],
+                })
+
+        # Frequent tag pairs
+        if len(self.cooccurrence_counts):
+            top = np.argsort(-self.cooccurrence_counts)[:10]
+            for key, count in zip(self.cooccurrence_keys[top].tolist(), self.cooccurrence_counts[top].tolist()):
+                if count < 2:
+                    continue
+                a, b = key >> 32, key & 0xFFFFFFFF
+                patterns.append({
+                    "type": "tag_cooccurrence",
+                    "key": "tag_cooccurrence:" + "|".join(sorted((tags[a], tags[b]))),
+                    "data": {"tags": [tags[a], tags[b]], "count": count},
+                    "confidence": round(count / max(1, min(self.tag_frequency[a], self.tag_frequency[b])), 3),
+                    "applications": ["auto_tagging", "related_content"],
+                })
+
+        # Creation activity over time
+        if total_items:
+            patterns.append({
+                "type": "temporal_activity",
+                "key": "temporal_activity",
+                "data": {
+                    "peak_hour": int(np.argmax(self.hours)),
+                    "peak_weekday": _WEEKDAYS[int(np.argmax(self.weekdays))],
+                    "active_days": int(len(self.day_keys)),
+                    "items_per_active_day": round(total_items / max(1, len(self.day_keys)), 2),
+                    "last_active_day": ((_EPOCH + timedelta(days=int(self.day_keys[-1]))).date().isoformat()
+                                        if len(self.day_keys) else None),
+                },
+                "confidence": round(float(self.hours.max()) / total_items, 3),
+                "applications": ["scheduling", "content_trends"],
+            })
+
+            # Category and content-type distribution
+            categories = {self.vocab["categories"][i]: int(c) for i, c in enumerate(self.categories) if c}
+            dominant = max(categories, key=categories.get)
+            patterns.append({
+                "type": "category_distribution",
+                "key": "category_distribution",
+                "data": {
+                    "categories": categories,
+                    "content_types": {self.vocab["content_types"][i]: int(c)
+                                      for i, c in enumerate(self.content_types) if c},
+                    "dominant_category": dominant,
+                },
+                "confidence": round(categories[dominant] / total_items, 3),
+                "applications": ["knowledge_gaps", "content_planning"],
+            })
+
+        return patterns
+
+    def _save_state(self):
+        """Persist running aggregates so restarts stay incremental"""
+        try:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+            arrays = {
+                "processed_ids": np.array(sorted(self.processed_ids), dtype=str),
+                "cooccurrence_keys": self.cooccurrence_keys,
+                "cooccurrence_counts": self.cooccurrence_counts,
+                "tag_frequency": self.tag_frequency,
+                "hours": self.hours,
+                "weekdays": self.weekdays,
+                "day_keys": self.day_keys,
+                "day_counts": self.day_counts,
+                "categories": self.categories,
+                "content_types": self.content_types,
+                "cluster_tag_keys": self.cluster_tag_keys,
+                "cluster_tag_counts": self.cluster_tag_counts,
+                "vocab": np.array(json.dumps(self.vocab)),
+            }
+            if self.centroids is not None:
+                arrays["centroids"] = self.centroids
+                arrays["cluster_counts"] = self.cluster_counts
+
+            path = self.state_dir / "pattern_state.npz"
+            tmp_path = path.with_name(path.name + ".tmp")
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error saving pattern state: {e}")
+
+    def _load_state(self):
+        path = self.state_dir / "pattern_state.npz"
+        if np is None or not path.exists():
+            return
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                self.processed_ids = set(str(i) for i in data["processed_ids"])
+                self.vocab = json.loads(str(data["vocab"]))
+                self._vocab_index = {name: {value: i for i, value in enumerate(values)}
+                                     for name, values in self.vocab.items()}
+                for name in ("cooccurrence_keys", "cooccurrence_counts", "tag_frequency", "hours",
+                             "weekdays", "day_keys", "day_counts", "categories", "content_types",
+                             "cluster_tag_keys", "cluster_tag_counts"):
+                    setattr(self, name, data[name])
+                if "centroids" in data:
+                    self.centroids = data["centroids"]
+                    self.cluster_counts = data["cluster_counts"]
+        except Exception as e:
+            print(f"Error loading pattern state, starting fresh: {e}")
+            self._reset_state()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "processed_items": len(self.processed_ids),
+            "tags": len(self.vocab["tags"]),
+            "tag_pairs": int(len(self.cooccurrence_keys)) if np is not None else 0,
+            "clusters": 0 if self.centroids is None else int(len(self.centroids)),
+            "max_workers": self.max_workers,
+            "last_run": self.last_run,
+        }
+
+
+__all__ = ['PatternAnalysisPipeline']
@@ -37,21 +37,6 @@ except ImportError:
     ImageEnhance = None
     ImageFilter = None
 
-try:
-    import matplotlib.pyplot as plt
-except ImportError:
-    plt = None
-
-try:
-    import seaborn as sns
-except ImportError:
-    sns = None
-
-try:
-    import pandas as pd
-except ImportError:
-    pd = None
-
 @dataclass
 class QualityAssessment:
     """Quality assessment result data structure"""
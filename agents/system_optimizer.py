@@ -60,12 +60,21 @@ class SystemOptimizerAgent:
         self.performance_history = []
         self.optimization_history = []
         self.last_optimization = None
+        self.last_memory_report = None
+        # tracemalloc slows every allocation, so allocation reports are opt-in
+        self.trace_allocations = False
+        self._started_tracing = False
         
         # Task metrics
         self.optimizations_performed = 0
         self.issues_resolved = 0
         self.uptime_improved = 0
         
+        from core.memory_manager import memory_manager
+        # Pooled instances share an agent_id, so the key carries the instance too
+        memory_manager.register(f"{self.agent_id}.optimization_history.{id(self):x}", self.trim_history,
+                                self.optimization_history.__len__)
+        
         print(f"✅ {self.name} initialized - Auto-optimization enabled")
         
         # Start background monitoring (only if there's a running event loop)
@@ -94,7 +103,7 @@ class SystemOptimizerAgent:
             elif task_type == 'backup_system':
                 return await self.create_system_backup()
             elif task_type == 'scale_agents':
-                return await self.auto_scale_agents()
+                return await self.auto_scale_agents(task.get('agent_types'))
             else:
                 return await self.perform_system_optimization()
                 
@@ -229,38 +238,55 @@ class SystemOptimizerAgent:
             }
     
     async def _optimize_memory(self) -> List[str]:
-        """Optimize memory usage"""
+        """Trim registered in-process caches under memory pressure (never sys.modules or bytecode caches)"""
         optimizations = []
         
         try:
-            # Force garbage collection
-            import gc
-            collected = gc.collect()
-            if collected > 0:
-                optimizations.append(f"Garbage collection freed {collected} objects")
-            
-            # Clear Python caches
-            sys.modules.clear()
-            optimizations.append("Python module cache cleared")
+            from core.memory_manager import memory_manager
+            
+            # Caches are trimmed on this (their owners') loop thread; only the
+            # collection and the tracemalloc snapshot run in worker threads
+            report = await memory_manager.reclaim_async()
+            if report['pressure'] != 'none' and self.trace_allocations and not self._started_tracing:
+                # Trace allocations while pressure lasts so later cycles can report growth
+                memory_manager.start_tracing()
+                self._started_tracing = True
+            report['top_allocations'] = await asyncio.to_thread(memory_manager.top_allocations, 5)
+            if self._started_tracing and (report['pressure'] == 'none' or not self.trace_allocations):
+                memory_manager.stop_tracing()
+                self._started_tracing = False
+            self.last_memory_report = report
+            
+            optimizations.append(f"Memory pressure: {report['pressure']}")
+            for name, removed in report['entries_removed'].items():
+                if removed:
+                    optimizations.append(f"Trimmed {removed} entries from {name}")
+            if report['gc_collected'] > 0:
+                optimizations.append(f"Garbage collection freed {report['gc_collected']} objects")
+            if report['rss_before'] and report['rss_after']:
+                freed = (report['rss_before'] - report['rss_after']) / 1024 / 1024
+                optimizations.append(f"RSS {report['rss_after'] / 1024 / 1024:.1f} MB, {max(freed, 0):.1f} MB freed")
+            for allocation in report['top_allocations']['top'][:3]:
+                optimizations.append(f"Top allocation: {allocation['location']} ({allocation['size_kb']} KB)")
             
             return optimizations
             
         except Exception as e:
             return [f"Memory optimization error: {str(e)}"]
     
+    def trim_history(self, fraction: float) -> int:
+        """Drop the oldest fraction of optimization_history"""
+        count = int(len(self.optimization_history) * fraction)
+        del self.optimization_history[:count]
+        return count
+    
     async def _cleanup_temporary_files(self) -> List[str]:
         """Clean up temporary files and caches"""
         optimizations = []
         
         try:
-            # Clean Python cache files
-            for root, dirs, files in os.walk('.'):
-                for dir_name in dirs[:]:
-                    if dir_name == '__pycache__':
-                        import shutil
-                        shutil.rmtree(os.path.join(root, dir_name))
-                        optimizations.append(f"Removed cache: {os.path.join(root, dir_name)}")
-                        dirs.remove(dir_name)
+            # __pycache__ directories are left alone: deleting them only makes
+            # the next start recompile every module
             
             # Clean log files older than 7 days
             logs_dir = Path("logs")
@@ -373,7 +399,7 @@ class SystemOptimizerAgent:
                         fixes.append(f"Fixed permissions for {dir_name}")
             
             # Check for corrupted cache files
-            cache_dirs = ['.cache', '__pycache__']
+            cache_dirs = ['.cache']
             for cache_dir in cache_dirs:
                 if os.path.exists(cache_dir):
                     try:
@@ -412,7 +438,8 @@ class SystemOptimizerAgent:
                 'optimizations_performed': self.optimizations_performed,
                 'issues_resolved': self.issues_resolved,
                 'last_optimization': self.last_optimization.isoformat() if self.last_optimization else None,
-                'thresholds': self.performance_thresholds
+                'thresholds': self.performance_thresholds,
+                'last_memory_report': self.last_memory_report
             }
             
         except Exception as e:
@@ -449,30 +476,37 @@ class SystemOptimizerAgent:
                 'error': f'Dependency update failed: {str(e)}'
             }
     
-    async def auto_scale_agents(self) -> Dict[str, Any]:
-        """Automatically scale agent instances based on load"""
+    async def auto_scale_agents(self, agent_types: List[str] = None) -> Dict[str, Any]:
+        """Automatically scale agent worker processes based on queue depth and latency"""
         try:
-            scaling_actions = []
-            
-            # Monitor agent workload
-            from web_interface.app import agents_registry
-            
-            for agent_id, agent in agents_registry.items():
-                if hasattr(agent, 'get_performance_metrics'):
-                    metrics = agent.get_performance_metrics()
-                    
-                    # Scale up if high load
-                    if metrics.get('queue_length', 0) > 5:
-                        scaling_actions.append(f"Scaled up {agent_id} (high queue)")
-                    
-                    # Scale down if idle
-                    elif metrics.get('idle_time', 0) > 300:  # 5 minutes
-                        scaling_actions.append(f"Optimized {agent_id} (idle)")
+            from core.worker_supervisor import worker_supervisor
+            
+            # Start pools for newly requested agent types
+            for agent_type in agent_types or []:
+                if agent_type not in worker_supervisor.pools:
+                    worker_supervisor.start_pool(agent_type)
+            
+            if not worker_supervisor.pools:
+                return {
+                    'success': True,
+                    'message': 'Auto-scaling skipped - no worker pools running',
+                    'scaling_actions': []
+                }
+            
+            # One evaluation of every pool against its scaling policy
+            events = await asyncio.to_thread(worker_supervisor.autoscale)
+            scaling_actions = [
+                f"Scaled {e['agent_type']} from {e['from_workers']} to {e['to_workers']} workers ({e['reason']})"
+                for e in events
+            ]
+            status = worker_supervisor.get_status()
             
             return {
                 'success': True,
                 'message': f'Auto-scaling completed - {len(scaling_actions)} actions',
-                'scaling_actions': scaling_actions
+                'scaling_actions': scaling_actions,
+                'pools': status['pools'],
+                'recent_scaling_events': status['scaling_events']
             }
             
         except Exception as e:
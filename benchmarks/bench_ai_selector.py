@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+AI Selector Benchmark
+select_best_agent latency with the per-agent scoring loop versus the
+compiled capability index (bitsets + vectorized NumPy scoring), for
+small and large agent registries. Both paths must pick the same agent.
+
+Usage: python benchmarks/bench_ai_selector.py [--agents 10 1000] [--selections 300]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.resolve()))
+
+from core.ai_selector import AISelector, CAPABILITY_SIMILARITY
+
+VOCABULARY = list(CAPABILITY_SIMILARITY) + [
+    "react", "vue", "css", "api", "server", "sql", "nosql", "storage", "docker", "cloud",
+    "devops", "script", "cli", "shell_execution", "ai_development", "ml", "nlp", "testing",
+    "security", "monitoring", "graphql", "kubernetes", "etl", "analytics", "mobile"
+]
+TASK_TYPES = ["web_app", "mobile_app", "automation", "api", "deployment", "data_processing", "other"]
+
+
+def make_registry(count: int, rng: random.Random):
+    registry = {}
+    for i in range(count):
+        registry[f"agent_{i}"] = {
+            "capabilities": rng.sample(VOCABULARY, rng.randint(2, 8)),
+            "priority": rng.randint(1, 10),
+            "status": "active" if rng.random() < 0.9 else "idle"
+        }
+    return registry
+
+
+def make_requests(count: int, rng: random.Random):
+    return [(rng.choice(TASK_TYPES), rng.sample(VOCABULARY, rng.randint(1, 4))) for _ in range(count)]
+
+
+def run(selector: AISelector, registry, requests):
+    latencies, picks = [], []
+    for task_type, required in requests:
+        start = time.perf_counter()
+        picks.append(selector.select_best_agent(task_type, required, registry))
+        latencies.append(time.perf_counter() - start)
+    return latencies, picks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, nargs="+", default=[10, 1000])
+    parser.add_argument("--selections", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"\n{args.selections} selections per run")
+    print(f"{'agents':>8}  {'mode':<10}{'mean us':>10}{'p50 us':>10}{'p95 us':>10}{'speedup':>9}  same picks")
+
+    for count in args.agents:
+        rng = random.Random(args.seed)
+        registry = make_registry(count, rng)
+        requests = make_requests(args.selections, rng)
+
+        loop = AISelector()
+        loop.use_index = False
+        loop_times, loop_picks = run(loop, registry, requests)
+
+        indexed = AISelector()
+        index_times, index_picks = run(indexed, registry, requests)
+
+        for mode, times in (("loop", loop_times), ("index", index_times)):
+            ordered = sorted(times)
+            speedup = statistics.mean(loop_times) / statistics.mean(times)
+            print(f"{count:>8}  {mode:<10}{statistics.mean(times) * 1e6:>10.1f}"
+                  f"{ordered[len(ordered) // 2] * 1e6:>10.1f}{ordered[int(len(ordered) * 0.95)] * 1e6:>10.1f}"
+                  f"{speedup:>8.1f}x  {loop_picks == index_picks if mode == 'index' else ''}")
+
+        stats = indexed.get_selection_analytics()["capability_index"]
+        print(f"{'':>8}  index: {stats['capabilities']} capabilities, {stats['similar_pairs']} similar pairs, "
+              f"{stats['bitset_bytes']} bitset bytes, {stats['builds']} build(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Error Recovery Benchmark
+Per-event cost of ErrorRecoverySystem.handle_error during an error storm
+(three raise sites failing thousands of times), with a full traceback and
+escalation on every event versus fingerprinted, sampled capture.
+
+Usage: python benchmarks/bench_error_recovery.py [--events 20000] [--providers 5]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.resolve()))
+
+from core.error_recovery import ErrorRecoverySystem
+
+
+def connect(provider: str):
+    raise ConnectionError(f"{provider} unavailable")
+
+
+def read_timeout(provider: str):
+    raise TimeoutError(f"{provider} timed out")
+
+
+def bad_response(provider: str):
+    raise ValueError(f"{provider} returned malformed JSON")
+
+
+RAISE_SITES = [connect, read_timeout, bad_response]
+
+
+def provider_call(site: int, provider: str):
+    """Stand-in for a failing dependency, a few frames deep"""
+    def send():
+        RAISE_SITES[site](provider)
+    send()
+
+
+def run(recovery: ErrorRecoverySystem, events: int, providers: int):
+    escalated = []
+    recovery.register_escalation_handler(escalated.append)
+    for error_type in ("ConnectionError", "TimeoutError", "ValueError"):
+        recovery.recovery_strategies[error_type] = recovery.recovery_strategies["Exception"]  # escalate
+
+    latencies = []
+    for i in range(events):
+        provider = f"provider_{i % providers}"
+        try:
+            provider_call(i % len(RAISE_SITES), provider)
+        except Exception as e:
+            start = time.perf_counter()
+            recovery.handle_error(e, {"component": "llm_gateway", "target": provider, "request": i})
+            latencies.append(time.perf_counter() - start)
+    return latencies, len(escalated)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--providers", type=int, default=5)
+    args = parser.parse_args()
+
+    full = ErrorRecoverySystem()
+    full.traceback_sample_interval = 0
+    full.escalation_interval = 0
+
+    modes = [("full capture", full), ("sampled", ErrorRecoverySystem())]
+
+    print(f"\n{args.events} errors from {len(RAISE_SITES)} raise sites across {args.providers} providers")
+    print(f"{'mode':<14}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}{'escalated':>11}{'fingerprints':>14}")
+    for name, recovery in modes:
+        latencies, escalated = run(recovery, args.events, args.providers)
+        ordered = sorted(latencies)
+        print(f"{name:<14}{statistics.mean(latencies) * 1e6:>10.1f}{ordered[len(ordered) // 2] * 1e6:>10.1f}"
+              f"{ordered[int(len(ordered) * 0.99)] * 1e6:>10.1f}{escalated:>11}{len(recovery.fingerprints):>14}")
+
+
+if __name__ == "__main__":
+    main()
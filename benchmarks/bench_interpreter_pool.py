@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Interpreter Pool Benchmark
+Latency of running a Python snippet through warm pre-started interpreters
+(core.interpreter_pool) versus spawning a fresh `python` process per run,
+as CodeExecutorAgent did before.
+
+Usage: python benchmarks/bench_interpreter_pool.py [--runs 200] [--concurrency 1 4] [--imports json,decimal]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.resolve()))
+
+from core.interpreter_pool import InterpreterPool
+from core.process_runner import ProcessRunner
+
+
+def snippet(imports: str) -> str:
+    lines = [f"import {name}" for name in imports.split(",") if name]
+    return "\n".join(lines + ["total = sum(i * i for i in range(1000))", "print(total)"])
+
+
+async def per_run_spawn(code: str, runs: int, concurrency: int, workdir: Path):
+    """Old path: write main.py, start python on it, capture its output"""
+    runner = ProcessRunner("bench", max_concurrent=concurrency)
+    script = workdir / "main.py"
+    script.write_text(code)
+
+    async def one():
+        start = time.perf_counter()
+        result = await runner.run([sys.executable, str(script)], cwd=str(workdir))
+        assert result.success, result.stderr
+        return time.perf_counter() - start
+
+    return await gather_limited(one, runs, concurrency)
+
+
+async def warm_pool(code: str, runs: int, concurrency: int, max_runs: int):
+    pool = InterpreterPool(size=concurrency, max_runs=max_runs)
+    await pool.start()
+
+    async def one():
+        start = time.perf_counter()
+        answer = await pool.execute(code)
+        assert answer["success"], answer["stderr"]
+        return time.perf_counter() - start
+
+    try:
+        return await gather_limited(one, runs, concurrency)
+    finally:
+        await pool.shutdown()
+
+
+async def gather_limited(fn, runs: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with semaphore:
+            return await fn()
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*[limited() for _ in range(runs)])
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--imports", default="json,decimal", help="modules each snippet imports")
+    parser.add_argument("--max-runs", type=int, default=100, help="runs before a pool worker is recycled")
+    args = parser.parse_args()
+
+    code = snippet(args.imports)
+    print(f"\n{args.runs} runs of a snippet importing [{args.imports}]")
+    print(f"{'mode':<18}{'conc':>6}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'runs/s':>10}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for concurrency in args.concurrency:
+            modes = [
+                ("spawn per run", per_run_spawn(code, args.runs, concurrency, Path(workdir))),
+                ("warm pool", warm_pool(code, args.runs, concurrency, args.max_runs)),
+            ]
+            for name, bench in modes:
+                latencies, elapsed = asyncio.run(bench)
+                ordered = sorted(latencies)
+                print(f"{name:<18}{concurrency:>6}{statistics.mean(latencies) * 1e3:>10.2f}"
+                      f"{ordered[len(ordered) // 2] * 1e3:>10.2f}{ordered[int(len(ordered) * 0.99)] * 1e3:>10.2f}"
+                      f"{args.runs / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+Cold-start wall time of the agents package, the web app and the CLI, with
+a per-module import-time breakdown taken from `python -X importtime`.
+
+Every measurement runs in a fresh interpreter so nothing is cached in
+sys.modules. "eager" targets force every agent import, which is what
+importing the packages used to cost before agents were loaded lazily.
+
+Usage: python benchmarks/bench_startup.py [--runs 3] [--top 15] [--target agents web ...]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent.resolve()
+
+# name -> (statement, registry whose per-entry load times are reported)
+TARGETS = {
+    "agents": ("import agents", "agents.AGENTS_REGISTRY"),
+    "agents (eager)": ("import agents; agents.AGENTS_REGISTRY.preload()", "agents.AGENTS_REGISTRY"),
+    "web": ("import web_interface.app", "web_interface.app.agent_registry"),
+    "web (eager)": ("import web_interface.app; web_interface.app.agent_registry.preload()",
+                    "web_interface.app.agent_registry"),
+    "core.memory_bus": ("import core.memory_bus", None),
+    "cli --help": (None, None),  # runs cli.py itself
+}
+
+
+def run_once(name: str, importtime: bool = False):
+    """Run one target in a fresh interpreter; returns (seconds, stdout, stderr)"""
+    flags = ["-X", "importtime"] if importtime else []
+    statement, registry = TARGETS[name]
+    if statement is None:
+        command = [sys.executable, *flags, str(ROOT / "cli.py"), "--help"]
+    else:
+        if registry:
+            # Report the registry's per-entry load times back on stdout
+            statement += f"; import json; print('@@' + json.dumps({registry}.import_times))"
+        command = [sys.executable, *flags, "-c", statement]
+
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"{name} failed:\n{result.stderr[-2000:]}")
+    return elapsed, result.stdout, result.stderr
+
+
+def parse_importtime(stderr: str):
+    """Per-module (self_us, cumulative_us) from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        modules[module.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def project_modules(modules):
+    """Top-level project modules only (agents.*, core.*, connectors.*, web_interface.*)"""
+    prefixes = ("agents", "core", "connectors", "web_interface")
+    return {name: times for name, times in modules.items() if name.split(".")[0] in prefixes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="timed runs per target (median reported)")
+    parser.add_argument("--top", type=int, default=15, help="modules to list in the breakdown")
+    parser.add_argument("--target", nargs="+", choices=list(TARGETS), default=list(TARGETS))
+    args = parser.parse_args()
+
+    print(f"\ncold start, median of {args.runs} fresh interpreters")
+    print(f"{'target':<18}{'median s':>10}{'min s':>10}")
+    for name in args.target:
+        times = [run_once(name)[0] for _ in range(args.runs)]
+        print(f"{name:<18}{statistics.median(times):>10.3f}{min(times):>10.3f}")
+
+    for name in args.target:
+        _, stdout, stderr = run_once(name, importtime=True)
+        modules = parse_importtime(stderr)
+
+        print(f"\n[{name}] slowest imports by cumulative time")
+        print(f"{'module':<48}{'self ms':>10}{'cumul ms':>10}")
+        for module, (self_us, cumulative_us) in sorted(modules.items(), key=lambda m: -m[1][1])[:args.top]:
+            print(f"{module:<48}{self_us / 1000:>10.1f}{cumulative_us / 1000:>10.1f}")
+
+        project = project_modules(modules)
+        print(f"project modules imported: {len(project)}, "
+              f"own time {sum(s for s, _ in project.values()) / 1000:.1f} ms")
+
+        report = [line[2:] for line in stdout.splitlines() if line.startswith("@@")]
+        agent_times = json.loads(report[-1]) if report else {}
+        if agent_times:
+            print("per-agent load time (import + instantiation):")
+            for agent_id, seconds in sorted(agent_times.items(), key=lambda a: -a[1]):
+                print(f"  {agent_id:<32}{seconds * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
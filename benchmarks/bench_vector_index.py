@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Vector Index Benchmark
+Recall@k and query latency of the IVF index against exact brute-force search.
+
+Usage: python benchmarks/bench_vector_index.py [--sizes 1000 10000 50000] [--k 10]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.resolve()))
+
+import numpy as np
+
+from core.vector_index import HashedNgramEmbedder, IVFIndex
+
+
+def make_corpus(size: int, seed: int = 7):
+    """Topic-structured synthetic corpus: each doc mixes topic and shared words"""
+    rng = np.random.default_rng(seed)
+    shared = [f"common{i}" for i in range(2000)]
+    topics = [[f"t{t}w{i}" for i in range(60)] for t in range(200)]
+
+    docs = []
+    for _ in range(size):
+        topic = topics[rng.integers(len(topics))]
+        words = list(rng.choice(topic, 5)) + list(rng.choice(shared, 25))
+        docs.append(" ".join(words))
+
+    queries = []
+    for _ in range(200):
+        topic = topics[rng.integers(len(topics))]
+        queries.append(" ".join(rng.choice(topic, 4)))
+    return docs, queries
+
+
+def run(size: int, k: int, probes):
+    embedder = HashedNgramEmbedder()
+    docs, queries = make_corpus(size)
+
+    start = time.perf_counter()
+    vectors = embedder.embed_batch(docs)
+    embed_time = time.perf_counter() - start
+
+    index = IVFIndex(embedder.dim)
+    start = time.perf_counter()
+    index.add_batch([str(i) for i in range(size)], vectors)
+    build_time = time.perf_counter() - start
+
+    query_vectors = embedder.embed_batch(queries)
+
+    start = time.perf_counter()
+    exact = [set(np.argsort(-(vectors @ q))[:k].astype(str)) for q in query_vectors]
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    print(f"\nN={size:,}  embed={embed_time:.2f}s ({embed_time / size * 1e6:.0f}us/doc)  "
+          f"build={build_time:.2f}s  lists={index.stats()['lists']}  brute-force={exact_ms:.3f}ms/query")
+    print(f"  {'n_probe':>8} {'recall@' + str(k):>10} {'ms/query':>10}")
+    for n_probe in probes:
+        hits = 0
+        start = time.perf_counter()
+        for q, truth in zip(query_vectors, exact):
+            found = {item_id for item_id, _ in index.search(q, k, n_probe=n_probe)}
+            hits += len(found & truth)
+        elapsed = (time.perf_counter() - start) / len(queries) * 1000
+        print(f"  {n_probe:>8} {hits / (k * len(queries)):>10.3f} {elapsed:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF vector index benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--probes", type=int, nargs="+", default=[4, 8, 16, 32])
+    args = parser.parse_args()
+
+    print(f"Vector index benchmark (cpus={os.cpu_count()})")
+    for size in args.sizes:
+        run(size, args.k, args.probes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Web Async Load Test
+Concurrent /api/task/submit throughput through the shared agent loop,
+compared with the old pattern of a fresh event loop per request.
+
+The benchmark agent holds a loop-bound resource (an aiohttp-style client
+created on first use), which is what breaks under per-request loops.
+
+Usage: python benchmarks/bench_web_async.py [--requests 400] [--concurrency 1 16 64] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.resolve()))
+
+from werkzeug.serving import make_server
+from flask import jsonify, request
+
+from web_interface import app as web
+
+
+class LoopBoundAgent:
+    """Simulated agent whose client is bound to the loop it was created on"""
+
+    name = "Bench Agent"
+    status = "ready"
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self._loop = None
+
+    async def process_task(self, task):
+        # Like an aiohttp session: bound to the loop it was opened on and
+        # unusable from any other loop
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        if self._loop is not asyncio.get_running_loop():
+            raise RuntimeError("client is attached to a different loop")
+        await asyncio.sleep(self.latency)
+        return {"echo": task.get("description")}
+
+
+def legacy_submit():
+    """The previous route body: one new event loop per request"""
+    agent = web.agent_registry[request.get_json()["agent_id"]]
+    try:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        result = loop.run_until_complete(agent.process_task({"description": "x"}))
+        loop.close()
+        return jsonify({"success": True, "data": result})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+def post(url: str, payload: dict):
+    body = json.dumps(payload).encode()
+    req = urllib.request.Request(url, body, {"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - start
+
+
+def load(url: str, total: int, concurrency: int, payload: dict):
+    with ThreadPoolExecutor(concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda _: post(url, payload), range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(r[1] for r in results)
+    codes = {}
+    for status, _ in results:
+        codes[status] = codes.get(status, 0) + 1
+    return {
+        "rps": total / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "codes": codes
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Web async load test")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated agent latency (s)")
+    args = parser.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    web.agent_registry["bench"] = LoopBoundAgent(args.latency)
+    web.app.add_url_rule("/bench/legacy", "bench_legacy", legacy_submit, methods=["POST"])
+    web.agent_runner.start()
+
+    server = make_server("127.0.0.1", 0, web.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    payload = {"agent_id": "bench", "task": "ping"}
+
+    print(f"\nagent latency={args.latency * 1000:.0f}ms  requests={args.requests}  "
+          f"loop max_concurrency={web.agent_runner.max_concurrency}")
+    print(f"{'mode':<14}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}  status codes")
+
+    for concurrency in args.concurrency:
+        for mode, path in (("shared loop", "/api/task/submit"), ("per-request", "/bench/legacy")):
+            # Fresh agent per run so the legacy path starts from a clean state
+            web.agent_registry["bench"] = LoopBoundAgent(args.latency)
+            r = load(base + path, args.requests, concurrency, payload)
+            print(f"{mode:<14}{concurrency:>6}{r['rps']:>10.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}  {r['codes']}")
+
+    # Deadline enforcement: agent slower than the request timeout -> 504
+    web.agent_registry["bench"] = LoopBoundAgent(2.0)
+    status, elapsed = post(base + "/api/task/submit", {"agent_id": "bench", "task": "slow", "timeout": 0.2})
+    print(f"\ntimeout=0.2s against a 2s agent -> HTTP {status} in {elapsed * 1000:.0f}ms")
+
+    print(f"runner stats: {json.dumps(web.agent_runner.get_stats(), default=str)}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,8 @@ SCREENSHOTS_DIR = PROJECT_DIR / "screenshots"
 SCREENSHOTS_DIR.mkdir(exist_ok=True)
 APP_STARTUP_TIMEOUT = int(os.getenv("APP_STARTUP_TIMEOUT", "20"))
 PAGE_LOAD_TIMEOUT = int(os.getenv("PAGE_LOAD_TIMEOUT", "30000"))
+JOB_TIMEOUT = int(os.getenv("JOB_TIMEOUT", "60"))
+JOB_FINAL_STATUSES = {"completed", "failed", "cancelled", "timeout"}
 
 PAGE_ROUTES = [
     ("/", "Home Dashboard"),
@@ -270,6 +272,18 @@ class BrowserTestRunner:
         results["pages"].append(interactive_result)
         return interactive_result
 
+    def wait_for_job(self, poll_url, timeout=JOB_TIMEOUT):
+        """Poll a queued job until it reaches a final status (or timeout seconds pass)"""
+        deadline = time.time() + timeout
+        job = {}
+        while time.time() < deadline:
+            response = self.page.request.get(f"{BASE_URL}{poll_url}", timeout=10000)
+            job = response.json().get("data") or {}
+            if job.get("status") in JOB_FINAL_STATUSES:
+                break
+            time.sleep(0.5)
+        return job
+
     def test_api_endpoints(self):
         print("\n🔌 Testing API endpoints...")
         for method, path, body in API_ENDPOINTS:
@@ -297,6 +311,12 @@ class BrowserTestRunner:
                     if response.status >= 400:
                         api_result["has_error_field"] = "error" in data
                         print(f"      {response.status} - Error: {data.get('error', 'unknown')}")
+                    elif response.status == 202 and (data.get("data") or {}).get("poll_url"):
+                        # Queued job (e.g. /api/prompt/process): follow it to its result
+                        job = self.wait_for_job(data["data"]["poll_url"])
+                        api_result["job_status"] = job.get("status")
+                        api_result["response_success"] = job.get("status") == "completed"
+                        print(f"      ✅ {response.status} - job {job.get('job_id')} {job.get('status')}")
                     else:
                         print(f"      ✅ {response.status} - success={data.get('success')}")
                 except Exception as e:
@@ -17,6 +17,9 @@ from typing import Dict, List, Any, Optional, Union
 from datetime import datetime
 import hashlib
 
+from core.error_recovery import error_recovery, RetryPolicy, deadline, remaining_time
+from core.memory_manager import memory_manager, trim_oldest
+
 class LLMGateway:
     """
     Universal LLM Gateway supporting multiple providers:
@@ -82,6 +85,12 @@ class LLMGateway:
         self.cache = {}
         self.cache_ttl = 3600  # 1 hour
         
+        # Requests go through a circuit breaker and retry budget per provider;
+        # request_timeout (seconds) bounds a whole chat_completion
+        self.executor = error_recovery.executor
+        self.retry_policy = RetryPolicy(max_attempts=2, base_delay=0.5, max_delay=4.0)
+        self.request_timeout = 60
+        
         # Initialize provider status
         self._initialize_providers()
     
@@ -132,32 +141,43 @@ class LLMGateway:
             else:
                 raise Exception(f"Rate limit exceeded for {selected_provider}")
         
-        try:
-            # Make API request
-            response = await self._make_llm_request(
-                selected_provider, selected_model, messages, **kwargs
-            )
-            
-            # Cache successful response
-            self._cache_response(cache_key, response)
-            
-            # Update usage stats
-            self._update_usage_stats(selected_provider, response)
-            
-            return response
-            
-        except Exception as e:
-            # Handle errors and retry with fallback
-            print(f"❌ Error with {selected_provider}: {e}")
-            
-            fallback_provider = self._get_fallback_provider(selected_provider)
-            if fallback_provider:
-                print(f"🔄 Retrying with fallback provider: {fallback_provider}")
-                return await self._make_llm_request(
-                    fallback_provider, "auto", messages, **kwargs
+        # One deadline covers retries and the fallback provider; an enclosing
+        # deadline set by the caller can only shorten it
+        with deadline(self.request_timeout):
+            try:
+                # Make API request
+                response = await self._call_provider(
+                    selected_provider, selected_model, messages, **kwargs
                 )
-            
-            raise e
+                
+                # Cache successful response
+                self._cache_response(cache_key, response)
+                
+                # Update usage stats
+                self._update_usage_stats(selected_provider, response)
+                
+                return response
+                
+            except Exception as e:
+                # Handle errors and retry with fallback
+                print(f"❌ Error with {selected_provider}: {e}")
+                
+                fallback_provider = self._get_fallback_provider(selected_provider)
+                if fallback_provider:
+                    print(f"🔄 Retrying with fallback provider: {fallback_provider}")
+                    return await self._call_provider(
+                        fallback_provider, "auto", messages, **kwargs
+                    )
+                
+                raise e
+    
+    async def _call_provider(self, provider: str, model: str,
+                             messages: List[Dict], **kwargs) -> Dict[str, Any]:
+        """_make_llm_request behind the provider's breaker, retried within the current deadline"""
+        return await self.executor.call(
+            "llm_gateway", provider, self._make_llm_request, provider, model, messages,
+            policy=self.retry_policy, **kwargs
+        )
     
     def _select_provider_and_model(self, provider: str, model: str) -> tuple:
         """Select optimal provider and model"""
@@ -175,6 +195,7 @@ class LLMGateway:
         available_providers = [
             (name, config) for name, config in self.providers.items()
             if config["status"] in ["active", "available"] and config["api_key"]
+            and self.executor.is_available("llm_gateway", name)
         ]
         
         # Sort by priority
@@ -233,12 +254,16 @@ class LLMGateway:
             headers["HTTP-Referer"] = "https://agentic-ai-system.com"
             headers["X-Title"] = "Agentic AI System"
         
+        # Never wait past the caller's deadline
+        remaining = remaining_time()
+        total_timeout = 60 if remaining is None else max(0.1, min(60, remaining))
+        
         async with aiohttp.ClientSession() as session:
             async with session.post(
                 f"{config['base_url']}/chat/completions",
                 headers=headers,
                 json=request_data,
-                timeout=aiohttp.ClientTimeout(total=60)
+                timeout=aiohttp.ClientTimeout(total=total_timeout)
             ) as response:
                 
                 if response.status == 200:
@@ -304,7 +329,8 @@ class LLMGateway:
             name for name, config in self.providers.items()
             if (name != current_provider and 
                 config["status"] in ["active", "available"] and
-                self._check_rate_limit(name))
+                self._check_rate_limit(name) and
+                self.executor.is_available("llm_gateway", name))
         ]
         
         if available:
@@ -320,7 +346,8 @@ class LLMGateway:
         for fallback in fallbacks:
             if (fallback != failed_provider and 
                 fallback in self.providers and
-                self.providers[fallback]["status"] != "disabled"):
+                self.providers[fallback]["status"] != "disabled" and
+                self.executor.is_available("llm_gateway", fallback)):
                 return fallback
         
         return None
@@ -366,6 +393,10 @@ class LLMGateway:
             for key in oldest_keys:
                 del self.cache[key]
     
+    def trim_cache(self, fraction: float) -> int:
+        """Drop expired responses, then the oldest fraction of the rest"""
+        return trim_oldest(self.cache, fraction, lambda cached: cached["timestamp"], max_age=self.cache_ttl)
+    
     def _update_usage_stats(self, provider: str, response: Dict):
         """Update usage statistics"""
         if provider not in self.usage_stats:
@@ -457,7 +488,8 @@ class LLMGateway:
                 "errors": stats.get("errors", 0),
                 "total_tokens": stats.get("total_tokens", 0),
                 "last_used": stats.get("last_used"),
-                "current_rate_limit_usage": len(self.rate_limits.get(provider_name, []))
+                "current_rate_limit_usage": len(self.rate_limits.get(provider_name, [])),
+                "circuit": self.executor.breaker("llm_gateway", provider_name).state
             }
         
         return status
@@ -511,3 +543,4 @@ class LLMGateway:
 
 # Global instance
 llm_gateway = LLMGateway()
+memory_manager.register("llm_gateway.cache", llm_gateway.trim_cache, lambda: len(llm_gateway.cache))
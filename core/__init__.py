@@ -5,43 +5,42 @@ Central Intelligence and Coordination System
 Made with love by Mulky Malikul Dhaher in Indonesia
 """
 
-from .ai_selector import AISelector
-
-# Safe imports - these may fail if optional dependencies are missing
-try:
-    from .prompt_master import PromptMasterAgent
-except ImportError as e:
-    PromptMasterAgent = None
-    print(f"Warning: PromptMasterAgent not available: {e}")
-
-try:
-    from .memory_bus import MemoryBus
-except ImportError as e:
-    MemoryBus = None
-    print(f"Warning: MemoryBus not available: {e}")
-
-try:
-    from .sync_engine import SyncEngine
-except ImportError as e:
-    SyncEngine = None
-    print(f"Warning: SyncEngine not available: {e}")
-
-try:
-    from .scheduler import AgentScheduler
-except ImportError as e:
-    AgentScheduler = None
-    print(f"Warning: AgentScheduler not available: {e}")
-
-try:
-    from .error_recovery import ErrorRecoverySystem
-except ImportError:
-    ErrorRecoverySystem = None
-
-# New module from cursor/fix integration
-try:
-    from .llm_client import LLMClient
-except ImportError:
-    LLMClient = None
+import importlib
+
+# Exports are imported on first access (PEP 562) so that importing one core
+# submodule, e.g. core.memory_bus, doesn't also pull in prompt_master,
+# llm_gateway/aiohttp and numpy. Optional ones resolve to None when their
+# dependencies are missing, as the old try/except imports did.
+_LAZY_EXPORTS = {
+    'AISelector': ('.ai_selector', 'AISelector', False),
+    'PromptMasterAgent': ('.prompt_master', 'PromptMasterAgent', True),
+    'MemoryBus': ('.memory_bus', 'MemoryBus', True),
+    'SyncEngine': ('.sync_engine', 'SyncEngine', True),
+    'AgentScheduler': ('.scheduler', 'AgentScheduler', True),
+    'ErrorRecoverySystem': ('.error_recovery', 'ErrorRecoverySystem', True),
+    'SemanticIndex': ('.vector_index', 'SemanticIndex', True),
+    'get_semantic_index': ('.vector_index', 'get_semantic_index', True),
+    # New module from cursor/fix integration
+    'LLMClient': ('.llm_client', 'LLMClient', True),
+}
+
+def __getattr__(name: str):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module_path, attribute, optional = _LAZY_EXPORTS[name]
+    try:
+        value = getattr(importlib.import_module(module_path, __name__), attribute)
+    except ImportError as e:
+        if not optional:
+            raise
+        print(f"Warning: {name} not available: {e}")
+        value = None
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
 
 __all__ = [
     'PromptMasterAgent',
@@ -50,5 +49,7 @@ __all__ = [
     'AgentScheduler',
     'AISelector',
     'ErrorRecoverySystem',
+    'SemanticIndex',
+    'get_semantic_index',
     'LLMClient'
 ]
@@ -0,0 +1,514 @@
+"""
+🏊 Agent Pool - Cached Agent Instances
+Lazily builds agent objects once and reuses them; agents that are not
+re-entrant are leased from a bounded per-type pool
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import asyncio
+import importlib
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+UNHEALTHY_STATUSES = {"error", "failed", "stopped", "stopping"}
+
+# Outcomes of claiming an instance: none free, a slot reserved for the
+# caller to build one, or (for a woken waiter) try claiming again
+_BUSY = object()
+_CREATE = object()
+_RETRY = object()
+
+@dataclass
+class AgentSpec:
+    agent_type: str
+    module: str
+    class_name: str
+    instance_attr: Optional[str] = None  # module-level global instance to reuse
+    reentrant: bool = True
+    pool_size: int = 1
+    warm: int = 0  # instances to build during warm_up()
+
+@dataclass
+class _PoolState:
+    idle: Deque[Any] = field(default_factory=deque)
+    members: List[Any] = field(default_factory=list)  # every live instance, leased or idle
+    in_use: int = 0
+    creating: int = 0  # slots reserved for instances being built outside the lock
+    global_claimed: bool = False  # the module's global instance has been taken
+    waiters: Deque[asyncio.Future] = field(default_factory=deque)  # async leases waiting, oldest first
+    failures: Dict[int, int] = field(default_factory=dict)  # id(instance) -> consecutive failures
+    condition: threading.Condition = field(default_factory=threading.Condition)
+    metrics: Dict[str, float] = field(default_factory=lambda: {
+        "created": 0,
+        "creation_time": 0.0,
+        "max_creation_time": 0.0,
+        "creation_errors": 0,
+        "import_time": 0.0,
+        "leases": 0,
+        "waits": 0,
+        "wait_time": 0.0,
+        "evicted": 0
+    })
+
+class AgentPool:
+    """
+    Central cache of agent instances.
+
+    Re-entrant agents have one shared instance (the module's global
+    instance when it has one, so importing and pooling don't build two).
+    Non-re-entrant agents, which keep per-task state such as running
+    subprocesses, are leased exclusively from a pool of up to
+    ``pool_size`` instances; callers beyond that wait for a release, for
+    at most ``lease_timeout`` seconds unless they pass their own timeout.
+
+    Async leases never block the event loop: instances are imported and
+    built in a worker thread, and waiters are futures that a release
+    hands its instance to directly, from whichever thread releases it.
+
+    Instances are evicted when their ``status`` turns unhealthy, when a
+    ``health_check()`` method reports False, or after ``max_failures``
+    consecutive failed leases.
+    """
+
+    def __init__(self, config_path: str = "config/system_config.yaml", max_failures: int = 3,
+                 lease_timeout: float = 300.0):
+        self.specs: Dict[str, AgentSpec] = {}
+        self.pools: Dict[str, _PoolState] = {}
+        self.max_failures = max_failures
+        self.lease_timeout = lease_timeout
+        self._config = self._load_config(config_path)
+
+    def _load_config(self, config_path: str) -> Dict[str, Any]:
+        """Per-agent pool settings from the agents section of the system config"""
+        path = Path(config_path)
+        if yaml is None or not path.exists():
+            return {}
+        try:
+            with open(path) as f:
+                return (yaml.safe_load(f) or {}).get("agents", {}) or {}
+        except Exception as e:
+            print(f"⚠️ Could not read agent pool config: {e}")
+            return {}
+
+    def register(self, agent_type: str, module: str, class_name: str, instance_attr: str = None,
+                 reentrant: bool = True, pool_size: int = 1, warm: int = 0):
+        """Register how to build an agent type; config file settings take precedence"""
+        settings = self._config.get(agent_type) or {}
+        spec = AgentSpec(
+            agent_type=agent_type,
+            module=module,
+            class_name=class_name,
+            instance_attr=instance_attr,
+            reentrant=settings.get("reentrant", reentrant),
+            pool_size=max(1, int(settings.get("pool_size", pool_size))),
+            warm=int(settings.get("warm", warm))
+        )
+        self.specs[agent_type] = spec
+        self.pools.setdefault(agent_type, _PoolState())
+
+    def __contains__(self, agent_type: str) -> bool:
+        return agent_type in self.specs
+
+    def is_pooled(self, agent_type: str) -> bool:
+        spec = self.specs.get(agent_type)
+        return spec is not None and not spec.reentrant
+
+    # ---------------------------------------------------------------
+    # Instance access
+    # ---------------------------------------------------------------
+
+    def get(self, agent_type: str):
+        """
+        Shared instance for an agent type, built on first use. For pooled
+        agents this is a pool member without exclusive use; prefer lease()
+        when the instance will run a task.
+        """
+        pool = self.pools.get(agent_type)
+        if pool is None:
+            return None
+        with pool.condition:
+            if pool.members:
+                return pool.members[0]
+            return self._create(agent_type, pool)
+
+    @contextmanager
+    def lease_sync(self, agent_type: str, timeout: float = None):
+        """Exclusive use of an instance from a synchronous caller"""
+        instance = self._acquire(agent_type, timeout)
+        failed = False
+        try:
+            yield instance
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._release(agent_type, instance, failed)
+
+    @asynccontextmanager
+    async def lease(self, agent_type: str, timeout: float = None):
+        """
+        Exclusive use of an instance (shared for re-entrant agents) for
+        the duration of the block. Yields None for unknown or unbuildable
+        agent types. An exception in the block counts as a failure.
+        Raises TimeoutError when no instance frees up within timeout.
+        """
+        instance = await self._acquire_async(agent_type, timeout)
+        failed = False
+        try:
+            yield instance
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._release(agent_type, instance, failed)
+
+    def report(self, agent_type: str, instance, success: bool):
+        """Record a task outcome for an instance obtained with get()"""
+        pool = self.pools.get(agent_type)
+        if pool is None or instance is None:
+            return
+        with pool.condition:
+            self._record_outcome(agent_type, pool, instance, not success)
+
+    def _claim(self, agent_type: str, pool: _PoolState, spec: AgentSpec):
+        """
+        An instance for the caller, _CREATE when a slot was reserved for
+        the caller to build one (with _build), or _BUSY. Caller holds the lock.
+        """
+        if spec.reentrant:
+            if pool.idle:
+                return pool.idle[0]
+            if pool.creating:
+                return _BUSY  # being built for another caller
+            pool.creating += 1
+            return _CREATE
+
+        while pool.idle:
+            instance = pool.idle.popleft()
+            if self._healthy(instance):
+                pool.in_use += 1
+                return instance
+            self._evict(agent_type, pool, instance)
+        if len(pool.members) + pool.creating < spec.pool_size:
+            pool.creating += 1
+            return _CREATE
+        return _BUSY
+
+    def _deadline(self, timeout: Optional[float]) -> float:
+        return time.perf_counter() + (self.lease_timeout if timeout is None else timeout)
+
+    def _acquire(self, agent_type: str, timeout: Optional[float]):
+        pool = self.pools.get(agent_type)
+        if pool is None:
+            return None
+        spec = self.specs[agent_type]
+        deadline = self._deadline(timeout)
+
+        waited_from = None
+        with pool.condition:
+            pool.metrics["leases"] += 1
+            while True:
+                instance = self._claim(agent_type, pool, spec)
+                if instance is not _BUSY:
+                    break
+                if waited_from is None:
+                    waited_from = time.perf_counter()
+                    pool.metrics["waits"] += 1
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise TimeoutError(f"No {agent_type} instance free after {deadline - waited_from:.1f}s")
+                pool.condition.wait(remaining)
+            self._record_wait(pool, waited_from)
+        if instance is _CREATE:
+            instance = self._build(agent_type, pool, leased=True)
+        return instance
+
+    async def _acquire_async(self, agent_type: str, timeout: Optional[float]):
+        """_acquire() for coroutines: builds in a worker thread and waits on a future, not a thread"""
+        pool = self.pools.get(agent_type)
+        if pool is None:
+            return None
+        spec = self.specs[agent_type]
+        deadline = self._deadline(timeout)
+        loop = asyncio.get_running_loop()
+
+        waited_from = None
+        with pool.condition:
+            pool.metrics["leases"] += 1
+        while True:
+            with pool.condition:
+                instance = self._claim(agent_type, pool, spec)
+                if instance is _BUSY:
+                    waiter = loop.create_future()
+                    pool.waiters.append(waiter)
+                    if waited_from is None:
+                        waited_from = time.perf_counter()
+                        pool.metrics["waits"] += 1
+                elif instance is not _CREATE:
+                    self._record_wait(pool, waited_from)
+                    return instance
+
+            if instance is _CREATE:
+                build = asyncio.ensure_future(asyncio.to_thread(self._build, agent_type, pool, True))
+                try:
+                    instance = await asyncio.shield(build)
+                except asyncio.CancelledError:
+                    # The build finishes in its thread; give back what it produces
+                    def give_back(done):
+                        if not done.cancelled() and done.exception() is None:
+                            self._release(agent_type, done.result(), False)
+                    build.add_done_callback(give_back)
+                    raise
+                with pool.condition:
+                    self._record_wait(pool, waited_from)
+                return instance
+
+            try:
+                instance = await asyncio.wait_for(waiter, max(0.0, deadline - time.perf_counter()))
+            except asyncio.TimeoutError:
+                self._forget(agent_type, pool, waiter)
+                raise TimeoutError(f"No {agent_type} instance free after {time.perf_counter() - waited_from:.1f}s")
+            except asyncio.CancelledError:
+                self._forget(agent_type, pool, waiter)
+                raise
+            if instance is not _RETRY:
+                with pool.condition:
+                    self._record_wait(pool, waited_from)
+                return instance
+
+    def _forget(self, agent_type: str, pool: _PoolState, waiter: asyncio.Future):
+        """A waiting lease gave up: drop its future, giving back an instance already handed to it"""
+        with pool.condition:
+            if waiter in pool.waiters:
+                pool.waiters.remove(waiter)
+                return
+        if waiter.done() and not waiter.cancelled() and waiter.result() is not _RETRY:
+            self._release(agent_type, waiter.result(), False)
+
+    def _wake(self, agent_type: str, pool: _PoolState, instance=_RETRY) -> bool:
+        """
+        Hand instance (or _RETRY: try to claim again) to the oldest async
+        waiter whose loop is still running. Caller holds the lock.
+        """
+        while pool.waiters:
+            waiter = pool.waiters.popleft()
+            if waiter.done():
+                continue
+            try:
+                waiter.get_loop().call_soon_threadsafe(self._deliver, agent_type, waiter, instance)
+            except RuntimeError:  # its loop is closed
+                continue
+            return True
+        return False
+
+    def _deliver(self, agent_type: str, waiter: asyncio.Future, instance):
+        """Runs on the waiter's loop"""
+        if not waiter.done():
+            waiter.set_result(instance)
+        elif instance is not _RETRY:
+            self._release(agent_type, instance, False)  # cancelled meanwhile: pass it on
+        else:
+            with self.pools[agent_type].condition:
+                self._wake(agent_type, self.pools[agent_type])
+
+    def _release(self, agent_type: str, instance, failed: bool):
+        pool = self.pools.get(agent_type)
+        if pool is None or instance is None:
+            return
+        spec = self.specs[agent_type]
+
+        with pool.condition:
+            evicted = self._record_outcome(agent_type, pool, instance, failed)
+            if spec.reentrant:
+                return
+            if not evicted and self._wake(agent_type, pool, instance):
+                return  # handed straight to a waiting lease, still in use
+            pool.in_use -= 1
+            if evicted:
+                self._wake(agent_type, pool)  # a waiting lease may build the replacement
+            else:
+                pool.idle.append(instance)
+            pool.condition.notify()
+
+    def _record_outcome(self, agent_type: str, pool: _PoolState, instance, failed: bool) -> bool:
+        """Track consecutive failures; evict unhealthy instances. Caller holds the lock."""
+        key = id(instance)
+        if failed:
+            pool.failures[key] = pool.failures.get(key, 0) + 1
+        else:
+            pool.failures.pop(key, None)
+
+        if pool.failures.get(key, 0) >= self.max_failures or not self._healthy(instance):
+            if instance in pool.idle:
+                pool.idle.remove(instance)
+            self._evict(agent_type, pool, instance)
+            return True
+        return False
+
+    def _create(self, agent_type: str, pool: _PoolState):
+        """Build an idle instance for get() and warm_up(). Caller holds the lock."""
+        pool.creating += 1
+        return self._build(agent_type, pool, leased=False)
+
+    def _build(self, agent_type: str, pool: _PoolState, leased: bool):
+        """
+        Import and construct an instance for a slot reserved in
+        pool.creating, reusing the module's global instance first. Runs
+        without the lock (or with it held by a synchronous caller); a
+        leased instance goes to the caller, any other joins the idle ones.
+        """
+        spec = self.specs[agent_type]
+        start = time.perf_counter()
+        import_time = None
+        try:
+            module = importlib.import_module(spec.module)
+            imported = time.perf_counter()
+            import_time, start = imported - start, imported
+            instance = None
+            if spec.instance_attr:
+                with pool.condition:
+                    use_global, pool.global_claimed = not pool.global_claimed, True
+                if use_global:
+                    instance = getattr(module, spec.instance_attr, None)
+            if instance is None:
+                instance = getattr(module, spec.class_name)()
+        except Exception as e:
+            with pool.condition:
+                pool.creating -= 1
+                pool.metrics["creation_errors"] += 1
+                if pool.metrics["creation_errors"] == 1:
+                    print(f"Failed to create agent {agent_type}: {e}")
+                # The slot is free again
+                self._wake(agent_type, pool)
+                pool.condition.notify_all()
+            return None
+
+        elapsed = time.perf_counter() - start
+        with pool.condition:
+            pool.creating -= 1
+            pool.members.append(instance)
+            if pool.metrics["created"] == 0:
+                pool.metrics["import_time"] = import_time
+            pool.metrics["created"] += 1
+            pool.metrics["creation_time"] += elapsed
+            pool.metrics["max_creation_time"] = max(pool.metrics["max_creation_time"], elapsed)
+            if leased and not spec.reentrant:
+                pool.in_use += 1
+            else:
+                pool.idle.append(instance)
+                # Callers waiting for a shared instance being built can use it now
+                while self._wake(agent_type, pool):
+                    pass
+                pool.condition.notify_all()
+        return instance
+
+    def _evict(self, agent_type: str, pool: _PoolState, instance):
+        if instance in pool.members:
+            pool.members.remove(instance)
+        pool.metrics["evicted"] += 1
+        pool.failures.pop(id(instance), None)
+        print(f"♻️ Evicted unhealthy {agent_type} instance")
+
+    def _healthy(self, instance) -> bool:
+        return getattr(instance, "status", "ready") not in UNHEALTHY_STATUSES
+
+    @staticmethod
+    def _record_wait(pool: _PoolState, waited_from: Optional[float]):
+        if waited_from is not None:
+            pool.metrics["wait_time"] += time.perf_counter() - waited_from
+
+    # ---------------------------------------------------------------
+    # Maintenance
+    # ---------------------------------------------------------------
+
+    def warm_up(self, agent_types: List[str] = None) -> Dict[str, int]:
+        """Build instances ahead of the first task; returns instances built per type"""
+        built = {}
+        for agent_type in agent_types or list(self.specs):
+            spec = self.specs.get(agent_type)
+            if spec is None:
+                continue
+            pool = self.pools[agent_type]
+            # Explicitly named types get at least one instance
+            target = min(spec.warm or (1 if agent_types else 0), spec.pool_size)
+            with pool.condition:
+                count = 0
+                while len(pool.members) + pool.creating < target:
+                    if self._create(agent_type, pool) is None:
+                        break
+                    count += 1
+                pool.condition.notify_all()
+            built[agent_type] = count
+        return built
+
+    def check_health(self) -> Dict[str, int]:
+        """Evict idle instances whose status or health_check() reports unhealthy"""
+        evicted = {}
+        for agent_type, pool in self.pools.items():
+            with pool.condition:
+                for instance in list(pool.idle):
+                    healthy = self._healthy(instance)
+                    check = getattr(instance, "health_check", None)
+                    if healthy and callable(check) and not asyncio.iscoroutinefunction(check):
+                        try:
+                            result = check()
+                            healthy = result.get("healthy", True) if isinstance(result, dict) else bool(result)
+                        except Exception:
+                            healthy = False
+                    if not healthy:
+                        pool.idle.remove(instance)
+                        self._evict(agent_type, pool, instance)
+                        evicted[agent_type] = evicted.get(agent_type, 0) + 1
+        return evicted
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Per-type pool occupancy, reuse and creation-cost metrics"""
+        metrics = {}
+        for agent_type, pool in self.pools.items():
+            spec = self.specs[agent_type]
+            with pool.condition:
+                m = dict(pool.metrics)
+                created = m["created"]
+                metrics[agent_type] = {
+                    "reentrant": spec.reentrant,
+                    "pool_size": spec.pool_size,
+                    "instances": len(pool.members),
+                    "idle": len(pool.idle),
+                    "in_use": pool.in_use,
+                    "created": int(created),
+                    "leases": int(m["leases"]),
+                    "reuse_rate": round(1 - created / m["leases"], 3) if m["leases"] else 0.0,
+                    "avg_creation_ms": round(m["creation_time"] / created * 1000, 2) if created else 0.0,
+                    "max_creation_ms": round(m["max_creation_time"] * 1000, 2),
+                    "import_ms": round(m["import_time"] * 1000, 2),
+                    "creation_errors": int(m["creation_errors"]),
+                    "waits": int(m["waits"]),
+                    "avg_wait_ms": round(m["wait_time"] / m["waits"] * 1000, 2) if m["waits"] else 0.0,
+                    "evicted": int(m["evicted"])
+                }
+        return metrics
+
+# Global instance with the built-in agent types
+agent_pool = AgentPool()
+agent_pool.register("cybershell", "agents.cybershell", "CyberShellAgent", "cybershell_agent",
+                    reentrant=False, pool_size=2, warm=1)
+agent_pool.register("dev_engine", "agents.dev_engine", "DevEngineAgent", "dev_engine_agent",
+                    reentrant=False, pool_size=2, warm=1)
+agent_pool.register("ui_designer", "agents.ui_designer", "UIDesignerAgent", "ui_designer_agent")
+agent_pool.register("agent_maker", "agents.agent_maker", "AgentMakerAgent", "agent_maker")
+agent_pool.register("fullstack_dev", "agents.fullstack_dev", "FullStackDevAgent", "fullstack_dev_agent")
+agent_pool.register("data_sync", "agents.data_sync", "DataSyncAgent", "data_sync_agent")
+agent_pool.register("deploy_manager", "agents.deploy_manager", "DeployManagerAgent", "deploy_manager_agent")
+agent_pool.register("github_agent", "agents.github_agent", "GitHubAgent")
+agent_pool.register("agent_watcher", "agents.agent_watcher", "AgentWatcherAgent")
@@ -6,13 +6,186 @@ Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
 """
 
 import json
-from typing import Dict, List, Any, Optional
-from datetime import datetime
+import time
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple
 try:
     import numpy as np
 except ImportError:
     np = None
 
+from .history_buffer import RingHistory
+from .memory_manager import memory_manager
+from .load_tracker import LoadTracker, load_tracker as default_load_tracker
+
+# Capability similarity mappings: a required capability equal to a key is
+# partially matched by agent capabilities containing any of its keywords
+# (and vice versa)
+CAPABILITY_SIMILARITY = {
+    "ui_design": ["frontend", "react", "design", "css"],
+    "backend": ["api", "server", "database"],
+    "frontend": ["ui", "react", "vue", "angular", "css"],
+    "database": ["sql", "nosql", "storage", "data"],
+    "deployment": ["deploy", "docker", "cloud", "devops"],
+    "automation": ["script", "cli", "shell", "workflow"]
+}
+
+# Agent specializations by task type
+AGENT_SPECIALIZATIONS = {
+    "cybershell": ["automation", "cli", "system_admin", "scripting"],
+    "ui_designer": ["web_app", "mobile_app", "design", "frontend"],
+    "dev_engine": ["project_setup", "architecture", "scaffolding"],
+    "agent_maker": ["ai_development", "automation", "agent_creation"],
+    "fullstack_dev": ["web_app", "mobile_app", "api", "full_development"],
+    "backend_dev": ["api", "backend", "server", "database"],
+    "frontend_dev": ["web_app", "mobile_app", "ui", "frontend"],
+    "data_sync": ["database", "data_processing", "sync", "storage"],
+    "github_agent": ["version_control", "ci_cd", "deployment", "collaboration"],
+    "deploy_manager": ["deployment", "cloud", "devops", "infrastructure"],
+    "web3_plugin": ["blockchain", "smart_contracts", "defi", "crypto"],
+    "voice_agent": ["voice_processing", "speech", "audio", "nlp"]
+}
+
+# Selections considered by the load balancing score
+LOAD_WINDOW = 50
+
+# Selections kept in selection_history, and scores kept per selection
+SELECTION_HISTORY_SIZE = 1000
+TOP_SCORES = 5
+
+# Interned capabilities the compiled index keeps before a rebuild starts
+# over from the registry's own (required capabilities come from task
+# analysis and are open-ended)
+MAX_INDEXED_CAPABILITIES = 4096
+
+class CapabilityIndex:
+    """
+    Compiled form of an agent registry for vectorized scoring.
+
+    Capability strings are interned to integer ids. Pairwise similarity
+    between ids is computed once, when a capability is first seen, and
+    kept as a sparse adjacency list. Each agent's capabilities are a row
+    of a packed bitset matrix, so "which agents have capability c (or
+    one similar to it)" is a handful of NumPy bit operations over all
+    agents at once. Per-agent priority, performance, load and task-type
+    specialization scores are kept as arrays aligned with agent_ids.
+
+    Capabilities seen only in requests are interned too; once there are
+    more than max_capabilities, the next build drops everything but the
+    registry's capabilities.
+    """
+
+    def __init__(self, similar_fn, max_capabilities: int = MAX_INDEXED_CAPABILITIES):
+        self.similar_fn = similar_fn
+        self.max_capabilities = max_capabilities
+        self._reset_capabilities()
+        self.capability_resets = 0
+
+        self.registry_id = None
+        self.agent_ids: List[str] = []
+        self.agent_array = np.zeros(0, dtype=object)
+        self.positions: Dict[str, int] = {}
+        self.bits = np.zeros((0, 0), dtype=np.uint8)
+        self.priority = np.zeros(0)
+        self.performance = np.zeros(0)
+        self.load_counts = np.zeros(0, dtype=np.int64)
+        self._specialization: Dict[str, "np.ndarray"] = {}
+        self.builds = 0
+
+    def _reset_capabilities(self):
+        self.cap_ids: Dict[str, int] = {}
+        self.caps: List[str] = []
+        self._similar: List[set] = []
+        self._similar_arrays: Dict[int, "np.ndarray"] = {}
+
+    def intern(self, capability: str) -> int:
+        """Integer id for a capability, computing its similarity row on first sight"""
+        cap_id = self.cap_ids.get(capability)
+        if cap_id is not None:
+            return cap_id
+
+        cap_id = len(self.caps)
+        self.cap_ids[capability] = cap_id
+        self.caps.append(capability)
+        self._similar.append(set())
+        for other_id, other in enumerate(self.caps[:-1]):
+            if self.similar_fn(capability, other):
+                self._similar[cap_id].add(other_id)
+                self._similar[other_id].add(cap_id)
+                self._similar_arrays.pop(other_id, None)
+        return cap_id
+
+    def similar_ids(self, cap_id: int) -> "np.ndarray":
+        if cap_id not in self._similar_arrays:
+            self._similar_arrays[cap_id] = np.array(sorted(self._similar[cap_id]), dtype=np.int64)
+        return self._similar_arrays[cap_id]
+
+    def is_current(self, registry: Dict[str, Any]) -> bool:
+        """Same registry object with the same agents in the same order (capabilities are assumed unchanged)"""
+        return (self.registry_id == id(registry) and list(registry) == self.agent_ids
+                and len(self.caps) <= self.max_capabilities)
+
+    def build(self, registry: Dict[str, Any], performance_fn, load_counter: Counter):
+        """Compile the registry; called when its identity or agent set changes"""
+        self.registry_id = id(registry)
+        self.agent_ids = list(registry)
+        self.agent_array = np.array(self.agent_ids, dtype=object)
+        self.positions = {agent_id: i for i, agent_id in enumerate(self.agent_ids)}
+
+        if len(self.caps) > self.max_capabilities:
+            self._reset_capabilities()
+            self.capability_resets += 1
+        rows = [[self.intern(cap) for cap in info.get("capabilities", [])] for info in registry.values()]
+        width = (len(self.caps) + 7) // 8
+        bits = np.zeros((len(rows), width), dtype=np.uint8)
+        for row, cap_ids in enumerate(rows):
+            for cap_id in cap_ids:
+                bits[row, cap_id >> 3] |= 0x80 >> (cap_id & 7)
+        self.bits = bits
+
+        self.priority = np.array([info.get("priority", 5) for info in registry.values()], dtype=np.float64)
+        self.performance = np.array([performance_fn(agent_id) for agent_id in self.agent_ids], dtype=np.float64)
+        self.load_counts = np.array([load_counter.get(agent_id, 0) for agent_id in self.agent_ids], dtype=np.int64)
+        self._specialization = {}
+        self.builds += 1
+
+    def has(self, cap_id: int) -> "np.ndarray":
+        """Boolean per agent: does it have capability cap_id"""
+        if cap_id >= self.bits.shape[1] * 8:
+            return np.zeros(len(self.agent_ids), dtype=bool)
+        return (self.bits[:, cap_id >> 3] & (0x80 >> (cap_id & 7))) != 0
+    
+    def has_any(self, cap_ids: "np.ndarray") -> "np.ndarray":
+        """Boolean per agent: does it have at least one of cap_ids"""
+        cap_ids = cap_ids[cap_ids < self.bits.shape[1] * 8]  # newer ids: no agent has them
+        if len(cap_ids) == 0:
+            return np.zeros(len(self.agent_ids), dtype=bool)
+        masks = (0x80 >> (cap_ids & 7)).astype(np.uint8)
+        return ((self.bits[:, cap_ids >> 3] & masks) != 0).any(axis=1)
+
+    def specialization(self, task_type: str, specialization_fn) -> "np.ndarray":
+        scores = self._specialization.get(task_type)
+        if scores is None:
+            if len(self._specialization) >= 256:
+                self._specialization.clear()
+            scores = np.array([specialization_fn(agent_id, task_type) for agent_id in self.agent_ids])
+            self._specialization[task_type] = scores
+        return scores
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "agents": len(self.agent_ids),
+            "capabilities": len(self.caps),
+            "similar_pairs": sum(len(ids) for ids in self._similar) // 2,
+            "bitset_bytes": int(self.bits.nbytes),
+            "builds": self.builds,
+            "capability_resets": self.capability_resets,
+            "cached_task_types": len(self._specialization)
+        }
+
+# _get_load_balance_score buckets indexed by recent assignment count (capped at 11)
+_LOAD_SCORE_TABLE = np.array([1.0, 0.8, 0.8, 0.6, 0.6, 0.6, 0.4, 0.4, 0.4, 0.4, 0.4, 0.2]) if np is not None else None
+
 class AISelector:
     """
     Intelligent agent selection system that:
@@ -21,10 +194,32 @@ class AISelector:
     - Considers agent performance history
     - Load balances across agents
     - Self-optimizes selection logic
+    
+    Dispatch: agents scoring within dispatch_margin of the best are
+    treated as equally suitable, and the load tracker picks among them
+    by live load ("least_outstanding", "power_of_two", or "best" to
+    always take the top score).
     """
     
-    def __init__(self):
-        self.selection_history = []
+    def __init__(self, load_tracker: Optional[LoadTracker] = None,
+                 dispatch_policy: str = "least_outstanding", dispatch_margin: float = 10.0):
+        self.load_tracker = load_tracker or default_load_tracker
+        self.dispatch_policy = dispatch_policy
+        self.dispatch_margin = dispatch_margin
+        
+        # Columnar ring buffer; timestamps are epoch seconds, top_scores holds
+        # the TOP_SCORES best candidates and task_success defaults to 1 until
+        # update_agent_performance reports an outcome
+        self.selection_history = RingHistory(SELECTION_HISTORY_SIZE, {
+            "timestamp": "d",
+            "task_type": "str",
+            "selected_agent": "str",
+            "required_capabilities": "strs",
+            "score": "d",
+            "top_scores": "obj",
+            "selection_reason": "obj",
+            "task_success": "b"
+        }, on_evict=self._forget_selection, on_compact=self._rekey_aggregates)
         self.agent_performance = {}
         self.capability_weights = {
             "shell_execution": 1.0,
@@ -36,6 +231,22 @@ class AISelector:
             "ai_development": 1.0,
             "automation": 1.0
         }
+        
+        # Rolling count of selections per agent over the last LOAD_WINDOW
+        self._recent_counts = Counter()
+        
+        # Aggregates over selection_history (keyed by interned string id),
+        # kept in step with appends and evictions
+        self._agent_usage = Counter()
+        self._task_type_counts = Counter()
+        self._cap_totals = Counter()
+        self._cap_successes = Counter()
+        # Latest selection per agent still awaiting an outcome, by sequence number
+        self._pending_outcomes: Dict[str, int] = {}
+        
+        # Compiled registry for vectorized scoring (requires NumPy)
+        self.use_index = np is not None
+        self._index = CapabilityIndex(self._capabilities_similar) if self.use_index else None
     
     def select_best_agent(self, task_type: str, required_capabilities: List[str], 
                          agent_registry: Dict[str, Any], 
@@ -54,9 +265,59 @@ class AISelector:
         """
         
         exclude_agents = exclude_agents or []
-        scores = {}
         
-        # Score each agent
+        if self.use_index:
+            candidates, values = self._score_agents_vectorized(task_type, required_capabilities,
+                                                               agent_registry, exclude_agents)
+            if not candidates:
+                return "fullstack_dev"  # Default fallback
+            
+            # A stable descending sort keeps max()'s first-wins tie breaking in registry order
+            order = np.argsort(-values, kind="stable")
+            close = order[values[order] >= values[order[0]] - self.dispatch_margin]
+            ranked = [(candidates[i], float(values[i])) for i in order[:max(TOP_SCORES, 2)]]
+            shortlist = [candidates[i] for i in close]
+            scores = {candidates[i]: float(values[i]) for i in close}
+        else:
+            all_scores = self._score_agents(task_type, required_capabilities,
+                                            agent_registry, exclude_agents)
+            
+            # Select highest scoring agent
+            if not all_scores:
+                return "fullstack_dev"  # Default fallback
+            
+            ranked = sorted(all_scores.items(), key=lambda item: -item[1])
+            best_score = ranked[0][1]
+            shortlist = [agent_id for agent_id, score in ranked if score >= best_score - self.dispatch_margin]
+            scores = {agent_id: all_scores[agent_id] for agent_id in shortlist}
+        
+        best_agent, best_score = ranked[0]
+        reason = self._describe_selection(best_agent, best_score, ranked[1][1] if len(ranked) > 1 else None)
+        
+        # Among near-equal candidates, route by live load
+        chosen = self.load_tracker.choose(shortlist, self.dispatch_policy)
+        if chosen != best_agent:
+            reason = (f"Load-balanced: {chosen} (score: {scores[chosen]:.1f}, "
+                      f"expected wait {self.load_tracker.expected_wait(chosen):.1f}s) over {best_agent} "
+                      f"(expected wait {self.load_tracker.expected_wait(best_agent):.1f}s)")
+            best_agent = chosen
+        
+        # Record selection for learning
+        self._record_selection(task_type, required_capabilities, best_agent, scores[best_agent],
+                               dict(ranked[:TOP_SCORES]), reason)
+        
+        return best_agent
+    
+    def invalidate_index(self):
+        """Recompile on next selection; needed after editing agent capabilities or priorities in place"""
+        if self._index is not None:
+            self._index.registry_id = None
+    
+    def _score_agents(self, task_type: str, required_capabilities: List[str],
+                      agent_registry: Dict[str, Any], exclude_agents: List[str]) -> Dict[str, float]:
+        """Score every eligible agent one at a time (fallback without NumPy)"""
+        
+        scores = {}
         for agent_id, agent_info in agent_registry.items():
             if agent_id in exclude_agents:
                 continue
@@ -64,21 +325,68 @@ class AISelector:
             if agent_info.get("status") != "active":
                 continue
             
-            score = self._calculate_agent_score(
+            scores[agent_id] = self._calculate_agent_score(
                 agent_id, agent_info, task_type, required_capabilities
             )
-            scores[agent_id] = score
+        return scores
+    
+    def _score_agents_vectorized(self, task_type: str, required_capabilities: List[str],
+                                 agent_registry: Dict[str, Any],
+                                 exclude_agents: List[str]) -> Tuple[List[str], "np.ndarray"]:
+        """
+        Same scores as _score_agents, computed for all agents at once from
+        the compiled CapabilityIndex and returned as (agent ids, scores).
+        Each term is accumulated in the same order as _calculate_agent_score,
+        so results match it exactly.
+        """
         
-        # Select highest scoring agent
-        if not scores:
-            return "fullstack_dev"  # Default fallback
+        index = self._index
+        if not index.is_current(agent_registry):
+            index.build(agent_registry, self._get_performance_score, self._recent_counts)
+        
+        # Status can change between calls, so eligibility is read every time
+        eligible = np.fromiter((info.get("status") == "active" for info in agent_registry.values()),
+                               dtype=bool, count=len(index.agent_ids))
+        for agent_id in exclude_agents:
+            position = index.positions.get(agent_id)
+            if position is not None:
+                eligible[position] = False
+        if not eligible.any():
+            return [], np.zeros(0)
+        
+        score = np.zeros(len(index.agent_ids))
+        score += index.priority * 10
+        score += self._capability_scores(index, required_capabilities) * 50
+        score += index.performance * 30
+        score += self._load_scores(index.load_counts) * 20
+        score += index.specialization(task_type, self._get_specialization_score) * 40
+        
+        return index.agent_array[eligible].tolist(), score[eligible]
+    
+    def _capability_scores(self, index: CapabilityIndex, required_capabilities: List[str]) -> "np.ndarray":
+        """Vectorized _calculate_capability_score over all indexed agents"""
         
-        best_agent = max(scores, key=scores.get)
+        if not required_capabilities:
+            return np.full(len(index.agent_ids), 0.5)
         
-        # Record selection for learning
-        self._record_selection(task_type, required_capabilities, best_agent, scores)
+        matches = np.zeros(len(index.agent_ids))
+        total_weight = 0
+        for required_cap in required_capabilities:
+            weight = self.capability_weights.get(required_cap, 1.0)
+            total_weight += weight
+            
+            cap_id = index.intern(required_cap)
+            direct = index.has(cap_id)
+            partial = index.has_any(index.similar_ids(cap_id))
+            # Adding 0.0 leaves other agents' sums bit-for-bit unchanged
+            matches += np.where(direct, weight, np.where(partial, weight * 0.7, 0.0))
         
-        return best_agent
+        return matches / total_weight if total_weight > 0 else np.zeros(len(index.agent_ids))
+    
+    @staticmethod
+    def _load_scores(counts: "np.ndarray") -> "np.ndarray":
+        """Vectorized _get_load_balance_score buckets"""
+        return _LOAD_SCORE_TABLE[np.minimum(counts, len(_LOAD_SCORE_TABLE) - 1)]
     
     def _calculate_agent_score(self, agent_id: str, agent_info: Dict, 
                               task_type: str, required_capabilities: List[str]) -> float:
@@ -141,18 +449,8 @@ class AISelector:
     def _capabilities_similar(self, cap1: str, cap2: str) -> bool:
         """Check if two capabilities are similar"""
         
-        # Define capability similarity mappings
-        similarity_map = {
-            "ui_design": ["frontend", "react", "design", "css"],
-            "backend": ["api", "server", "database"],
-            "frontend": ["ui", "react", "vue", "angular", "css"],
-            "database": ["sql", "nosql", "storage", "data"],
-            "deployment": ["deploy", "docker", "cloud", "devops"],
-            "automation": ["script", "cli", "shell", "workflow"]
-        }
-        
         # Check direct similarity
-        for base_cap, similar_caps in similarity_map.items():
+        for base_cap, similar_caps in CAPABILITY_SIMILARITY.items():
             if cap1 == base_cap and any(sim in cap2.lower() for sim in similar_caps):
                 return True
             if cap2 == base_cap and any(sim in cap1.lower() for sim in similar_caps):
@@ -189,11 +487,8 @@ class AISelector:
     def _get_load_balance_score(self, agent_id: str) -> float:
         """Get load balancing score (prefer less busy agents)"""
         
-        # Count recent tasks assigned to this agent
-        recent_assignments = len([
-            selection for selection in self.selection_history[-50:]  # Last 50 selections
-            if selection.get("selected_agent") == agent_id
-        ])
+        # Recent tasks assigned to this agent (rolling count over the last LOAD_WINDOW selections)
+        recent_assignments = self._recent_counts.get(agent_id, 0)
         
         # Convert to score (fewer assignments = higher score)
         if recent_assignments == 0:
@@ -210,23 +505,7 @@ class AISelector:
     def _get_specialization_score(self, agent_id: str, task_type: str) -> float:
         """Get specialization score for specific task types"""
         
-        # Define agent specializations
-        specializations = {
-            "cybershell": ["automation", "cli", "system_admin", "scripting"],
-            "ui_designer": ["web_app", "mobile_app", "design", "frontend"],
-            "dev_engine": ["project_setup", "architecture", "scaffolding"],
-            "agent_maker": ["ai_development", "automation", "agent_creation"],
-            "fullstack_dev": ["web_app", "mobile_app", "api", "full_development"],
-            "backend_dev": ["api", "backend", "server", "database"],
-            "frontend_dev": ["web_app", "mobile_app", "ui", "frontend"],
-            "data_sync": ["database", "data_processing", "sync", "storage"],
-            "github_agent": ["version_control", "ci_cd", "deployment", "collaboration"],
-            "deploy_manager": ["deployment", "cloud", "devops", "infrastructure"],
-            "web3_plugin": ["blockchain", "smart_contracts", "defi", "crypto"],
-            "voice_agent": ["voice_processing", "speech", "audio", "nlp"]
-        }
-        
-        agent_specializations = specializations.get(agent_id, [])
+        agent_specializations = AGENT_SPECIALIZATIONS.get(agent_id, [])
         
         # Direct match
         if task_type in agent_specializations:
@@ -239,35 +518,78 @@ class AISelector:
         
         return 0.1  # Low score for non-specialized tasks
     
-    def _record_selection(self, task_type: str, required_capabilities: List[str], 
-                         selected_agent: str, all_scores: Dict[str, float]):
+    def _record_selection(self, task_type: str, required_capabilities: List[str], selected_agent: str,
+                          score: float, top_scores: Dict[str, float], reason: str):
         """Record selection for learning and optimization"""
         
-        selection_record = {
-            "timestamp": datetime.now().isoformat(),
-            "task_type": task_type,
-            "required_capabilities": required_capabilities,
-            "selected_agent": selected_agent,
-            "all_scores": all_scores,
-            "selection_reason": self._generate_selection_reason(selected_agent, all_scores)
-        }
-        
-        self.selection_history.append(selection_record)
-        
-        # Keep only last 1000 selections
-        if len(self.selection_history) > 1000:
-            self.selection_history = self.selection_history[-1000:]
+        history = self.selection_history
+        
+        # The selection leaving the load window is still in the (larger) history buffer
+        if len(history) >= LOAD_WINDOW:
+            self._adjust_load(history.get(-LOAD_WINDOW, "selected_agent"), -1)
+        
+        seq = history.append(
+            timestamp=time.time(),
+            task_type=task_type,
+            selected_agent=selected_agent,
+            required_capabilities=required_capabilities,
+            score=score,
+            top_scores=top_scores,
+            selection_reason=reason,
+            task_success=1
+        )
+        self._adjust_load(selected_agent, 1)
+        self._pending_outcomes[selected_agent] = seq
+        
+        record = history.raw_row(-1)
+        self._agent_usage[record["selected_agent"]] += 1
+        self._task_type_counts[record["task_type"]] += 1
+        for cap_id in set(record["required_capabilities"]):
+            self._cap_totals[cap_id] += 1
+            self._cap_successes[cap_id] += 1
     
-    def _generate_selection_reason(self, selected_agent: str, scores: Dict[str, float]) -> str:
-        """Generate human-readable reason for selection"""
-        
-        max_score = scores[selected_agent]
-        other_scores = [score for agent, score in scores.items() if agent != selected_agent]
-        
-        if not other_scores:
+    def _forget_selection(self, record: Dict[str, Any]):
+        """Eviction hook: take the oldest selection out of the aggregates"""
+        
+        self._decrement(self._agent_usage, record["selected_agent"])
+        self._decrement(self._task_type_counts, record["task_type"])
+        for cap_id in set(record["required_capabilities"]):
+            self._decrement(self._cap_totals, cap_id)
+            if record["task_success"]:
+                self._decrement(self._cap_successes, cap_id)
+    
+    def _rekey_aggregates(self, mapping: Dict[int, int]):
+        """Compaction hook: follow selection_history's renumbered string ids"""
+        for counter in (self._agent_usage, self._task_type_counts, self._cap_totals, self._cap_successes):
+            rekeyed = Counter({mapping[key]: count for key, count in counter.items()})
+            counter.clear()
+            counter.update(rekeyed)
+    
+    def trim_history(self, fraction: float) -> int:
+        """Drop the oldest fraction of selection_history, keeping the LOAD_WINDOW most recent"""
+        history = self.selection_history
+        return history.drop_oldest(min(int(len(history) * fraction), len(history) - LOAD_WINDOW))
+    
+    @staticmethod
+    def _decrement(counter: Counter, key: int):
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
+    
+    def _adjust_load(self, agent_id: str, delta: int):
+        self._recent_counts[agent_id] += delta
+        if self._recent_counts[agent_id] <= 0:
+            del self._recent_counts[agent_id]
+        if self._index is not None:
+            position = self._index.positions.get(agent_id)
+            if position is not None:
+                self._index.load_counts[position] += delta
+    
+    def _describe_selection(self, selected_agent: str, max_score: float, runner_up: Optional[float]) -> str:
+        if runner_up is None:
             return f"Only available agent: {selected_agent}"
         
-        margin = max_score - max(other_scores)
+        margin = max_score - runner_up
         
         if margin > 20:
             return f"Clear best choice: {selected_agent} (score: {max_score:.1f})"
@@ -310,6 +632,19 @@ class AISelector:
             perf["task_types"][task_type]["count"] += 1
             if task_success:
                 perf["task_types"][task_type]["success"] += 1
+        
+        if self._index is not None:
+            position = self._index.positions.get(agent_id)
+            if position is not None:
+                self._index.performance[position] = self._get_performance_score(agent_id)
+        
+        # Attribute the outcome to the agent's latest selection, if still in the history
+        seq = self._pending_outcomes.pop(agent_id, None)
+        index = self.selection_history.index_of(seq) if seq is not None else None
+        if index is not None and not task_success:
+            self.selection_history.set(index, "task_success", 0)
+            for cap_id in set(self.selection_history.get(index, "required_capabilities", raw=True)):
+                self._decrement(self._cap_successes, cap_id)
     
     def get_agent_recommendations(self, task_type: str) -> List[Dict[str, Any]]:
         """Get agent recommendations with explanations"""
@@ -383,30 +718,18 @@ class AISelector:
     def optimize_selection_weights(self):
         """Optimize capability weights based on historical performance"""
         
-        # Analyze successful vs failed selections
-        successful_selections = [
-            s for s in self.selection_history 
-            if s.get("task_success", True)  # Assume success if not recorded
-        ]
-        
-        failed_selections = [
-            s for s in self.selection_history 
-            if not s.get("task_success", True)
-        ]
+        # Success and total counts per capability are maintained as selections
+        # are recorded and evicted; selections without a reported outcome count
+        # as successful
+        interner = self.selection_history.interner
         
         # Adjust weights based on success patterns
         # This is a simplified version - in practice would use ML
         
         for capability in self.capability_weights:
-            success_with_cap = len([
-                s for s in successful_selections
-                if capability in s.get("required_capabilities", [])
-            ])
-            
-            total_with_cap = len([
-                s for s in self.selection_history
-                if capability in s.get("required_capabilities", [])
-            ])
+            cap_id = interner.find(capability)
+            total_with_cap = self._cap_totals.get(cap_id, 0)
+            success_with_cap = self._cap_successes.get(cap_id, 0)
             
             if total_with_cap > 10:  # Only adjust if we have enough data
                 success_rate = success_with_cap / total_with_cap
@@ -424,32 +747,26 @@ class AISelector:
         """Get analytics on agent selection patterns"""
         
         if not self.selection_history:
-            return {"message": "No selection history available"}
-        
-        # Agent usage statistics
-        agent_usage = {}
-        task_type_distribution = {}
-        
-        for selection in self.selection_history:
-            agent = selection["selected_agent"]
-            task_type = selection["task_type"]
-            
-            agent_usage[agent] = agent_usage.get(agent, 0) + 1
-            task_type_distribution[task_type] = task_type_distribution.get(task_type, 0) + 1
+            return {"message": "No selection history available", "live_load": self.load_tracker.snapshot()}
         
-        # Most used agents
-        most_used = sorted(agent_usage.items(), key=lambda x: x[1], reverse=True)[:5]
+        lookup = self.selection_history.interner.lookup
         
-        # Most common task types
-        common_tasks = sorted(task_type_distribution.items(), key=lambda x: x[1], reverse=True)[:5]
+        # Most used agents and most common task types, from the running counts
+        most_used = [(lookup(agent), count) for agent, count in self._agent_usage.most_common(5)]
+        common_tasks = [(lookup(task_type), count) for task_type, count in self._task_type_counts.most_common(5)]
         
         return {
             "total_selections": len(self.selection_history),
             "most_used_agents": most_used,
             "common_task_types": common_tasks,
             "current_weights": self.capability_weights,
-            "agents_with_performance_data": len(self.agent_performance)
+            "agents_with_performance_data": len(self.agent_performance),
+            "recent_load": dict(self._recent_counts),
+            "dispatch_policy": self.dispatch_policy,
+            "live_load": self.load_tracker.snapshot(),
+            "capability_index": self._index.get_stats() if self._index is not None else None
         }
 
 # Global instance
 ai_selector = AISelector()
+memory_manager.register("ai_selector.selection_history", ai_selector.trim_history, lambda: len(ai_selector.selection_history))
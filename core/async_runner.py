@@ -0,0 +1,227 @@
+"""
+🔁 Async Runner - Long-lived Background Event Loop
+Lets synchronous callers (Flask routes, threads) run agent coroutines
+on one shared loop with bounded concurrency and per-call timeouts
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+class LoopBusyError(RuntimeError):
+    """Raised when the runner already has max_pending calls in flight"""
+
+class AsyncRunner:
+    """
+    Owns one event loop running forever in a daemon thread.
+
+    Coroutines submitted from other threads share that loop, so
+    loop-bound resources (aiohttp sessions, locks, queues) created by
+    agents stay valid between requests. At most ``max_concurrency``
+    coroutines run at once; up to ``max_pending`` may be queued behind
+    them before new submissions are rejected with LoopBusyError.
+    """
+
+    def __init__(self, name: str = "agent-loop", max_concurrency: int = 32,
+                 max_pending: int = 256, default_timeout: float = 120.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.default_timeout = default_timeout
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'timed_out': 0,
+            'rejected': 0,
+            'pending': 0,
+            'running': 0,
+            'peak_running': 0,
+            'total_wait_time': 0.0,
+            'total_run_time': 0.0
+        }
+
+    def start(self):
+        """Start the loop thread (idempotent)"""
+        with self._start_lock:
+            if self.loop is not None and self.loop.is_running():
+                return
+
+            ready = threading.Event()
+
+            def _run():
+                self.loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self.loop)
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                self.loop.call_soon(ready.set)
+                self.loop.run_forever()
+
+                # Drain anything still scheduled before closing
+                pending = asyncio.all_tasks(self.loop)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                self.loop.close()
+
+            self._thread = threading.Thread(target=_run, name=self.name, daemon=True)
+            self._thread.start()
+            ready.wait()
+            atexit.register(self.stop)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the loop and join its thread"""
+        if self.loop is None or not self.loop.is_running():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._thread:
+            self._thread.join(timeout)
+        self.loop = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.loop is not None and self.loop.is_running()
+
+    def submit(self, coro: Awaitable, timeout: Optional[float] = None) -> concurrent.futures.Future:
+        """
+        Schedule a coroutine on the background loop and return a
+        concurrent Future. The timeout covers queueing and execution;
+        on expiry the coroutine is cancelled and the Future raises
+        asyncio.TimeoutError.
+        """
+        self.start()
+
+        with self._stats_lock:
+            if self.stats['pending'] >= self.max_pending:
+                self.stats['rejected'] += 1
+                # Close the coroutine so Python doesn't warn it was never awaited
+                if asyncio.iscoroutine(coro):
+                    coro.close()
+                raise LoopBusyError(f"{self.name} has {self.max_pending} calls pending")
+            self.stats['submitted'] += 1
+            self.stats['pending'] += 1
+
+        timeout = self.default_timeout if timeout is None else timeout
+        return asyncio.run_coroutine_threadsafe(self._guarded(coro, timeout), self.loop)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None,
+            wait: Optional[Callable[[float], Any]] = None) -> Any:
+        """
+        Submit a coroutine and block the calling thread until it finishes.
+
+        ``wait`` is an optional cooperative sleep (e.g. gevent.sleep) used
+        to poll the Future instead of blocking an OS thread, for servers
+        where blocking would stall every other request.
+        """
+        future = self.submit(coro, timeout)
+        timeout = self.default_timeout if timeout is None else timeout
+
+        if wait is None:
+            try:
+                # Small grace period: the loop enforces the real deadline
+                return future.result(timeout + 1.0)
+            except concurrent.futures.TimeoutError:
+                future.cancel()
+                raise asyncio.TimeoutError()
+
+        deadline = time.monotonic() + timeout + 1.0
+        delay = 0.001
+        while not future.done():
+            if time.monotonic() > deadline:
+                future.cancel()
+                raise asyncio.TimeoutError()
+            wait(delay)
+            delay = min(delay * 2, 0.05)
+        return future.result()
+
+    async def _guarded(self, coro: Awaitable, timeout: float) -> Any:
+        """Apply the concurrency cap and deadline on the loop thread"""
+        queued_at = time.monotonic()
+        started = False
+        try:
+            async with _deadline(timeout):
+                async with self._semaphore:
+                    started = True
+                    run_start = time.monotonic()
+                    with self._stats_lock:
+                        self.stats['pending'] -= 1
+                        self.stats['running'] += 1
+                        self.stats['peak_running'] = max(self.stats['peak_running'], self.stats['running'])
+                        self.stats['total_wait_time'] += run_start - queued_at
+                    try:
+                        result = await coro
+                    finally:
+                        with self._stats_lock:
+                            self.stats['running'] -= 1
+                            self.stats['total_run_time'] += time.monotonic() - run_start
+
+            with self._stats_lock:
+                self.stats['completed'] += 1
+            return result
+
+        except asyncio.TimeoutError:
+            with self._stats_lock:
+                self.stats['timed_out'] += 1
+            raise
+        except BaseException:
+            with self._stats_lock:
+                self.stats['failed'] += 1
+            raise
+        finally:
+            if not started:
+                with self._stats_lock:
+                    self.stats['pending'] -= 1
+                if asyncio.iscoroutine(coro):
+                    coro.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Snapshot of runner counters"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+
+        started = stats['completed'] + stats['failed'] + stats['timed_out']
+        stats['running_loop'] = self.is_running
+        stats['max_concurrency'] = self.max_concurrency
+        stats['max_pending'] = self.max_pending
+        stats['avg_wait_time'] = stats['total_wait_time'] / started if started else 0.0
+        stats['avg_run_time'] = stats['total_run_time'] / started if started else 0.0
+        return stats
+
+class _deadline:
+    """asyncio.timeout() equivalent for Python versions that lack it"""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._handle = None
+        self._task = None
+        self._expired = False
+
+    async def __aenter__(self):
+        self._task = asyncio.current_task()
+        self._handle = asyncio.get_running_loop().call_later(self.timeout, self._expire)
+        return self
+
+    def _expire(self):
+        self._expired = True
+        self._task.cancel()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._handle.cancel()
+        if self._expired and exc_type is asyncio.CancelledError:
+            raise asyncio.TimeoutError()
+        return False
+
+# Global instance shared by the web interface and other sync callers
+async_runner = AsyncRunner()
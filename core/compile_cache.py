@@ -0,0 +1,235 @@
+"""
+📦 Compile Cache - Content-addressed Build Artifacts
+Reuses compiled programs when the same source is compiled again with the
+same flags and toolchain, within a disk budget with LRU eviction
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from .process_runner import ProcessResult, ProcessRunner
+
+@dataclass
+class BuildOutcome:
+    """Artifact directory for a key (None if the build failed) and how it was obtained"""
+    key: str
+    path: Optional[Path]
+    hit: bool
+    result: Optional[ProcessResult] = None  # the compiler run, when this call built it
+
+# Staging directories of builds whose owner is gone, or older than this, are removed
+STALE_STAGING_SECONDS = 3600
+
+def _directory_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by someone else
+    return True
+
+class CompileCache:
+    """
+    Directory of build outputs named by sha256(language, toolchain
+    version, flags, source).
+
+    A build runs in a private temporary directory that is renamed into
+    place when it succeeds, so readers never see half-written artifacts
+    and two processes racing on the same key both end up with a complete
+    one. Within a process, identical concurrent requests share a single
+    build. Failed builds are not cached. Entries are evicted least
+    recently used first once the cache grows past max_bytes, skipping
+    any that are in use.
+
+    Staging directories are named .tmp-<pid>-<random>; a scan leaves
+    those of live processes alone (they may be mid-build) and removes
+    the rest, or any older than STALE_STAGING_SECONDS.
+    """
+
+    def __init__(self, root: str = "data/compile_cache", max_bytes: int = 512 * 1024 * 1024,
+                 runner: Optional[ProcessRunner] = None):
+        self.root = Path(root).resolve()  # compilers run with the build directory as cwd
+        self.max_bytes = max_bytes
+        self.runner = runner or ProcessRunner("compile_cache", max_concurrent=2, default_timeout=10)
+
+        self.entries: "OrderedDict[str, int]" = OrderedDict()  # key -> bytes, least recently used first
+        self.total_bytes = 0
+        self._in_use: Dict[str, int] = {}
+        self._building: Dict[str, asyncio.Future] = {}
+        self._toolchains: Dict[str, str] = {}
+        self._scanned = False
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'coalesced_failed': 0,  # waited for a build that failed
+            'failed_builds': 0,
+            'evictions': 0
+        }
+
+    def _scan(self):
+        """Pick up artifacts left by earlier runs, oldest first"""
+        self._scanned = True
+        self.root.mkdir(parents=True, exist_ok=True)
+        found = []
+        for entry in self.root.iterdir():
+            if entry.name.startswith(".tmp-"):
+                if self._stale_staging(entry):
+                    shutil.rmtree(entry, ignore_errors=True)
+            elif entry.is_dir():
+                found.append((entry.stat().st_mtime, entry.name, _directory_size(entry)))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    @staticmethod
+    def _stale_staging(entry: Path) -> bool:
+        """Whether a staging directory was abandoned (its owner exited, or it is too old)"""
+        try:
+            if time.time() - entry.stat().st_mtime > STALE_STAGING_SECONDS:
+                return True
+        except OSError:
+            return False  # already gone
+        owner = entry.name[len(".tmp-"):].split("-", 1)[0]
+        if owner.isdigit():
+            return int(owner) != os.getpid() and not _pid_alive(int(owner))
+        return False
+
+    async def toolchain_version(self, command: List[str]) -> str:
+        """First line of e.g. `g++ --version`, remembered per command"""
+        name = " ".join(command)
+        if name not in self._toolchains:
+            result = await self.runner.run(command)
+            output = (result.stdout or result.stderr).strip()
+            self._toolchains[name] = output.splitlines()[0] if output else name
+        return self._toolchains[name]
+
+    @staticmethod
+    def key(language: str, source: str, flags: List[str], toolchain: str) -> str:
+        digest = hashlib.sha256()
+        for part in (language, toolchain, "\0".join(flags), source):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0\0")
+        return digest.hexdigest()
+
+    @asynccontextmanager
+    async def artifact(self, key: str, build: Callable[[Path], Awaitable[ProcessResult]]) -> AsyncIterator[BuildOutcome]:
+        """
+        Yield the artifact for key, calling build(directory) to produce it
+        on a miss. The entry cannot be evicted while the block runs.
+        """
+        outcome = await self._obtain(key, build)
+        if outcome.path is None:
+            yield outcome
+            return
+
+        self._in_use[key] = self._in_use.get(key, 0) + 1
+        try:
+            yield outcome
+        finally:
+            self._in_use[key] -= 1
+            if not self._in_use[key]:
+                del self._in_use[key]
+            self._evict()
+
+    async def _obtain(self, key: str, build: Callable[[Path], Awaitable[ProcessResult]]) -> BuildOutcome:
+        if not self._scanned:
+            self._scan()
+
+        path = self.root / key
+        if key in self.entries and path.is_dir():
+            self.stats['hits'] += 1
+            self.entries.move_to_end(key)
+            os.utime(path)  # lets a restarted process rebuild the LRU order
+            return BuildOutcome(key, path, hit=True)
+
+        pending = self._building.get(key)
+        if pending is not None:
+            try:
+                outcome = await asyncio.shield(pending)
+            except Exception:
+                self.stats['coalesced_failed'] += 1
+                raise
+            if outcome.path is None:
+                self.stats['coalesced_failed'] += 1
+            elif key not in self.entries:
+                return await self._obtain(key, build)  # evicted before this caller resumed
+            else:
+                self.stats['coalesced'] += 1
+            return BuildOutcome(key, outcome.path, hit=outcome.path is not None, result=outcome.result)
+
+        future = asyncio.get_running_loop().create_future()
+        self._building[key] = future
+        try:
+            outcome = await self._build(key, path, build)
+            future.set_result(outcome)
+            return outcome
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved here so an unawaited future doesn't warn
+            raise
+        finally:
+            del self._building[key]
+
+    async def _build(self, key: str, path: Path, build: Callable[[Path], Awaitable[ProcessResult]]) -> BuildOutcome:
+        self.stats['misses'] += 1
+        staging = self.root / f".tmp-{os.getpid()}-{uuid.uuid4().hex}"
+        staging.mkdir(parents=True)
+        try:
+            result = await build(staging)
+            if not result.success:
+                self.stats['failed_builds'] += 1
+                return BuildOutcome(key, None, hit=False, result=result)
+
+            try:
+                os.rename(staging, path)
+            except OSError:
+                # Another process published the same key first; theirs is equivalent
+                if not path.is_dir():
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        size = _directory_size(path)
+        self.total_bytes += size - self.entries.pop(key, 0)
+        self.entries[key] = size
+        return BuildOutcome(key, path, hit=False, result=result)
+
+    def _evict(self):
+        for key in list(self.entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key in self._in_use:
+                continue
+            self.total_bytes -= self.entries.pop(key)
+            shutil.rmtree(self.root / key, ignore_errors=True)
+            self.stats['evictions'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['hits'] + self.stats['misses'] + self.stats['coalesced'] + self.stats['coalesced_failed']
+        return {
+            **self.stats,
+            'entries': len(self.entries),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'hit_rate': round((self.stats['hits'] + self.stats['coalesced']) / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,254 @@
+"""
+🐳 Container Pool - Pre-warmed Docker Containers for Code Execution
+Keeps idle, network-disabled containers per image and runs snippets in
+them with exec instead of creating and removing a container per run
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import asyncio
+import io
+import math
+import tarfile
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional
+
+# Shell snippet that empties the workspace between runs
+RESET_WORKSPACE = "rm -rf {workspace}/* {workspace}/.[!.]* {workspace}/..?* 2>/dev/null; true"
+
+@dataclass
+class _Pooled:
+    container: Any
+    image: str
+    created: float = field(default_factory=time.time)
+    uses: int = 0
+
+@dataclass
+class _ImagePool:
+    idle: Deque[_Pooled] = field(default_factory=deque)
+    total: int = 0  # idle + checked out + being created
+    warmed: bool = False
+
+def _archive(files: Dict[str, str]) -> bytes:
+    """In-memory tar of name -> text, as put_archive expects"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for name, text in files.items():
+            data = text.encode("utf-8")
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+class ContainerPool:
+    """
+    Pool of long-lived containers per image, driven through the docker SDK.
+
+    The client only needs the parts of docker.DockerClient used here:
+    containers.run(image, command, detach=True, ...) returning a
+    container with put_archive(path, data), exec_run(cmd, workdir=...,
+    demux=True) and remove(force=True). Every SDK call is blocking, so
+    each one runs in a worker thread rather than on the event loop.
+
+    Containers start idle (`sleep infinity`) with networking disabled and
+    memory/CPU limits. A run copies the files into the workspace, execs
+    the command under `timeout -s KILL`, then the workspace is emptied
+    and the container goes back to the pool. Containers are replaced
+    after max_uses runs, after max_age seconds, or when a run fails to
+    come back; at most size containers exist per image.
+    """
+
+    def __init__(self, client, size: int = 2, max_uses: int = 50, max_age: float = 600.0,
+                 mem_limit: str = "256m", cpu_quota: int = 50000, workspace: str = "/workspace",
+                 max_output: int = 1024 * 1024):
+        self.client = client
+        self.size = size
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.mem_limit = mem_limit
+        self.cpu_quota = cpu_quota
+        self.workspace = workspace
+        self.max_output = max_output
+
+        self.pools: Dict[str, _ImagePool] = {}
+        self._closed = False
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.stats = {
+            'runs': 0,
+            'created': 0,
+            'reused': 0,
+            'recycled': 0,
+            'timeouts': 0,
+            'failures': 0
+        }
+
+    def _cond(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._condition = loop, asyncio.Condition()
+        return self._condition
+
+    def _expired(self, pooled: _Pooled) -> bool:
+        return self._closed or pooled.uses >= self.max_uses or time.time() - pooled.created >= self.max_age
+
+    async def _create(self, image: str) -> _Pooled:
+        container = await asyncio.to_thread(
+            self.client.containers.run,
+            image,
+            command=["sleep", "infinity"],
+            detach=True,
+            network_disabled=True,
+            mem_limit=self.mem_limit,
+            cpu_period=100000,
+            cpu_quota=self.cpu_quota,
+            working_dir=self.workspace,
+            labels={"agentic.pool": "code_executor"}
+        )
+        self.stats['created'] += 1
+        return _Pooled(container, image)
+
+    async def _discard(self, pooled: _Pooled):
+        self.stats['recycled'] += 1
+        try:
+            await asyncio.to_thread(pooled.container.remove, force=True)
+        except Exception as e:
+            print(f"⚠️ Could not remove container for {pooled.image}: {e}")
+
+    async def acquire(self, image: str) -> _Pooled:
+        """An idle container for image, creating one if the pool has room, else wait"""
+        cond = self._cond()
+        pool = self.pools.setdefault(image, _ImagePool())
+        async with cond:
+            while True:
+                while pool.idle:
+                    pooled = pool.idle.popleft()
+                    if not self._expired(pooled):
+                        self.stats['reused'] += 1
+                        return pooled
+                    pool.total -= 1
+                    asyncio.ensure_future(self._discard(pooled))
+                if pool.total < self.size:
+                    pool.total += 1
+                    break
+                await cond.wait()
+
+        try:
+            return await self._create(image)
+        except BaseException:
+            async with cond:
+                pool.total -= 1
+                cond.notify_all()
+            raise
+
+    async def release(self, pooled: _Pooled, healthy: bool = True):
+        """Reset the workspace and return the container, or replace it"""
+        pool = self.pools[pooled.image]
+        pooled.uses += 1
+        if healthy and not self._expired(pooled):
+            try:
+                await asyncio.to_thread(pooled.container.exec_run,
+                                        ["sh", "-c", RESET_WORKSPACE.format(workspace=self.workspace)])
+            except Exception:
+                healthy = False
+        else:
+            healthy = False
+
+        if not healthy:
+            await self._discard(pooled)
+        async with self._cond():
+            if healthy:
+                pool.idle.append(pooled)
+            else:
+                pool.total -= 1
+            self._condition.notify_all()
+
+    async def warm(self, image: str, count: Optional[int] = None):
+        """Start idle containers for image up to count (default: size)"""
+        cond = self._cond()
+        pool = self.pools.setdefault(image, _ImagePool())
+        pool.warmed = True
+        target = self.size if count is None else min(count, self.size)
+        async with cond:
+            missing = max(0, target - pool.total)
+            pool.total += missing
+
+        created = await asyncio.gather(*[self._create(image) for _ in range(missing)], return_exceptions=True)
+        async with cond:
+            for pooled in created:
+                if isinstance(pooled, BaseException):
+                    pool.total -= 1
+                else:
+                    pool.idle.append(pooled)
+            cond.notify_all()
+
+    async def execute(self, image: str, command: str, files: Dict[str, str], timeout: float = 30.0) -> Dict[str, Any]:
+        """Copy files into a pooled container's workspace and run command there"""
+        pool = self.pools.get(image)
+        if pool is None or not pool.warmed:
+            # First run for this image: bring the rest of the pool up in the background
+            self.pools.setdefault(image, _ImagePool()).warmed = True
+            asyncio.ensure_future(self.warm(image))
+
+        pooled = await self.acquire(image)
+        self.stats['runs'] += 1
+        healthy = True
+        started = time.perf_counter()
+        try:
+            if files:
+                await asyncio.to_thread(pooled.container.put_archive, self.workspace, _archive(files))
+            seconds = max(1, math.ceil(timeout))
+            exec_cmd = ["timeout", "-s", "KILL", str(seconds), "sh", "-c", command]
+            try:
+                result = await asyncio.wait_for(
+                    asyncio.to_thread(pooled.container.exec_run, exec_cmd, workdir=self.workspace, demux=True),
+                    timeout + 5
+                )
+            except asyncio.TimeoutError:
+                # exec did not come back even after the in-container timeout; give up on this container
+                healthy = False
+                self.stats['timeouts'] += 1
+                return {'success': False, 'timed_out': True, 'return_code': None, 'stdout': '',
+                        'stderr': f'Execution timed out ({timeout} seconds limit)',
+                        'duration': time.perf_counter() - started}
+
+            stdout, stderr = result.output if result.output else (None, None)
+            duration = time.perf_counter() - started
+            # timeout(1) exits 124, or 137 for the KILL; a quick 137 is something else (e.g. the OOM killer)
+            timed_out = result.exit_code in (124, 137) and duration >= seconds - 0.5
+            if timed_out:
+                self.stats['timeouts'] += 1
+            return {
+                'success': result.exit_code == 0,
+                'timed_out': timed_out,
+                'return_code': result.exit_code,
+                'stdout': (stdout or b'')[:self.max_output].decode('utf-8', errors='replace'),
+                'stderr': (stderr or b'')[:self.max_output].decode('utf-8', errors='replace'),
+                'duration': duration
+            }
+        except Exception:
+            healthy = False
+            self.stats['failures'] += 1
+            raise
+        finally:
+            await asyncio.shield(self.release(pooled, healthy))
+
+    async def shutdown(self):
+        """Remove every idle container (checked-out ones are removed on release)"""
+        self._closed = True
+        for pool in self.pools.values():
+            while pool.idle:
+                pooled = pool.idle.popleft()
+                pool.total -= 1
+                await self._discard(pooled)
+            pool.warmed = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'images': {image: {'idle': len(pool.idle), 'total': pool.total} for image, pool in self.pools.items()}
+        }
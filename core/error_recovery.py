@@ -5,13 +5,25 @@ Self-healing system for detecting, diagnosing, and recovering from errors
 Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
 """
 
+import asyncio
+import contextvars
+import functools
+import heapq
+import inspect
+import random
 import time
 import traceback
 import threading
-from typing import Dict, List, Any, Optional, Callable
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Callable, Tuple, Type
 from datetime import datetime
 from enum import Enum
 
+from .history_buffer import RingHistory
+from .memory_manager import memory_manager
+
 
 class RecoveryStrategy(Enum):
     RETRY = "retry"
@@ -28,6 +40,311 @@ class ErrorSeverity(Enum):
     CRITICAL = "critical"
 
 
+# _classify_severity buckets by exception class name
+CRITICAL_ERRORS = frozenset({"SystemExit", "KeyboardInterrupt", "MemoryError"})
+HIGH_ERRORS = frozenset({"RuntimeError", "ConnectionError", "TimeoutError"})
+MEDIUM_ERRORS = frozenset({"ValueError", "KeyError", "TypeError"})
+
+
+@dataclass
+class ErrorFingerprint:
+    """Running record for one kind of error: exception type + the frame that raised it"""
+    fingerprint: str
+    error_type: str
+    severity: ErrorSeverity
+    count: int = 0
+    first_seen: float = 0.0
+    last_seen: float = 0.0
+    last_message: str = ""
+    sample_traceback: Optional[str] = None
+    sampled_at: float = 0.0
+    escalated_at: Optional[float] = None
+    suppressed: int = 0  # escalations skipped since the last one went out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "error_type": self.error_type,
+            "severity": self.severity.value,
+            "count": self.count,
+            "first_seen": datetime.fromtimestamp(self.first_seen).isoformat(),
+            "last_seen": datetime.fromtimestamp(self.last_seen).isoformat(),
+            "last_message": self.last_message,
+            "sample_traceback": self.sample_traceback,
+            "suppressed_escalations": self.suppressed,
+        }
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised without calling the dependency while its circuit breaker is open"""
+
+    def __init__(self, component: str, target: str, retry_after: float):
+        super().__init__(f"Circuit open for {component}/{target}, retry in {retry_after:.1f}s")
+        self.component = component
+        self.target = target
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the caller's deadline runs out before or during an attempt"""
+
+
+# Absolute time.monotonic() deadline of the current task, inherited by nested calls
+_deadline: contextvars.ContextVar = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """
+    Bound everything inside the block to finish within seconds. Nested
+    deadlines can only shorten the enclosing one; executor calls made in
+    the block (including from awaited coroutines) inherit it.
+    """
+    if seconds is None:
+        yield _deadline.get()
+        return
+    current = _deadline.get()
+    new = time.monotonic() + seconds
+    if current is not None:
+        new = min(new, current)
+    token = _deadline.set(new)
+    try:
+        yield new
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current deadline, or None when there is none"""
+    current = _deadline.get()
+    return None if current is None else current - time.monotonic()
+
+
+@dataclass
+class RetryPolicy:
+    """How a dependency call is retried: exponential backoff with full jitter"""
+    max_attempts: int = 3
+    base_delay: float = 0.2
+    max_delay: float = 5.0
+    multiplier: float = 2.0
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,)
+
+    def backoff(self, retry: int, rng: random.Random) -> float:
+        """Delay before retry number retry (1-based): uniform in [0, capped exponential]"""
+        return rng.uniform(0, min(self.max_delay, self.base_delay * self.multiplier ** (retry - 1)))
+
+
+class CircuitBreaker:
+    """
+    Breaker for one (component, target) dependency. Opens after
+    failure_threshold consecutive failures, rejects calls for reset_timeout
+    seconds, then lets a single probe through (half_open): success closes
+    it, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"  # closed, open, half_open
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def retry_after(self) -> float:
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def release(self):
+        """Give back a half-open probe slot for a call that was abandoned"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """
+    Caps retries at ratio of the calls made in the last window seconds
+    (plus min_retries), so a failing dependency gets a bounded amount of
+    extra traffic instead of max_attempts times its normal load.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 3, window: float = 10.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._calls: deque = deque()
+        self._retries: deque = deque()
+
+    def _prune(self, now: float):
+        for events in (self._calls, self._retries):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def record_call(self):
+        self._calls.append(time.monotonic())
+
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        self._prune(now)
+        if len(self._retries) >= self.min_retries + self.ratio * len(self._calls):
+            return False
+        self._retries.append(now)
+        return True
+
+
+class ResilientExecutor:
+    """
+    Runs calls to external dependencies behind a circuit breaker and a
+    retry budget per (component, target), e.g. ("llm_gateway", "openrouter")
+    or ("sync_engine", agent_id), so one failing provider or peer never
+    trips the breaker for the others. Retries back off exponentially with
+    full jitter and never outlive the caller's deadline().
+
+    Usage:
+        result = await executor.call("llm_gateway", provider, fn, *args, timeout=30)
+
+        @executor.protect("data_sync", "redis")
+        async def push(...): ...
+
+    fn may be a coroutine function or a plain callable. Calls that give
+    up are reported to on_failure (ErrorRecoverySystem.handle_error).
+    """
+
+    def __init__(self, policy: Optional[RetryPolicy] = None, failure_threshold: int = 5,
+                 reset_timeout: float = 30.0, budget_ratio: float = 0.2,
+                 on_failure: Optional[Callable[[Exception, Dict], Any]] = None):
+        self.policy = policy or RetryPolicy()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.budget_ratio = budget_ratio
+        self.on_failure = on_failure
+
+        self.breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self.budgets: Dict[Tuple[str, str], RetryBudget] = {}
+        self.stats: Dict[Tuple[str, str], Counter] = {}
+        self._random = random.Random()
+
+    def breaker(self, component: str, target: str) -> CircuitBreaker:
+        key = (component, target)
+        if key not in self.breakers:
+            self.breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            self.budgets[key] = RetryBudget(self.budget_ratio)
+            self.stats[key] = Counter()
+        return self.breakers[key]
+
+    def is_available(self, component: str, target: str) -> bool:
+        """False while the dependency's breaker is open (does not claim a half-open probe)"""
+        breaker = self.breakers.get((component, target))
+        return breaker is None or breaker.state != "open" or breaker.retry_after() == 0
+
+    async def call(self, component: str, target: str, fn: Callable, *args,
+                   policy: Optional[RetryPolicy] = None, timeout: Optional[float] = None, **kwargs) -> Any:
+        policy = policy or self.policy
+        breaker = self.breaker(component, target)
+        budget = self.budgets[(component, target)]
+        stats = self.stats[(component, target)]
+
+        with deadline(timeout):
+            budget.record_call()
+            attempt = 0
+            while True:
+                attempt += 1
+                remaining = remaining_time()
+                if remaining is not None and remaining <= 0:
+                    stats["deadline_exceeded"] += 1
+                    raise DeadlineExceeded(f"Deadline exceeded before calling {component}/{target}")
+
+                if not breaker.allow():
+                    stats["rejected"] += 1
+                    raise CircuitOpenError(component, target, breaker.retry_after())
+
+                stats["attempts"] += 1
+                try:
+                    result = fn(*args, **kwargs)
+                    if inspect.isawaitable(result):
+                        result = await (asyncio.wait_for(result, remaining) if remaining is not None else result)
+                except asyncio.CancelledError:
+                    breaker.release()
+                    raise
+                except Exception as e:
+                    breaker.record_failure()
+                    timed_out = isinstance(e, asyncio.TimeoutError) and remaining is not None
+                    error = DeadlineExceeded(f"Deadline exceeded calling {component}/{target}") if timed_out else e
+
+                    if (isinstance(e, policy.retry_on) and not timed_out
+                            and attempt < policy.max_attempts and breaker.state != "open"):
+                        delay = policy.backoff(attempt, self._random)
+                        remaining = remaining_time()
+                        if remaining is not None and delay >= remaining:
+                            stats["deadline_exceeded"] += 1
+                        elif not budget.try_spend():
+                            stats["budget_exhausted"] += 1
+                        else:
+                            stats["retries"] += 1
+                            await asyncio.sleep(delay)
+                            continue
+
+                    stats["failures"] += 1
+                    if self.on_failure:
+                        self.on_failure(error, {"component": component, "target": target, "attempts": attempt})
+                    if error is e:
+                        raise
+                    raise error from e
+
+                breaker.record_success()
+                stats["successes"] += 1
+                return result
+
+    def protect(self, component: str, target: str, policy: Optional[RetryPolicy] = None,
+                timeout: Optional[float] = None):
+        """Decorator form of call() for coroutine functions"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                return await self.call(component, target, fn, *args, policy=policy, timeout=timeout, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Breaker state and counters per dependency, keyed component/target"""
+        view = {}
+        for (component, target), breaker in self.breakers.items():
+            view[f"{component}/{target}"] = {
+                "state": breaker.state,
+                "consecutive_failures": breaker.consecutive_failures,
+                "retry_after": round(breaker.retry_after(), 2),
+                **self.stats[(component, target)]
+            }
+        return view
+
+
 class ErrorRecoverySystem:
     """
     Autonomous error recovery system that:
@@ -36,28 +353,54 @@ class ErrorRecoverySystem:
     - Tracks error patterns and frequencies
     - Provides self-healing capabilities
     - Escalates unrecoverable errors
+    - Retries dependency calls behind per-dependency breakers (executor)
     """
 
-    def __init__(self):
+    def __init__(self, max_error_history: int = 1000):
         self.system_id = "error_recovery"
         self.status = "active"
 
-        # Error tracking
-        self.error_history: List[Dict] = []
+        # Configuration
+        self.max_retry_attempts = 3
+        self.retry_delay_base = 5  # seconds
+        self.max_error_history = max_error_history
+
+        # Error tracking: error_counts are lifetime totals, the window
+        # counters cover whatever error_history currently holds
+        self.error_history = RingHistory(self.max_error_history, {
+            "timestamp": "d",
+            "error_type": "str",
+            "fingerprint": "str",
+            "severity": "str",
+            "error_message": "obj",
+            "traceback": "obj",
+            "context": "obj",
+        }, on_evict=self._forget_error)
         self.error_counts: Dict[str, int] = {}
+        self._window_type_counts = Counter()
+        self._window_severity_counts = Counter()
+
+        # Per-fingerprint (type + raising frame) counters, least recently seen
+        # first. A full traceback is formatted for the first occurrence of a
+        # fingerprint and then at most once per traceback_sample_interval;
+        # escalation handlers hear about a fingerprint at most once per
+        # escalation_interval, with the number of occurrences suppressed since
+        self.fingerprints: "OrderedDict[str, ErrorFingerprint]" = OrderedDict()
+        self.max_fingerprints = 1000
+        self.traceback_sample_interval = 60.0  # seconds
+        self.escalation_interval = 60.0  # seconds
+        self.suppressed_escalations = 0
         self.recovery_strategies: Dict[str, RecoveryStrategy] = {}
 
         # Recovery handlers
         self.recovery_handlers: Dict[str, Callable] = {}
         self.escalation_handlers: List[Callable] = []
 
-        # Configuration
-        self.max_retry_attempts = 3
-        self.retry_delay_base = 5  # seconds
-        self.max_error_history = 1000
-
-        # Circuit breaker state
+        # Circuit breaker state by error type, for errors reported without a
+        # dependency; calls made through the executor get a breaker per
+        # (component, target) instead
         self.circuit_breakers: Dict[str, Dict] = {}
+        self.executor = ResilientExecutor(on_failure=self.handle_error)
 
         # Register default strategies
         self._register_default_strategies()
@@ -86,30 +429,55 @@ class ErrorRecoverySystem:
         Returns:
             Recovery result with status and action taken
         """
-        error_type = type(error).__name__
+        # Cheap per-event path: the fingerprint record carries counters and
+        # severity, and a full traceback is only formatted when sampled
+        now = time.time()
+        fingerprint = self._fingerprint(error, now)
+        error_type = fingerprint.error_type
+        message = str(error)
+        fingerprint.last_message = message
+
+        formatted = None
+        if fingerprint.count == 1 or now - fingerprint.sampled_at >= self.traceback_sample_interval:
+            formatted = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+            fingerprint.sample_traceback = formatted
+            fingerprint.sampled_at = now
+
         error_info = {
             "error_type": error_type,
-            "error_message": str(error),
-            "traceback": traceback.format_exc(),
-            "context": context or {},
-            "timestamp": datetime.now().isoformat(),
-            "severity": self._classify_severity(error),
+            "error_message": message,
+            "traceback": formatted,
+            "fingerprint": fingerprint.fingerprint,
+            "occurrences": fingerprint.count,
+            "context": context if context is not None else {},
+            "timestamp": datetime.fromtimestamp(now).isoformat(),
+            "severity": fingerprint.severity,
         }
 
         # Record error
-        self._record_error(error_info)
+        self._record_error(error_info, now)
 
         # Get recovery strategy
         strategy = self.recovery_strategies.get(
             error_type, RecoveryStrategy.ESCALATE
         )
 
-        # Check circuit breaker
-        if self._is_circuit_open(error_type):
+        # Check circuit breaker: the failing dependency's own breaker when the
+        # context names one, otherwise the shared breaker for the error type
+        dependency = self._dependency(error_info["context"])
+        if dependency:
+            circuit_open = not self.executor.is_available(*dependency)
+            breaker_name = "/".join(dependency)
+        else:
+            self._update_circuit_breaker(error_type)
+            circuit_open = self._is_circuit_open(error_type)
+            breaker_name = error_type
+
+        if circuit_open:
             return {
                 "recovered": False,
                 "strategy": "circuit_breaker",
-                "message": f"Circuit breaker open for {error_type}",
+                "message": f"Circuit breaker open for {breaker_name}",
                 "error_info": error_info,
             }
 
@@ -122,31 +490,88 @@ class ErrorRecoverySystem:
         """Classify error severity"""
         error_type = type(error).__name__
 
-        critical_errors = {"SystemExit", "KeyboardInterrupt", "MemoryError"}
-        high_errors = {"RuntimeError", "ConnectionError", "TimeoutError"}
-        medium_errors = {"ValueError", "KeyError", "TypeError"}
-
-        if error_type in critical_errors:
+        if error_type in CRITICAL_ERRORS:
             return ErrorSeverity.CRITICAL
-        elif error_type in high_errors:
+        elif error_type in HIGH_ERRORS:
             return ErrorSeverity.HIGH
-        elif error_type in medium_errors:
+        elif error_type in MEDIUM_ERRORS:
             return ErrorSeverity.MEDIUM
         else:
             return ErrorSeverity.LOW
 
-    def _record_error(self, error_info: Dict):
+    def _fingerprint(self, error: Exception, now: float) -> ErrorFingerprint:
+        """Find (or start) the record for this error's type and raising frame, and count the event"""
+        error_type = type(error).__name__
+        tb = error.__traceback__
+        if tb is None:
+            key = f"{error_type}@<not raised>"
+        else:
+            while tb.tb_next is not None:
+                tb = tb.tb_next
+            code = tb.tb_frame.f_code
+            key = f"{error_type}@{code.co_filename}:{tb.tb_lineno}({code.co_name})"
+
+        fingerprint = self.fingerprints.get(key)
+        if fingerprint is None:
+            fingerprint = ErrorFingerprint(key, error_type, self._classify_severity(error), first_seen=now)
+            self.fingerprints[key] = fingerprint
+            if len(self.fingerprints) > self.max_fingerprints:
+                self.fingerprints.popitem(last=False)  # least recently seen
+        else:
+            self.fingerprints.move_to_end(key)
+
+        fingerprint.count += 1
+        fingerprint.last_seen = now
+        return fingerprint
+
+    def _record_error(self, error_info: Dict, now: Optional[float] = None):
         """Record error in history"""
-        self.error_history.append(error_info)
         error_type = error_info["error_type"]
+        severity = error_info["severity"].value
+
+        # A full buffer overwrites its oldest entry (see _forget_error)
+        self.error_history.append(
+            timestamp=now if now is not None else time.time(),
+            error_type=error_type,
+            fingerprint=error_info.get("fingerprint"),
+            severity=severity,
+            error_message=error_info["error_message"],
+            traceback=error_info["traceback"],
+            context=error_info["context"],
+        )
         self.error_counts[error_type] = self.error_counts.get(error_type, 0) + 1
-
-        # Trim history if too long
-        if len(self.error_history) > self.max_error_history:
-            self.error_history = self.error_history[-self.max_error_history:]
-
-        # Update circuit breaker
-        self._update_circuit_breaker(error_type)
+        self._window_type_counts[error_type] += 1
+        self._window_severity_counts[severity] += 1
+
+    @staticmethod
+    def _dependency(context: Dict) -> Optional[Tuple[str, str]]:
+        """(component, target) named by an error context, if any"""
+        if context.get("component") and context.get("target"):
+            return str(context["component"]), str(context["target"])
+        return None
+
+    def _forget_error(self, record: Dict):
+        """Eviction hook: drop the oldest error from the window counts"""
+        lookup = self.error_history.interner.lookup
+        for counter, key in ((self._window_type_counts, lookup(record["error_type"])),
+                             (self._window_severity_counts, lookup(record["severity"]))):
+            counter[key] -= 1
+            if counter[key] <= 0:
+                del counter[key]
+
+    def trim_history(self, fraction: float) -> int:
+        """Drop the oldest fraction of error_history and of the least recently seen fingerprints"""
+        removed = self.error_history.drop_oldest(int(len(self.error_history) * fraction))
+        for _ in range(int(len(self.fingerprints) * fraction)):
+            self.fingerprints.popitem(last=False)
+            removed += 1
+        return removed
+
+    def _materialize_error(self, record: Dict) -> Dict:
+        """History row in the shape handle_error reports"""
+        record["timestamp"] = datetime.fromtimestamp(record["timestamp"]).isoformat()
+        record["severity"] = ErrorSeverity(record["severity"])
+        return record
 
     def _update_circuit_breaker(self, error_type: str):
         """Update circuit breaker state for an error type"""
@@ -160,12 +585,12 @@ class ErrorRecoverySystem:
 
         cb = self.circuit_breakers[error_type]
         cb["failure_count"] += 1
-        cb["last_failure"] = datetime.now().isoformat()
+        cb["last_failure"] = time.time()
 
         # Open circuit breaker if too many failures
         if cb["failure_count"] >= self.max_retry_attempts and cb["state"] == "closed":
             cb["state"] = "open"
-            cb["opened_at"] = datetime.now().isoformat()
+            cb["opened_at"] = cb["last_failure"]
 
     def _is_circuit_open(self, error_type: str) -> bool:
         """Check if circuit breaker is open for error type"""
@@ -176,8 +601,7 @@ class ErrorRecoverySystem:
         if cb["state"] == "open":
             # Check if we should try half-open
             if cb["opened_at"]:
-                opened_time = datetime.fromisoformat(cb["opened_at"])
-                elapsed = (datetime.now() - opened_time).total_seconds()
+                elapsed = time.time() - cb["opened_at"]
                 if elapsed > self.retry_delay_base * 60:  # Reset after base*60 seconds
                     cb["state"] = "half_open"
                     return False
@@ -213,7 +637,23 @@ class ErrorRecoverySystem:
         return result
 
     def _escalate_error(self, error_info: Dict):
-        """Escalate error to registered handlers"""
+        """Escalate error to registered handlers, at most once per escalation_interval per fingerprint"""
+        if not self.escalation_handlers:
+            return
+
+        fingerprint = self.fingerprints.get(error_info.get("fingerprint"))
+        if fingerprint is not None:
+            now = time.time()
+            if fingerprint.escalated_at is not None and now - fingerprint.escalated_at < self.escalation_interval:
+                fingerprint.suppressed += 1
+                self.suppressed_escalations += 1
+                return
+            error_info["suppressed_since_last"] = fingerprint.suppressed
+            if error_info["traceback"] is None:
+                error_info["traceback"] = fingerprint.sample_traceback
+            fingerprint.escalated_at = now
+            fingerprint.suppressed = 0
+
         for handler in self.escalation_handlers:
             try:
                 handler(error_info)
@@ -233,10 +673,20 @@ class ErrorRecoverySystem:
         return {
             "total_errors": len(self.error_history),
             "error_counts": self.error_counts,
+            "window_counts": {
+                "by_type": dict(self._window_type_counts),
+                "by_severity": dict(self._window_severity_counts),
+            },
             "circuit_breakers": {
                 k: v["state"] for k, v in self.circuit_breakers.items()
             },
-            "recent_errors": self.error_history[-10:] if self.error_history else [],
+            "dependency_breakers": self.executor.snapshot(),
+            "top_fingerprints": [
+                fingerprint.to_dict() for fingerprint in
+                heapq.nlargest(10, self.fingerprints.values(), key=lambda f: f.count)
+            ],
+            "suppressed_escalations": self.suppressed_escalations,
+            "recent_errors": [self._materialize_error(record) for record in self.error_history[-10:]],
         }
 
     def reset_circuit_breaker(self, error_type: str = None):
@@ -253,3 +703,4 @@ class ErrorRecoverySystem:
 
 # Global instance
 error_recovery = ErrorRecoverySystem()
+memory_manager.register("error_recovery.error_history", error_recovery.trim_history, lambda: len(error_recovery.error_history))
@@ -0,0 +1,240 @@
+"""
+🗃️ History Buffer - Fixed-Capacity Columnar Ring Buffer
+Bounded event histories stored as typed arrays with interned strings,
+with eviction hooks for keeping running aggregates exact
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+# A history compacts its own interner once it holds at least this many
+# strings and twice as many as after the previous compaction
+COMPACT_MIN_STRINGS = 1024
+
+class StringInterner:
+    """Maps repeated strings (agent ids, task types, error types) to small ints"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def intern(self, value: str) -> int:
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self._ids[value] = string_id
+            self.strings.append(value)
+        return string_id
+
+    def find(self, value: str) -> Optional[int]:
+        """Id of an already interned string, without adding it"""
+        return self._ids.get(value)
+
+    def retain(self, string_ids: Iterable[int]) -> Dict[int, int]:
+        """Keep only the given ids (renumbered in their old order); returns old id -> new id"""
+        kept = sorted(set(string_ids))
+        self.strings = [self.strings[string_id] for string_id in kept]
+        self._ids = {value: new_id for new_id, value in enumerate(self.strings)}
+        return {old_id: new_id for new_id, old_id in enumerate(kept)}
+
+    def lookup(self, string_id: int) -> Optional[str]:
+        return self.strings[string_id] if string_id >= 0 else None
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+class RingHistory:
+    """
+    Fixed-capacity history stored column by column.
+
+    Column kinds: an array typecode ('d', 'q', 'b', ...) for numbers,
+    'str' for an interned string (stored as an int id), 'strs' for a
+    tuple of interned strings and 'obj' for anything else. Appending to
+    a full buffer overwrites the oldest slot in place, so there is no
+    slicing or copying; on_evict(raw_row) runs first so callers can
+    subtract the outgoing record from running aggregates.
+
+    Indexing and slicing work like the list of dicts it replaces
+    (history[-1], history[-10:]) and materialize rows on demand.
+
+    A history that owns its interner drops strings no stored record
+    uses any more (after drop_oldest, and whenever the interner has
+    doubled since it was last compacted); on_compact(mapping) hears the
+    old id -> new id renumbering so callers can rekey their aggregates.
+    """
+
+    def __init__(self, capacity: int, columns: Dict[str, str],
+                 interner: Optional[StringInterner] = None,
+                 on_evict: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 on_compact: Optional[Callable[[Dict[int, int]], None]] = None):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.kinds = dict(columns)
+        self.interner = interner or StringInterner()
+        self.on_evict = on_evict
+        self.on_compact = on_compact
+        # A shared interner may hold ids other histories still use
+        self._owns_interner = interner is None
+        self._compact_at = COMPACT_MIN_STRINGS
+        self.compactions = 0
+
+        self._columns: Dict[str, Any] = {}
+        for name, kind in self.kinds.items():
+            if kind == 'str':
+                self._columns[name] = array('i', [-1]) * capacity
+            elif kind in ('strs', 'obj'):
+                self._columns[name] = [None] * capacity
+            else:
+                self._columns[name] = array(kind, [0]) * capacity
+
+        self._start = 0
+        self._size = 0
+        self.appended = 0  # total records ever appended; also the next sequence number
+
+    def append(self, **values) -> int:
+        """Add a record (missing columns get zero/None); returns its sequence number"""
+        if self._size == self.capacity:
+            if self.on_evict:
+                self.on_evict(self.raw_row(0))
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+        else:
+            slot = (self._start + self._size) % self.capacity
+            self._size += 1
+
+        for name, kind in self.kinds.items():
+            self._columns[name][slot] = self._encode(kind, values.get(name))
+
+        self.appended += 1
+        if self._owns_interner and len(self.interner) >= self._compact_at:
+            self.compact_strings()
+        return self.appended - 1
+
+    def _encode(self, kind: str, value: Any) -> Any:
+        if kind == 'str':
+            return -1 if value is None else self.interner.intern(value)
+        if kind == 'strs':
+            return tuple(self.interner.intern(v) for v in (value or ()))
+        if kind == 'obj':
+            return value
+        return value if value is not None else 0
+
+    def _decode(self, kind: str, value: Any) -> Any:
+        if kind == 'str':
+            return self.interner.lookup(value)
+        if kind == 'strs':
+            return [self.interner.strings[v] for v in value] if value is not None else []
+        return value
+
+    def _slot(self, index: int) -> int:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("history index out of range")
+        return (self._start + index) % self.capacity
+
+    def raw_row(self, index: int) -> Dict[str, Any]:
+        """Record with strings left as interned ids"""
+        slot = self._slot(index)
+        return {name: column[slot] for name, column in self._columns.items()}
+
+    def row(self, index: int) -> Dict[str, Any]:
+        slot = self._slot(index)
+        return {name: self._decode(self.kinds[name], column[slot]) for name, column in self._columns.items()}
+
+    def index_of(self, seq: int) -> Optional[int]:
+        """Current index of a record by sequence number, or None once evicted"""
+        offset = seq - (self.appended - self._size)
+        return offset if 0 <= offset < self._size else None
+
+    def get(self, index: int, name: str, raw: bool = False) -> Any:
+        value = self._columns[name][self._slot(index)]
+        return value if raw else self._decode(self.kinds[name], value)
+
+    def set(self, index: int, name: str, value: Any):
+        self._columns[name][self._slot(index)] = self._encode(self.kinds[name], value)
+
+    def column(self, name: str, raw: bool = False) -> List[Any]:
+        """One column, oldest first"""
+        column = self._columns[name]
+        end = self._start + self._size
+        if end <= self.capacity:
+            values = list(column[self._start:end])
+        else:
+            values = list(column[self._start:]) + list(column[:end - self.capacity])
+        return values if raw else [self._decode(self.kinds[name], v) for v in values]
+
+    def drop_oldest(self, count: int) -> int:
+        """Evict up to count of the oldest records (running on_evict for each); returns how many went"""
+        count = max(0, min(count, self._size))
+        for _ in range(count):
+            if self.on_evict:
+                self.on_evict(self.raw_row(0))
+            for name, kind in self.kinds.items():
+                if kind in ('strs', 'obj'):
+                    self._columns[name][self._start] = None  # release payloads
+            self._start = (self._start + 1) % self.capacity
+            self._size -= 1
+        if count and self._owns_interner:
+            self.compact_strings()
+        return count
+
+    def compact_strings(self) -> int:
+        """Drop interned strings no stored record refers to; returns how many went"""
+        slots = [(self._start + i) % self.capacity for i in range(self._size)]
+        live = set()
+        for name, kind in self.kinds.items():
+            column = self._columns[name]
+            if kind == 'str':
+                live.update(column[slot] for slot in slots)
+            elif kind == 'strs':
+                for slot in slots:
+                    live.update(column[slot])
+        live.discard(-1)
+
+        dropped = len(self.interner) - len(live)
+        if dropped:
+            mapping = self.interner.retain(live)
+            occupied = set(slots)
+            for name, kind in self.kinds.items():
+                column = self._columns[name]
+                if kind == 'str':
+                    for slot in range(self.capacity):
+                        column[slot] = mapping[column[slot]] if slot in occupied and column[slot] >= 0 else -1
+                elif kind == 'strs':
+                    for slot in range(self.capacity):
+                        column[slot] = tuple(mapping[v] for v in column[slot]) if slot in occupied else None
+            self.compactions += 1
+            if self.on_compact:
+                self.on_compact(mapping)
+        self._compact_at = max(COMPACT_MIN_STRINGS, 2 * len(self.interner))
+        return dropped
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.row(i) for i in range(*index.indices(self._size))]
+        return self.row(index)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self._size):
+            yield self.row(i)
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the fixed-size columns (excludes 'obj' payloads)"""
+        total = 0
+        for column in self._columns.values():
+            total += column.itemsize * len(column) if isinstance(column, array) else 8 * len(column)
+        return total
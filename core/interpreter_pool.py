@@ -0,0 +1,317 @@
+"""
+🏊 Interpreter Pool - Warm Pre-started Python Workers
+Runs Python snippets in long-lived sandboxed interpreters instead of a new
+process per run, keeping REPL-style session namespaces between calls
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from .process_runner import stop_process
+
+WORKER_SCRIPT = str(Path(__file__).with_name("interpreter_worker.py"))
+
+@dataclass
+class _Worker:
+    process: asyncio.subprocess.Process
+    session: Optional[str] = None  # set for a worker dedicated to one session
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    runs: int = 0
+    started: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+class InterpreterPool:
+    """
+    Pool of pre-started `python -I` worker processes (core/interpreter_worker.py).
+
+    Code is sent to a worker over its stdin as one JSON line and the
+    answer (captured stdout/stderr, the repr of a trailing expression,
+    session variables) comes back as one JSON line, so a run costs a
+    round trip instead of interpreter startup and imports.
+
+    Each worker starts with rlimits on address space and written file
+    size; every run gets a CPU-seconds allowance and a wall-clock timer
+    inside the worker, plus a hard timeout here that kills the worker if
+    it stops answering or sends back anything that is not a well-formed
+    answer to the request.
+
+    Runs without a session id go to the size shared workers, each in a
+    child forked from the warm worker, so nothing one run changes in the
+    process (builtins, os.environ, sys.modules, threads, signal handlers)
+    is seen by the next; a child that crashes is reported without
+    losing the worker. A session gets a worker of its own, started for it
+    and never used for anything else, so one session's objects cannot be
+    reached from another session's code; at most max_sessions such
+    workers are kept, the least recently used being stopped first.
+    Workers are replaced after max_runs runs, or when they crash or are
+    killed; a session whose worker went away starts over and the next
+    result says so with session_reset.
+    """
+
+    def __init__(self, size: int = 2, max_runs: int = 100, cpu_seconds: int = 30,
+                 memory_mb: int = 512, file_size_mb: int = 16, default_timeout: float = 30.0,
+                 max_output: int = 1024 * 1024, python: str = sys.executable, max_sessions: int = 16):
+        self.size = size
+        self.max_runs = max_runs
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.file_size_mb = file_size_mb
+        self.default_timeout = default_timeout
+        self.max_output = max_output
+        self.python = python
+        self.max_sessions = max_sessions
+
+        self.workers: List[_Worker] = []  # shared, for runs without a session
+        self.session_workers: Dict[str, _Worker] = {}
+        self._reset_sessions: Set[str] = set()  # sessions whose worker was retired
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._ids = itertools.count(1)
+
+        self.stats = {
+            'runs': 0,
+            'workers_started': 0,
+            'workers_recycled': 0,
+            'workers_crashed': 0,
+            'timeouts': 0,
+            'invalid_answers': 0,
+            'session_resets': 0,
+            'sessions_evicted': 0
+        }
+
+    def _set_limits(self):
+        """preexec_fn for workers: address space and file size rlimits"""
+        if self.memory_mb:
+            limit = self.memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        if self.file_size_mb:
+            limit = self.file_size_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_FSIZE, (limit, limit))
+
+    async def _spawn(self, session: Optional[str] = None) -> _Worker:
+        process = await asyncio.create_subprocess_exec(
+            self.python, "-I", WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            preexec_fn=self._set_limits if resource is not None else None,
+            start_new_session=os.name == "posix",
+            limit=4 * self.max_output + 65536  # one answer line holds both outputs, JSON-escaped
+        )
+        ready = json.loads(await process.stdout.readline() or b"{}")
+        if "ready" not in ready:
+            raise RuntimeError("interpreter worker failed to start")
+        self.stats['workers_started'] += 1
+        return _Worker(process, session=session)
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Workers belong to the loop that created them
+            for worker in self.workers + list(self.session_workers.values()):
+                self._kill_now(worker)
+            self.workers, self.session_workers = [], {}
+            self._loop, self._start_lock = loop, asyncio.Lock()
+
+    async def start(self):
+        """Start the shared workers on the running loop (idempotent; restarts them on a new loop)"""
+        self._bind_loop()
+        async with self._start_lock:
+            await self._fill()
+
+    async def _fill(self):
+        """Top the shared workers up to size (caller holds _start_lock)"""
+        missing = self.size - len(self.workers)
+        if missing > 0:
+            self.workers.extend(await asyncio.gather(*[self._spawn() for _ in range(missing)]))
+
+    @staticmethod
+    def _kill_now(worker: _Worker):
+        if worker.alive:
+            try:
+                worker.process.kill()
+            except ProcessLookupError:
+                pass
+
+    async def _session_worker(self, session_id: str):
+        """The session's own worker, starting one if it has none; returns (worker, session_reset)"""
+        worker = self.session_workers.get(session_id)
+        if worker is not None:
+            return worker, False
+        async with self._start_lock:
+            worker = self.session_workers.get(session_id)
+            if worker is not None:  # started by a concurrent first run
+                return worker, False
+            worker = await self._spawn(session=session_id)
+            self.session_workers[session_id] = worker
+
+        session_reset = session_id in self._reset_sessions
+        if session_reset:
+            self._reset_sessions.discard(session_id)
+            self.stats['session_resets'] += 1
+        await self._evict_sessions(keep=worker)
+        return worker, session_reset
+
+    async def _evict_sessions(self, keep: _Worker):
+        """Stop least recently used idle session workers beyond max_sessions"""
+        idle = sorted((w for w in self.session_workers.values() if w is not keep and not w.lock.locked()),
+                      key=lambda w: w.last_used)
+        for worker in idle[:max(0, len(self.session_workers) - self.max_sessions)]:
+            self.stats['sessions_evicted'] += 1
+            await self._retire(worker)
+
+    def _current(self, worker: _Worker) -> bool:
+        """Whether worker is alive and still the pool's (not retired or replaced meanwhile)"""
+        if worker.session is not None:
+            return worker.alive and self.session_workers.get(worker.session) is worker
+        return worker.alive and worker in self.workers
+
+    async def _locked_worker(self, session_id: Optional[str]):
+        """A current worker for the run, its lock held by the caller; returns (worker, session_reset)"""
+        session_reset = False
+        while True:
+            if session_id is None:
+                await self.start()
+                worker = min(self.workers, key=lambda w: (w.lock.locked(), w.runs))
+            else:
+                self._bind_loop()
+                worker, reset = await self._session_worker(session_id)
+                session_reset = session_reset or reset
+            await worker.lock.acquire()
+            # The worker may have been recycled, crashed or reset while this run waited
+            if self._current(worker):
+                return worker, session_reset
+            worker.lock.release()
+            if not worker.alive:
+                await self._retire(worker, replace=True)  # died while idle
+
+    async def _retire(self, worker: _Worker, replace: bool = False):
+        """Stop a worker; a shared one still in the pool gets a fresh replacement, a session forgets its namespace"""
+        pooled = False
+        if worker.session is not None:
+            if self.session_workers.get(worker.session) is worker:
+                del self.session_workers[worker.session]
+                self._reset_sessions.add(worker.session)
+        elif worker in self.workers:
+            self.workers.remove(worker)
+            pooled = True
+        if worker.alive:
+            await stop_process(worker.process, grace=1.0)
+        if replace and pooled:
+            async with self._start_lock:
+                await self._fill()
+
+    def _valid(self, answer: Any, request_id: int) -> bool:
+        return (isinstance(answer, dict) and answer.get("id") == request_id
+                and all(key in answer for key in ("success", "stdout", "stderr")))
+
+    async def execute(self, code: str, session_id: Optional[str] = None, timeout: Optional[float] = None,
+                      cwd: Optional[str] = None) -> Dict[str, Any]:
+        """Run code in a warm worker; with a session_id, in that session's own worker and namespace"""
+        timeout = self.default_timeout if timeout is None else timeout
+
+        request = {
+            "id": next(self._ids),
+            "session": session_id,
+            "code": code,
+            "timeout": timeout,
+            "cpu_seconds": self.cpu_seconds,
+            "max_output": self.max_output,
+            "cwd": cwd
+        }
+
+        worker, session_reset = await self._locked_worker(session_id)
+        try:
+            answer, lost = None, False
+            try:
+                worker.process.stdin.write((json.dumps(request) + "\n").encode())
+                await worker.process.stdin.drain()
+                # The worker enforces timeout itself; this catches one that stopped answering
+                line = await asyncio.wait_for(worker.process.stdout.readline(), timeout + 5)
+                if line:
+                    answer = json.loads(line)
+                    if not self._valid(answer, request["id"]):
+                        raise ValueError("malformed answer")
+            except asyncio.TimeoutError:
+                self.stats['timeouts'] += 1
+                answer = {"success": False, "stdout": "", "stderr": f"Execution timed out ({timeout} seconds limit)",
+                          "error_type": "TimeoutError", "timed_out": True}
+                lost = True  # a worker that stopped answering is replaced
+            except (ConnectionResetError, BrokenPipeError):
+                answer = None
+            except ValueError:
+                # Undecodable, oversized or mismatched answer: the protocol can't be trusted any more
+                self.stats['invalid_answers'] += 1
+                answer = None
+                await stop_process(worker.process, grace=1.0)
+            lost = lost or answer is None
+
+            self.stats['runs'] += 1
+            worker.runs += 1
+            worker.last_used = time.time()
+            if answer is None:
+                try:
+                    status = await asyncio.wait_for(worker.process.wait(), 5)
+                except asyncio.TimeoutError:
+                    await stop_process(worker.process, grace=1.0)
+                    status = worker.process.returncode
+                answer = {"success": False, "stdout": "", "error_type": "WorkerCrashed", "timed_out": False,
+                          "stderr": f"Interpreter exited with status {status} (resource limit, crash or broken protocol)"}
+            if lost or worker.runs >= self.max_runs:
+                self.stats['workers_crashed' if lost else 'workers_recycled'] += 1
+                await self._retire(worker, replace=True)
+        finally:
+            worker.lock.release()
+
+        answer.update({"session_id": session_id, "session_reset": session_reset})
+        return answer
+
+    async def reset_session(self, session_id: str):
+        """Forget a session's namespace by stopping its worker"""
+        self._reset_sessions.discard(session_id)
+        worker = self.session_workers.pop(session_id, None)
+        if worker is None:
+            return
+        async with worker.lock:
+            if worker.alive:
+                await stop_process(worker.process, grace=1.0)
+
+    async def shutdown(self):
+        """Stop every worker (closing stdin lets idle workers exit cleanly)"""
+        workers = self.workers + list(self.session_workers.values())
+        self.workers, self.session_workers = [], {}
+        self._reset_sessions.clear()
+        for worker in workers:
+            if worker.alive:
+                worker.process.stdin.close()
+        for worker in workers:
+            try:
+                await asyncio.wait_for(worker.process.wait(), 2)
+            except asyncio.TimeoutError:
+                await stop_process(worker.process, grace=1.0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'workers': len(self.workers),
+            'sessions': len(self.session_workers),
+            'runs_per_worker': [worker.runs for worker in self.workers],
+            'runs_per_session': {session: worker.runs for session, worker in self.session_workers.items()}
+        }
@@ -0,0 +1,229 @@
+"""
+🐍 Interpreter Worker - Long-lived Sandboxed Python Executor
+Started by core.interpreter_pool as `python -I interpreter_worker.py`; reads
+one JSON request per line on stdin and answers one JSON line on stdout.
+Runs without a session execute in a forked child, so nothing they change
+outlives them
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import ast
+import io
+import json
+import os
+import select
+import signal
+import sys
+import time
+import traceback
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Bound before any user code runs, so a run that replaces json.dumps or
+# json.loads can't break the protocol (the pool replaces a worker whose
+# answers stop decoding anyway)
+_dumps, _loads = json.dumps, json.loads
+
+class CappedWriter(io.TextIOBase):
+    """stdout/stderr replacement that keeps at most limit characters"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+        self.truncated = False
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        room = self.limit - self.size
+        if room > 0:
+            self.parts.append(text[:room])
+            self.size += min(len(text), room)
+        if len(text) > room:
+            self.truncated = True
+        return len(text)
+
+    def getvalue(self) -> str:
+        return "".join(self.parts)
+
+class RunTimeout(BaseException):
+    """Raised inside user code when its wall-clock budget runs out (BaseException so bare excepts don't swallow it)"""
+
+def _on_alarm(signum, frame):
+    raise RunTimeout()
+
+def _limit_cpu(seconds: float):
+    """Allow this run `seconds` of CPU on top of what the worker has used so far"""
+    if resource is None or not seconds:
+        return
+    used = resource.getrusage(resource.RUSAGE_SELF)
+    spent = used.ru_utime + used.ru_stime
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(spent + seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+def _describe(namespace: dict) -> dict:
+    """Type name of each user-visible variable in a session namespace"""
+    return {name: type(value).__name__ for name, value in namespace.items()
+            if not name.startswith("_") and type(value).__name__ not in ("module", "function", "type")}
+
+def run(request: dict, namespaces: dict) -> dict:
+    session = request.get("session")
+    if session is None:
+        namespace = {"__name__": "__main__"}
+    else:
+        namespace = namespaces.setdefault(session, {"__name__": "__main__"})
+
+    limit = request.get("max_output", 1024 * 1024)
+    stdout, stderr = CappedWriter(limit), CappedWriter(limit)
+    result = None
+    error_type = None
+    timed_out = False
+
+    started = time.perf_counter()
+    previous_dir = os.getcwd()
+    # input() must not read the request channel
+    sys.stdin, sys.stdout, sys.stderr = io.StringIO(""), stdout, stderr
+    try:
+        if request.get("cwd"):
+            os.chdir(request["cwd"])
+        _limit_cpu(request.get("cpu_seconds"))
+        signal.setitimer(signal.ITIMER_REAL, request.get("timeout") or 0)
+
+        # REPL style: a trailing expression is evaluated and its repr returned
+        tree = ast.parse(request["code"], "<session>", "exec")
+        tail = tree.body.pop() if tree.body and isinstance(tree.body[-1], ast.Expr) else None
+        exec(compile(tree, "<session>", "exec"), namespace)
+        if tail is not None:
+            value = eval(compile(ast.Expression(tail.value), "<session>", "eval"), namespace)
+            if value is not None:
+                result = repr(value)[:limit]
+    except RunTimeout:
+        timed_out = True
+        error_type = "TimeoutError"
+        stderr.write(f"Execution timed out ({request.get('timeout')} seconds limit)\n")
+    except BaseException as e:  # SystemExit and KeyboardInterrupt are reported, not obeyed
+        error_type = type(e).__name__
+        stderr.write(traceback.format_exc())
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        sys.stdin, sys.stdout, sys.stderr = sys.__stdin__, sys.__stdout__, sys.__stderr__
+        os.chdir(previous_dir)
+
+    return {
+        "id": request.get("id"),
+        "success": error_type is None,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "result": result,
+        "error_type": error_type,
+        "timed_out": timed_out,
+        "truncated": stdout.truncated or stderr.truncated,
+        "duration": time.perf_counter() - started,
+        "variables": _describe(namespace) if session is not None else {}
+    }
+
+def _crashed(request: dict, started: float, stderr: str, timed_out: bool = False) -> dict:
+    return {
+        "id": request.get("id"),
+        "success": False,
+        "stdout": "",
+        "stderr": stderr,
+        "result": None,
+        "error_type": "TimeoutError" if timed_out else "WorkerCrashed",
+        "timed_out": timed_out,
+        "truncated": False,
+        "duration": time.perf_counter() - started,
+        "variables": {}
+    }
+
+def run_forked(request: dict, private_fds) -> dict:
+    """
+    Run a sessionless request in a forked child of this warm process.
+
+    Whatever the code changes (builtins, os.environ, sys.modules, threads,
+    signal handlers) dies with the child. The child hands its answer back
+    over a pipe and never sees the request or answer channels; this
+    process reports a child that crashes or outlives its timeout.
+    """
+    started = time.perf_counter()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        for fd in private_fds:
+            os.close(fd)
+        try:
+            data = _dumps(run(request, {}), default=str).encode()
+        except BaseException:
+            data = b""
+        os.write(write_fd, data)  # a short write is caught as a malformed answer
+        os._exit(0)
+
+    os.close(write_fd)
+    chunks = []
+    deadline = time.monotonic() + (request.get("timeout") or 0) + 2
+    while True:
+        wait = deadline - time.monotonic() if request.get("timeout") else None
+        if wait is not None and wait <= 0:
+            break
+        ready, _, _ = select.select([read_fd], [], [], wait)
+        if not ready:
+            break
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(read_fd)
+
+    # Reap the child; one that is still running ignored its timeout
+    done, status = os.waitpid(pid, os.WNOHANG)
+    if not done:
+        time.sleep(0.05)
+        done, status = os.waitpid(pid, os.WNOHANG)
+    if not done:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        return _crashed(request, started, f"Execution timed out ({request.get('timeout')} seconds limit)\n", timed_out=True)
+
+    try:
+        response = _loads(b"".join(chunks))
+    except ValueError:
+        response = None
+    if not isinstance(response, dict) or response.get("id") != request.get("id"):
+        return _crashed(request, started, f"Interpreter exited with status {os.waitstatus_to_exitcode(status)} "
+                                          f"(resource limit or crash)")
+    return response
+
+def main():
+    # Requests and answers use private copies of stdin/stdout; fd 0 reads
+    # /dev/null and fd 1 is pointed at stderr so that os.read(0, ...),
+    # os.write(1, ...) or child processes can't touch the protocol
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    channel = os.fdopen(os.dup(1), "w", encoding="utf-8", buffering=1)
+    null = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(null, 0)
+    os.close(null)
+    os.dup2(2, 1)
+    signal.signal(signal.SIGALRM, _on_alarm)
+
+    namespaces = {}
+    channel.write(_dumps({"ready": os.getpid()}) + "\n")
+    private_fds = (requests.fileno(), channel.fileno())
+    for line in requests:
+        request = _loads(line)
+        if request.get("session") is None and hasattr(os, "fork"):
+            response = run_forked(request, private_fds)
+        else:
+            response = run(request, namespaces)
+        channel.write(_dumps(response, default=str) + "\n")
+
+if __name__ == "__main__":
+    main()
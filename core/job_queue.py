@@ -0,0 +1,426 @@
+"""
+📬 Job Queue - Asynchronous Prompt Processing
+Accepts prompts immediately and runs them on a bounded, prioritized
+worker pool hosted on the shared agent event loop
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .async_runner import AsyncRunner, async_runner
+
+class JobQueueFullError(RuntimeError):
+    """Raised when the queue already holds max_queue_size unfinished jobs"""
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    TIMEOUT = "timeout"
+
+FINAL_STATUSES = {JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED, JobStatus.TIMEOUT}
+
+@dataclass
+class Job:
+    job_id: str
+    prompt: str
+    input_type: str = "text"
+    metadata: Dict = field(default_factory=dict)
+    status: str = JobStatus.QUEUED
+    stage: str = "submitted"
+    priority: int = 5
+    progress: float = 0.0
+    analysis: Optional[Dict] = None
+    result: Any = None
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    enqueued_at: Optional[float] = None
+    started_at: Optional[float] = None
+    completed_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        def iso(ts):
+            return datetime.fromtimestamp(ts).isoformat() if ts else None
+
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.stage,
+            "priority": self.priority,
+            "progress": round(self.progress, 3),
+            "prompt": self.prompt[:200],
+            "task_type": (self.analysis or {}).get("task_type"),
+            "result": self.result,
+            "error": self.error,
+            "submitted_at": iso(self.submitted_at),
+            "started_at": iso(self.started_at),
+            "completed_at": iso(self.completed_at),
+            "wait_time": (self.started_at - self.submitted_at) if self.started_at else None,
+            "run_time": (self.completed_at - self.started_at) if self.started_at and self.completed_at else None
+        }
+
+class JobQueue:
+    """
+    Prompt job queue with analysis-driven priorities.
+
+    A submitted job is analyzed first (bounded by ``max_analyzers``) so
+    its priority can come from analysis["priority"]; it then waits in a
+    priority queue (higher priority first, FIFO within a priority) for
+    one of ``max_workers`` workers. Workers, the queue and all job
+    coroutines live on the AsyncRunner loop; submit(), get_job() and
+    cancel() are safe to call from any thread.
+
+    The processor is duck-typed on PromptMasterAgent: analyze_prompt(),
+    create_task() and execute_task(). Finished tasks are persisted with
+    store.store_task() so results outlive the in-memory job table.
+    """
+
+    def __init__(self, processor, store=None, runner: AsyncRunner = None,
+                 max_workers: int = 4, max_analyzers: int = 8, max_queue_size: int = 500,
+                 job_timeout: float = 1800.0, max_finished: int = 1000):
+        self.processor = processor
+        self.store = store if store is not None else getattr(processor, "memory", None)
+        self.runner = runner or async_runner
+        self.max_workers = max_workers
+        self.max_analyzers = max_analyzers
+        self.max_queue_size = max_queue_size
+        self.job_timeout = job_timeout
+        self.max_finished = max_finished
+
+        self.jobs: Dict[str, Job] = {}
+        self.finished: "OrderedDict[str, None]" = OrderedDict()
+        self.listeners: List[Callable[[str, Dict], None]] = []
+
+        self._lock = threading.Lock()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._analysis_semaphore: Optional[asyncio.Semaphore] = None
+        self._workers: List[asyncio.Task] = []
+        self._running_tasks: Dict[str, asyncio.Task] = {}
+        self._sequence = 0
+        self._started = False
+
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "timed_out": 0,
+            "rejected": 0
+        }
+        self.wait_times = deque(maxlen=1000)
+        self.run_times = deque(maxlen=1000)
+
+    # ---------------------------------------------------------------
+    # Lifecycle
+    # ---------------------------------------------------------------
+
+    def start(self):
+        """Start the worker pool on the runner loop (idempotent)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+        self.runner.start()
+        ready = threading.Event()
+
+        def _spawn():
+            previous, self._queue = self._queue, asyncio.PriorityQueue()
+            if previous is not None:
+                # Jobs still queued when stop() ran wait for the new workers
+                while not previous.empty():
+                    self._queue.put_nowait(previous.get_nowait())
+            self._analysis_semaphore = asyncio.Semaphore(self.max_analyzers)
+            self._workers = [
+                self.runner.loop.create_task(self._worker(i))
+                for i in range(self.max_workers)
+            ]
+            ready.set()
+
+        self.runner.loop.call_soon_threadsafe(_spawn)
+        ready.wait()
+
+    def stop(self):
+        """Cancel the workers and any running jobs; queued jobs run after the next start()"""
+        if not self._started or not self.runner.is_running:
+            return
+
+        def _cancel():
+            for worker in self._workers:
+                worker.cancel()
+            for task in list(self._running_tasks.values()):
+                task.cancel()
+
+        self.runner.loop.call_soon_threadsafe(_cancel)
+        self._started = False
+
+    def add_listener(self, listener: Callable[[str, Dict], None]):
+        """Register listener(event, job_dict) for job state changes"""
+        self.listeners.append(listener)
+
+    # ---------------------------------------------------------------
+    # Thread-safe API
+    # ---------------------------------------------------------------
+
+    def submit(self, prompt: str, input_type: str = "text", metadata: Dict = None) -> Job:
+        """Accept a prompt and return its job immediately"""
+        self.start()
+
+        with self._lock:
+            if self._unfinished_count() >= self.max_queue_size:
+                self.stats["rejected"] += 1
+                raise JobQueueFullError(f"Job queue full ({self.max_queue_size} unfinished jobs)")
+
+            job = Job(
+                job_id=f"job_{uuid.uuid4().hex[:16]}",
+                prompt=prompt,
+                input_type=input_type,
+                metadata=metadata or {}
+            )
+            self.jobs[job.job_id] = job
+            self.stats["submitted"] += 1
+
+        self._notify("job_submitted", job)
+        self.runner.loop.call_soon_threadsafe(
+            lambda: self.runner.loop.create_task(self._admit(job))
+        )
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job state, falling back to the persisted task for evicted jobs"""
+        job = self.jobs.get(job_id)
+        if job:
+            return job.to_dict()
+
+        if self.store is not None:
+            task = self.store.get_task(job_id)
+            if task:
+                return {
+                    "job_id": job_id,
+                    "status": task.get("status"),
+                    "stage": "persisted",
+                    "progress": 1.0 if task.get("status") in FINAL_STATUSES else 0.0,
+                    "prompt": (task.get("prompt") or "")[:200],
+                    "task_type": task.get("task_type"),
+                    "result": task.get("result"),
+                    "submitted_at": task.get("created_at"),
+                    "completed_at": task.get("completed_at")
+                }
+        return None
+
+    def list_jobs(self, status: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs first, optionally filtered by status"""
+        with self._lock:
+            jobs = sorted(self.jobs.values(), key=lambda j: j.submitted_at, reverse=True)
+        if status:
+            jobs = [j for j in jobs if j.status == status]
+        return [j.to_dict() for j in jobs[:limit]]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job"""
+        job = self.jobs.get(job_id)
+        if not job or job.status in FINAL_STATUSES:
+            return False
+
+        def _cancel():
+            task = self._running_tasks.get(job_id)
+            if task:
+                task.cancel()
+            elif job.status not in FINAL_STATUSES:
+                # Still analyzing or queued; workers skip finished jobs
+                self._finish(job, JobStatus.CANCELLED, error="Cancelled before start")
+
+        self.runner.loop.call_soon_threadsafe(_cancel)
+        return True
+
+    def wait(self, job_id: str, timeout: float = None,
+             sleep: Callable[[float], Any] = time.sleep) -> Optional[Dict[str, Any]]:
+        """Block until a job finishes or the timeout passes; returns its state"""
+        deadline = time.monotonic() + timeout if timeout else None
+        delay = 0.005
+        while True:
+            job = self.jobs.get(job_id)
+            if not job or job.status in FINAL_STATUSES:
+                return self.get_job(job_id)
+            if deadline and time.monotonic() > deadline:
+                return job.to_dict()
+            sleep(delay)
+            delay = min(delay * 2, 0.25)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth, wait-time and throughput metrics"""
+        now = time.time()
+        with self._lock:
+            jobs = list(self.jobs.values())
+            stats = dict(self.stats)
+
+        analyzing = [j for j in jobs if j.status == JobStatus.QUEUED and j.enqueued_at is None]
+        waiting = [j for j in jobs if j.status == JobStatus.QUEUED and j.enqueued_at is not None]
+        running = [j for j in jobs if j.status == JobStatus.RUNNING]
+
+        depth_by_priority: Dict[int, int] = {}
+        for job in waiting:
+            depth_by_priority[job.priority] = depth_by_priority.get(job.priority, 0) + 1
+
+        return {
+            **stats,
+            "queue_depth": len(waiting),
+            "analyzing": len(analyzing),
+            "running": len(running),
+            "workers": self.max_workers,
+            "max_queue_size": self.max_queue_size,
+            "depth_by_priority": dict(sorted(depth_by_priority.items(), reverse=True)),
+            "oldest_waiting_age": max((now - j.submitted_at for j in waiting), default=0.0),
+            "wait_time": _summarize(self.wait_times),
+            "run_time": _summarize(self.run_times)
+        }
+
+    # ---------------------------------------------------------------
+    # Loop-side execution
+    # ---------------------------------------------------------------
+
+    def _unfinished_count(self) -> int:
+        return sum(1 for j in self.jobs.values() if j.status not in FINAL_STATUSES)
+
+    async def _admit(self, job: Job):
+        """Analyze a job to obtain its priority, then enqueue it"""
+        if job.status in FINAL_STATUSES:
+            return
+        try:
+            async with self._analysis_semaphore:
+                if job.status in FINAL_STATUSES:
+                    return
+                job.stage = "analyzing"
+                self._notify("job_progress", job)
+                job.analysis = await self.processor.analyze_prompt(job.prompt, job.input_type, job.metadata)
+        except Exception as e:
+            self._finish(job, JobStatus.FAILED, error=f"Analysis failed: {e}")
+            return
+
+        if job.status in FINAL_STATUSES:
+            return
+        job.priority = job.analysis.get("priority", 5)
+        job.stage = "waiting"
+        job.progress = 0.1
+        job.enqueued_at = time.time()
+        self._sequence += 1
+        await self._queue.put((-job.priority, self._sequence, job.job_id))
+        self._notify("job_progress", job)
+
+    async def _worker(self, worker_index: int):
+        while True:
+            _, _, job_id = await self._queue.get()
+            try:
+                job = self.jobs.get(job_id)
+                if job is None or job.status in FINAL_STATUSES:
+                    continue
+                task = asyncio.get_running_loop().create_task(self._run(job))
+                self._running_tasks[job_id] = task
+                try:
+                    await asyncio.shield(task)
+                except asyncio.CancelledError:
+                    if not task.done():
+                        # The worker itself is being stopped
+                        task.cancel()
+                        raise
+                finally:
+                    self._running_tasks.pop(job_id, None)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        job.status = JobStatus.RUNNING
+        job.stage = "executing"
+        job.started_at = time.time()
+        self.wait_times.append(job.started_at - job.submitted_at)
+        self._notify("job_started", job)
+
+        task = None
+        try:
+            task = self.processor.create_task(job.prompt, job.analysis, task_id=job.job_id)
+
+            def on_progress(update: Dict):
+                total = update.get("total_steps") or 1
+                job.progress = 0.1 + 0.85 * update.get("step", 0) / total
+                job.stage = f"step {update.get('step')}/{total}: {update.get('agent')}"
+                self._notify("job_progress", job)
+
+            result = await asyncio.wait_for(
+                self.processor.execute_task(task, job.analysis, progress_callback=on_progress),
+                self.job_timeout
+            )
+            self._finish(job, JobStatus.COMPLETED, result=result, task=task)
+
+        except asyncio.TimeoutError:
+            self._finish(job, JobStatus.TIMEOUT, error=f"Job exceeded {self.job_timeout:.0f}s", task=task)
+        except asyncio.CancelledError:
+            self._finish(job, JobStatus.CANCELLED, error="Cancelled while running", task=task)
+        except Exception as e:
+            self._finish(job, JobStatus.FAILED, error=str(e), task=task)
+
+    def _finish(self, job: Job, status: str, result: Any = None, error: str = None, task=None):
+        job.status = status
+        job.stage = status
+        job.result = result
+        job.error = error
+        job.completed_at = time.time()
+        job.progress = 1.0
+        if job.started_at:
+            self.run_times.append(job.completed_at - job.started_at)
+
+        counter = {
+            JobStatus.COMPLETED: "completed",
+            JobStatus.FAILED: "failed",
+            JobStatus.CANCELLED: "cancelled",
+            JobStatus.TIMEOUT: "timed_out"
+        }[status]
+
+        with self._lock:
+            self.stats[counter] += 1
+            self.finished[job.job_id] = None
+            while len(self.finished) > self.max_finished:
+                evicted, _ = self.finished.popitem(last=False)
+                self.jobs.pop(evicted, None)
+
+        if task is not None:
+            task.status = status
+            task.completed_at = task.completed_at or datetime.now()
+            task.result = result if result is not None else {"error": error}
+            active = getattr(self.processor, "active_tasks", None)
+            if active is not None:
+                active.pop(task.task_id, None)
+            if self.store is not None:
+                # SQLite write off the loop thread
+                asyncio.get_running_loop().run_in_executor(None, self.store.store_task, task)
+
+        self._notify(f"job_{status}", job)
+
+    def _notify(self, event: str, job: Job):
+        payload = job.to_dict()
+        for listener in self.listeners:
+            try:
+                listener(event, payload)
+            except Exception as e:
+                print(f"Job listener error: {e}")
+
+def _summarize(samples) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0, "avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "avg": sum(ordered) / len(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1]
+    }
@@ -0,0 +1,121 @@
+"""
+💤 Lazy Registry - Import-on-First-Use Component Registry
+Maps names to (module, attribute) pairs and imports each one only
+when it is first looked up, recording how long every import took
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import importlib.util
+import threading
+import time
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+class LazyRegistry(MutableMapping):
+    """
+    Dict-like registry of name -> instance that defers imports.
+
+    ``registry['cybershell']`` imports only the cybershell module. Iterating,
+    len(), values() or items() import every entry and skip the ones that
+    failed, so callers written against an eagerly built dict keep working.
+    Use available() to list names and loaded() to inspect what is already
+    imported without triggering any imports (e.g. from status endpoints).
+    """
+
+    def __init__(self, specs: Dict[str, Tuple[str, str]], package: Optional[str] = None,
+                 on_load: Optional[Callable[[str, Any], None]] = None):
+        self.specs = dict(specs)
+        self.package = package
+        self.on_load = on_load
+
+        self.import_times: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def load(self, name: str) -> Any:
+        """Import one entry (once); None if unknown or its import failed"""
+        if name in self._instances:
+            return self._instances[name]
+        if name not in self.specs:
+            return None
+
+        with self._lock:
+            if name in self._instances:
+                return self._instances[name]
+
+            module_path, attribute = self.specs[name]
+            started = time.perf_counter()
+            try:
+                # __import__ rather than importlib.import_module so the
+                # import shows up in `python -X importtime` profiles
+                module = __import__(importlib.util.resolve_name(module_path, self.package),
+                                    fromlist=[attribute])
+                instance = getattr(module, attribute)
+            except Exception as e:
+                # ImportError for missing optional dependencies, anything else
+                # for a broken module: neither may take the registry down
+                instance = None
+                self.errors[name] = f"{type(e).__name__}: {e}"
+                print(f"⚠️ Could not load {module_path}.{attribute}: {e}")
+            self.import_times[name] = time.perf_counter() - started
+
+            self._instances[name] = instance
+            if self.on_load:
+                self.on_load(name, instance)
+            return instance
+
+    def __getitem__(self, name: str) -> Any:
+        instance = self.load(name)
+        if instance is None:
+            raise KeyError(name)
+        return instance
+
+    def __setitem__(self, name: str, instance: Any):
+        """Register an already constructed instance under name"""
+        self._instances[name] = instance
+        self.specs.setdefault(name, (type(instance).__module__, name))
+
+    def __delitem__(self, name: str):
+        if name not in self.specs:
+            raise KeyError(name)
+        self.specs.pop(name)
+        self._instances.pop(name, None)
+
+    def __iter__(self) -> Iterator[str]:
+        for name in list(self.specs):
+            if self.load(name) is not None:
+                yield name
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, name) -> bool:
+        return self.load(name) is not None
+
+    def available(self) -> list:
+        """All registered names, without importing anything"""
+        return list(self.specs)
+
+    def loaded(self) -> Dict[str, Any]:
+        """Entries imported successfully so far, without importing anything"""
+        return {name: instance for name, instance in self._instances.items() if instance is not None}
+
+    def preload(self, names=None) -> Dict[str, float]:
+        """Import the given entries (default: all) now; returns their import times"""
+        for name in names or list(self.specs):
+            self.load(name)
+        return dict(self.import_times)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'registered': len(self.specs),
+            'loaded': len(self.loaded()),
+            'failed': sorted(self.errors),
+            'import_times': {name: round(t, 4) for name, t in self.import_times.items()},
+            'total_import_time': round(sum(self.import_times.values()), 4)
+        }
+
+    def __repr__(self) -> str:
+        return f"<LazyRegistry {len(self.loaded())}/{len(self.specs)} loaded>"
@@ -0,0 +1,142 @@
+"""
+📶 Load Tracker - Live Per-Agent Load for Dispatch
+Counts in-flight work per agent, learns EWMA service times and picks
+agents by least outstanding requests or power-of-two-choices
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+# SyncEngine agent states that mean the agent is doing work right now
+BUSY_STATES = {"busy", "working", "processing", "executing", "running"}
+
+class LoadTracker:
+    """
+    Live load view shared by the selector and the code that runs agents.
+
+    PromptMaster (task execution) and AgentScheduler (running_tasks)
+    wrap each agent call in track(), which keeps an outstanding-request
+    count per agent and source and folds the call's duration into an
+    exponentially weighted moving average. SyncEngine reports agent
+    states; an agent it marks busy counts as at least one outstanding
+    request even when the work came from elsewhere.
+
+    expected_wait() = (outstanding + 1) * EWMA service time is the cost
+    used for dispatch: least_outstanding picks the cheapest candidate,
+    power_of_two picks the cheaper of two random candidates, which
+    spreads load well even when the view is slightly stale.
+    """
+
+    def __init__(self, alpha: float = 0.3, default_service_time: float = 1.0):
+        self.alpha = alpha
+        self.default_service_time = default_service_time
+
+        self.outstanding: Dict[str, Dict[str, int]] = {}
+        self.service_time: Dict[str, float] = {}
+        self.states: Dict[str, str] = {}
+        self.completed: Dict[str, int] = {}
+        self.failed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    def begin(self, agent_id: str, source: str = "direct"):
+        with self._lock:
+            by_source = self.outstanding.setdefault(agent_id, {})
+            by_source[source] = by_source.get(source, 0) + 1
+
+    def end(self, agent_id: str, source: str = "direct", duration: Optional[float] = None,
+            success: bool = True):
+        with self._lock:
+            by_source = self.outstanding.get(agent_id, {})
+            if by_source.get(source, 0) > 0:
+                by_source[source] -= 1
+                if by_source[source] == 0:
+                    del by_source[source]
+
+            if duration is not None:
+                previous = self.service_time.get(agent_id)
+                self.service_time[agent_id] = (duration if previous is None
+                                               else self.alpha * duration + (1 - self.alpha) * previous)
+            counter = self.completed if success else self.failed
+            counter[agent_id] = counter.get(agent_id, 0) + 1
+
+    @contextmanager
+    def track(self, agent_id: str, source: str = "direct"):
+        """Count a call as outstanding while it runs and record its duration"""
+        self.begin(agent_id, source)
+        started = time.monotonic()
+        success = False
+        try:
+            yield
+            success = True
+        finally:
+            self.end(agent_id, source, time.monotonic() - started, success)
+
+    def set_state(self, agent_id: str, state: Optional[str]):
+        """State reported by SyncEngine; None forgets the agent"""
+        with self._lock:
+            if state is None:
+                self.states.pop(agent_id, None)
+            else:
+                self.states[agent_id] = state
+
+    def get_outstanding(self, agent_id: str) -> int:
+        count = sum(self.outstanding.get(agent_id, {}).values())
+        if count == 0 and self.states.get(agent_id) in BUSY_STATES:
+            return 1
+        return count
+
+    def get_service_time(self, agent_id: str) -> float:
+        """EWMA service time; agents never seen use the average of known ones"""
+        if agent_id in self.service_time:
+            return self.service_time[agent_id]
+        if self.service_time:
+            return sum(self.service_time.values()) / len(self.service_time)
+        return self.default_service_time
+
+    def expected_wait(self, agent_id: str) -> float:
+        return (self.get_outstanding(agent_id) + 1) * self.get_service_time(agent_id)
+
+    def choose(self, candidates: Sequence[str], policy: str = "least_outstanding") -> Optional[str]:
+        """
+        Pick one of candidates (ordered best first by the caller) by
+        expected wait. Ties keep the caller's order, so with no load
+        information the first candidate wins.
+        """
+        if not candidates:
+            return None
+        if len(candidates) == 1 or policy == "best":
+            return candidates[0]
+
+        if policy == "power_of_two":
+            first, second = sorted(self._random.sample(range(len(candidates)), 2))
+            pair = [candidates[first], candidates[second]]
+            return min(pair, key=self.expected_wait)
+
+        # least_outstanding: min() keeps the first of equal costs
+        return min(candidates, key=self.expected_wait)
+
+    def snapshot(self, agent_ids: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Live per-agent load view"""
+        with self._lock:
+            known = set(self.outstanding) | set(self.service_time) | set(self.states)
+            view = {}
+            for agent_id in sorted(known if agent_ids is None else agent_ids):
+                view[agent_id] = {
+                    "outstanding": self.get_outstanding(agent_id),
+                    "by_source": dict(self.outstanding.get(agent_id, {})),
+                    "state": self.states.get(agent_id),
+                    "ewma_service_time": round(self.service_time[agent_id], 4) if agent_id in self.service_time else None,
+                    "expected_wait": round(self.expected_wait(agent_id), 4),
+                    "completed": self.completed.get(agent_id, 0),
+                    "failed": self.failed.get(agent_id, 0)
+                }
+            return view
+
+# Global instance fed by PromptMaster, AgentScheduler and SyncEngine
+load_tracker = LoadTracker()
@@ -17,6 +17,8 @@ from dataclasses import dataclass, asdict
 import threading
 import os
 
+from .memory_manager import memory_manager, trim_oldest
+
 @dataclass 
 class MemoryEntry:
     entry_id: str
@@ -39,6 +41,13 @@ class MemoryBus:
     - Search and filtering
     """
     
+    # Tables whose row counts are maintained incrementally -> primary key
+    COUNTED_TABLES = {
+        "memory": "entry_id",
+        "tasks": "task_id",
+        "agent_metrics": "metric_id"
+    }
+    
     def __init__(self):
         self.db_path = "data/memory.db"
         self.json_path = "data/memory.json"
@@ -102,8 +111,69 @@ class MemoryBus:
         conn.execute("CREATE INDEX IF NOT EXISTS idx_timestamp ON memory(timestamp)")
         
         conn.commit()
+        
+        self._init_row_counters(conn)
         conn.close()
     
+    def _init_row_counters(self, conn):
+        """
+        Maintain per-table row counts with triggers so usage stats never
+        need COUNT(*) scans. Counts live in the database, so every process
+        and MemoryBus instance sharing the file sees the same numbers.
+        """
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS table_row_counts (
+                table_name TEXT PRIMARY KEY,
+                row_count INTEGER NOT NULL
+            )
+        """)
+        
+        # BEGIN IMMEDIATE blocks writers, so no rows slip in between the
+        # seeding COUNT(*) and the triggers taking over
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table, key in self.COUNTED_TABLES.items():
+                # INSERT OR REPLACE on an existing key replaces rather than
+                # adds a row, so only count inserts of new keys
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_count_insert
+                    BEFORE INSERT ON {table}
+                    WHEN NOT EXISTS (SELECT 1 FROM {table} WHERE {key} = NEW.{key})
+                    BEGIN
+                        UPDATE table_row_counts SET row_count = row_count + 1 WHERE table_name = '{table}';
+                    END
+                """)
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_count_delete
+                    AFTER DELETE ON {table}
+                    BEGIN
+                        UPDATE table_row_counts SET row_count = row_count - 1 WHERE table_name = '{table}';
+                    END
+                """)
+                
+                seeded = conn.execute(
+                    "SELECT 1 FROM table_row_counts WHERE table_name = ?", (table,)
+                ).fetchone()
+                if not seeded:
+                    # One-time scan for databases created before the counters existed
+                    count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    conn.execute(
+                        "INSERT INTO table_row_counts (table_name, row_count) VALUES (?, ?)",
+                        (table, count)
+                    )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    
+    def get_row_counts(self) -> Dict[str, int]:
+        """Current row count of each counted table"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return dict(conn.execute("SELECT table_name, row_count FROM table_row_counts").fetchall())
+        finally:
+            conn.close()
+    
     def _init_redis(self):
         """Initialize Redis connection (optional)"""
         if redis is None:
@@ -199,6 +269,13 @@ class MemoryBus:
             print(f"Error storing memory: {e}")
             return False
     
+    def trim_cache(self, fraction: float) -> int:
+        """Drop cached entries older than an hour, then the oldest fraction (SQLite keeps them all)"""
+        with self.lock:
+            return trim_oldest(self.cache, fraction,
+                               lambda cached: datetime.fromisoformat(cached["timestamp"]).timestamp(),
+                               max_age=3600)
+    
     def retrieve(self, entry_id: str) -> Optional[MemoryEntry]:
         """Retrieve memory entry by ID"""
         try:
@@ -480,17 +557,10 @@ class MemoryBus:
         try:
             conn = sqlite3.connect(self.db_path)
             
-            # Get table sizes
-            cursor = conn.execute("SELECT COUNT(*) FROM memory")
-            memory_count = cursor.fetchone()[0]
-            
-            cursor = conn.execute("SELECT COUNT(*) FROM tasks")
-            tasks_count = cursor.fetchone()[0]
-            
-            cursor = conn.execute("SELECT COUNT(*) FROM agent_metrics")
-            metrics_count = cursor.fetchone()[0]
+            # Table sizes come from trigger-maintained counters, not scans
+            counts = dict(conn.execute("SELECT table_name, row_count FROM table_row_counts").fetchall())
             
-            # Get database size
+            # Get database size (header reads, no table access)
             cursor = conn.execute("PRAGMA page_count")
             page_count = cursor.fetchone()[0]
             cursor = conn.execute("PRAGMA page_size")
@@ -500,9 +570,9 @@ class MemoryBus:
             conn.close()
             
             return {
-                "memory_entries": memory_count,
-                "tasks": tasks_count,
-                "metrics": metrics_count,
+                "memory_entries": counts.get("memory", 0),
+                "tasks": counts.get("tasks", 0),
+                "metrics": counts.get("agent_metrics", 0),
                 "database_size_mb": round(db_size / (1024 * 1024), 2),
                 "cache_entries": len(self.cache),
                 "redis_connected": self.redis_client is not None
@@ -539,3 +609,4 @@ class MemoryBus:
 
 # Global instance
 memory_bus = MemoryBus()
+memory_manager.register("memory_bus.cache", memory_bus.trim_cache, lambda: len(memory_bus.cache))
@@ -0,0 +1,239 @@
+"""
+🧹 Memory Manager - Targeted In-Process Memory Reclamation
+Registry of trimmable caches and histories, trimmed by their own policies
+under memory pressure, with tracemalloc reports of the top allocations
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import asyncio
+import gc
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from typing import Any, Callable, Dict, List, Optional
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Fraction of each cache trimmed at each pressure level
+TRIM_FRACTIONS = {"none": 0.0, "moderate": 0.25, "critical": 0.5}
+
+def _weak(fn: Callable) -> Callable[[], Optional[Callable]]:
+    """Weak reference to a bound method (so registering never keeps an owner alive), strong otherwise"""
+    if hasattr(fn, "__self__") and hasattr(fn, "__func__"):
+        return weakref.WeakMethod(fn)
+    return lambda: fn
+
+class MemoryManager:
+    """
+    Finds memory the process can give back without breaking anything.
+
+    Components register their caches with register(name, trim, size):
+    trim(fraction) removes about that fraction of entries using the
+    cache's own policy (expired first, then least recently used or
+    oldest) and returns how many entries went; size() returns the current
+    entry count. Bytecode caches (__pycache__) and sys.modules are never
+    touched: clearing them frees nothing useful and makes every later
+    import slower.
+
+    reclaim() checks memory pressure (process RSS against rss_limit and
+    system memory use) and trims every registered cache by the matching
+    fraction, then runs a garbage collection. Trim callbacks take no
+    locks of their own, so reclaim() must run on the thread that writes
+    the caches (the agent event loop); from a coroutine use
+    reclaim_async(), which only moves the collection off the loop.
+    top_allocations() reports
+    the largest allocation sites from tracemalloc, and growth since the
+    previous report, once tracing has been started.
+    """
+
+    def __init__(self, rss_limit_mb: Optional[float] = None,
+                 moderate_percent: float = 80.0, critical_percent: float = 90.0):
+        limit = rss_limit_mb if rss_limit_mb is not None else os.getenv("AGENTIC_RSS_LIMIT_MB")
+        self.rss_limit = float(limit) * 1024 * 1024 if limit else None
+        self.moderate_percent = moderate_percent
+        self.critical_percent = critical_percent
+
+        self.caches: Dict[str, Dict[str, Any]] = {}
+        self.reclaims: List[Dict[str, Any]] = []
+        self._previous_snapshot = None
+        self._lock = threading.Lock()
+
+    def register(self, name: str, trim: Callable[[float], int], size: Optional[Callable[[], int]] = None):
+        """Register a trimmable cache; bound methods are held weakly"""
+        with self._lock:
+            self.caches[name] = {"trim": _weak(trim), "size": _weak(size) if size else None}
+
+    def unregister(self, name: str):
+        with self._lock:
+            self.caches.pop(name, None)
+
+    def _live(self) -> Dict[str, Dict[str, Callable]]:
+        """Registered caches whose owners still exist (dead ones are dropped)"""
+        live = {}
+        with self._lock:
+            for name, entry in list(self.caches.items()):
+                trim = entry["trim"]()
+                if trim is None:
+                    del self.caches[name]
+                    continue
+                size = entry["size"]() if entry["size"] else None
+                live[name] = {"trim": trim, "size": size}
+        return live
+
+    def cache_sizes(self) -> Dict[str, Optional[int]]:
+        return {name: (entry["size"]() if entry["size"] else None) for name, entry in self._live().items()}
+
+    @staticmethod
+    def rss() -> Optional[int]:
+        """Resident set size of this process in bytes"""
+        if psutil is not None:
+            return psutil.Process().memory_info().rss
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def pressure(self) -> str:
+        """none, moderate or critical, from RSS against rss_limit and system memory use"""
+        rss = self.rss()
+        if self.rss_limit and rss is not None:
+            used = 100.0 * rss / self.rss_limit
+        elif psutil is not None:
+            used = psutil.virtual_memory().percent
+        else:
+            return "none"
+
+        if used >= self.critical_percent:
+            return "critical"
+        if used >= self.moderate_percent:
+            return "moderate"
+        return "none"
+
+    def trim(self, fraction: float) -> Dict[str, int]:
+        """Trim every registered cache by fraction; returns entries removed per cache"""
+        removed = {}
+        for name, entry in self._live().items():
+            try:
+                removed[name] = int(entry["trim"](fraction) or 0)
+            except Exception as e:
+                print(f"⚠️ Could not trim {name}: {e}")
+        return removed
+
+    def reclaim(self, level: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Trim caches for the given (or current) pressure level and collect
+        garbage. Expired entries are dropped even without pressure.
+        """
+        level = level or self.pressure()
+        rss_before = self.rss()
+        started = time.perf_counter()
+
+        removed = self.trim(TRIM_FRACTIONS.get(level, 0.0))
+        return self._report(level, rss_before, removed, gc.collect(), started)
+
+    async def reclaim_async(self, level: Optional[str] = None) -> Dict[str, Any]:
+        """reclaim() from the event loop: trims here, on the loop thread, and collects in a worker thread"""
+        level = level or self.pressure()
+        rss_before = self.rss()
+        started = time.perf_counter()
+
+        removed = self.trim(TRIM_FRACTIONS.get(level, 0.0))
+        return self._report(level, rss_before, removed, await asyncio.to_thread(gc.collect), started)
+
+    def _report(self, level: str, rss_before: Optional[int], removed: Dict[str, int],
+                collected: int, started: float) -> Dict[str, Any]:
+        report = {
+            "timestamp": time.time(),
+            "pressure": level,
+            "rss_before": rss_before,
+            "rss_after": self.rss(),
+            "entries_removed": removed,
+            "gc_collected": collected,
+            "duration": round(time.perf_counter() - started, 4)
+        }
+        self.reclaims.append(report)
+        del self.reclaims[:-50]
+        return report
+
+    def start_tracing(self, frames: int = 1):
+        """Start tracemalloc (it slows allocation, so it is off until asked for)"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop_tracing(self):
+        tracemalloc.stop()
+        self._previous_snapshot = None
+
+    def top_allocations(self, limit: int = 10) -> Dict[str, Any]:
+        """Largest allocation sites by line, and the biggest growth since the last call"""
+        if not tracemalloc.is_tracing():
+            return {"tracing": False, "top": [], "growth": []}
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+        def describe(stat, size_key="size"):
+            frame = stat.traceback[0]
+            return {
+                "location": f"{frame.filename}:{frame.lineno}",
+                "size_kb": round(getattr(stat, size_key) / 1024, 1),
+                "count": stat.count
+            }
+
+        top = [describe(stat) for stat in snapshot.statistics("lineno")[:limit]]
+        growth = []
+        if self._previous_snapshot is not None:
+            growth = [describe(stat, "size_diff") for stat in snapshot.compare_to(self._previous_snapshot, "lineno")[:limit]
+                      if stat.size_diff > 0]
+        self._previous_snapshot = snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": True,
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "top": top,
+            "growth": growth
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        rss = self.rss()
+        return {
+            "rss_mb": round(rss / 1024 / 1024, 1) if rss is not None else None,
+            "rss_limit_mb": round(self.rss_limit / 1024 / 1024, 1) if self.rss_limit else None,
+            "pressure": self.pressure(),
+            "caches": self.cache_sizes(),
+            "tracing": tracemalloc.is_tracing(),
+            "last_reclaim": self.reclaims[-1] if self.reclaims else None
+        }
+
+def trim_oldest(cache: Dict, fraction: float, timestamp_of: Callable[[Any], float],
+                max_age: Optional[float] = None, now: Optional[float] = None) -> int:
+    """
+    Shared policy for dict caches: drop entries older than max_age, then
+    the oldest fraction of what is left. Returns the number removed.
+    """
+    now = time.time() if now is None else now
+    removed = 0
+    if max_age is not None:
+        for key in [k for k, v in cache.items() if now - timestamp_of(v) > max_age]:
+            del cache[key]
+            removed += 1
+
+    count = int(len(cache) * fraction)
+    if count > 0:
+        for key in sorted(cache, key=lambda k: timestamp_of(cache[k]))[:count]:
+            del cache[key]
+        removed += count
+    return removed
+
+# Global instance
+memory_manager = MemoryManager()
@@ -0,0 +1,245 @@
+"""
+⚙️ Process Runner - Non-blocking Subprocess Execution
+Runs child processes with asyncio so the event loop keeps serving other
+agents, with capped output capture, timeouts and bounded concurrency
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import asyncio
+import itertools
+import os
+import signal
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# Bytes kept per stream; output past this is read and discarded
+DEFAULT_MAX_OUTPUT = 1024 * 1024
+READ_CHUNK = 64 * 1024
+
+@dataclass
+class ProcessResult:
+    """Outcome of one child process"""
+    args: List[str]
+    return_code: Optional[int]
+    stdout: str
+    stderr: str
+    duration: float
+    timed_out: bool = False
+    stdout_truncated: bool = False
+    stderr_truncated: bool = False
+    pid: Optional[int] = None
+    process_id: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.return_code == 0 and not self.timed_out
+
+@dataclass
+class RunningProcess:
+    """A child process while it runs, as listed by ProcessRunner.active"""
+    process_id: str
+    args: List[str]
+    process: asyncio.subprocess.Process
+    started: float = field(default_factory=time.time)
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    @property
+    def return_code(self) -> Optional[int]:
+        return self.process.returncode
+
+async def _read_capped(stream: asyncio.StreamReader, limit: int) -> tuple:
+    """Read a stream to EOF keeping at most limit bytes; returns (text, truncated)"""
+    kept = bytearray()
+    truncated = False
+    while True:
+        chunk = await stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        room = limit - len(kept)
+        if room > 0:
+            kept += chunk[:room]
+        if len(chunk) > room:
+            truncated = True  # keep draining so the child never blocks on a full pipe
+    return kept.decode("utf-8", errors="replace"), truncated
+
+async def _feed(process: asyncio.subprocess.Process, data: Optional[bytes]):
+    """Write data to the child's stdin and close it; a child that exits without reading is fine"""
+    if data is None:
+        return
+    try:
+        process.stdin.write(data)
+        await process.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        process.stdin.close()
+
+def _signal_process(process: asyncio.subprocess.Process, sig: int):
+    """Signal the child's whole process group (it was started in its own session)"""
+    if process.returncode is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, sig)
+        elif sig == signal.SIGTERM:
+            process.terminate()
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+async def stop_process(process: asyncio.subprocess.Process, grace: float = 2.0):
+    """SIGTERM, then SIGKILL if the process is still running after grace seconds"""
+    _signal_process(process, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(process.wait(), grace)
+    except asyncio.TimeoutError:
+        _signal_process(process, getattr(signal, "SIGKILL", signal.SIGTERM))
+        await process.wait()
+
+class ProcessRunner:
+    """
+    Runs subprocesses with asyncio.create_subprocess_exec.
+
+    stdout and stderr are read concurrently in chunks, keeping at most
+    max_output bytes of each, so a chatty child can neither fill a pipe
+    and stall nor exhaust memory. On timeout, or when the awaiting task
+    is cancelled, the child's process group is terminated and then
+    killed. At most max_concurrent processes run at once per event loop;
+    further calls wait for a slot.
+    """
+
+    def __init__(self, name: str, max_concurrent: int = 4, default_timeout: float = 30.0,
+                 max_output: int = DEFAULT_MAX_OUTPUT, kill_grace: float = 2.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.default_timeout = default_timeout
+        self.max_output = max_output
+        self.kill_grace = kill_grace
+
+        self.active: Dict[str, RunningProcess] = {}
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = \
+            weakref.WeakKeyDictionary()
+        self._ids = itertools.count(1)
+
+        self.stats = {
+            'started': 0,
+            'completed': 0,
+            'timed_out': 0,
+            'cancelled': 0,
+            'truncated': 0,
+            'peak_running': 0
+        }
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrent)
+        return semaphore
+
+    async def run(self, args: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                  timeout: Optional[float] = None, stdin: Optional[bytes] = None,
+                  max_output: Optional[int] = None) -> ProcessResult:
+        """
+        Run args to completion (or timeout) and return its ProcessResult.
+
+        Raises FileNotFoundError/PermissionError if the program cannot be
+        started, like subprocess.run.
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        limit = self.max_output if max_output is None else max_output
+
+        async with self._semaphore():
+            started = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                *args,
+                stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=cwd,
+                env=env,
+                start_new_session=os.name == "posix"
+            )
+            process_id = f"{self.name}_{next(self._ids)}"
+            self.active[process_id] = RunningProcess(process_id, list(args), process)
+            self.stats['started'] += 1
+            self.stats['peak_running'] = max(self.stats['peak_running'], len(self.active))
+
+            # stdin is written inside completion so the timeout covers a child that never reads it
+            completion = asyncio.ensure_future(self._complete(process, limit, stdin))
+            timed_out = False
+            try:
+                try:
+                    (stdout, out_cut), (stderr, err_cut) = await asyncio.wait_for(asyncio.shield(completion), timeout)
+                except asyncio.TimeoutError:
+                    timed_out = True
+                    self.stats['timed_out'] += 1
+                    await stop_process(process, self.kill_grace)
+                    try:
+                        # The pipes close once the process group is gone
+                        (stdout, out_cut), (stderr, err_cut) = await asyncio.wait_for(completion, self.kill_grace)
+                    except asyncio.TimeoutError:
+                        stdout, stderr, out_cut, err_cut = "", "", False, False
+            except asyncio.CancelledError:
+                self.stats['cancelled'] += 1
+                completion.cancel()
+                await asyncio.shield(stop_process(process, self.kill_grace))
+                raise
+            finally:
+                self.active.pop(process_id, None)
+
+        self.stats['completed'] += 1
+        if out_cut or err_cut:
+            self.stats['truncated'] += 1
+        return ProcessResult(
+            args=list(args),
+            return_code=process.returncode,
+            stdout=stdout,
+            stderr=stderr,
+            duration=time.perf_counter() - started,
+            timed_out=timed_out,
+            stdout_truncated=out_cut,
+            stderr_truncated=err_cut,
+            pid=process.pid,
+            process_id=process_id
+        )
+
+    @staticmethod
+    async def _complete(process: asyncio.subprocess.Process, limit: int, stdin: Optional[bytes] = None) -> tuple:
+        """Feed stdin while draining both pipes, then reap the process"""
+        outputs = await asyncio.gather(_read_capped(process.stdout, limit), _read_capped(process.stderr, limit),
+                                       _feed(process, stdin))
+        await process.wait()
+        return outputs[:2]
+
+    async def kill(self, process_id: str) -> bool:
+        """Stop a running process by id; its run() call returns with the exit status"""
+        running = self.active.get(process_id)
+        if running is None:
+            return False
+        await stop_process(running.process, self.kill_grace)
+        return True
+
+    def list_active(self) -> List[Dict[str, Any]]:
+        return [{
+            "process_id": running.process_id,
+            "pid": running.pid,
+            "command": " ".join(running.args),
+            "status": "running" if running.return_code is None else "completed",
+            "return_code": running.return_code,
+            "running_for": round(time.time() - running.started, 2)
+        } for running in self.active.values()]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'running': len(self.active),
+            'max_concurrent': self.max_concurrent
+        }
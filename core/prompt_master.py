@@ -9,12 +9,16 @@ import asyncio
 import json
 import time
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable
 from dataclasses import dataclass
 
 from .memory_bus import MemoryBus
 from .ai_selector import AISelector
 from .sync_engine import SyncEngine
+from .workflow_engine import WorkflowEngine, WorkflowValidationError
+from .agent_pool import agent_pool
+from .load_tracker import load_tracker
+from .worker_supervisor import worker_supervisor
 from connectors.llm_gateway import LLMGateway
 
 @dataclass
@@ -53,6 +57,7 @@ class PromptMasterAgent:
         self.active_tasks: Dict[str, Task] = {}
         self.agent_registry = {}
         self.workflow_templates = {}
+        self.workflow_engine = WorkflowEngine(max_concurrency=4)
         
         # Load configurations
         self._load_agent_registry()
@@ -141,27 +146,27 @@ class PromptMasterAgent:
         """Load workflow templates for common tasks"""
         self.workflow_templates = {
             "create_web_app": [
-                {"agent": "dev_engine", "task": "setup_project_structure"},
-                {"agent": "ui_designer", "task": "create_ui_components"},
-                {"agent": "backend_dev", "task": "create_api_endpoints"},
-                {"agent": "data_sync", "task": "setup_database"},
-                {"agent": "deploy_manager", "task": "deploy_to_web"}
+                {"id": "scaffold", "agent": "dev_engine", "task": "setup_project_structure"},
+                {"id": "ui", "agent": "ui_designer", "task": "create_ui_components", "depends_on": ["scaffold"]},
+                {"id": "database", "agent": "data_sync", "task": "setup_database", "depends_on": ["scaffold"]},
+                {"id": "api", "agent": "backend_dev", "task": "create_api_endpoints", "depends_on": ["database"]},
+                {"id": "deploy", "agent": "deploy_manager", "task": "deploy_to_web", "depends_on": ["ui", "api"]}
             ],
             "create_mobile_app": [
-                {"agent": "dev_engine", "task": "setup_react_native"},
-                {"agent": "ui_designer", "task": "mobile_ui_design"},
-                {"agent": "fullstack_dev", "task": "mobile_development"},
-                {"agent": "deploy_manager", "task": "build_apk"}
+                {"id": "scaffold", "agent": "dev_engine", "task": "setup_react_native"},
+                {"id": "ui", "agent": "ui_designer", "task": "mobile_ui_design", "depends_on": []},
+                {"id": "app", "agent": "fullstack_dev", "task": "mobile_development", "depends_on": ["scaffold", "ui"]},
+                {"id": "build", "agent": "deploy_manager", "task": "build_apk", "depends_on": ["app"]}
             ],
             "automate_workflow": [
-                {"agent": "cybershell", "task": "analyze_requirements"},
-                {"agent": "agent_maker", "task": "create_automation_agent"},
-                {"agent": "github_agent", "task": "setup_ci_cd"}
+                {"id": "requirements", "agent": "cybershell", "task": "analyze_requirements"},
+                {"id": "automation", "agent": "agent_maker", "task": "create_automation_agent", "depends_on": ["requirements"]},
+                {"id": "ci_cd", "agent": "github_agent", "task": "setup_ci_cd", "depends_on": ["requirements"]}
             ],
             "data_analysis": [
-                {"agent": "data_sync", "task": "collect_data"},
-                {"agent": "fullstack_dev", "task": "create_analysis_tools"},
-                {"agent": "ui_designer", "task": "create_dashboard"}
+                {"id": "collect", "agent": "data_sync", "task": "collect_data"},
+                {"id": "dashboard", "agent": "ui_designer", "task": "create_dashboard", "depends_on": []},
+                {"id": "analysis", "agent": "fullstack_dev", "task": "create_analysis_tools", "depends_on": ["collect"]}
             ]
         }
     
@@ -175,32 +180,14 @@ class PromptMasterAgent:
             metadata: Additional context (user_id, session, etc.)
         """
         try:
-            # Generate unique task ID
-            task_id = f"task_{int(time.time())}_{len(self.active_tasks)}"
-            
             # Analyze prompt with AI
-            analysis = await self._analyze_prompt(prompt, input_type, metadata)
+            analysis = await self.analyze_prompt(prompt, input_type, metadata)
             
-            # Create task object
-            task = Task(
-                task_id=task_id,
-                prompt=prompt,
-                task_type=analysis["task_type"],
-                priority=analysis["priority"],
-                created_at=datetime.now()
-            )
+            # Create and store task
+            task = self.create_task(prompt, analysis)
+            task_id = task.task_id
             
-            # Store task
-            self.active_tasks[task_id] = task
-            self.memory.store_task(task)
-            
-            # Determine execution strategy
-            if analysis["complexity"] == "simple":
-                # Single agent execution
-                result = await self._execute_single_agent_task(task, analysis)
-            else:
-                # Multi-agent workflow
-                result = await self._execute_workflow(task, analysis)
+            result = await self.execute_task(task, analysis)
             
             return {
                 "success": True,
@@ -216,6 +203,50 @@ class PromptMasterAgent:
                 "task_id": task_id if 'task_id' in locals() else None
             }
     
+    async def analyze_prompt(self, prompt: str, input_type: str = "text", metadata: Dict = None) -> Dict[str, Any]:
+        """Analyze a prompt, filling in defaults for any fields the LLM omitted"""
+        analysis = await self._analyze_prompt(prompt, input_type, metadata)
+        analysis.setdefault("task_type", "other")
+        analysis.setdefault("complexity", "medium")
+        try:
+            analysis["priority"] = max(1, min(10, int(analysis.get("priority", 5))))
+        except (TypeError, ValueError):
+            analysis["priority"] = 5
+        return analysis
+    
+    def create_task(self, prompt: str, analysis: Dict, task_id: str = None) -> Task:
+        """Create, register and store the task for an analyzed prompt"""
+        if task_id is None:
+            task_id = f"task_{int(time.time())}_{len(self.active_tasks)}"
+        
+        task = Task(
+            task_id=task_id,
+            prompt=prompt,
+            task_type=analysis["task_type"],
+            priority=analysis["priority"],
+            created_at=datetime.now()
+        )
+        
+        self.active_tasks[task_id] = task
+        self.memory.store_task(task)
+        return task
+    
+    async def execute_task(self, task: Task, analysis: Dict,
+                           progress_callback: Optional[Callable[[Dict], None]] = None) -> Dict[str, Any]:
+        """
+        Execute an analyzed task with a single agent or a workflow
+        
+        progress_callback, if given, is called with a dict describing each
+        completed workflow step.
+        """
+        # Determine execution strategy
+        if analysis["complexity"] == "simple":
+            # Single agent execution
+            return await self._execute_single_agent_task(task, analysis)
+        
+        # Multi-agent workflow
+        return await self._execute_workflow(task, analysis, progress_callback)
+    
     async def _analyze_prompt(self, prompt: str, input_type: str, metadata: Dict) -> Dict[str, Any]:
         """Analyze prompt using LLM to determine task type and complexity"""
         
@@ -271,23 +302,22 @@ class PromptMasterAgent:
         task.status = "executing"
         
         # Execute with selected agent
-        agent_module = self._get_agent_module(selected_agent)
-        if agent_module:
-            result = await agent_module.process_task({
-                "task_id": task.task_id,
-                "prompt": task.prompt,
-                "analysis": analysis
-            })
-            
-            task.status = "completed"
-            task.completed_at = datetime.now()
-            task.result = result
-            
-            return result
-        else:
+        available, result = await self._run_agent(selected_agent, {
+            "task_id": task.task_id,
+            "prompt": task.prompt,
+            "analysis": analysis
+        })
+        if not available:
             raise Exception(f"Agent {selected_agent} not available")
+        
+        task.status = "completed"
+        task.completed_at = datetime.now()
+        task.result = result
+        
+        return result
     
-    async def _execute_workflow(self, task: Task, analysis: Dict) -> Dict[str, Any]:
+    async def _execute_workflow(self, task: Task, analysis: Dict,
+                                progress_callback: Optional[Callable[[Dict], None]] = None) -> Dict[str, Any]:
         """Execute complex multi-agent workflow"""
         
         # Get workflow template
@@ -298,22 +328,26 @@ class PromptMasterAgent:
             workflow = await self._generate_custom_workflow(task, analysis)
         
         task.status = "executing_workflow"
-        results = []
         
-        # Execute workflow steps
-        for step in workflow:
-            step_result = await self._execute_workflow_step(step, task, analysis)
-            results.append(step_result)
-            
-            # Check if step failed
-            if not step_result.get("success", True):
-                task.status = "failed"
-                break
+        async def execute_step(step, upstream):
+            return await self._execute_workflow_step(
+                {"agent": step.agent, "task": step.task, "id": step.step_id}, task, analysis, upstream
+            )
+        
+        # Independent steps run concurrently; dependents get upstream results
+        try:
+            run = await self.workflow_engine.run(workflow, execute_step, progress_callback)
+        except WorkflowValidationError as e:
+            # Malformed dependency graph (typically LLM-generated): run in listed order
+            print(f"⚠️ Invalid workflow graph ({e}), running steps sequentially")
+            sequential = [{k: v for k, v in step.items() if k not in ("id", "depends_on")} for step in workflow]
+            run = await self.workflow_engine.run(sequential, execute_step, progress_callback)
         
         # Compile final result
-        final_result = await self._compile_workflow_result(results, task)
+        final_result = await self._compile_workflow_result(run["results"], task)
+        final_result["timing"] = run["timing"]
         
-        task.status = "completed"
+        task.status = "completed" if run["success"] else "failed"
         task.completed_at = datetime.now()
         task.result = final_result
         
@@ -321,7 +355,8 @@ class PromptMasterAgent:
     
     def _get_workflow_template(self, task_type: str) -> List[Dict]:
         """Get predefined workflow template"""
-        return self.workflow_templates.get(task_type)
+        # Analysis reports "web_app" while templates are keyed "create_web_app"
+        return self.workflow_templates.get(task_type) or self.workflow_templates.get(f"create_{task_type}")
     
     async def _generate_custom_workflow(self, task: Task, analysis: Dict) -> List[Dict]:
         """Generate custom workflow using AI"""
@@ -330,10 +365,13 @@ class PromptMasterAgent:
         Generate a workflow of agent tasks to complete the user request. Return JSON array:
         
         [
-            {"agent": "agent_name", "task": "specific_task_description"},
-            {"agent": "agent_name", "task": "specific_task_description"}
+            {"id": "step_id", "agent": "agent_name", "task": "specific_task_description", "depends_on": []},
+            {"id": "step_id", "agent": "agent_name", "task": "specific_task_description", "depends_on": ["step_id"]}
         ]
         
+        List in depends_on only the steps whose output a step actually needs, so
+        independent steps can run in parallel.
+        
         Available agents: cybershell, ui_designer, dev_engine, agent_maker, fullstack_dev, data_sync, voice_agent, github_agent, deploy_manager, web3_plugin
         """
         
@@ -353,27 +391,28 @@ class PromptMasterAgent:
             # Fallback workflow
             return [{"agent": "fullstack_dev", "task": task.prompt}]
     
-    async def _execute_workflow_step(self, step: Dict, task: Task, analysis: Dict) -> Dict[str, Any]:
+    async def _execute_workflow_step(self, step: Dict, task: Task, analysis: Dict,
+                                     upstream: Dict[str, Any] = None) -> Dict[str, Any]:
         """Execute single workflow step"""
         
         agent_name = step["agent"] 
         step_task = step["task"]
         
-        # Get agent module
-        agent_module = self._get_agent_module(agent_name)
-        
-        if agent_module:
-            step_result = await agent_module.process_task({
-                "task_id": f"{task.task_id}_step_{agent_name}",
-                "prompt": step_task,
-                "original_prompt": task.prompt,
-                "analysis": analysis,
-                "workflow_context": True
-            })
-            
+        available, step_result = await self._run_agent(agent_name, {
+            "task_id": f"{task.task_id}_step_{step.get('id', agent_name)}",
+            "prompt": step_task,
+            "original_prompt": task.prompt,
+            "analysis": analysis,
+            "upstream_results": {
+                step_id: result.get("result") for step_id, result in (upstream or {}).items()
+            },
+            "workflow_context": True
+        })
+        
+        if available:
             # Store step result in memory
             self.memory.store_workflow_step(task.task_id, agent_name, step_result)
-            
+        
             return {
                 "agent": agent_name,
                 "task": step_task,
@@ -388,6 +427,21 @@ class PromptMasterAgent:
                 "success": False
             }
     
+    async def _run_agent(self, agent_name: str, payload: Dict) -> tuple:
+        """
+        Run payload on an agent: in its worker pool when one is running,
+        else on an instance leased for the call. Returns (available, result).
+        """
+        if worker_supervisor.routes(agent_name):
+            with load_tracker.track(agent_name, "prompt_master"):
+                return True, await worker_supervisor.run(agent_name, payload)
+        
+        async with agent_pool.lease(agent_name) as agent_module:
+            if not agent_module:
+                return False, None
+            with load_tracker.track(agent_name, "prompt_master"):
+                return True, await agent_module.process_task(payload)
+    
     async def _compile_workflow_result(self, results: List[Dict], task: Task) -> Dict[str, Any]:
         """Compile final result from workflow execution"""
         
@@ -449,37 +503,8 @@ class PromptMasterAgent:
         return deliverables
     
     def _get_agent_module(self, agent_name: str):
-        """Get agent module by name"""
-        try:
-            if agent_name == "cybershell":
-                from agents.cybershell import CyberShellAgent
-                return CyberShellAgent()
-            elif agent_name == "ui_designer":
-                from agents.ui_designer import UIDesignerAgent
-                return UIDesignerAgent()
-            elif agent_name == "dev_engine":
-                from agents.dev_engine import DevEngineAgent
-                return DevEngineAgent()
-            elif agent_name == "agent_maker":
-                from agents.agent_maker import AgentMakerAgent
-                return AgentMakerAgent()
-            elif agent_name == "fullstack_dev":
-                from agents.fullstack_dev import FullStackDevAgent
-                return FullStackDevAgent()
-            elif agent_name == "data_sync":
-                from agents.data_sync import DataSyncAgent
-                return DataSyncAgent()
-            elif agent_name == "github_agent":
-                from agents.github_agent import GitHubAgent
-                return GitHubAgent()
-            elif agent_name == "deploy_manager":
-                from agents.deploy_manager import DeployManagerAgent
-                return DeployManagerAgent()
-            # Add other agents as needed
-            else:
-                return None
-        except ImportError:
-            return None
+        """Get agent module by name (cached; use agent_pool.lease() to run tasks)"""
+        return agent_pool.get(agent_name)
     
     def get_system_status(self) -> Dict[str, Any]:
         """Get current system status"""
@@ -490,6 +515,7 @@ class PromptMasterAgent:
             "active_tasks": len(self.active_tasks),
             "available_agents": len(self.agent_registry),
             "memory_usage": self.memory.get_usage_stats(),
+            "agent_pool": agent_pool.get_metrics(),
             "uptime": time.time() - getattr(self, 'start_time', time.time())
         }
     
@@ -0,0 +1,348 @@
+"""
+📡 Replication Queue - Durable, Rate-limited Backup Transfers
+Persists replication jobs in SQLite and copies backup files to nodes in
+priority order within bandwidth and concurrency limits, resuming after
+failures or restarts
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import asyncio
+import os
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+class TokenBucket:
+    """
+    Byte-rate limiter shared by concurrent transfers. A consumer takes
+    what it needs at once and sleeps off any deficit, so the long-run rate
+    never exceeds rate bytes/s; a rate of None (or 0) means unlimited.
+    """
+
+    def __init__(self, rate: Optional[float], burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else (rate or 0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    async def consume(self, amount: int):
+        if not self.rate:
+            return
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= amount
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+class _PendingFile:
+    """File being written to a DirectoryNode; appears under its name only on commit"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.staging = path.with_name(f".tmp-{uuid.uuid4().hex}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.handle = open(self.staging, 'wb')
+
+    def write(self, data: bytes):
+        self.handle.write(data)
+
+    def commit(self):
+        self.handle.close()
+        os.replace(self.staging, self.path)
+
+    def abort(self):
+        self.handle.close()
+        self.staging.unlink(missing_ok=True)
+
+class DirectoryNode:
+    """
+    Replication target backed by a directory (a mounted disk or share, or
+    a temporary directory in tests). Other transports only need has(),
+    open() and the write/commit/abort of what open() returns.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def has(self, relpath: str, size: int) -> bool:
+        path = self.root / relpath
+        return path.is_file() and path.stat().st_size == size
+
+    def open(self, relpath: str) -> _PendingFile:
+        return _PendingFile(self.root / relpath)
+
+@dataclass
+class _Node:
+    transport: Any
+    max_concurrent: int
+    bucket: TokenBucket
+    running: int = 0
+    bytes_sent: int = 0
+
+@dataclass
+class _Job:
+    backup_id: str
+    node_id: str
+    attempts: int
+    files_done: int
+    bytes_done: int
+
+class ReplicationQueue:
+    """
+    Durable queue of (backup, node) copies.
+
+    Jobs live in a SQLite table, so a restart resumes them: jobs that
+    were running go back to pending and continue from the last recorded
+    file. list_files(backup_id) gives the files to copy, relative to
+    source_root and in copy order; a file is sent in block_size pieces,
+    committed on the node atomically, and skipped if the node already has
+    it at the right size. Runnable jobs start by priority, then newest
+    backup first, while fewer than max_concurrent transfers run overall
+    and fewer than the node's own limit run to that node. Every block
+    passes the global and the node's token bucket. A failed job is
+    retried with exponential backoff up to max_attempts times.
+    """
+
+    def __init__(self, db_path: str, source_root: str, list_files: Callable[[str], List[str]],
+                 max_concurrent: int = 4, bandwidth: Optional[float] = None, block_size: int = 256 * 1024,
+                 max_attempts: int = 5, retry_delay: float = 10.0,
+                 on_complete: Optional[Callable[[str, str], Awaitable[None]]] = None):
+        self.db_path = Path(db_path)
+        self.source_root = Path(source_root)
+        self.list_files = list_files
+        self.max_concurrent = max_concurrent
+        self.bucket = TokenBucket(bandwidth)
+        self.block_size = block_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.on_complete = on_complete
+        self.progress_interval = 1.0  # seconds between progress writes during a job
+
+        self.nodes: Dict[str, _Node] = {}
+        self._active: Set[Tuple[str, str]] = set()
+        self._ready = False
+        self._wake: Optional[asyncio.Event] = None
+
+        self.stats = {
+            'jobs_completed': 0,
+            'jobs_failed': 0,
+            'retries': 0,
+            'files_sent': 0,
+            'files_skipped': 0,
+            'bytes_sent': 0
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if not self._ready:
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS replication_jobs (
+                    backup_id TEXT NOT NULL,
+                    node_id TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    not_before REAL NOT NULL DEFAULT 0,
+                    files_done INTEGER NOT NULL DEFAULT 0,
+                    bytes_done INTEGER NOT NULL DEFAULT 0,
+                    bytes_total INTEGER,
+                    last_error TEXT,
+                    completed_at REAL,
+                    PRIMARY KEY (backup_id, node_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_replication_status ON replication_jobs(status, priority, created_at);
+            ''')
+            # Jobs left running by a previous process resume from their recorded progress
+            conn.execute("UPDATE replication_jobs SET status = 'pending' WHERE status = 'running'")
+            conn.commit()
+            self._ready = True
+        return conn
+
+    def _execute(self, query: str, params: tuple = ()) -> List[tuple]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(query, params).fetchall()
+            conn.commit()
+            return rows
+        finally:
+            conn.close()
+
+    def register_node(self, node_id: str, transport, max_concurrent: int = 2, bandwidth: Optional[float] = None):
+        """Add a replication target with its own concurrency and bytes/s limits"""
+        self.nodes[node_id] = _Node(transport, max_concurrent, TokenBucket(bandwidth))
+
+    def enqueue(self, backup_id: str, node_id: str, priority: int = 0, created_at: Optional[float] = None):
+        """Queue a copy of backup_id to node_id (re-queues it if it had failed)"""
+        now = time.time()
+        self._execute('''
+            INSERT INTO replication_jobs (backup_id, node_id, priority, created_at, enqueued_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (backup_id, node_id) DO UPDATE SET
+                status = 'pending', attempts = 0, not_before = 0, priority = excluded.priority
+            WHERE status = 'failed'
+        ''', (backup_id, node_id, priority, created_at or now, now))
+        if self._wake is not None:
+            self._wake.set()
+
+    def _runnable(self) -> List[_Job]:
+        """Pending jobs to start now, in priority order, within the concurrency limits"""
+        rows = self._execute('''
+            SELECT backup_id, node_id, attempts, files_done, bytes_done FROM replication_jobs
+            WHERE status = 'pending' AND not_before <= ?
+            ORDER BY priority DESC, created_at DESC
+        ''', (time.time(),))
+        running = len(self._active)
+        per_node = {node_id: node.running for node_id, node in self.nodes.items()}
+        jobs = []
+        for backup_id, node_id, attempts, files_done, bytes_done in rows:
+            if running >= self.max_concurrent:
+                break
+            node = self.nodes.get(node_id)
+            if node is None or per_node[node_id] >= node.max_concurrent or (backup_id, node_id) in self._active:
+                continue
+            per_node[node_id] += 1
+            running += 1
+            jobs.append(_Job(backup_id, node_id, attempts, files_done, bytes_done))
+        return jobs
+
+    async def drain(self) -> int:
+        """Run jobs until none is runnable (jobs waiting out a retry delay stay queued); returns jobs finished"""
+        tasks: Set[asyncio.Task] = set()
+        finished = 0
+        while True:
+            for job in self._runnable():
+                self._active.add((job.backup_id, job.node_id))
+                self.nodes[job.node_id].running += 1
+                self._execute("UPDATE replication_jobs SET status = 'running' WHERE backup_id = ? AND node_id = ?",
+                              (job.backup_id, job.node_id))
+                tasks.add(asyncio.create_task(self._run(job)))
+            if not tasks:
+                return finished
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finished += len(done)
+
+    async def run_forever(self, interval: float = 30.0):
+        """Background loop: drain, then wait for new work or for retries to come due"""
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                await self.drain()
+            except Exception as e:
+                print(f"⚠️ Replication queue error: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _run(self, job: _Job):
+        node = self.nodes[job.node_id]
+        try:
+            await self._transfer(job, node)
+        except Exception as e:
+            job.attempts += 1
+            failed = job.attempts >= self.max_attempts
+            self.stats['jobs_failed' if failed else 'retries'] += 1
+            self._execute('''
+                UPDATE replication_jobs SET status = ?, attempts = ?, not_before = ?, last_error = ?,
+                    files_done = ?, bytes_done = ?
+                WHERE backup_id = ? AND node_id = ?
+            ''', ('failed' if failed else 'pending', job.attempts,
+                  time.time() + self.retry_delay * 2 ** (job.attempts - 1), str(e),
+                  job.files_done, job.bytes_done, job.backup_id, job.node_id))
+            print(f"⚠️ Replication of {job.backup_id} to {job.node_id} failed (attempt {job.attempts}): {e}")
+        else:
+            self.stats['jobs_completed'] += 1
+            self._execute('''
+                UPDATE replication_jobs SET status = 'done', completed_at = ?, files_done = ?, bytes_done = ?,
+                    last_error = NULL
+                WHERE backup_id = ? AND node_id = ?
+            ''', (time.time(), job.files_done, job.bytes_done, job.backup_id, job.node_id))
+            if self.on_complete is not None:
+                try:
+                    await self.on_complete(job.backup_id, job.node_id)
+                except Exception as e:
+                    print(f"⚠️ Replication completion hook failed for {job.backup_id}: {e}")
+        finally:
+            node.running -= 1
+            self._active.discard((job.backup_id, job.node_id))
+
+    async def _transfer(self, job: _Job, node: _Node):
+        files = await asyncio.to_thread(self.list_files, job.backup_id)
+        sizes = await asyncio.to_thread(lambda: [(self.source_root / name).stat().st_size for name in files])
+        self._execute("UPDATE replication_jobs SET bytes_total = ? WHERE backup_id = ? AND node_id = ?",
+                      (sum(sizes), job.backup_id, job.node_id))
+
+        saved = time.monotonic()
+        for index in range(job.files_done, len(files)):
+            name, size = files[index], sizes[index]
+            if await asyncio.to_thread(node.transport.has, name, size):
+                self.stats['files_skipped'] += 1
+            else:
+                await self._copy(node, name)
+                self.stats['files_sent'] += 1
+            job.files_done = index + 1
+            job.bytes_done += size
+            if time.monotonic() - saved >= self.progress_interval:
+                saved = time.monotonic()
+                self._execute("UPDATE replication_jobs SET files_done = ?, bytes_done = ? WHERE backup_id = ? AND node_id = ?",
+                              (job.files_done, job.bytes_done, job.backup_id, job.node_id))
+
+    async def _copy(self, node: _Node, name: str):
+        source = await asyncio.to_thread(open, self.source_root / name, 'rb')
+        target = None
+        try:
+            target = await asyncio.to_thread(node.transport.open, name)
+            while True:
+                block = await asyncio.to_thread(source.read, self.block_size)
+                if not block:
+                    break
+                await self.bucket.consume(len(block))
+                await node.bucket.consume(len(block))
+                await asyncio.to_thread(target.write, block)
+                node.bytes_sent += len(block)
+                self.stats['bytes_sent'] += len(block)
+            await asyncio.to_thread(target.commit)
+            target = None
+        finally:
+            source.close()
+            if target is not None:
+                target.abort()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue counts and replication lag (age of the oldest unreplicated backup) per node"""
+        now = time.time()
+        rows = self._execute('''
+            SELECT node_id, status, COUNT(*), MIN(created_at), COALESCE(SUM(bytes_total - bytes_done), 0),
+                   MAX(completed_at)
+            FROM replication_jobs GROUP BY node_id, status
+        ''')
+        nodes: Dict[str, Dict[str, Any]] = {
+            node_id: {'pending': 0, 'running': 0, 'done': 0, 'failed': 0, 'lag_seconds': 0.0,
+                      'bytes_remaining': 0, 'last_completed_at': None, 'bytes_sent': node.bytes_sent}
+            for node_id, node in self.nodes.items()
+        }
+        for node_id, status, count, oldest, remaining, completed in rows:
+            entry = nodes.setdefault(node_id, {'pending': 0, 'running': 0, 'done': 0, 'failed': 0, 'lag_seconds': 0.0,
+                                               'bytes_remaining': 0, 'last_completed_at': None, 'bytes_sent': 0})
+            entry[status] = count
+            if status == 'done':
+                entry['last_completed_at'] = completed
+            else:
+                entry['lag_seconds'] = round(max(entry['lag_seconds'], now - oldest), 1)
+                entry['bytes_remaining'] += remaining
+        return {
+            **self.stats,
+            'pending': sum(entry['pending'] + entry['running'] for entry in nodes.values()),
+            'max_lag_seconds': max((entry['lag_seconds'] for entry in nodes.values()), default=0.0),
+            'nodes': nodes
+        }
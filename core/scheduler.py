@@ -18,6 +18,11 @@ try:
 except ImportError:
     croniter = None
 import uuid
+from contextlib import asynccontextmanager
+
+from .agent_pool import agent_pool
+from .load_tracker import load_tracker
+from .worker_supervisor import worker_supervisor
 
 class ScheduleType(Enum):
     ONE_TIME = "one_time"
@@ -332,32 +337,18 @@ class AgentScheduler:
             
             print(f"⏰ Executing scheduled task: {task.task_id} on agent {task.agent_id}")
             
-            # Get agent and execute task
-            agent = self._get_agent_instance(task.agent_id)
+            # Execute the task
+            result, execution_time = await self._run_on_agent(task)
             
-            if agent:
-                start_time = time.time()
-                
-                # Execute the task
-                if hasattr(agent, 'process_scheduled_task'):
-                    result = await agent.process_scheduled_task(task.task_data)
-                else:
-                    result = await agent.process_task(task.task_data)
-                
-                execution_time = time.time() - start_time
-                
-                # Update task with success
-                task.status = ScheduleStatus.COMPLETED
-                task.last_result = result
-                task.retry_count = 0
-                
-                # Update stats
-                self._update_execution_stats(True, execution_time)
-                
-                print(f"✅ Task {task.task_id} completed successfully in {execution_time:.2f}s")
-                
-            else:
-                raise Exception(f"Agent {task.agent_id} not available")
+            # Update task with success
+            task.status = ScheduleStatus.COMPLETED
+            task.last_result = result
+            task.retry_count = 0
+            
+            # Update stats
+            self._update_execution_stats(True, execution_time)
+            
+            print(f"✅ Task {task.task_id} completed successfully in {execution_time:.2f}s")
                 
         except Exception as e:
             # Handle task failure
@@ -390,28 +381,44 @@ class AgentScheduler:
             # Save updated configuration
             self._save_schedule_config()
     
+    async def _run_on_agent(self, task: ScheduledTask):
+        """Run a task in the agent's worker pool when one is running, else on a leased instance; returns (result, seconds)"""
+        if worker_supervisor.routes(task.agent_id):
+            start_time = time.time()
+            with load_tracker.track(task.agent_id, "scheduler"):
+                result = await worker_supervisor.run(task.agent_id, task.task_data, method="process_scheduled_task")
+            return result, time.time() - start_time
+        
+        async with self._lease_agent(task.agent_id) as agent:
+            if not agent:
+                raise Exception(f"Agent {task.agent_id} not available")
+            
+            start_time = time.time()
+            with load_tracker.track(task.agent_id, "scheduler"):
+                if hasattr(agent, 'process_scheduled_task'):
+                    result = await agent.process_scheduled_task(task.task_data)
+                else:
+                    result = await agent.process_task(task.task_data)
+            return result, time.time() - start_time
+    
     def _get_agent_instance(self, agent_id: str):
-        """Get agent instance for execution"""
-        try:
-            if agent_id == "prompt_master":
-                from core.prompt_master import prompt_master
-                return prompt_master
-            elif agent_id == "agent_watcher":
-                from agents.agent_watcher import AgentWatcherAgent
-                return AgentWatcherAgent()
-            elif agent_id == "data_sync":
-                from agents.data_sync import DataSyncAgent
-                return DataSyncAgent()
-            elif agent_id == "cybershell":
-                from agents.cybershell import CyberShellAgent
-                return CyberShellAgent()
-            # Add other agents as needed
-            else:
-                print(f"Unknown agent: {agent_id}")
-                return None
-        except ImportError as e:
-            print(f"Failed to import agent {agent_id}: {e}")
+        """Get agent instance for execution (cached by the agent pool)"""
+        if agent_id == "prompt_master":
+            from core.prompt_master import prompt_master
+            return prompt_master
+        if agent_id not in agent_pool:
+            print(f"Unknown agent: {agent_id}")
             return None
+        return agent_pool.get(agent_id)
+    
+    @asynccontextmanager
+    async def _lease_agent(self, agent_id: str):
+        """Exclusive use of a pooled agent instance for one task run"""
+        if agent_id == "prompt_master" or agent_id not in agent_pool:
+            yield self._get_agent_instance(agent_id)
+            return
+        async with agent_pool.lease(agent_id) as agent:
+            yield agent
     
     def _calculate_next_run(self, task: ScheduledTask) -> datetime:
         """Calculate next run time for recurring tasks"""
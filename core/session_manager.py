@@ -0,0 +1,235 @@
+"""
+🗂️ Session Manager - Execution Session Lifecycle
+Tracks per-session working directories, expires idle sessions, enforces
+count and disk budgets and reaps them in the background
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import asyncio
+import inspect
+import os
+import re
+import shutil
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+TMPFS_ROOT = "/dev/shm"
+
+# Session ids name directories under root; nothing that could leave it
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,128}")
+
+def _directory_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+def _remove_directory(path: Path) -> int:
+    """Delete a session directory (a symlink is unlinked, never followed); returns the bytes it held"""
+    if path.is_symlink():
+        path.unlink()
+        return 0
+    if not path.exists():
+        return 0
+    size = _directory_size(path)
+    shutil.rmtree(path, ignore_errors=True)
+    return size
+
+class SessionManager:
+    """
+    Owns session records and their directories under root.
+
+    A session expires after idle_ttl seconds without use, or after its
+    own ttl if one was given at creation (execute_code uses a short one
+    for the throwaway sessions it creates when the caller passes none).
+    When there are more than max_sessions sessions, or their directories
+    hold more than max_bytes, the least recently used idle sessions are
+    closed first. Sessions inside a using() block are never reaped.
+
+    With use_tmpfs the directories live under /dev/shm, which avoids
+    disk I/O for the many small files sessions write; max_bytes then
+    bounds the RAM they can take. on_close callbacks (sync or async) run
+    for every closed session, e.g. to drop interpreter state. Directory
+    walks and deletions from async code run in a worker thread.
+    """
+
+    def __init__(self, root: str = "temp_sessions", idle_ttl: float = 1800.0,
+                 max_sessions: int = 200, max_bytes: int = 1024 * 1024 * 1024,
+                 use_tmpfs: bool = False, reap_interval: float = 60.0):
+        self.tmpfs = use_tmpfs and os.path.isdir(TMPFS_ROOT) and os.access(TMPFS_ROOT, os.W_OK)
+        self.root = (Path(TMPFS_ROOT) / "agentic_sessions" if self.tmpfs else Path(root)).resolve()
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.reap_interval = reap_interval
+
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self._last_used: Dict[str, float] = {}
+        self._ttl: Dict[str, float] = {}
+        self._bytes: Dict[str, int] = {}
+        self._busy: Dict[str, int] = {}
+        self.on_close: List[Callable[[str], Union[None, Awaitable[None]]]] = []
+        self._reaper: Optional[asyncio.Task] = None
+
+        self.stats = {
+            'created': 0,
+            'closed': 0,
+            'expired': 0,
+            'evicted': 0,
+            'bytes_reclaimed': 0
+        }
+
+    def path(self, session_id: str) -> Path:
+        """Directory for a session; raises ValueError for ids that are not plain names"""
+        if not isinstance(session_id, str) or not SESSION_ID_PATTERN.fullmatch(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        path = self.root / session_id
+        if path.parent != self.root:
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return path
+
+    def create(self, session_id: str, record: Optional[Dict[str, Any]] = None,
+               ttl: Optional[float] = None) -> Dict[str, Any]:
+        """Register a session (replacing any record with the same id) and create its directory"""
+        self.path(session_id).mkdir(parents=True, exist_ok=True)
+        if session_id not in self.sessions:
+            self.stats['created'] += 1
+        self.sessions[session_id] = record if record is not None else {'id': session_id}
+        self._last_used[session_id] = time.time()
+        self._bytes.setdefault(session_id, 0)
+        if ttl is not None:
+            self._ttl[session_id] = ttl
+        else:
+            self._ttl.pop(session_id, None)
+        return self.sessions[session_id]
+
+    def ensure(self, session_id: str) -> Path:
+        """Directory for a session, registering it if it is unknown or was reaped"""
+        if session_id not in self.sessions:
+            self.create(session_id)
+        path = self.path(session_id)
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def touch(self, session_id: str):
+        if session_id in self.sessions:
+            now = time.time()
+            self._last_used[session_id] = now
+            self.sessions[session_id]['last_activity'] = datetime.fromtimestamp(now).isoformat()
+
+    def record_usage(self, session_id: str) -> int:
+        """Re-measure a session's directory (call after a run writes to it)"""
+        if session_id not in self.sessions:
+            return 0
+        self._bytes[session_id] = _directory_size(self.path(session_id))
+        return self._bytes[session_id]
+
+    @asynccontextmanager
+    async def using(self, session_id: str):
+        """Keep a session from being reaped while a run uses it"""
+        self.path(session_id)  # validate before taking a reference
+        self._busy[session_id] = self._busy.get(session_id, 0) + 1
+        self.touch(session_id)
+        try:
+            yield self.ensure(session_id)
+        finally:
+            self._busy[session_id] -= 1
+            if not self._busy[session_id]:
+                del self._busy[session_id]
+            self.touch(session_id)
+            if session_id in self.sessions:
+                size = await asyncio.to_thread(_directory_size, self.path(session_id))
+                if session_id in self.sessions:  # not closed while it was measured
+                    self._bytes[session_id] = size
+
+    async def close(self, session_id: str, reason: str = 'closed') -> int:
+        """Remove a session and its directory; returns bytes reclaimed"""
+        path = self.path(session_id)
+        if path.parent != self.root:
+            raise ValueError(f"Refusing to remove {path}: not a session directory of {self.root}")
+        if session_id not in self.sessions and not path.exists():
+            return 0
+        self.sessions.pop(session_id, None)
+        self._last_used.pop(session_id, None)
+        self._ttl.pop(session_id, None)
+        self._bytes.pop(session_id, None)
+
+        reclaimed = await asyncio.to_thread(_remove_directory, path)
+        self.stats[reason] += 1
+        self.stats['bytes_reclaimed'] += reclaimed
+
+        for callback in self.on_close:
+            try:
+                outcome = callback(session_id)
+                if inspect.isawaitable(outcome):
+                    await outcome
+            except Exception as e:
+                print(f"⚠️ Session close hook failed for {session_id}: {e}")
+        return reclaimed
+
+    async def reap(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Close expired sessions, then least recently used ones over the count/byte budgets"""
+        now = time.time() if now is None else now
+        idle = [sid for sid in self.sessions if sid not in self._busy]
+
+        expired = [sid for sid in idle
+                   if now - self._last_used.get(sid, now) > self._ttl.get(sid, self.idle_ttl)]
+        reclaimed = 0
+        for session_id in expired:
+            reclaimed += await self.close(session_id, 'expired')
+
+        evicted = 0
+        candidates = sorted((sid for sid in idle if sid in self.sessions), key=lambda sid: self._last_used[sid])
+        for session_id in candidates:
+            if len(self.sessions) <= self.max_sessions and self.bytes_in_use() <= self.max_bytes:
+                break
+            reclaimed += await self.close(session_id, 'evicted')
+            evicted += 1
+
+        return {'expired': len(expired), 'evicted': evicted, 'bytes_reclaimed': reclaimed}
+
+    def bytes_in_use(self) -> int:
+        return sum(self._bytes.values())
+
+    def ensure_reaper(self):
+        """Start the background reaper on the running loop (no-op if it is already running there)"""
+        loop = asyncio.get_running_loop()
+        if self._reaper is not None and not self._reaper.done() and self._reaper.get_loop() is loop:
+            return
+        self._reaper = loop.create_task(self._reap_forever())
+
+    async def _reap_forever(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                await self.reap()
+            except Exception as e:
+                print(f"⚠️ Session reaper error: {e}")
+
+    async def shutdown(self):
+        """Stop the reaper and close every session"""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for session_id in list(self.sessions):
+            await self.close(session_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'sessions_alive': len(self.sessions),
+            'sessions_busy': len(self._busy),
+            'bytes_in_use': self.bytes_in_use(),
+            'max_sessions': self.max_sessions,
+            'max_bytes': self.max_bytes,
+            'root': str(self.root),
+            'tmpfs': self.tmpfs
+        }
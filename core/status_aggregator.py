@@ -0,0 +1,153 @@
+"""
+📊 Status Aggregator - Cached System Status Snapshots
+Combines status sources behind per-source TTL caches and publishes
+versioned snapshots with compact deltas for live dashboards
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+class StatusAggregator:
+    """
+    Cached, versioned view over a set of status sources.
+
+    Each registered source is a zero-argument callable returning a
+    JSON-serializable dict, refreshed at most once per its TTL no matter
+    how many clients poll. A refresh that raises keeps the last good
+    value. Concurrent callers share a single refresh (single flight).
+
+    Every snapshot whose content changed gets a new version number.
+    delta(base_version) returns only the leaf paths that changed since
+    that version, so live clients don't receive the full payload each tick.
+    """
+
+    def __init__(self, ttl: float = 2.0, history: int = 32):
+        self.ttl = ttl
+        self.history = history
+
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self.version = 0
+        self.snapshot_data: Dict[str, Any] = {}
+        self.snapshot_time = 0.0
+
+        # version -> flattened snapshot, for computing deltas
+        self._versions: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'requests': 0,
+            'cache_hits': 0,
+            'source_refreshes': 0,
+            'source_errors': 0,
+            'refresh_time': 0.0
+        }
+
+    def register(self, name: str, source: Callable[[], Dict[str, Any]], ttl: Optional[float] = None):
+        """Add a status source; ttl defaults to the aggregator TTL"""
+        self.sources[name] = {
+            'fn': source,
+            'ttl': self.ttl if ttl is None else ttl,
+            'value': None,
+            'updated': 0.0,
+            'error': None
+        }
+
+    def snapshot(self, force: bool = False) -> Tuple[int, Dict[str, Any]]:
+        """Return (version, data), refreshing expired sources if needed"""
+        self.stats['requests'] += 1
+        now = time.monotonic()
+        if not force and now - self.snapshot_time < self._min_ttl():
+            self.stats['cache_hits'] += 1
+            return self.version, self.snapshot_data
+
+        with self._lock:
+            # Another thread may have refreshed while we waited
+            now = time.monotonic()
+            if not force and now - self.snapshot_time < self._min_ttl():
+                self.stats['cache_hits'] += 1
+                return self.version, self.snapshot_data
+
+            start = time.perf_counter()
+            data = {}
+            for name, source in self.sources.items():
+                if force or source['value'] is None or now - source['updated'] >= source['ttl']:
+                    self._refresh(source, now)
+                data[name] = source['value'] if source['value'] is not None else {}
+                if source['error']:
+                    data[name] = {**data[name], '_error': source['error']}
+            self.stats['refresh_time'] += time.perf_counter() - start
+
+            flat = flatten(data)
+            previous = self._versions.get(self.version)
+            if previous != flat:
+                self.version += 1
+                self._versions[self.version] = flat
+                while len(self._versions) > self.history:
+                    self._versions.popitem(last=False)
+
+            self.snapshot_data = data
+            self.snapshot_time = now
+            return self.version, data
+
+    def delta(self, base_version: int) -> Optional[Dict[str, Any]]:
+        """
+        Changes from base_version to the current snapshot, or None when
+        base_version is no longer retained and the client needs a full
+        snapshot. Returns {'version', 'base', 'set', 'unset'}.
+        """
+        version, _ = self.snapshot()
+        with self._lock:
+            current = self._versions.get(version, {})
+            base = self._versions.get(base_version)
+        if base is None:
+            return None
+
+        changed = {path: value for path, value in current.items() if base.get(path, _MISSING) != value}
+        removed = [path for path in base if path not in current]
+        return {'version': version, 'base': base_version, 'set': changed, 'unset': removed}
+
+    def _refresh(self, source: Dict[str, Any], now: float):
+        try:
+            source['value'] = source['fn']()
+            source['error'] = None
+            self.stats['source_refreshes'] += 1
+        except Exception as e:
+            source['error'] = str(e)
+            self.stats['source_errors'] += 1
+        source['updated'] = now
+
+    def _min_ttl(self) -> float:
+        return min((s['ttl'] for s in self.sources.values()), default=self.ttl)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats['version'] = self.version
+        stats['sources'] = {
+            name: {'ttl': s['ttl'], 'age': round(time.monotonic() - s['updated'], 3), 'error': s['error']}
+            for name, s in self.sources.items()
+        }
+        stats['hit_rate'] = stats['cache_hits'] / stats['requests'] if stats['requests'] else 0.0
+        return stats
+
+_MISSING = object()
+
+def flatten(data: Dict[str, Any], prefix: str = '') -> Dict[str, Any]:
+    """Flatten nested dicts into dotted leaf paths; lists stay leaves"""
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            flat.update(flatten(value, path + '.'))
+        else:
+            flat[path] = value
+    return flat
+
+def apply_delta(flat: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply a delta to a flattened snapshot (the client-side operation)"""
+    result = {path: value for path, value in flat.items() if path not in set(delta['unset'])}
+    result.update(delta['set'])
+    return result
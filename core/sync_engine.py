@@ -19,6 +19,9 @@ except ImportError:
     websockets = None
 import uuid
 
+from .error_recovery import error_recovery, RetryPolicy
+from .load_tracker import load_tracker
+
 class MessageType(Enum):
     TASK_REQUEST = "task_request"
     TASK_RESPONSE = "task_response"
@@ -75,6 +78,12 @@ class SyncEngine:
         self.websocket_server = None
         self.websocket_port = 8765
         
+        # WebSocket sends go through a breaker per agent; a failed send is not
+        # retried in place because the message stays queued for message_processor
+        self.delivery = error_recovery.executor
+        self.delivery_policy = RetryPolicy(max_attempts=1)
+        self.delivery_timeout = 5.0
+        
         # Performance tracking
         self.message_stats = {
             "total_messages": 0,
@@ -176,6 +185,7 @@ class SyncEngine:
             
             # Initialize agent state
             self.agent_states[agent_id] = "idle"
+            load_tracker.set_state(agent_id, "idle")
             
             print(f"✅ Agent {agent_id} registered with sync engine")
             
@@ -206,6 +216,7 @@ class SyncEngine:
             
             if agent_id in self.agent_states:
                 del self.agent_states[agent_id]
+            load_tracker.set_state(agent_id, None)
             
             # Broadcast agent unregistration
             self.broadcast_message(
@@ -240,11 +251,10 @@ class SyncEngine:
             # Try immediate delivery via WebSocket
             if message.to_agent in self.agent_connections:
                 try:
-                    websocket = self.agent_connections[message.to_agent]
-                    await websocket.send(json.dumps({
+                    await self._deliver(message.to_agent, {
                         "type": "new_message",
                         "message": asdict(message)
-                    }, default=str))
+                    })
                 except Exception as e:
                     print(f"WebSocket delivery failed: {e}")
             
@@ -262,6 +272,12 @@ class SyncEngine:
             self.message_stats["failed_deliveries"] += 1
             return False
     
+    async def _deliver(self, agent_id: str, payload: Dict):
+        """Send over the agent's WebSocket; fails fast while its breaker is open"""
+        websocket = self.agent_connections[agent_id]
+        await self.delivery.call("sync_engine", agent_id, websocket.send, json.dumps(payload, default=str),
+                                 policy=self.delivery_policy, timeout=self.delivery_timeout)
+    
     def get_messages(self, agent_id: str, limit: int = 10) -> List[Message]:
         """Get pending messages for an agent"""
         if agent_id not in self.message_queues:
@@ -358,6 +374,7 @@ class SyncEngine:
         """Update agent state"""
         if agent_id in self.registered_agents:
             self.agent_states[agent_id] = new_state
+            load_tracker.set_state(agent_id, new_state)
             self.registered_agents[agent_id]["last_state_update"] = datetime.now().isoformat()
             
             # Broadcast state change
@@ -377,15 +394,16 @@ class SyncEngine:
             try:
                 # Process failed deliveries
                 for agent_id, messages in self.message_queues.items():
-                    if messages and agent_id in self.agent_connections:
+                    # Agents whose breaker is open keep their queue until it half-opens
+                    if (messages and agent_id in self.agent_connections
+                            and self.delivery.is_available("sync_engine", agent_id)):
                         # Try to deliver pending messages
                         for message in messages[:5]:  # Process up to 5 messages per cycle
                             try:
-                                websocket = self.agent_connections[agent_id]
-                                await websocket.send(json.dumps({
+                                await self._deliver(agent_id, {
                                     "type": "pending_message",
                                     "message": asdict(message)
-                                }, default=str))
+                                })
                                 
                                 # Remove delivered message
                                 self.message_queues[agent_id].remove(message)
@@ -506,7 +524,11 @@ class SyncEngine:
             "message_stats": self.message_stats,
             "total_queued_messages": sum(len(queue) for queue in self.message_queues.values()),
             "pending_responses": len(self.pending_responses),
-            "websocket_port": self.websocket_port
+            "websocket_port": self.websocket_port,
+            "open_delivery_circuits": [
+                key for key, view in self.delivery.snapshot().items()
+                if key.startswith("sync_engine/") and view["state"] != "closed"
+            ]
         }
     
     def get_agent_list(self) -> List[Dict]:
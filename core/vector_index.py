@@ -0,0 +1,569 @@
+"""
+🧭 Vector Index - Approximate Nearest-Neighbour Retrieval
+Local embeddings and an IVF index shared by knowledge and memory search
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class HashedNgramEmbedder:
+    """
+    Local, dependency-free text embedder.
+
+    Words and their character n-grams are hashed into a fixed number of
+    signed buckets (the "hashing trick"), weighted with sublinear term
+    frequency and L2-normalised, so cosine similarity is a plain dot product.
+    crc32 is used instead of hash() so vectors are stable across processes
+    and can be persisted; per-word buckets are cached.
+    """
+
+    def __init__(self, dim: int = 384, ngram_range: Tuple[int, int] = (3, 4),
+                 word_weight: float = 2.0, cache_size: int = 50000):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.word_weight = word_weight
+        self.cache_size = cache_size
+        self._word_cache: Dict[str, Tuple["np.ndarray", "np.ndarray"]] = {}
+
+    def _word_features(self, word: str) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Bucket indices and signed weights for one word (cached)"""
+        cached = self._word_cache.get(word)
+        if cached is not None:
+            return cached
+
+        features = ["w:" + word]
+        padded = f" {word} "
+        min_n, max_n = self.ngram_range
+        for n in range(min_n, max_n + 1):
+            features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+        hashes = [zlib.crc32(feature.encode("utf-8")) for feature in features]
+        indices = np.fromiter((h % self.dim for h in hashes), dtype=np.int64, count=len(hashes))
+        weights = np.fromiter((1.0 if h & 0x80000000 else -1.0 for h in hashes),
+                              dtype=np.float32, count=len(hashes))
+        weights[0] *= self.word_weight
+
+        if len(self._word_cache) >= self.cache_size:
+            self._word_cache.clear()
+        self._word_cache[word] = (indices, weights)
+        return indices, weights
+
+    def embed(self, text: str) -> "np.ndarray":
+        """Embed a single text into a unit-length float32 vector"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = Counter(_TOKEN_PATTERN.findall((text or "").lower()))
+        if words:
+            parts = [self._word_features(word) for word in words]
+            indices = np.concatenate([p[0] for p in parts])
+            scale = np.repeat(
+                np.fromiter((1.0 + math.log(c) for c in words.values()), dtype=np.float32, count=len(words)),
+                [len(p[0]) for p in parts],
+            )
+            np.add.at(vector, indices, np.concatenate([p[1] for p in parts]) * scale)
+
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def embed_batch(self, texts: Iterable[str]) -> "np.ndarray":
+        """Embed several texts into a (n, dim) matrix"""
+        rows = [self.embed(text) for text in texts]
+        if not rows:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack(rows)
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index over unit vectors.
+
+    - Below ``min_train_size`` live vectors the index does exact search
+    - Once large enough, spherical k-means partitions vectors into
+      ``sqrt(n)`` lists and queries only scan the ``n_probe`` closest lists
+    - Inserts are assigned to their nearest list incrementally; the
+      partitioning is retrained when the index grows ``retrain_factor``-fold
+    - Deletes are tombstones, compacted once they exceed ``compact_ratio``
+    """
+
+    def __init__(self, dim: int, n_probe: int = 8, min_train_size: int = 1024,
+                 retrain_factor: float = 4.0, compact_ratio: float = 0.3,
+                 max_lists: int = 1024, kmeans_iterations: int = 10):
+        if np is None:
+            raise ImportError("numpy is required for IVFIndex")
+
+        self.dim = dim
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size
+        self.retrain_factor = retrain_factor
+        self.compact_ratio = compact_ratio
+        self.max_lists = max_lists
+        self.kmeans_iterations = kmeans_iterations
+        self.lock = threading.RLock()
+
+        # Row storage
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._ids: List[Optional[str]] = []
+        self._row_of: Dict[str, int] = {}
+        self._size = 0
+        self._deleted = 0
+
+        # Partitioning
+        self._centroids = None
+        self._lists: List[List[int]] = []
+        self._list_arrays: Dict[int, "np.ndarray"] = {}
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._row_of
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    def ids(self) -> List[str]:
+        """Return ids of all live vectors"""
+        return list(self._row_of.keys())
+
+    def add(self, item_id: str, vector: "np.ndarray"):
+        """Insert or replace a vector"""
+        vector = np.asarray(vector, dtype=np.float32).reshape(self.dim)
+
+        with self.lock:
+            if item_id in self._row_of:
+                self._remove_row(self._row_of.pop(item_id))
+
+            row = self._append_row(item_id, vector)
+            if self.is_trained:
+                list_id = int(np.argmax(self._centroids @ vector))
+                self._assign[row] = list_id
+                self._lists[list_id].append(row)
+                self._list_arrays.pop(list_id, None)
+
+            self._maybe_train()
+
+    def add_batch(self, item_ids: List[str], vectors: "np.ndarray"):
+        """Insert several vectors, training once at the end"""
+        with self.lock:
+            trained = self.is_trained
+            for item_id, vector in zip(item_ids, vectors):
+                if item_id in self._row_of:
+                    self._remove_row(self._row_of.pop(item_id))
+                self._append_row(item_id, np.asarray(vector, dtype=np.float32))
+            if trained:
+                self._train()
+            else:
+                self._maybe_train()
+
+    def remove(self, item_id: str) -> bool:
+        """Delete a vector by id"""
+        with self.lock:
+            row = self._row_of.pop(item_id, None)
+            if row is None:
+                return False
+            self._remove_row(row)
+            if self._deleted > self.compact_ratio * max(self._size, 1):
+                self._compact()
+            return True
+
+    def search(self, vector: "np.ndarray", k: int = 10, n_probe: int = None,
+               filter_fn: Callable[[str], bool] = None) -> List[Tuple[str, float]]:
+        """
+        Return up to ``k`` (id, cosine similarity) pairs, best first.
+
+        When ``filter_fn`` rejects too many candidates the probe set is
+        widened until ``k`` results are found or every list was scanned.
+        """
+        vector = np.asarray(vector, dtype=np.float32).reshape(self.dim)
+
+        with self.lock:
+            if not self._row_of or k <= 0:
+                return []
+
+            if not self.is_trained:
+                return self._score_rows(self._live_rows(), vector, k, filter_fn)
+
+            probes = min(n_probe or self.n_probe, len(self._lists))
+            order = np.argsort(-(self._centroids @ vector))
+            while True:
+                rows = self._rows_for_lists(order[:probes])
+                results = self._score_rows(rows, vector, k, filter_fn)
+                if len(results) >= k or probes >= len(self._lists):
+                    return results
+                probes = min(probes * 2, len(self._lists))
+
+    def get_vectors(self, item_ids: List[str]) -> Optional["np.ndarray"]:
+        """Stored vectors for ``item_ids`` (None if any id is unknown)"""
+        with self.lock:
+            rows = [self._row_of.get(item_id) for item_id in item_ids]
+            if any(row is None for row in rows):
+                return None
+            return self._vectors[rows].copy()
+
+    def stats(self) -> Dict[str, Any]:
+        """Index shape and health"""
+        return {
+            "vectors": len(self._row_of),
+            "tombstones": self._deleted,
+            "dim": self.dim,
+            "trained": self.is_trained,
+            "lists": len(self._lists),
+            "n_probe": self.n_probe,
+        }
+
+    def save(self, path: str):
+        """Persist the index atomically to ``path`` (.npz)"""
+        with self.lock:
+            self._compact()
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            meta = {
+                "dim": self.dim,
+                "n_probe": self.n_probe,
+                "min_train_size": self.min_train_size,
+                "retrain_factor": self.retrain_factor,
+                "trained_size": self._trained_size,
+            }
+            tmp_path = path.with_name(path.name + ".tmp")
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    vectors=self._vectors[:self._size],
+                    ids=np.array(self._ids[:self._size], dtype=str),
+                    assign=self._assign[:self._size],
+                    centroids=(self._centroids if self.is_trained
+                               else np.zeros((0, self.dim), dtype=np.float32)),
+                    meta=np.array(json.dumps(meta)),
+                )
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Load an index written by :meth:`save`"""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            index = cls(
+                dim=meta["dim"],
+                n_probe=meta["n_probe"],
+                min_train_size=meta["min_train_size"],
+                retrain_factor=meta["retrain_factor"],
+            )
+            vectors = data["vectors"].astype(np.float32)
+            ids = [str(i) for i in data["ids"]]
+            centroids = data["centroids"]
+
+            index._vectors = vectors.copy()
+            index._alive = np.ones(len(ids), dtype=bool)
+            index._assign = data["assign"].astype(np.int32)
+            index._ids = ids
+            index._row_of = {item_id: row for row, item_id in enumerate(ids)}
+            index._size = len(ids)
+            index._trained_size = meta.get("trained_size", 0)
+
+            if len(centroids):
+                index._centroids = centroids.astype(np.float32)
+                index._lists = [[] for _ in range(len(centroids))]
+                for row, list_id in enumerate(index._assign.tolist()):
+                    if list_id >= 0:
+                        index._lists[list_id].append(row)
+
+        return index
+
+    # Internal helpers
+
+    def _append_row(self, item_id: str, vector: "np.ndarray") -> int:
+        if self._size == len(self._vectors):
+            capacity = max(64, len(self._vectors) * 2)
+            self._vectors = self._grow(self._vectors, capacity)
+            self._alive = self._grow(self._alive, capacity)
+            self._assign = self._grow(self._assign, capacity)
+            self._ids.extend([None] * (capacity - len(self._ids)))
+
+        row = self._size
+        self._vectors[row] = vector
+        self._alive[row] = True
+        self._assign[row] = -1
+        self._ids[row] = item_id
+        self._row_of[item_id] = row
+        self._size += 1
+        return row
+
+    @staticmethod
+    def _grow(array: "np.ndarray", capacity: int) -> "np.ndarray":
+        grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def _remove_row(self, row: int):
+        self._alive[row] = False
+        self._deleted += 1
+
+    def _live_rows(self) -> "np.ndarray":
+        return np.flatnonzero(self._alive[:self._size])
+
+    def _rows_for_lists(self, list_ids) -> "np.ndarray":
+        arrays = []
+        for list_id in list_ids:
+            list_id = int(list_id)
+            array = self._list_arrays.get(list_id)
+            if array is None:
+                array = np.asarray(self._lists[list_id], dtype=np.int64)
+                self._list_arrays[list_id] = array
+            arrays.append(array)
+        rows = np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.int64)
+        return rows[self._alive[rows]]
+
+    def _score_rows(self, rows: "np.ndarray", vector: "np.ndarray", k: int,
+                    filter_fn: Optional[Callable[[str], bool]]) -> List[Tuple[str, float]]:
+        if filter_fn is not None and len(rows):
+            keep = np.fromiter((filter_fn(self._ids[r]) for r in rows), dtype=bool, count=len(rows))
+            rows = rows[keep]
+        if not len(rows):
+            return []
+
+        scores = self._vectors[rows] @ vector
+        if len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-scores[top])]
+        return [(self._ids[rows[i]], float(scores[i])) for i in top]
+
+    def _maybe_train(self):
+        live = len(self._row_of)
+        if live < self.min_train_size:
+            return
+        if not self.is_trained or live >= self._trained_size * self.retrain_factor:
+            self._train()
+
+    def _train(self):
+        """Spherical k-means over the live vectors"""
+        rows = self._live_rows()
+        if len(rows) < self.min_train_size:
+            self._centroids = None
+            self._lists = []
+            self._list_arrays = {}
+            self._assign[:self._size] = -1
+            return
+
+        n_lists = max(1, min(self.max_lists, int(math.sqrt(len(rows)))))
+        rng = np.random.default_rng(len(rows))
+        sample_size = min(len(rows), n_lists * 64)
+        sample = self._vectors[rng.choice(rows, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+        for _ in range(self.kmeans_iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1)
+            empty = norms == 0
+            if empty.any():
+                # Re-seed empty lists so every partition stays useful
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+                norms[empty] = np.linalg.norm(sums[empty], axis=1)
+            centroids = sums / norms[:, None]
+
+        self._centroids = centroids.astype(np.float32)
+        self._assign[:self._size] = -1
+        labels = np.argmax(self._vectors[rows] @ self._centroids.T, axis=1)
+        self._assign[rows] = labels
+        self._lists = [[] for _ in range(n_lists)]
+        for row, label in zip(rows.tolist(), labels.tolist()):
+            self._lists[label].append(row)
+        self._list_arrays = {}
+        self._trained_size = len(rows)
+
+    def _compact(self):
+        """Drop tombstoned rows and renumber the remaining ones"""
+        if not self._deleted:
+            return
+        rows = self._live_rows()
+        self._vectors = self._vectors[rows].copy()
+        self._alive = np.ones(len(rows), dtype=bool)
+        self._assign = self._assign[rows].copy()
+        self._ids = [self._ids[r] for r in rows]
+        self._row_of = {item_id: row for row, item_id in enumerate(self._ids)}
+        self._size = len(rows)
+        self._deleted = 0
+
+        if self.is_trained:
+            self._lists = [[] for _ in range(len(self._centroids))]
+            for row, list_id in enumerate(self._assign.tolist()):
+                if list_id >= 0:
+                    self._lists[list_id].append(row)
+            self._list_arrays = {}
+
+
+class SemanticIndex:
+    """
+    Text-level API over an embedder and an IVF index.
+
+    This is the single retrieval surface used by the knowledge agent and the
+    agent memory manager: add/remove items by id, query by text and persist
+    to disk. Persistence is batched (``autosave_every`` mutations) because
+    callers keep their own source of truth and reconcile on startup.
+    """
+
+    def __init__(self, name: str, path: str = None, embedder=None,
+                 autosave_every: int = 100, **index_options):
+        if np is None:
+            raise ImportError("numpy is required for SemanticIndex")
+
+        self.name = name
+        self.path = Path(path) if path else Path("data/vectors") / f"{name}.npz"
+        self.embedder = embedder or HashedNgramEmbedder()
+        self.autosave_every = autosave_every
+        self._dirty = 0
+
+        self.index = None
+        if self.path.exists():
+            try:
+                self.index = IVFIndex.load(str(self.path))
+                if self.index.dim != self.embedder.dim:
+                    print(f"⚠️ Vector index {name} has dim {self.index.dim}, "
+                          f"embedder has {self.embedder.dim}; rebuilding")
+                    self.index = None
+            except Exception as e:
+                print(f"⚠️ Could not load vector index {name}: {e}")
+                self.index = None
+        if self.index is None:
+            self.index = IVFIndex(self.embedder.dim, **index_options)
+
+        self.query_stats = {"queries": 0, "total_time": 0.0}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self.index
+
+    def embed(self, text: str) -> "np.ndarray":
+        return self.embedder.embed(text)
+
+    def add(self, item_id: str, text: str = None, vector: "np.ndarray" = None) -> "np.ndarray":
+        """Index an item by text (or a precomputed vector); returns the vector"""
+        if vector is None:
+            vector = self.embed(text or "")
+        self.index.add(item_id, vector)
+        self._mark_dirty()
+        return vector
+
+    def remove(self, item_id: str) -> bool:
+        removed = self.index.remove(item_id)
+        if removed:
+            self._mark_dirty()
+        return removed
+
+    def get_vectors(self, item_ids: List[str]) -> Optional["np.ndarray"]:
+        return self.index.get_vectors(item_ids)
+
+    def search(self, query: str, k: int = 10, filter_fn: Callable[[str], bool] = None,
+               min_score: float = None) -> List[Tuple[str, float]]:
+        """Return up to ``k`` (item_id, similarity) pairs for a text query"""
+        start = time.perf_counter()
+        results = self.index.search(self.embed(query), k=k, filter_fn=filter_fn)
+        if min_score is not None:
+            results = [(item_id, score) for item_id, score in results if score >= min_score]
+
+        self.query_stats["queries"] += 1
+        self.query_stats["total_time"] += time.perf_counter() - start
+        return results
+
+    def reconcile(self, items: Dict[str, Any], text_fn: Callable[[Any], str] = None,
+                  vector_fn: Callable[[Any], Optional["np.ndarray"]] = None) -> Dict[str, int]:
+        """
+        Bring the index in line with the caller's source of truth.
+
+        ``items`` maps id -> record; missing ids are embedded (or take their
+        stored vector from ``vector_fn``) and ids no longer present are dropped.
+        """
+        stale = [item_id for item_id in self.index.ids() if item_id not in items]
+        for item_id in stale:
+            self.index.remove(item_id)
+
+        missing = [item_id for item_id in items if item_id not in self.index]
+        if missing:
+            vectors = []
+            for item_id in missing:
+                vector = vector_fn(items[item_id]) if vector_fn else None
+                if vector is None or len(vector) != self.embedder.dim:
+                    vector = self.embed(text_fn(items[item_id]) if text_fn else str(items[item_id]))
+                vectors.append(vector)
+            self.index.add_batch(missing, np.vstack(vectors))
+
+        if stale or missing:
+            self.save()
+        return {"added": len(missing), "removed": len(stale)}
+
+    def save(self):
+        try:
+            self.index.save(str(self.path))
+            self._dirty = 0
+        except Exception as e:
+            print(f"Error saving vector index {self.name}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        queries = self.query_stats["queries"]
+        return {
+            "name": self.name,
+            "path": str(self.path),
+            **self.index.stats(),
+            "queries": queries,
+            "avg_query_ms": round(self.query_stats["total_time"] / queries * 1000, 3) if queries else 0.0,
+            "unsaved_changes": self._dirty,
+        }
+
+    def _mark_dirty(self):
+        self._dirty += 1
+        if self._dirty >= self.autosave_every:
+            self.save()
+
+
+_semantic_indexes: Dict[str, SemanticIndex] = {}
+_semantic_indexes_lock = threading.Lock()
+
+
+def get_semantic_index(name: str, path: str = None, **options) -> Optional[SemanticIndex]:
+    """
+    Get (or lazily create) the shared semantic index stored at ``path``
+    (default ``data/vectors/<name>.npz``).
+
+    Returns None when numpy is unavailable so callers can fall back to
+    their keyword search.
+    """
+    if np is None:
+        return None
+
+    path = Path(path) if path else Path("data/vectors") / f"{name}.npz"
+    key = str(path.resolve())
+    with _semantic_indexes_lock:
+        if key not in _semantic_indexes:
+            _semantic_indexes[key] = SemanticIndex(name, path=str(path), **options)
+        return _semantic_indexes[key]
+
+
+__all__ = ['HashedNgramEmbedder', 'IVFIndex', 'SemanticIndex', 'get_semantic_index']
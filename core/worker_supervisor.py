@@ -0,0 +1,505 @@
+"""
+⚖️ Worker Supervisor - Autoscaled Agent Worker Processes
+Runs agents in pools of worker processes fed from a shared task queue and
+scales each pool on queue depth and latency SLOs
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import asyncio
+import atexit
+import importlib
+import inspect
+import itertools
+import math
+import multiprocessing
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Workers of a pool that fail to load their agent this many times in a row
+# are not respawned; the pool is marked broken and callers run in-process
+MAX_LOAD_FAILURES = 3
+
+def _pack(success: bool, value: Any) -> bytes:
+    """Pickle a task outcome; an unpicklable result becomes an error outcome"""
+    try:
+        return pickle.dumps((success, value))
+    except Exception as e:
+        return pickle.dumps((False, f"Result could not be sent back: {type(e).__name__}: {e}"))
+
+def _worker_main(agent_type: str, module: str, attribute: str, tasks, results):
+    """
+    Worker process loop: import the agent once, then run tasks until a None
+    sentinel arrives. Each task is reported as started and then finished so
+    the supervisor can fail the task of a worker that dies mid-way. Tasks
+    and outcomes travel pickled by hand: the queue's feeder thread would
+    drop an unpicklable object silently and leave its caller waiting.
+    """
+    pid = os.getpid()
+    try:
+        agent = getattr(importlib.import_module(module), attribute)
+    except Exception as e:
+        results.put(("dead", None, pid, (agent_type, f"{type(e).__name__}: {e}")))
+        sys.exit(1)
+
+    loop = asyncio.new_event_loop()
+    while True:
+        item = tasks.get()
+        if item is None:
+            break
+        task_id, method, blob = item
+        results.put(("started", task_id, pid, None))
+        try:
+            task = pickle.loads(blob)
+            handler = getattr(agent, method, None) or getattr(agent, "process_task", agent)
+            result = handler(task)
+            if inspect.isawaitable(result):
+                result = loop.run_until_complete(result)
+            outcome = _pack(True, result)
+        except Exception as e:
+            outcome = _pack(False, f"{type(e).__name__}: {e}")
+        results.put(("done", task_id, pid, outcome))
+    loop.close()
+
+@dataclass
+class ScalingPolicy:
+    """
+    When a pool grows or shrinks. Backlog is outstanding tasks per worker;
+    latency is submit-to-result p95 over recent tasks. Scale-up and
+    scale-down thresholds are far apart (hysteresis), scale-down also needs
+    the pool to have been quiet for a whole down cool-down.
+    """
+    min_workers: int = 1
+    max_workers: int = max(2, os.cpu_count() or 2)
+    latency_slo: float = 5.0  # seconds, p95
+    scale_up_backlog: float = 2.0
+    scale_down_backlog: float = 0.5
+    target_backlog: float = 1.0  # backlog a scale-up aims for
+    up_cooldown: float = 10.0  # seconds since the last scaling event
+    down_cooldown: float = 60.0
+    latency_window: int = 200  # completed tasks considered for p95
+    throughput_window: float = 30.0  # seconds measured before/after a scaling event
+
+@dataclass
+class _WorkerPool:
+    agent_type: str
+    module: str
+    attribute: str
+    policy: ScalingPolicy
+    tasks: Any
+    workers: Dict[int, Any] = field(default_factory=dict)  # pid -> Process
+    retiring: int = 0  # sentinels queued but not yet consumed
+    running: Dict[int, int] = field(default_factory=dict)  # pid -> task_id in progress
+    submitted: int = 0
+    finished: int = 0
+    failed: int = 0
+    latencies: Deque[Tuple[float, float]] = field(default_factory=deque)  # (finished_at, latency), latest latency_window
+    completions: Deque[float] = field(default_factory=lambda: deque(maxlen=10000))
+    last_scaled: float = 0.0
+    busy_at: float = field(default_factory=time.monotonic)  # last time scale-down was not warranted
+    crashes: int = 0
+    load_failures: int = 0  # consecutive workers that could not import the agent
+    broken: Optional[str] = None  # why the pool stopped respawning workers
+
+class WorkerSupervisor:
+    """
+    Process-level worker pools for agents.
+
+    start_pool() launches min_workers processes for an agent type; each
+    imports the agent (the module-level instance from agents/) and pulls
+    tasks from the pool's queue. submit() returns a concurrent Future that
+    a collector thread resolves when the result comes back; run() awaits it
+    for at most default_timeout seconds unless given its own timeout.
+
+    autoscale() evaluates every pool against its ScalingPolicy and adds or
+    retires workers; retiring is graceful (a sentinel is queued, so the
+    worker finishes what it is doing first). Dead workers are reaped and
+    replaced, failing the task they were running, unless MAX_LOAD_FAILURES
+    workers in a row could not import the agent: the pool is then broken,
+    its tasks fail and routes() sends callers back to in-process agents.
+    Every scaling decision
+    is recorded with the throughput (tasks/s) before it, and the
+    throughput after it is filled in once throughput_window has passed.
+    """
+
+    def __init__(self, start_method: str = "spawn", default_timeout: float = 300.0):
+        self.start_method = start_method
+        self.default_timeout = default_timeout
+        self.pools: Dict[str, _WorkerPool] = {}
+        self.scaling_events: Deque[Dict[str, Any]] = deque(maxlen=500)
+
+        self._context = multiprocessing.get_context(start_method)
+        self._results = None
+        self._collector: Optional[threading.Thread] = None
+        self._futures: Dict[int, Tuple[str, Future, float]] = {}
+        self._task_ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._autoscaler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # Pools
+
+    def start_pool(self, agent_type: str, module: str = None, attribute: str = None,
+                   policy: ScalingPolicy = None) -> Dict[str, Any]:
+        """Start a pool for agent_type; module/attribute default to its agents/ registry entry"""
+        with self._lock:
+            if agent_type in self.pools:
+                return self.get_pool_status(agent_type)
+
+            if module is None:
+                module, attribute = self._resolve(agent_type)
+            policy = policy or ScalingPolicy()
+
+            self._ensure_collector()
+            pool = _WorkerPool(agent_type, module, attribute, policy, self._context.Queue(),
+                               latencies=deque(maxlen=policy.latency_window))
+            self.pools[agent_type] = pool
+            self._spawn(pool, policy.min_workers)
+            print(f"⚖️ Worker pool {agent_type} started with {policy.min_workers} worker(s)")
+            return self.get_pool_status(agent_type)
+
+    @staticmethod
+    def _resolve(agent_type: str) -> Tuple[str, str]:
+        import importlib.util
+        from agents import AGENTS_REGISTRY
+
+        if agent_type not in AGENTS_REGISTRY.specs:
+            raise KeyError(f"Unknown agent type: {agent_type}")
+        module, attribute = AGENTS_REGISTRY.specs[agent_type]
+        return importlib.util.resolve_name(module, AGENTS_REGISTRY.package), attribute
+
+    def _ensure_collector(self):
+        if self._collector is None:
+            self._results = self._context.Queue()
+            self._collector = threading.Thread(target=self._collect, name="worker-supervisor-results", daemon=True)
+            self._collector.start()
+            atexit.register(self.shutdown)
+
+    def _spawn(self, pool: _WorkerPool, count: int):
+        for _ in range(count):
+            process = self._context.Process(
+                target=_worker_main,
+                args=(pool.agent_type, pool.module, pool.attribute, pool.tasks, self._results),
+                name=f"worker-{pool.agent_type}",
+                daemon=True
+            )
+            process.start()
+            pool.workers[process.pid] = process
+
+    def _retire(self, pool: _WorkerPool, count: int):
+        for _ in range(count):
+            pool.tasks.put(None)
+            pool.retiring += 1
+
+    def stop_pool(self, agent_type: str, timeout: float = 10.0):
+        with self._lock:
+            pool = self.pools.pop(agent_type, None)
+        if pool is None:
+            return
+        self._retire(pool, len(pool.workers))
+        deadline = time.monotonic() + timeout
+        for process in pool.workers.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+                process.join(1)
+        with self._lock:
+            for task_id, entry in list(self._futures.items()):
+                if entry[0] == agent_type:
+                    self._fail_task(task_id, f"Worker pool {agent_type} stopped")
+
+    def shutdown(self):
+        for agent_type in list(self.pools):
+            self.stop_pool(agent_type)
+        self._stop.set()
+        if self._collector is not None:
+            self._results.put(None)
+            self._collector.join(timeout=5)
+            self._collector = None
+
+    # Tasks
+
+    def routes(self, agent_type: str) -> bool:
+        """Whether agent_type tasks should go to its worker pool (one is running and not broken)"""
+        pool = self.pools.get(agent_type)
+        return pool is not None and pool.broken is None
+
+    def submit(self, agent_type: str, task: Any, method: str = "process_task") -> Future:
+        """
+        Queue task for the agent_type pool; the Future resolves to the
+        agent's result. method names the agent method to call (falling back
+        to process_task when the agent has no such method).
+        """
+        blob = pickle.dumps(task)  # fails here, not silently in the queue's feeder thread
+        future = Future()
+        with self._lock:
+            pool = self.pools.get(agent_type)
+            if pool is None:
+                raise KeyError(f"No worker pool for {agent_type}")
+            if pool.broken is not None:
+                raise RuntimeError(f"Worker pool {agent_type} is broken: {pool.broken}")
+            task_id = next(self._task_ids)
+            self._futures[task_id] = (agent_type, future, time.monotonic())
+            pool.submitted += 1
+        pool.tasks.put((task_id, method, blob))
+        return future
+
+    async def run(self, agent_type: str, task: Any, method: str = "process_task",
+                  timeout: Optional[float] = None) -> Any:
+        """
+        submit() for async callers. Raises asyncio.TimeoutError after
+        timeout seconds (default_timeout when None); a timed out or
+        cancelled task stops counting as outstanding, and its result is
+        discarded should the worker still finish it.
+        """
+        future = self.submit(agent_type, task, method)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future),
+                                          self.default_timeout if timeout is None else timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self._abandon(future)
+            raise
+
+    def _abandon(self, future: Future):
+        """Stop waiting for the task behind future"""
+        with self._lock:
+            for task_id, entry in list(self._futures.items()):
+                if entry[1] is future:
+                    self._fail_task(task_id, f"Task for {entry[0]} was abandoned")
+                    return
+
+    def _collect(self):
+        while True:
+            try:
+                message = self._results.get()
+            except (EOFError, OSError):
+                return  # queue closed at interpreter exit
+            if message is None:
+                return
+            kind, task_id, pid, payload = message
+            with self._lock:
+                if kind == "started":
+                    entry = self._futures.get(task_id)
+                    pool = self.pools.get(entry[0]) if entry else None
+                    if pool is not None:
+                        pool.running[pid] = task_id
+                        pool.load_failures = 0
+                elif kind == "done":
+                    try:
+                        success, value = pickle.loads(payload)
+                    except Exception as e:
+                        success, value = False, f"Result could not be read: {type(e).__name__}: {e}"
+                    self._finish(task_id, pid, success, value)
+                elif kind == "dead":
+                    agent_type, error = payload
+                    print(f"⚠️ Worker {pid} could not load its agent: {error}")
+                    pool = self.pools.get(agent_type)
+                    if pool is not None:
+                        pool.load_failures += 1
+                        if pool.load_failures >= MAX_LOAD_FAILURES and pool.broken is None:
+                            self._break(pool, error)
+
+    def _finish(self, task_id: int, pid: int, success: bool, value: Any):
+        entry = self._futures.pop(task_id, None)
+        if entry is None:
+            # Abandoned or failed already; the worker is free again
+            for pool in self.pools.values():
+                if pool.running.get(pid) == task_id:
+                    del pool.running[pid]
+            return
+        agent_type, future, submitted_at = entry
+        pool = self.pools.get(agent_type)
+        now = time.monotonic()
+        if pool is not None:
+            pool.running.pop(pid, None)
+            pool.finished += 1
+            pool.completions.append(now)
+            pool.latencies.append((now, now - submitted_at))
+            if not success:
+                pool.failed += 1
+        if future.done():
+            return  # cancelled by the caller
+        if success:
+            future.set_result(value)
+        else:
+            future.set_exception(RuntimeError(value))
+
+    def _fail_task(self, task_id: int, reason: str):
+        entry = self._futures.pop(task_id, None)
+        if entry is not None:
+            pool = self.pools.get(entry[0])
+            if pool is not None:
+                pool.finished += 1
+                pool.failed += 1
+            if not entry[1].done():
+                entry[1].set_exception(RuntimeError(reason))
+
+    def _break(self, pool: _WorkerPool, reason: str):
+        """Stop respawning a pool whose workers can't load the agent; fail its queued tasks"""
+        pool.broken = reason
+        print(f"💀 Worker pool {pool.agent_type} stopped after {pool.load_failures} failed starts: {reason}")
+        for task_id, entry in list(self._futures.items()):
+            if entry[0] == pool.agent_type:
+                self._fail_task(task_id, f"Worker pool {pool.agent_type} is broken: {reason}")
+
+    # Scaling
+
+    def _reap(self, pool: _WorkerPool):
+        """Forget exited workers; replace crashed ones and fail their current task"""
+        for pid, process in list(pool.workers.items()):
+            if process.is_alive():
+                continue
+            del pool.workers[pid]
+            task_id = pool.running.pop(pid, None)
+            if process.exitcode == 0 and pool.retiring > 0:
+                pool.retiring -= 1
+                continue
+            pool.crashes += 1
+            if task_id is not None:
+                self._fail_task(task_id, f"Worker {pid} for {pool.agent_type} exited with code {process.exitcode}")
+            if pool.broken is not None:
+                continue
+            print(f"⚠️ Worker {pid} for {pool.agent_type} exited ({process.exitcode}), replacing it")
+            self._spawn(pool, 1)
+
+    def _p95(self, pool: _WorkerPool) -> Optional[float]:
+        if not pool.latencies:
+            return None
+        ordered = sorted(latency for _, latency in pool.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def _throughput(self, pool: _WorkerPool, start: float, end: float) -> float:
+        """Completed tasks per second in [start, end)"""
+        count = sum(1 for finished in pool.completions if start <= finished < end)
+        return count / max(end - start, 1e-9)
+
+    def evaluate(self, agent_type: str, now: float = None) -> Optional[Dict[str, Any]]:
+        """Scale one pool if its policy calls for it; returns the scaling event, if any"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            pool = self.pools[agent_type]
+            policy = pool.policy
+            self._reap(pool)
+            self._settle_events(pool, now)
+            if pool.broken is not None:
+                return None
+
+            workers = len(pool.workers) - pool.retiring
+            outstanding = pool.submitted - pool.finished
+            backlog = outstanding / max(workers, 1)
+            p95 = self._p95(pool)
+
+            wants_up = backlog > policy.scale_up_backlog or (p95 is not None and p95 > policy.latency_slo)
+            wants_down = backlog < policy.scale_down_backlog and (p95 is None or p95 < policy.latency_slo / 2)
+            if not wants_down:
+                pool.busy_at = now
+
+            target = workers
+            if wants_up and workers < policy.max_workers and now - pool.last_scaled >= policy.up_cooldown:
+                target = min(policy.max_workers, max(workers + 1, math.ceil(outstanding / policy.target_backlog)))
+                reason = (f"backlog {backlog:.1f}/worker" if backlog > policy.scale_up_backlog
+                          else f"p95 {p95:.2f}s over {policy.latency_slo:.2f}s SLO")
+            elif (wants_down and workers > policy.min_workers and now - pool.last_scaled >= policy.down_cooldown
+                  and now - pool.busy_at >= policy.down_cooldown):
+                target = workers - 1
+                reason = f"idle: backlog {backlog:.1f}/worker"
+
+            if target == workers:
+                return None
+
+            if target > workers:
+                self._spawn(pool, target - workers)
+            else:
+                self._retire(pool, workers - target)
+            pool.last_scaled = now
+
+            event = {
+                "timestamp": datetime.now().isoformat(),
+                "agent_type": agent_type,
+                "from_workers": workers,
+                "to_workers": target,
+                "reason": reason,
+                "backlog": round(backlog, 2),
+                "p95_latency": round(p95, 4) if p95 is not None else None,
+                "throughput_before": round(self._throughput(pool, now - policy.throughput_window, now), 3),
+                "throughput_after": None,
+                "_at": now
+            }
+            self.scaling_events.append(event)
+            arrow = "📈" if target > workers else "📉"
+            print(f"{arrow} Scaled {agent_type} workers {workers} → {target} ({reason})")
+            return event
+
+    def _settle_events(self, pool: _WorkerPool, now: float):
+        """Fill in throughput_after for this pool's events whose measurement window has passed"""
+        window = pool.policy.throughput_window
+        for event in self.scaling_events:
+            if (event["agent_type"] == pool.agent_type and event["throughput_after"] is None
+                    and now - event["_at"] >= window):
+                event["throughput_after"] = round(self._throughput(pool, event["_at"], event["_at"] + window), 3)
+
+    def autoscale(self) -> List[Dict[str, Any]]:
+        """Evaluate every pool once; returns the scaling events made"""
+        events = []
+        for agent_type in list(self.pools):
+            event = self.evaluate(agent_type)
+            if event:
+                events.append(event)
+        return events
+
+    def start_autoscaler(self, interval: float = 5.0):
+        """Run autoscale() every interval seconds in a daemon thread"""
+        if self._autoscaler is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.autoscale()
+                except Exception as e:
+                    print(f"⚠️ Autoscaler error: {e}")
+
+        self._autoscaler = threading.Thread(target=loop, name="worker-autoscaler", daemon=True)
+        self._autoscaler.start()
+
+    # Status
+
+    def get_pool_status(self, agent_type: str) -> Dict[str, Any]:
+        with self._lock:
+            pool = self.pools[agent_type]
+            now = time.monotonic()
+            p95 = self._p95(pool)
+            return {
+                "agent_type": agent_type,
+                "workers": len(pool.workers) - pool.retiring,
+                "busy_workers": len(pool.running),
+                "outstanding": pool.submitted - pool.finished,
+                "submitted": pool.submitted,
+                "finished": pool.finished,
+                "failed": pool.failed,
+                "crashes": pool.crashes,
+                "broken": pool.broken,
+                "p95_latency": round(p95, 4) if p95 is not None else None,
+                "throughput": round(self._throughput(pool, now - pool.policy.throughput_window, now), 3),
+                "min_workers": pool.policy.min_workers,
+                "max_workers": pool.policy.max_workers
+            }
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "pools": {agent_type: self.get_pool_status(agent_type) for agent_type in list(self.pools)},
+            "scaling_events": [{k: v for k, v in event.items() if not k.startswith("_")}
+                               for event in list(self.scaling_events)[-20:]],
+            "autoscaler_running": self._autoscaler is not None
+        }
+
+# Global instance; no processes are started until start_pool()
+worker_supervisor = WorkerSupervisor()
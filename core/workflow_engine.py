@@ -0,0 +1,219 @@
+"""
+🕸️ Workflow Engine - DAG-Parallel Multi-Agent Execution
+Runs workflow steps as soon as their dependencies finish, with a
+concurrency cap, upstream result passing and critical-path timing
+
+Made with ❤️ by Mulky Malikul Dhaher in Indonesia 🇮🇩
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+@dataclass
+class WorkflowStep:
+    step_id: str
+    agent: str
+    task: Any
+    depends_on: List[str] = field(default_factory=list)
+    status: str = "pending"  # pending, running, completed, failed, skipped
+    result: Optional[Dict[str, Any]] = None
+    ready_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+class WorkflowValidationError(ValueError):
+    """Raised for unknown dependencies, duplicate ids or cycles"""
+
+def build_steps(workflow: List[Dict[str, Any]]) -> List[WorkflowStep]:
+    """
+    Turn workflow dicts ({"agent", "task", optional "id", "depends_on"})
+    into validated steps in topological order.
+
+    Step ids default to the agent name (suffixed on repeats). A workflow
+    in which no step declares depends_on is treated as the legacy
+    sequential list, each step depending on the previous one.
+    """
+    steps = []
+    seen: Dict[str, int] = {}
+    for index, raw in enumerate(workflow):
+        agent = raw.get("agent")
+        if not agent:
+            raise WorkflowValidationError(f"Step {index} has no agent")
+        step_id = str(raw.get("id") or agent)
+        if step_id in seen and not raw.get("id"):
+            seen[step_id] += 1
+            step_id = f"{step_id}_{seen[step_id]}"
+        elif step_id in seen:
+            raise WorkflowValidationError(f"Duplicate step id '{step_id}'")
+        else:
+            seen[step_id] = 1
+
+        depends_on = raw.get("depends_on")
+        if isinstance(depends_on, str):
+            depends_on = [depends_on]
+        steps.append(WorkflowStep(step_id=step_id, agent=agent, task=raw.get("task"),
+                                  depends_on=list(depends_on or [])))
+
+    if not any("depends_on" in raw for raw in workflow):
+        for previous, step in zip(steps, steps[1:]):
+            step.depends_on = [previous.step_id]
+
+    by_id = {step.step_id: step for step in steps}
+    for step in steps:
+        for dependency in step.depends_on:
+            if dependency not in by_id:
+                raise WorkflowValidationError(f"Step '{step.step_id}' depends on unknown step '{dependency}'")
+
+    # Kahn's algorithm: stable topological order, detects cycles
+    remaining = {step.step_id: len(set(step.depends_on)) for step in steps}
+    dependents: Dict[str, List[str]] = {step.step_id: [] for step in steps}
+    for step in steps:
+        for dependency in set(step.depends_on):
+            dependents[dependency].append(step.step_id)
+
+    ordered = []
+    ready = [step.step_id for step in steps if remaining[step.step_id] == 0]
+    while ready:
+        step_id = ready.pop(0)
+        ordered.append(by_id[step_id])
+        for dependent in dependents[step_id]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+
+    if len(ordered) != len(steps):
+        cyclic = sorted(step_id for step_id, count in remaining.items() if count > 0)
+        raise WorkflowValidationError(f"Workflow has a dependency cycle through {cyclic}")
+    return ordered
+
+class WorkflowEngine:
+    """
+    Executes a workflow DAG.
+
+    Every step gets its own coroutine that waits for its dependencies
+    and then for a slot under ``max_concurrency``; all of them are run
+    together with asyncio.gather, so a step starts the moment its last
+    dependency finishes rather than when a whole "level" does. A failed
+    step skips everything downstream of it while independent branches
+    keep running.
+    """
+
+    def __init__(self, max_concurrency: int = 4):
+        self.max_concurrency = max_concurrency
+
+    async def run(self, workflow: List[Dict[str, Any]],
+                  execute_step: Callable[[WorkflowStep, Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                  progress_callback: Optional[Callable[[Dict], None]] = None) -> Dict[str, Any]:
+        """
+        Run the workflow. execute_step(step, upstream) receives the results
+        of the step's direct dependencies keyed by step id and returns a
+        result dict whose "success" flag (default True) marks failure.
+        """
+        steps = build_steps(workflow)
+        by_id = {step.step_id: step for step in steps}
+        done = {step.step_id: asyncio.Event() for step in steps}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        start = time.monotonic()
+        finished = []
+
+        async def run_step(step: WorkflowStep):
+            try:
+                for dependency in step.depends_on:
+                    await done[dependency].wait()
+
+                blocked = [d for d in step.depends_on if by_id[d].status != "completed"]
+                step.ready_at = time.monotonic()
+                if blocked:
+                    step.status = "skipped"
+                    step.result = {
+                        "agent": step.agent,
+                        "task": step.task,
+                        "success": False,
+                        "skipped": True,
+                        "error": f"Skipped: upstream step(s) {blocked} did not complete"
+                    }
+                    return
+
+                async with semaphore:
+                    step.status = "running"
+                    step.started_at = time.monotonic()
+                    upstream = {d: by_id[d].result for d in step.depends_on}
+                    try:
+                        result = await execute_step(step, upstream)
+                    except Exception as e:
+                        result = {"agent": step.agent, "task": step.task, "error": str(e), "success": False}
+                    step.finished_at = time.monotonic()
+
+                step.result = result
+                step.status = "completed" if result.get("success", True) else "failed"
+            finally:
+                if step.finished_at is None:
+                    step.finished_at = time.monotonic()
+                finished.append(step.step_id)
+                done[step.step_id].set()
+                if progress_callback:
+                    progress_callback({
+                        "stage": "workflow",
+                        "step": len(finished),
+                        "total_steps": len(steps),
+                        "step_id": step.step_id,
+                        "agent": step.agent,
+                        "status": step.status,
+                        "success": step.status == "completed"
+                    })
+
+        await asyncio.gather(*(run_step(step) for step in steps))
+
+        return {
+            "steps": steps,
+            "results": [dict(step.result or {}, step_id=step.step_id, status=step.status) for step in steps],
+            "success": all(step.status == "completed" for step in steps),
+            "timing": self.timing_report(steps, start)
+        }
+
+    @staticmethod
+    def timing_report(steps: List[WorkflowStep], start: float) -> Dict[str, Any]:
+        """
+        Per-step timings plus the critical path: the chain of dependencies
+        that determined when the workflow finished. Walking back from the
+        last step to finish, each hop follows the dependency that finished
+        last (the one the step actually waited on).
+        """
+        by_id = {step.step_id: step for step in steps}
+        executed = [s for s in steps if s.started_at is not None]
+
+        def duration(step):
+            return (step.finished_at - step.started_at) if step.started_at else 0.0
+
+        wall_time = max((s.finished_at for s in steps if s.finished_at), default=start) - start
+        serial_time = sum(duration(s) for s in executed)
+
+        path = []
+        current = max(steps, key=lambda s: s.finished_at or start, default=None)
+        while current is not None:
+            path.append(current)
+            upstream = [by_id[d] for d in current.depends_on]
+            current = max(upstream, key=lambda s: s.finished_at or start) if upstream else None
+        path.reverse()
+
+        return {
+            "wall_time": round(wall_time, 4),
+            "serial_time": round(serial_time, 4),
+            "parallel_speedup": round(serial_time / wall_time, 2) if wall_time > 0 else 1.0,
+            "critical_path": [step.step_id for step in path],
+            "critical_path_time": round(sum(duration(s) for s in path), 4),
+            "steps": {
+                step.step_id: {
+                    "agent": step.agent,
+                    "status": step.status,
+                    "depends_on": step.depends_on,
+                    "start": round(step.started_at - start, 4) if step.started_at else None,
+                    "duration": round(duration(step), 4),
+                    # Time spent waiting for a concurrency slot after deps finished
+                    "queue_wait": round(step.started_at - step.ready_at, 4) if step.started_at and step.ready_at else 0.0
+                }
+                for step in steps
+            }
+        }
@@ -17,6 +17,13 @@ import pickle
 import threading
 from dataclasses import dataclass, asdict
 
+try:
+    import numpy as np
+    from core.vector_index import get_semantic_index
+except ImportError:
+    np = None
+    get_semantic_index = None
+
 @dataclass
 class MemoryEntry:
     """Data structure for memory entries"""
@@ -32,10 +39,14 @@ class MemoryEntry:
 class MemoryManager:
     """Central memory management system for all agents"""
     
-    def __init__(self, db_path: str = "data/agent_memory.db"):
+    def __init__(self, db_path: str = "data/agent_memory.db", min_similarity: float = 0.1):
         self.db_path = db_path
+        self.min_similarity = min_similarity
         self.lock = threading.Lock()
+        self.semantic_index = None
+        self._memory_agents: Dict[str, str] = {}  # memory id -> agent_id, for index filtering
         self._setup_database()
+        self._setup_semantic_index()
         self._setup_external_apis()
         
     def _setup_database(self):
@@ -88,7 +99,29 @@ class MemoryManager:
             conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_memory_agent_id ON agent_memory(agent_id)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_agent_memory_timestamp ON agent_memory(timestamp)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_knowledge_base_topic ON knowledge_base(topic)")
+    
+    def _setup_semantic_index(self):
+        """Load the memory vector index and reconcile it with the database"""
+        if get_semantic_index is None:
+            return
+        
+        try:
+            index_path = Path(self.db_path).parent / "vectors" / f"{Path(self.db_path).stem}.npz"
+            self.semantic_index = get_semantic_index("agent_memory", path=str(index_path))
+            
+            with sqlite3.connect(self.db_path) as conn:
+                rows = conn.execute("SELECT id, agent_id, content, embedding FROM agent_memory").fetchall()
             
+            self._memory_agents = {row[0]: row[1] for row in rows}
+            self.semantic_index.reconcile(
+                {row[0]: row for row in rows},
+                text_fn=lambda row: row[2],
+                vector_fn=lambda row: np.frombuffer(row[3], dtype=np.float32) if row[3] else None
+            )
+        except Exception as e:
+            print(f"Error setting up memory vector index: {e}")
+            self.semantic_index = None
+        
     def _setup_external_apis(self):
         """Setup external API configurations"""
         self.external_apis = {
@@ -118,11 +151,15 @@ class MemoryManager:
         """Store memory entry in database"""
         try:
             with self.lock:
+                vector = None
+                if self.semantic_index is not None:
+                    vector = self.semantic_index.embed(memory_entry.content)
+                
                 with sqlite3.connect(self.db_path) as conn:
                     conn.execute("""
                         INSERT OR REPLACE INTO agent_memory 
-                        (id, agent_id, task_id, content, metadata, timestamp, memory_type, importance)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        (id, agent_id, task_id, content, metadata, timestamp, memory_type, importance, embedding)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """, (
                         memory_entry.id,
                         memory_entry.agent_id,
@@ -131,8 +168,14 @@ class MemoryManager:
                         json.dumps(memory_entry.metadata),
                         memory_entry.timestamp,
                         memory_entry.memory_type,
-                        memory_entry.importance
+                        memory_entry.importance,
+                        vector.tobytes() if vector is not None else None
                     ))
+                
+                # Index only what the database accepted, so a failed insert leaves no search hit
+                if vector is not None:
+                    self.semantic_index.add(memory_entry.id, vector=vector)
+                    self._memory_agents[memory_entry.id] = memory_entry.agent_id
                     
             return True
         except Exception as e:
@@ -182,8 +225,11 @@ class MemoryManager:
             print(f"Error retrieving memories: {e}")
             return []
     
-    def search_memories(self, query: str, agent_id: Optional[str] = None) -> List[MemoryEntry]:
-        """Search memories by content"""
+    def search_memories(self, query: str, agent_id: Optional[str] = None, limit: int = 50) -> List[MemoryEntry]:
+        """Search memories by content (vector index when available, LIKE otherwise)"""
+        if self.semantic_index is not None:
+            return self._search_memories_semantic(query, agent_id, limit)
+        
         try:
             with sqlite3.connect(self.db_path) as conn:
                 sql_query = """
@@ -196,7 +242,8 @@ class MemoryManager:
                     sql_query += " AND agent_id = ?"
                     params.append(agent_id)
                 
-                sql_query += " ORDER BY importance DESC, timestamp DESC LIMIT 50"
+                sql_query += " ORDER BY importance DESC, timestamp DESC LIMIT ?"
+                params.append(limit)
                 
                 cursor = conn.execute(sql_query, params)
                 rows = cursor.fetchall()
@@ -221,6 +268,42 @@ class MemoryManager:
             print(f"Error searching memories: {e}")
             return []
     
+    def _search_memories_semantic(self, query: str, agent_id: Optional[str],
+                                  limit: int) -> List[MemoryEntry]:
+        """Nearest-neighbour memory search, most similar first"""
+        try:
+            filter_fn = (lambda memory_id: self._memory_agents.get(memory_id) == agent_id) if agent_id else None
+            hits = self.semantic_index.search(query, k=limit, filter_fn=filter_fn,
+                                              min_score=self.min_similarity)
+            if not hits:
+                return []
+            
+            with sqlite3.connect(self.db_path) as conn:
+                placeholders = ",".join("?" * len(hits))
+                rows = conn.execute(
+                    f"SELECT * FROM agent_memory WHERE id IN ({placeholders})",
+                    [memory_id for memory_id, _ in hits]
+                ).fetchall()
+            
+            by_id = {
+                row[0]: MemoryEntry(
+                    id=row[0],
+                    agent_id=row[1],
+                    task_id=row[2],
+                    content=row[3],
+                    metadata=json.loads(row[4]),
+                    timestamp=row[5],
+                    memory_type=row[6],
+                    importance=row[7]
+                )
+                for row in rows
+            }
+            return [by_id[memory_id] for memory_id, _ in hits if memory_id in by_id]
+            
+        except Exception as e:
+            print(f"Error searching memories: {e}")
+            return []
+    
     def store_agent_interaction(self, from_agent: str, to_agent: str, 
                                interaction_type: str, content: str, 
                                context: Optional[Dict] = None) -> bool:
@@ -464,7 +547,7 @@ class AgentMemoryInterface:
     def get_relevant_memories(self, agent_id: str, query: str, limit: int = 10) -> List[MemoryEntry]:
         """Get memories relevant to current task"""
         # Search memories for relevant content
-        memories = self.memory_manager.search_memories(query, agent_id)
+        memories = self.memory_manager.search_memories(query, agent_id, limit=limit * 2)
         
         # Also get recent high-importance memories
         recent_memories = self.memory_manager.retrieve_memories(
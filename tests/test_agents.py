@@ -24,6 +24,7 @@ from agents.data_sync import data_sync_agent
 from agents.fullstack_dev import fullstack_dev_agent
 from agents.deploy_manager import deploy_manager_agent
 from agents.prompt_generator import prompt_generator_agent
+from agents.knowledge_patterns import PatternAnalysisPipeline
 
 class TestCyberShellAgent:
     """Test CyberShell Agent functionality"""
@@ -257,6 +258,43 @@ class TestDataSyncAgent:
         assert "sqlite" in databases
         assert "postgresql" in databases
         assert "redis" in databases
+    
+    @pytest.mark.asyncio
+    async def test_hung_redis_does_not_block_the_loop(self, monkeypatch):
+        """The remote timeout bounds blocking Redis writes, which run off the event loop"""
+        import time
+        import threading
+        from core.error_recovery import ResilientExecutor, RetryPolicy
+        
+        release = threading.Event()
+        
+        class HungRedis:
+            def setex(self, key, ttl, value):
+                release.wait(5)
+        
+        monkeypatch.setitem(data_sync_agent.connections, "redis", HungRedis())
+        monkeypatch.setattr(data_sync_agent, "executor", ResilientExecutor())
+        monkeypatch.setattr(data_sync_agent, "retry_policy", RetryPolicy(max_attempts=1))
+        monkeypatch.setattr(data_sync_agent, "remote_timeout", 0.2)
+        
+        ticks = 0
+        
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        
+        ticking = asyncio.ensure_future(ticker())
+        started = time.perf_counter()
+        try:
+            result = await data_sync_agent._cache_to_redis()
+        finally:
+            release.set()
+            ticking.cancel()
+        
+        assert not result["success"] and "Deadline" in result["error"]
+        assert time.perf_counter() - started < 2 and ticks >= 5
 
 class TestFullStackDevAgent:
     """Test Full Stack Developer Agent functionality"""
@@ -516,6 +554,204 @@ class TestAgentPerformance:
         # Memory increase should be reasonable (less than 100MB)
         assert memory_increase < 100 * 1024 * 1024
 
+class TestKnowledgePatternPipeline:
+    """Test the parallel, incremental pattern analysis pipeline"""
+    
+    def _items(self, start, count):
+        from types import SimpleNamespace
+        tag_sets = [["python", "api"], ["python", "api", "asyncio"], ["react", "css"], ["sql"]]
+        return {
+            f"item{i}": SimpleNamespace(
+                created_at=datetime(2025, 1, 6, 9 + i % 3),
+                category=["code", "web", "data"][i % 3],
+                content_type="text",
+                tags=tag_sets[i % len(tag_sets)]
+            )
+            for i in range(start, start + count)
+        }
+    
+    def _pair_counts(self, pipeline):
+        tags = pipeline.vocab["tags"]
+        return {
+            tuple(sorted((tags[k >> 32], tags[k & 0xFFFFFFFF]))): int(c)
+            for k, c in zip(pipeline.cooccurrence_keys.tolist(), pipeline.cooccurrence_counts.tolist())
+        }
+    
+    @pytest.mark.asyncio
+    async def test_cooccurrence_matches_naive_count(self, tmp_path):
+        """Vectorized sparse co-occurrence equals a pairwise loop"""
+        from itertools import combinations
+        from collections import Counter
+        
+        items = self._items(0, 40)
+        pipeline = PatternAnalysisPipeline(state_dir=str(tmp_path), max_workers=2)
+        patterns = await pipeline.run(items)
+        pipeline.shutdown()
+        
+        expected = Counter()
+        for item in items.values():
+            expected.update(tuple(sorted(pair)) for pair in combinations(item.tags, 2))
+        
+        assert self._pair_counts(pipeline) == dict(expected)
+        assert {"tag_cooccurrence", "temporal_activity", "category_distribution"} <= {p["type"] for p in patterns}
+    
+    @pytest.mark.asyncio
+    async def test_incremental_runs_only_process_new_items(self, tmp_path):
+        """Incremental runs match a full run and skip already-seen items"""
+        items = self._items(0, 30)
+        incremental = PatternAnalysisPipeline(state_dir=str(tmp_path / "inc"), max_workers=2)
+        await incremental.run(items)
+        
+        assert await incremental.run(items) == []
+        assert incremental.last_run["new_items"] == 0
+        
+        items.update(self._items(30, 10))
+        await incremental.run(items)
+        assert incremental.last_run["new_items"] == 10
+        incremental.shutdown()
+        
+        full = PatternAnalysisPipeline(state_dir=str(tmp_path / "full"), max_workers=2)
+        await full.run(items)
+        full.shutdown()
+        
+        assert self._pair_counts(incremental) == self._pair_counts(full)
+        assert incremental.hours.tolist() == full.hours.tolist()
+        
+        # State survives a restart
+        restored = PatternAnalysisPipeline(state_dir=str(tmp_path / "inc"))
+        assert len(restored.processed_ids) == 40
+    
+    @pytest.mark.asyncio
+    async def test_small_first_batch_does_not_cap_the_cluster_count(self, tmp_path):
+        """Later runs add centroids up to n_clusters for items far from the existing ones"""
+        import numpy as np
+        pipeline = PatternAnalysisPipeline(state_dir=str(tmp_path), max_workers=1, n_clusters=4)
+        
+        def vectors(item_ids):
+            # One direction per tag set (items cycle through four)
+            return np.eye(4, dtype=np.float32)[[int(i[4:]) % 4 for i in item_ids]]
+        
+        items = self._items(0, 1)
+        await pipeline.run(items, vector_fn=vectors)
+        assert len(pipeline.centroids) == 1
+        
+        items.update(self._items(1, 20))
+        await pipeline.run(items, vector_fn=vectors)
+        pipeline.shutdown()
+        assert len(pipeline.centroids) == 4
+        assert int(pipeline.cluster_counts.sum()) == 21 and (pipeline.cluster_counts > 0).all()
+    
+    @pytest.mark.asyncio
+    async def test_agent_updates_patterns_in_place(self, tmp_path, monkeypatch):
+        """Re-runs keep one stored row per pattern and count only new or changed ones"""
+        import sqlite3
+        from agents.knowledge_management_agent import KnowledgeManagementAgent
+        
+        monkeypatch.chdir(tmp_path)
+        agent = KnowledgeManagementAgent()
+        agent.pattern_pipeline = PatternAnalysisPipeline(state_dir=str(tmp_path / "patterns"), max_workers=1)
+        agent.knowledge_items = self._items(0, 30)
+        try:
+            first = await agent.analyze_knowledge_patterns()
+            stored = len(agent.learning_patterns)
+            assert first["patterns_discovered"] == stored > 0
+            
+            assert (await agent.analyze_knowledge_patterns())["patterns_discovered"] == 0
+            again = await agent.analyze_knowledge_patterns(full_rebuild=True)
+            assert again["patterns_discovered"] == 0
+            
+            # New items change some patterns (e.g. counts); nothing is duplicated
+            agent.knowledge_items.update(self._items(30, 10))
+            changed = await agent.analyze_knowledge_patterns()
+            assert 0 < changed["patterns_discovered"] <= len(agent.learning_patterns)
+            
+            conn = sqlite3.connect(agent.db_path)
+            rows = conn.execute("SELECT COUNT(*) FROM learning_patterns").fetchone()[0]
+            conn.close()
+            assert rows == len(agent.learning_patterns) == agent.analytics["patterns_discovered"]
+            assert len({(p.pattern_type, json.dumps(p.pattern_data, sort_keys=True))
+                        for p in agent.learning_patterns.values()}) == rows
+        finally:
+            agent.pattern_pipeline.shutdown()
+
+class TestAgentsPackage:
+    """Test the lazily loaded agents package"""
+    
+    def test_importing_an_agent_module_keeps_the_instance_attribute(self):
+        """`import agents.X` must not replace agents.X (the instance) with the module"""
+        import importlib
+        import types
+        import agents
+        import agents.code_executor
+        importlib.import_module("agents.system_optimizer")
+        
+        for name, agent_id in (("code_executor", "code_executor"), ("system_optimizer", "system_optimizer"),
+                               ("agent_maker", "agent_maker")):
+            instance = getattr(agents, name)
+            assert not isinstance(instance, types.ModuleType)
+            assert instance is agents.AGENTS_REGISTRY.load(agent_id)
+        
+        # Submodules whose names don't collide with an agent stay bound as usual
+        import agents.knowledge_patterns
+        assert isinstance(agents.knowledge_patterns, types.ModuleType)
+
+class TestSystemOptimizer:
+    """Test System Optimizer memory handling"""
+    
+    def test_pooled_instances_keep_their_own_caches_and_tracing_stops(self, monkeypatch):
+        """Each instance registers its own history, and tracing ends with the pressure"""
+        import tracemalloc
+        from agents.system_optimizer import SystemOptimizerAgent
+        from core.memory_manager import memory_manager
+        
+        # Built outside a running loop so no background monitoring starts
+        first, second = SystemOptimizerAgent(), SystemOptimizerAgent()
+        keys = [name for name in memory_manager.cache_sizes() if ".optimization_history" in name]
+        assert sum(name.endswith(f"{id(first):x}") or name.endswith(f"{id(second):x}") for name in keys) == 2
+        
+        was_tracing = tracemalloc.is_tracing()
+        monkeypatch.setattr(memory_manager, "pressure", lambda: "moderate")
+        asyncio.run(first._optimize_memory())
+        assert tracemalloc.is_tracing() == was_tracing
+        
+        first.trace_allocations = True
+        asyncio.run(first._optimize_memory())
+        assert tracemalloc.is_tracing() and first.last_memory_report["top_allocations"]["tracing"]
+        monkeypatch.setattr(memory_manager, "pressure", lambda: "none")
+        asyncio.run(first._optimize_memory())
+        assert tracemalloc.is_tracing() == was_tracing
+
+class TestCredentialManager:
+    """Test Credential Manager key handling"""
+    
+    @pytest.mark.asyncio
+    async def test_rotating_the_master_key_keeps_credentials_readable(self, tmp_path, monkeypatch):
+        """Rotation re-encrypts stored credentials and replaces the key file"""
+        pytest.importorskip("cryptography")
+        from agents.credential_manager import CredentialManagerAgent
+        
+        monkeypatch.chdir(tmp_path)
+        agent = CredentialManagerAgent()
+        old_key = (tmp_path / "data" / "master.key").read_bytes()
+        assert ((tmp_path / "data" / "master.key").stat().st_mode & 0o777) == 0o600
+        stored = await agent.store_credential({
+            "platform": "github", "auth_method": "token", "username": "octo",
+            "credential_data": {"token": "ghp_example"}
+        })
+        assert stored["success"]
+        
+        rotated = await agent.rotate_master_key({})
+        assert rotated == {"success": True, "credentials_rotated": 1}
+        new_key = (tmp_path / "data" / "master.key").read_bytes()
+        assert new_key != old_key
+        assert not (tmp_path / "data" / "master.key.new").exists()
+        
+        # A fresh instance only has the new key on disk
+        restarted = CredentialManagerAgent()
+        fetched = await restarted.get_credential({"platform": "github", "username": "octo"})
+        assert fetched["success"]
+        assert fetched["credential"]["credential_data"] == {"token": "ghp_example"}
+
 # Fixtures and utilities
 @pytest.fixture
 def sample_task():
@@ -57,24 +57,10 @@ system_status = {
     'last_update': datetime.now().isoformat()
 }
 
-# Safe import of core components
-# Each is imported individually so one failure doesn't block others
-memory_bus = None
-llm_gateway = None
-agent_registry = {}  # Consistent naming: agent_registry (not agents_registry)
-
-def _try_import(module_path, attribute, fallback=None):
-    """Safely import a module attribute with fallback"""
-    try:
-        mod = __import__(module_path, fromlist=[attribute])
-        return getattr(mod, attribute)
-    except Exception as e:
-        print(f"  Warning: Could not import {module_path}.{attribute}: {e}")
-        return fallback
-
-# Import core components (each may fail independently)
-memory_bus = _try_import('core.memory_bus', 'memory_bus')
-llm_gateway = _try_import('connectors.llm_gateway', 'llm_gateway')
+# Lazy import of core components and agents
+# Nothing is imported until first use, so the app starts in well under a
+# second and one failing import doesn't block the others
+from core.lazy_registry import LazyRegistry
 
 # Import agents (each may fail independently)
 _agent_imports = {
@@ -94,14 +80,206 @@ _agent_imports = {
     'llm_provider_manager': ('agents.llm_provider_manager', 'llm_provider_manager'),
 }
 
-for agent_id, (module_path, attr_name) in _agent_imports.items():
-    agent_instance = _try_import(module_path, attr_name)
-    if agent_instance is not None:
-        agent_registry[agent_id] = agent_instance
+agent_registry = LazyRegistry(_agent_imports)  # Consistent naming: agent_registry (not agents_registry)
+
+# Core components (each may fail independently)
+_components = LazyRegistry({
+    'memory_bus': ('core.memory_bus', 'memory_bus'),
+    'llm_gateway': ('connectors.llm_gateway', 'llm_gateway'),
+})
+
+
+def _get_memory_bus():
+    return _components.load('memory_bus')
+
+
+def _get_llm_gateway():
+    return _components.load('llm_gateway')
+
+
+def __getattr__(name):
+    # PEP 562: keeps `from web_interface.app import memory_bus` working
+    if name in _components.specs:
+        return _components.load(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+print(f"Registered {len(_agent_imports)} agents (loaded on first use)")
+
+
+# ============================================================
+# Async Execution
+# ============================================================
+
+# All agent coroutines run on one long-lived background loop instead of a
+# fresh loop per request, so loop-bound agent resources survive between
+# requests and Flask workers only wait on a Future.
+from core.async_runner import AsyncRunner, LoopBusyError
+
+REQUEST_TIMEOUT = float(os.getenv('AGENT_REQUEST_TIMEOUT', 120))
+MAX_REQUEST_TIMEOUT = float(os.getenv('AGENT_MAX_REQUEST_TIMEOUT', 600))
+
+agent_runner = AsyncRunner(
+    name='web-agent-loop',
+    max_concurrency=int(os.getenv('AGENT_LOOP_MAX_CONCURRENCY', 32)),
+    max_pending=int(os.getenv('AGENT_LOOP_MAX_PENDING', 256)),
+    default_timeout=REQUEST_TIMEOUT
+)
+
+
+def _request_timeout(data):
+    """Per-request timeout from the JSON body, clamped to the server maximum"""
+    try:
+        timeout = float((data or {}).get('timeout', REQUEST_TIMEOUT))
+    except (TypeError, ValueError):
+        timeout = REQUEST_TIMEOUT
+    return max(0.1, min(timeout, MAX_REQUEST_TIMEOUT))
+
+
+def _run_async(coro, timeout=None):
+    """Run a coroutine on the shared agent loop and wait for its result"""
+    # Under gevent a blocking Future.result() would stall the whole hub
+    wait = socketio.sleep if _socketio_mode == 'gevent' else None
+    return agent_runner.run(coro, timeout=timeout, wait=wait)
 
-loaded_count = len(agent_registry)
-total_count = len(_agent_imports)
-print(f"Loaded {loaded_count}/{total_count} agents, memory_bus={'OK' if memory_bus else 'NA'}, llm_gateway={'OK' if llm_gateway else 'NA'}")
+
+def _call_agent(func, *args, timeout=None):
+    """Call a sync or async agent method, routing coroutines to the agent loop"""
+    if asyncio.iscoroutinefunction(func):
+        return _run_async(func(*args), timeout)
+    return func(*args)
+
+
+# Prompt jobs: accepted immediately, executed by a bounded worker pool on
+# the agent loop and pushed to subscribers over SocketIO
+from core.job_queue import JobQueue, JobQueueFullError
+
+job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def _emit_job_event(event, job):
+    socketio.emit(event, job, room=f"job_{job['job_id']}")
+    socketio.emit('job_update', {'event': event, 'job_id': job['job_id'],
+                                 'status': job['status'], 'progress': job['progress']},
+                  room='system_updates')
+
+
+def _get_job_queue():
+    """Create the prompt job queue on first use (requires prompt_master)"""
+    global job_queue
+    if job_queue is None and 'prompt_master' in agent_registry:
+        with _job_queue_lock:
+            if job_queue is None:
+                queue = JobQueue(
+                    agent_registry['prompt_master'],
+                    store=_get_memory_bus(),
+                    runner=agent_runner,
+                    max_workers=int(os.getenv('JOB_WORKERS', 4)),
+                    max_queue_size=int(os.getenv('JOB_MAX_QUEUE', 500)),
+                    job_timeout=float(os.getenv('JOB_TIMEOUT', 1800))
+                )
+                queue.add_listener(_emit_job_event)
+                job_queue = queue
+    return job_queue
+
+
+# ============================================================
+# Status Aggregation
+# ============================================================
+
+# Dashboard polls and the monitoring loop share one cached snapshot; each
+# source is recomputed at most once per its TTL however many clients poll.
+from core.status_aggregator import StatusAggregator
+
+STATUS_TTL = float(os.getenv('STATUS_CACHE_TTL', 2))
+status_aggregator = StatusAggregator(ttl=STATUS_TTL)
+
+
+def _system_source():
+    # Only agents imported so far: a status poll must not trigger the imports
+    loaded = agent_registry.loaded()
+    return {
+        'system_status': 'running' if loaded else 'partial',
+        'agents_active': len(loaded),
+        'agents_ready': len([a for a in loaded.values()
+                             if hasattr(a, 'status') and a.status == 'ready']),
+        'total_agents': len(agent_registry.available()),
+        'loaded_agents': list(loaded.keys()),
+        'components': {
+            'memory_bus': _get_memory_bus() is not None,
+            'llm_gateway': _get_llm_gateway() is not None,
+        }
+    }
+
+
+def _prompt_master_source():
+    if 'prompt_master' not in agent_registry:
+        return {}
+    master_status = agent_registry['prompt_master'].get_system_status()
+    return {
+        # Whole seconds so the value doesn't change on every refresh
+        'uptime': int(master_status.get('uptime', 0)),
+        'active_tasks': master_status.get('active_tasks', 0),
+        'memory_usage': master_status.get('memory_usage', 'Unknown')
+    }
+
+
+def _llm_source():
+    llm_gateway = _get_llm_gateway()
+    if not llm_gateway:
+        return {}
+    return {'llm_providers': len([p for p in llm_gateway.providers.values() if p.get('status') != 'disabled'])}
+
+
+def _jobs_source():
+    if job_queue is None:
+        return {}
+    metrics = job_queue.get_metrics()
+    return {key: metrics[key] for key in ('queue_depth', 'running', 'analyzing', 'completed', 'failed')}
+
+
+status_aggregator.register('system', _system_source)
+status_aggregator.register('prompt_master', _prompt_master_source, ttl=max(STATUS_TTL, 5))
+status_aggregator.register('llm', _llm_source, ttl=max(STATUS_TTL, 30))
+status_aggregator.register('jobs', _jobs_source, ttl=1)
+
+
+# Agents that are not re-entrant (e.g. cybershell) are leased exclusively
+# from a per-type instance pool instead of sharing one global object
+from core.agent_pool import agent_pool
+from core.load_tracker import load_tracker
+from core.worker_supervisor import worker_supervisor
+
+
+def _run_agent_task(agent_id, task_data, timeout=None):
+    """Run an agent's process_task: in its worker pool if one runs, else leasing pooled agents for the call"""
+    # Direct submissions count towards the agent's live load like PromptMaster tasks
+    with load_tracker.track(agent_id, 'web'):
+        if worker_supervisor.routes(agent_id):
+            return _run_async(worker_supervisor.run(agent_id, task_data, timeout=timeout), timeout)
+        agent = agent_registry[agent_id]
+        if agent_pool.is_pooled(agent_id) and asyncio.iscoroutinefunction(agent.process_task):
+            async def leased():
+                async with agent_pool.lease(agent_id) as instance:
+                    return await (instance or agent).process_task(task_data)
+            return _run_async(leased(), timeout)
+        return _call_agent(agent.process_task, task_data, timeout=timeout)
+
+
+def _overloaded_response():
+    return jsonify({
+        'success': False,
+        'error': 'Server is busy, retry later',
+        'runner': agent_runner.get_stats()
+    }), 503
+
+
+def _timeout_response(timeout):
+    return jsonify({
+        'success': False,
+        'error': f'Request timed out after {timeout:.1f}s'
+    }), 504
 
 
 # ============================================================
@@ -160,36 +338,29 @@ def integrations():
 
 @app.route('/api/system/status')
 def get_system_status():
-    """Get current system status"""
+    """Get current system status (served from the cached aggregator snapshot)"""
     try:
+        version, snapshot = status_aggregator.snapshot()
+        system = snapshot.get('system', {})
+
         data = {
-            'system_status': 'running' if agent_registry else 'partial',
-            'agents_active': len(agent_registry),
-            'total_agents': len(agent_registry),
-            'loaded_agents': list(agent_registry.keys()),
+            'system_status': system.get('system_status'),
+            'agents_active': system.get('agents_active'),
+            'total_agents': system.get('total_agents'),
+            'loaded_agents': system.get('loaded_agents'),
             'last_update': datetime.now().isoformat(),
             'version': '2.0.0',
-            'components': {
-                'memory_bus': memory_bus is not None,
-                'llm_gateway': llm_gateway is not None,
-            }
+            'components': system.get('components'),
+            'snapshot_version': version
         }
 
-        # Add prompt_master status if available
-        if 'prompt_master' in agent_registry:
-            try:
-                master_status = agent_registry['prompt_master'].get_system_status()
-                data['uptime'] = master_status.get('uptime', '0')
-                data['memory_usage'] = master_status.get('memory_usage', 'Unknown')
-            except Exception:
-                pass
-
-        # Add LLM provider info if available
-        if llm_gateway:
-            try:
-                data['llm_providers'] = len([p for p in llm_gateway.providers.values() if p.get('status') != 'disabled'])
-            except Exception:
-                data['llm_providers'] = 0
+        master = snapshot.get('prompt_master')
+        if master:
+            data['uptime'] = master.get('uptime', '0')
+            data['memory_usage'] = master.get('memory_usage', 'Unknown')
+
+        if 'llm_providers' in snapshot.get('llm', {}):
+            data['llm_providers'] = snapshot['llm']['llm_providers']
 
         return jsonify({'success': True, 'data': data})
 
@@ -282,22 +453,18 @@ def submit_task():
             return jsonify({
                 'success': False,
                 'error': f'Agent "{agent_id}" not found',
-                'available_agents': list(agent_registry.keys())
+                'available_agents': agent_registry.available()
             }), 404
 
         agent = agent_registry[agent_id]
 
+        timeout = _request_timeout(data)
+
         # Execute task
         if hasattr(agent, 'process_task'):
-            if asyncio.iscoroutinefunction(agent.process_task):
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                result = loop.run_until_complete(agent.process_task(task_data))
-                loop.close()
-            else:
-                result = agent.process_task(task_data)
+            result = _run_agent_task(agent_id, task_data, timeout=timeout)
         elif hasattr(agent, 'execute'):
-            result = agent.execute(task_data)
+            result = _call_agent(agent.execute, task_data, timeout=timeout)
         else:
             result = {
                 'success': True,
@@ -308,13 +475,23 @@ def submit_task():
 
         return jsonify({'success': True, 'data': result})
 
+    except LoopBusyError:
+        return _overloaded_response()
+    except asyncio.TimeoutError:
+        return _timeout_response(timeout)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/prompt/process', methods=['POST'])
 def process_prompt():
-    """Process a prompt through the system"""
+    """
+    Queue a prompt for processing and return its job id immediately.
+
+    Poll /api/jobs/<job_id> or join the job's SocketIO room
+    ('subscribe_job') for progress. Send "wait": true to block until
+    the job finishes (bounded by the request timeout).
+    """
     try:
         data = request.get_json()
         if not data:
@@ -327,40 +504,75 @@ def process_prompt():
         if not prompt:
             return jsonify({'success': False, 'error': 'Prompt is required'}), 400
 
-        # Use prompt master if available
-        if 'prompt_master' in agent_registry:
-            pm = agent_registry['prompt_master']
-
-            if hasattr(pm, 'process_prompt'):
-                if asyncio.iscoroutinefunction(pm.process_prompt):
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    result = loop.run_until_complete(
-                        pm.process_prompt(prompt, input_type, metadata)
-                    )
-                    loop.close()
-                else:
-                    result = pm.process_prompt(prompt, input_type, metadata)
-            else:
-                result = {
-                    'success': False,
-                    'error': 'Prompt processing not implemented'
-                }
-        else:
+        queue = _get_job_queue()
+        if queue is None:
             # Fallback: return available agents info
-            result = {
+            return jsonify({'success': True, 'data': {
                 'success': True,
                 'message': 'Prompt received but prompt master not available',
                 'prompt': prompt,
-                'suggested_agents': list(agent_registry.keys())
-            }
+                'suggested_agents': agent_registry.available()
+            }})
 
-        return jsonify({'success': True, 'data': result})
+        job = queue.submit(prompt, input_type, metadata)
+
+        if data.get('wait'):
+            wait = socketio.sleep if _socketio_mode == 'gevent' else time.sleep
+            state = queue.wait(job.job_id, timeout=_request_timeout(data), sleep=wait)
+            return jsonify({'success': True, 'data': state})
 
+        return jsonify({
+            'success': True,
+            'data': {
+                'job_id': job.job_id,
+                'status': job.status,
+                'poll_url': f'/api/jobs/{job.job_id}',
+                'socket_room': f'job_{job.job_id}'
+            }
+        }), 202
+
+    except JobQueueFullError as e:
+        return jsonify({'success': False, 'error': str(e), 'queue': job_queue.get_metrics()}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/jobs')
+def list_jobs():
+    """List recent jobs with queue metrics"""
+    queue = _get_job_queue()
+    if queue is None:
+        return jsonify({'success': False, 'error': 'Job queue not available'}), 503
+
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    return jsonify({
+        'success': True,
+        'data': {
+            'jobs': queue.list_jobs(request.args.get('status'), limit),
+            'metrics': queue.get_metrics()
+        }
+    })
+
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Poll a job's status, progress and result"""
+    queue = _get_job_queue()
+    state = queue.get_job(job_id) if queue else None
+    if state is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'data': state})
+
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    queue = _get_job_queue()
+    if not queue or not queue.cancel(job_id):
+        return jsonify({'success': False, 'error': 'Job not found or already finished'}), 404
+    return jsonify({'success': True, 'data': {'job_id': job_id, 'status': 'cancelling'}})
+
+
 # ============================================================
 # API Routes - LLM
 # ============================================================
@@ -369,6 +581,7 @@ def process_prompt():
 def get_llm_providers():
     """Get LLM provider status"""
     try:
+        llm_gateway = _get_llm_gateway()
         if not llm_gateway:
             return jsonify({
                 'success': False,
@@ -394,19 +607,21 @@ def get_llm_providers():
 def test_llm_providers():
     """Test all LLM providers"""
     try:
+        llm_gateway = _get_llm_gateway()
         if not llm_gateway:
             return jsonify({
                 'success': False,
                 'error': 'LLM Gateway not available'
             }), 503
 
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        test_results = loop.run_until_complete(llm_gateway.test_all_providers())
-        loop.close()
+        test_results = _run_async(llm_gateway.test_all_providers())
 
         return jsonify({'success': True, 'data': test_results})
 
+    except LoopBusyError:
+        return _overloaded_response()
+    except asyncio.TimeoutError:
+        return _timeout_response(REQUEST_TIMEOUT)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -419,6 +634,7 @@ def test_llm_providers():
 def get_memory_stats():
     """Get memory bus statistics"""
     try:
+        memory_bus = _get_memory_bus()
         if not memory_bus:
             return jsonify({
                 'success': True,
@@ -472,10 +688,17 @@ def get_performance_metrics():
             'total': getattr(disk_info, 'total', 1)
         },
         'agents': {
-            'total': len(agent_registry),
-            'active': len([a for a in agent_registry.values()
-                          if hasattr(a, 'status') and a.status == 'ready'])
+            'total': len(agent_registry.available()),
+            'loaded': len(agent_registry.loaded()),
+            'active': len([a for a in agent_registry.loaded().values()
+                          if hasattr(a, 'status') and a.status == 'ready']),
+            'imports': agent_registry.get_stats()
         },
+        'async_runner': agent_runner.get_stats(),
+        'job_queue': job_queue.get_metrics() if job_queue else None,
+        'status_cache': status_aggregator.get_stats(),
+        'agent_pool': agent_pool.get_metrics(),
+        'agent_load': load_tracker.snapshot(),
         'uptime': str(datetime.now()),
         'timestamp': datetime.now().isoformat()
     }
@@ -494,6 +717,9 @@ def execute_workflow():
         workflow_id = data.get('workflow_id', 'custom')
         steps = data.get('steps', [])
 
+        # The timeout covers the whole workflow, not each step
+        deadline = time.monotonic() + _request_timeout(data)
+
         # Execute workflow steps through available agents
         results = []
         for step in steps[:20]:  # Limit to 20 steps
@@ -503,15 +729,17 @@ def execute_workflow():
             if agent_id and agent_id in agent_registry:
                 agent = agent_registry[agent_id]
                 if hasattr(agent, 'process_task'):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        results.append({'step': len(results) + 1, 'agent': agent_id, 'error': 'Workflow timed out'})
+                        continue
                     try:
-                        if asyncio.iscoroutinefunction(agent.process_task):
-                            loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(loop)
-                            step_result = loop.run_until_complete(agent.process_task(task))
-                            loop.close()
-                        else:
-                            step_result = agent.process_task(task)
+                        step_result = _run_agent_task(agent_id, task, timeout=remaining)
                         results.append({'step': len(results) + 1, 'agent': agent_id, 'result': step_result})
+                    except LoopBusyError:
+                        return _overloaded_response()
+                    except asyncio.TimeoutError:
+                        results.append({'step': len(results) + 1, 'agent': agent_id, 'error': 'Step timed out'})
                     except Exception as e:
                         results.append({'step': len(results) + 1, 'agent': agent_id, 'error': str(e)})
                 else:
@@ -562,6 +790,24 @@ def handle_subscribe_updates():
     emit('subscription_confirmed', {
         'message': 'Subscribed to system updates'
     })
+    # Full snapshot once; the room then only receives deltas against it
+    version, snapshot = status_aggregator.snapshot()
+    emit('system_snapshot', {'version': version, 'data': snapshot})
+
+
+@socketio.on('subscribe_job')
+def handle_subscribe_job(data):
+    """Subscribe to progress events for one job"""
+    from flask_socketio import join_room
+    job_id = (data or {}).get('job_id')
+    queue = _get_job_queue()
+    state = queue.get_job(job_id) if queue and job_id else None
+    if state is None:
+        emit('error', {'message': f'Job {job_id} not found', 'timestamp': datetime.now().isoformat()})
+        return
+    join_room(f'job_{job_id}')
+    # Send the current state so late subscribers don't miss completion
+    emit('job_status', state)
 
 
 @socketio.on('request_status_update')
@@ -569,14 +815,18 @@ def handle_status_request():
     """Handle status update request"""
     try:
         status_data = {
-            'agents_count': len(agent_registry),
-            'active_agents': len([a for a in agent_registry.values()
+            'agents_count': len(agent_registry.loaded()),
+            'active_agents': len([a for a in agent_registry.loaded().values()
                                   if hasattr(a, 'status') and a.status == 'ready']),
             'system_status': 'running',
             'timestamp': datetime.now().isoformat()
         }
         emit('status_update', status_data)
 
+        # Also serves as the resync path for clients that missed a delta
+        version, snapshot = status_aggregator.snapshot()
+        emit('system_snapshot', {'version': version, 'data': snapshot})
+
     except Exception as e:
         emit('error', {
             'message': str(e),
@@ -589,20 +839,34 @@ def handle_status_request():
 # ============================================================
 
 def background_monitoring():
-    """Background monitoring and updates"""
+    """Broadcast status deltas to subscribed clients when the snapshot changes"""
+    interval = float(os.getenv('STATUS_BROADCAST_INTERVAL', 10))
+    broadcast_version, _ = status_aggregator.snapshot()
+
     while True:
         try:
             global system_status
+            version, snapshot = status_aggregator.snapshot()
+            system = snapshot.get('system', {})
             system_status.update({
                 'status': 'running',
-                'agents_active': len([a for a in agent_registry.values()
-                                      if hasattr(a, 'status') and a.status == 'ready']),
-                'total_agents': len(agent_registry),
+                'agents_active': system.get('agents_ready', 0),
+                'total_agents': system.get('total_agents', 0),
                 'last_update': datetime.now().isoformat()
             })
 
-            socketio.emit('system_update', system_status, room='system_updates')
-            time.sleep(10)
+            agent_pool.check_health()
+
+            if version != broadcast_version:
+                delta = status_aggregator.delta(broadcast_version)
+                if delta is None:
+                    # Base fell out of history; clients resync on version mismatch
+                    delta = {'version': version, 'base': broadcast_version, 'full': snapshot}
+                delta['timestamp'] = system_status['last_update']
+                socketio.emit('system_delta', delta, room='system_updates')
+                broadcast_version = version
+
+            time.sleep(interval)
 
         except Exception as e:
             print(f"Background monitoring error: {e}")
@@ -636,7 +900,19 @@ def internal_error(error):
 if __name__ == '__main__':
     print("Starting Agentic AI System Web Interface")
     print(f"Dashboard: http://localhost:{os.getenv('WEB_INTERFACE_PORT', 5000)}")
-    print(f"Loaded {len(agent_registry)} agents")
+    print(f"Registered {len(agent_registry.available())} agents")
+
+    # Start the shared agent loop before serving requests
+    agent_runner.start()
+
+    # Import agents and pre-build pooled instances off the request path;
+    # the server accepts requests meanwhile and loads on demand
+    def _warm_up():
+        if os.getenv('AGENT_PRELOAD', 'true').lower() == 'true':
+            agent_registry.preload()
+        agent_pool.warm_up()
+
+    threading.Thread(target=_warm_up, daemon=True).start()
 
     # Start background monitoring
     monitoring_thread = threading.Thread(target=background_monitoring, daemon=True)
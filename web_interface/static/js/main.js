@@ -33,6 +33,28 @@
                 App.showNotification('Disconnected from server', 'warning');
             });
 
+            this.socket.on('connect', function() {
+                App.socket.emit('subscribe_updates');
+            });
+
+            // Full snapshot on subscribe, then {version, base, set, unset} deltas
+            this.socket.on('system_snapshot', function(msg) {
+                App.statusVersion = msg.version;
+                App.statusFlat = App.flatten(msg.data);
+                App.handleSystemUpdate(msg.data.system || {});
+            });
+
+            this.socket.on('system_delta', function(delta) {
+                if (delta.full || delta.base !== App.statusVersion) {
+                    App.socket.emit('request_status_update');
+                    return;
+                }
+                (delta.unset || []).forEach(function(path) { delete App.statusFlat[path]; });
+                Object.assign(App.statusFlat, delta.set || {});
+                App.statusVersion = delta.version;
+                App.handleSystemUpdate(App.unflatten(App.statusFlat).system || {});
+            });
+
             this.socket.on('system_update', function(data) {
                 App.handleSystemUpdate(data);
             });
@@ -61,11 +83,42 @@
             }
         },
 
+        statusVersion: null,
+        statusFlat: {},
+
+        flatten: function(data, prefix, out) {
+            prefix = prefix || '';
+            out = out || {};
+            Object.keys(data || {}).forEach(function(key) {
+                const value = data[key];
+                if (value && typeof value === 'object' && !Array.isArray(value) && Object.keys(value).length) {
+                    App.flatten(value, prefix + key + '.', out);
+                } else {
+                    out[prefix + key] = value;
+                }
+            });
+            return out;
+        },
+
+        unflatten: function(flat) {
+            const data = {};
+            Object.keys(flat).forEach(function(path) {
+                const parts = path.split('.');
+                let node = data;
+                parts.slice(0, -1).forEach(function(part) {
+                    node = node[part] = node[part] || {};
+                });
+                node[parts[parts.length - 1]] = flat[path];
+            });
+            return data;
+        },
+
         handleSystemUpdate: function(data) {
             // Update agent count in sidebar if present
             const agentCountEl = document.getElementById('agent-count');
-            if (agentCountEl && data.agents_active !== undefined) {
-                agentCountEl.textContent = data.agents_active + ' Agents Active';
+            const active = data.agents_ready !== undefined ? data.agents_ready : data.agents_active;
+            if (agentCountEl && active !== undefined) {
+                agentCountEl.textContent = active + ' Agents Active';
             }
 
             // Update workflow count
@@ -494,12 +494,17 @@ class AgenticVoice {
             const result = await response.json();
             
             if (result.success) {
+                // The prompt runs as a background job; wait for it to finish
+                const data = result.data && result.data.job_id
+                    ? await this.waitForJob(result.data.job_id)
+                    : result.data;
+                
                 let responseText = '';
                 
-                if (result.data && result.data.response) {
-                    responseText = result.data.response;
-                } else if (result.data && result.data.message) {
-                    responseText = result.data.message;
+                if (data && data.response) {
+                    responseText = data.response;
+                } else if (data && data.message) {
+                    responseText = data.message;
                 } else {
                     responseText = 'Task completed successfully!';
                 }
@@ -535,6 +540,32 @@ class AgenticVoice {
         }
     }
 
+    async waitForJob(jobId, timeoutMs = 300000) {
+        // Poll /api/jobs/<job_id> with backoff until the job is final; returns job.result
+        const deadline = Date.now() + timeoutMs;
+        let delay = 250;
+        
+        while (Date.now() < deadline) {
+            await new Promise(resolve => setTimeout(resolve, delay));
+            delay = Math.min(delay * 2, 2000);
+            
+            const response = await fetch(`/api/jobs/${jobId}`);
+            const result = await response.json();
+            if (!result.success) {
+                throw new Error(result.error || 'Job not found');
+            }
+            
+            const job = result.data;
+            if (job.status === 'completed') {
+                return job.result;
+            }
+            if (['failed', 'cancelled', 'timeout'].includes(job.status)) {
+                throw new Error(job.error || `Job ${job.status}`);
+            }
+        }
+        throw new Error('Timed out waiting for the agent');
+    }
+
     async speak(text, options = {}) {
         if (this.isSpeaking) {
             this.synthesis.cancel();